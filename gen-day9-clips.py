@@ -1,9 +1,12 @@
 #!/usr/bin/env python3
 """Generate LTX-2.3 text-to-video clips for Day 9 video (AI chaos digest)."""
-import json, time, random, sys, os, subprocess
+import sys, os, subprocess
+
+from pipeline.comfy import ClipJob, get_client, print_result, run_clips, stable_seed
 
 COMFY_URL = "http://172.18.64.1:8001"
 OUTPUT_DIR = "/home/aten/zkagi-video-engine/public/scenes"
+comfy = get_client(COMFY_URL)
 os.makedirs(OUTPUT_DIR, exist_ok=True)
 
 # Text-to-video clips for each video scene
@@ -131,51 +134,6 @@ def build_t2v_workflow(prompt, seed, length=97):
     }
 
 
-def submit_workflow(workflow):
-    import urllib.request
-    data = json.dumps({"prompt": workflow}).encode()
-    req = urllib.request.Request(f"{COMFY_URL}/prompt", data=data,
-                                 headers={"Content-Type": "application/json"})
-    resp = urllib.request.urlopen(req)
-    return json.loads(resp.read())["prompt_id"]
-
-
-def poll_until_done(prompt_id, timeout=300):
-    import urllib.request
-    start = time.time()
-    while time.time() - start < timeout:
-        try:
-            resp = urllib.request.urlopen(f"{COMFY_URL}/history/{prompt_id}")
-            data = json.loads(resp.read())
-            if prompt_id in data:
-                status = data[prompt_id].get("status", {}).get("status_str", "")
-                outputs = data[prompt_id].get("outputs", {})
-                if status == "error":
-                    msgs = data[prompt_id].get("status", {}).get("messages", [])
-                    return "ERROR", None, str(msgs)
-                if outputs:
-                    return "DONE", data[prompt_id], None
-        except Exception:
-            pass
-        time.sleep(3)
-    return "TIMEOUT", None, None
-
-
-def download_output(history_data, output_path):
-    import urllib.request
-    outputs = history_data.get("outputs", {})
-    for nid, out in outputs.items():
-        for key in ["gifs", "videos", "images"]:
-            if key in out:
-                for item in out[key]:
-                    fn = item.get("filename", "")
-                    if fn.endswith(".mp4") or fn.endswith(".webm"):
-                        url = f"{COMFY_URL}/view?filename={fn}&type=output"
-                        urllib.request.urlretrieve(url, output_path)
-                        return True
-    return False
-
-
 def extract_stills(video_path, scene_idx, num_stills):
     """Extract evenly-spaced stills from a video clip for Ken Burns overflow."""
     duration = float(subprocess.check_output([
@@ -207,43 +165,23 @@ def main():
     start_idx = int(sys.argv[1]) if len(sys.argv) > 1 else 0
     end_idx = int(sys.argv[2]) if len(sys.argv) > 2 else len(CLIPS)
 
+    jobs = []
     for i in range(start_idx, end_idx):
         filename, prompt = CLIPS[i]
         output_path = os.path.join(OUTPUT_DIR, filename)
         scene_num, num_stills = scene_info[i]
 
-        if os.path.exists(output_path) and os.path.getsize(output_path) > 10000:
-            print(f"[{i+1}/{len(CLIPS)}] SKIP {filename} (already exists)")
-            extract_stills(output_path, scene_num, num_stills)
-            continue
-
-        seed = random.randint(1, 999999999)
-        workflow = build_t2v_workflow(prompt, seed)
-
-        print(f"[{i+1}/{len(CLIPS)}] Submitting {filename}...")
-        try:
-            prompt_id = submit_workflow(workflow)
-            print(f"  Prompt ID: {prompt_id}")
-        except Exception as e:
-            print(f"  ERROR submitting: {e}")
-            continue
-
-        print(f"  Polling for completion...")
-        status, data, err = poll_until_done(prompt_id, timeout=300)
-
-        if status == "DONE":
-            if download_output(data, output_path):
-                size = os.path.getsize(output_path)
-                print(f"  DONE: {filename} ({size} bytes)")
-                # Extract stills for Ken Burns overflow
-                extract_stills(output_path, scene_num, num_stills)
-            else:
-                print(f"  ERROR: Could not find video in outputs")
-        elif status == "ERROR":
-            print(f"  ERROR: {err}")
-        else:
-            print(f"  TIMEOUT after 300s")
+        seed = stable_seed(prompt)
+        jobs.append(ClipJob(filename, output_path, build_t2v_workflow(prompt, seed),
+                            meta={"scene": scene_num, "stills": num_stills}))
+
+    def on_result(result):
+        print_result(result)
+        if result.ok:
+            # Extract stills for Ken Burns overflow
+            extract_stills(result.job.dest, result.job.meta["scene"], result.job.meta["stills"])
 
+    run_clips(jobs, comfy, on_result=on_result)
     print("\nAll clips done!")
 
 
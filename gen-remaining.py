@@ -1,9 +1,12 @@
 #!/usr/bin/env python3
 """Generate remaining LTX-2 clips (scenes 1-4) with 97 frames for speed."""
-import json, time, random, subprocess, sys, os, urllib.request
+import os
+
+from pipeline.comfy import ClipJob, get_client, run_clips, stable_seed
 
 COMFY_URL = "http://172.18.64.1:8001"
 OUTPUT_DIR = "/home/aten/zkagi-video-engine/public/scenes"
+comfy = get_client(COMFY_URL)
 
 SCENES = [
     {
@@ -75,71 +78,15 @@ def build_workflow(prompt, filename_prefix, seed, length=97):
         "18": {"class_type": "SaveVideo", "inputs": {"video": ["17", 0], "filename_prefix": filename_prefix, "format": "mp4", "codec": "h264"}},
     }
 
-def submit(workflow):
-    data = json.dumps({"prompt": workflow}).encode()
-    req = urllib.request.Request(f"{COMFY_URL}/prompt", data=data, headers={"Content-Type": "application/json"})
-    try:
-        resp = urllib.request.urlopen(req)
-        return json.loads(resp.read())["prompt_id"]
-    except urllib.error.HTTPError as e:
-        print(f"  HTTP {e.code}: {e.read().decode()}")
-        return None
-
-def poll(prompt_id, timeout=900):
-    start = time.time()
-    while time.time() - start < timeout:
-        resp = urllib.request.urlopen(f"{COMFY_URL}/history/{prompt_id}")
-        data = json.loads(resp.read())
-        if prompt_id in data:
-            status = data[prompt_id].get("status", {}).get("status_str", "")
-            if status == "error":
-                print(f"  ERROR: {data[prompt_id].get('status', {}).get('messages', [])}")
-                return None
-            outputs = data[prompt_id].get("outputs", {})
-            if outputs:
-                return outputs
-        time.sleep(10)
-    print(f"  TIMEOUT")
-    return None
-
-def download(outputs, dest):
-    for nid, out in outputs.items():
-        for key in ["gifs", "videos", "images"]:
-            if key in out:
-                for item in out[key]:
-                    fn = item.get("filename", "")
-                    if fn.endswith(".mp4"):
-                        sf = item.get("subfolder", "")
-                        url = f"{COMFY_URL}/view?filename={fn}&type=output"
-                        if sf: url += f"&subfolder={sf}"
-                        urllib.request.urlretrieve(url, dest)
-                        return True
-    return False
-
-# Submit ALL jobs to queue at once
-prompt_ids = []
+# Keep the ComfyUI queue full and save clips in the order they finish
+jobs = []
 for scene in SCENES:
-    seed = random.randint(1, 2**31)
+    seed = stable_seed(scene["prompt"])
     wf = build_workflow(scene["prompt"], scene["name"], seed)
-    pid = submit(wf)
-    if pid:
-        prompt_ids.append((scene, pid))
-        print(f"Submitted {scene['name']}: {pid}")
-    else:
-        print(f"FAILED to submit {scene['name']}")
+    jobs.append(ClipJob(scene["name"], os.path.join(OUTPUT_DIR, scene["output"]), wf))
 
-# Wait for each in order
-for scene, pid in prompt_ids:
-    print(f"\nWaiting for {scene['name']}...")
-    outputs = poll(pid, timeout=900)
-    if outputs:
-        dest = os.path.join(OUTPUT_DIR, scene["output"])
-        if download(outputs, dest):
-            dur = subprocess.run(["ffprobe", "-v", "error", "-show_entries", "format=duration", "-of", "csv=p=0", dest], capture_output=True, text=True).stdout.strip()
-            print(f"  Saved {dest} ({dur}s)")
-        else:
-            print(f"  No video found in outputs")
-    else:
-        print(f"  FAILED")
+report = run_clips(jobs, comfy, poll_interval=10)
+for result in report.failed:
+    print(f"FAILED {result.job.name}: {result.error}")
 
 print("\nAll done!")
@@ -1,10 +1,13 @@
 #!/usr/bin/env python3
 """Generate LTX-2 text-to-video clips via ComfyUI (no reference images needed)."""
 
-import json, time, random, subprocess, sys, os, urllib.request, urllib.parse
+import subprocess, os
+
+from pipeline.comfy import ClipJob, get_client, print_result, run_clips, stable_seed
 
 COMFY_URL = "http://172.18.64.1:8001"
 SCENES_DIR = "public/scenes"
+comfy = get_client(COMFY_URL)
 
 # Only video scenes (skip motion-graphic scenes 1 and 5)
 VIDEO_SCENES = {
@@ -152,55 +155,6 @@ def build_t2v_workflow(motion_prompt: str, output_prefix: str, seed: int) -> dic
     }
 
 
-def submit_workflow(workflow: dict) -> str:
-    """Submit workflow and return prompt_id."""
-    payload = json.dumps({"prompt": workflow}).encode()
-    req = urllib.request.Request(
-        f"{COMFY_URL}/prompt",
-        data=payload,
-        headers={"Content-Type": "application/json"}
-    )
-    with urllib.request.urlopen(req) as resp:
-        data = json.loads(resp.read())
-    return data["prompt_id"]
-
-
-def poll_completion(prompt_id: str, timeout: int = 300) -> dict:
-    """Poll until workflow completes or times out."""
-    start = time.time()
-    while time.time() - start < timeout:
-        with urllib.request.urlopen(f"{COMFY_URL}/history/{prompt_id}") as resp:
-            history = json.loads(resp.read())
-        if prompt_id in history:
-            status = history[prompt_id].get("status", {}).get("status_str", "")
-            outputs = history[prompt_id].get("outputs", {})
-            if status == "error":
-                print(f"  ERROR: {json.dumps(history[prompt_id].get('status', {}), indent=2)}")
-                return None
-            if outputs:
-                return outputs
-        time.sleep(3)
-    print(f"  TIMEOUT after {timeout}s")
-    return None
-
-
-def download_video(outputs: dict, dest: str):
-    """Find and download the video file from outputs."""
-    for nid, out in outputs.items():
-        for key in ["gifs", "videos", "images"]:
-            if key in out:
-                for item in out[key]:
-                    fn = item.get("filename", "")
-                    if fn.endswith(".mp4") or fn.endswith(".webm"):
-                        url = f"{COMFY_URL}/view?filename={urllib.parse.quote(fn)}&type=output"
-                        urllib.request.urlretrieve(url, dest)
-                        size = os.path.getsize(dest)
-                        print(f"  Downloaded: {dest} ({size} bytes)")
-                        return True
-    print(f"  No video found in outputs")
-    return False
-
-
 def extract_frames(video_path: str, scene_idx: int, num_frames: int):
     """Extract frames from video for Ken Burns overflow images."""
     duration = float(subprocess.run(
@@ -235,36 +189,25 @@ def main():
     # S4: 12.16s > 12s → 3 overflow (b,c,d)
     overflow_counts = {0: 3, 2: 2, 3: 2, 4: 3}
 
+    jobs = []
     for scene_idx, scene in VIDEO_SCENES.items():
         out_path = os.path.join(SCENES_DIR, scene["output"])
-        print(f"\n=== Scene {scene_idx} (text-to-video) ===")
-
-        seed = random.randint(1, 2**32)
+        seed = stable_seed(scene["prompt"])
         prefix = f"scene_{scene_idx}"
-        workflow = build_t2v_workflow(scene["prompt"], prefix, seed)
-
-        print(f"  Submitting workflow (seed={seed})...")
-        prompt_id = submit_workflow(workflow)
-        print(f"  Prompt ID: {prompt_id}")
-
-        print(f"  Polling for completion...")
-        outputs = poll_completion(prompt_id, timeout=300)
-        if outputs:
-            download_video(outputs, out_path)
-            dur = subprocess.run(
-                ["ffprobe", "-v", "error", "-show_entries", "format=duration",
-                 "-of", "csv=p=0", out_path],
-                capture_output=True, text=True
-            ).stdout.strip()
-            print(f"  Duration: {dur}s")
-
-            # Extract overflow frames
-            n_overflow = overflow_counts.get(scene_idx, 0)
-            if n_overflow > 0:
-                print(f"  Extracting {n_overflow} overflow frames...")
-                extract_frames(out_path, scene_idx, n_overflow)
-        else:
-            print(f"  FAILED for scene {scene_idx}")
+        print(f"Scene {scene_idx} (text-to-video, seed={seed})")
+        jobs.append(ClipJob(f"scene-{scene_idx}-a", out_path,
+                            build_t2v_workflow(scene["prompt"], prefix, seed),
+                            meta={"scene": scene_idx}))
+
+    def on_result(result):
+        print_result(result)
+        # Extract overflow frames while the next clip is still rendering.
+        n_overflow = overflow_counts.get(result.job.meta["scene"], 0)
+        if result.ok and n_overflow > 0:
+            print(f"  Extracting {n_overflow} overflow frames...")
+            extract_frames(result.job.dest, result.job.meta["scene"], n_overflow)
+
+    run_clips(jobs, comfy, on_result=on_result)
 
     print("\n=== Summary ===")
     for f in sorted(os.listdir(SCENES_DIR)):
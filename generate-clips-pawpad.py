@@ -1,10 +1,11 @@
 #!/usr/bin/env python3
 """Generate LTX-2 video clips for PawPad DeFi Horror Stories via ComfyUI."""
 
-import json, time, random, sys, os, urllib.request, urllib.parse
+from pipeline.comfy import ClipJob, get_client, run_clips, stable_seed
 
 COMFY_URL = "http://172.18.64.1:8001"
 SCENES_DIR = "/home/aten/zkagi-video-engine/public/scenes"
+comfy = get_client(COMFY_URL)
 
 MOTION_PROMPTS = [
     # Scene 0: Rick approves unlimited
@@ -24,26 +25,7 @@ NEGATIVE_PROMPT = "static, frozen, no motion, blurry, low quality, distorted, te
 
 def upload_image(filepath):
     """Upload image to ComfyUI, return the server-side filename."""
-    filename = os.path.basename(filepath)
-    with open(filepath, "rb") as f:
-        data = f.read()
-
-    boundary = "----WebKitFormBoundary" + str(random.randint(10**15, 10**16))
-    body = (
-        f"--{boundary}\r\n"
-        f'Content-Disposition: form-data; name="image"; filename="{filename}"\r\n'
-        f"Content-Type: image/png\r\n\r\n"
-    ).encode() + data + f"\r\n--{boundary}--\r\n".encode()
-
-    req = urllib.request.Request(
-        f"{COMFY_URL}/upload/image",
-        data=body,
-        headers={"Content-Type": f"multipart/form-data; boundary={boundary}"},
-        method="POST",
-    )
-    resp = urllib.request.urlopen(req)
-    result = json.loads(resp.read())
-    return result.get("name", filename)
+    return comfy.upload_image(filepath)
 
 
 def build_workflow(image_name, motion_prompt, seed, scene_idx=0):
@@ -182,109 +164,26 @@ def build_workflow(image_name, motion_prompt, seed, scene_idx=0):
     }
 
 
-def submit_workflow(workflow):
-    """Submit workflow to ComfyUI and return prompt_id."""
-    payload = json.dumps({"prompt": workflow}).encode()
-    req = urllib.request.Request(
-        f"{COMFY_URL}/prompt",
-        data=payload,
-        headers={"Content-Type": "application/json"},
-        method="POST",
-    )
-    resp = urllib.request.urlopen(req)
-    result = json.loads(resp.read())
-    if "error" in result:
-        print(f"  ERROR: {result['error']}")
-        if "node_errors" in result:
-            for nid, err in result["node_errors"].items():
-                print(f"    Node {nid}: {err}")
-        return None
-    return result["prompt_id"]
-
-
-def poll_completion(prompt_id, timeout=300):
-    """Poll until workflow completes or errors."""
-    start = time.time()
-    while time.time() - start < timeout:
-        try:
-            resp = urllib.request.urlopen(f"{COMFY_URL}/history/{prompt_id}")
-            history = json.loads(resp.read())
-            if prompt_id in history:
-                status = history[prompt_id].get("status", {}).get("status_str", "")
-                outputs = history[prompt_id].get("outputs", {})
-                if status == "error":
-                    print(f"  ERROR in workflow")
-                    msgs = history[prompt_id].get("status", {}).get("messages", [])
-                    for m in msgs:
-                        print(f"    {m}")
-                    return None
-                if outputs:
-                    return history[prompt_id]
-        except Exception as e:
-            print(f"  Poll error: {e}")
-        time.sleep(5)
-    print(f"  TIMEOUT after {timeout}s")
-    return None
-
-
-def download_video(history_entry, output_path):
-    """Download the generated video from ComfyUI."""
-    outputs = history_entry.get("outputs", {})
-    for nid, out in outputs.items():
-        for key in ["gifs", "videos", "images"]:
-            if key in out:
-                for item in out[key]:
-                    fn = item.get("filename", "")
-                    subfolder = item.get("subfolder", "")
-                    if fn.endswith(".mp4"):
-                        url = f"{COMFY_URL}/view?filename={urllib.parse.quote(fn)}&type=output"
-                        if subfolder:
-                            url += f"&subfolder={urllib.parse.quote(subfolder)}"
-                        urllib.request.urlretrieve(url, output_path)
-                        return True
-    return False
+def scene_workflow(image_path, scene_idx):
+    """Workflow builder for one scene; uploads its image when the runner asks."""
+    def build():
+        print(f"  Uploading {image_path}...")
+        image_name = upload_image(image_path)
+        print(f"  Uploaded as: {image_name}")
+        seed = stable_seed(image_name, MOTION_PROMPTS[scene_idx])
+        return build_workflow(image_name, MOTION_PROMPTS[scene_idx], seed, scene_idx)
+    return build
 
 
 def main():
+    jobs = []
     for i in range(2, 5):  # scenes 2,3,4 (0,1 already done)
-        print(f"\n{'='*60}")
-        print(f"SCENE {i}: Generating video clip...")
-        print(f"{'='*60}")
-
         image_path = f"{SCENES_DIR}/scene-{i}-a.png"
         output_path = f"{SCENES_DIR}/scene-{i}-a.mp4"
+        jobs.append(ClipJob(f"scene-{i}-a", output_path, scene_workflow(image_path, i)))
 
-        # Upload image
-        print(f"  Uploading {image_path}...")
-        image_name = upload_image(image_path)
-        print(f"  Uploaded as: {image_name}")
-
-        # Build workflow
-        seed = random.randint(1, 2**32)
-        workflow = build_workflow(image_name, MOTION_PROMPTS[i], seed, i)
-
-        # Submit
-        print(f"  Submitting workflow (seed={seed})...")
-        prompt_id = submit_workflow(workflow)
-        if not prompt_id:
-            print(f"  FAILED to submit scene {i}")
-            continue
-        print(f"  Submitted: {prompt_id}")
-
-        # Poll
-        print(f"  Waiting for completion...")
-        result = poll_completion(prompt_id, timeout=300)
-        if not result:
-            print(f"  FAILED scene {i}")
-            continue
-
-        # Download
-        print(f"  Downloading video...")
-        if download_video(result, output_path):
-            size = os.path.getsize(output_path)
-            print(f"  DONE: {output_path} ({size} bytes)")
-        else:
-            print(f"  FAILED to download scene {i}")
+    # Queues every scene at once and downloads each clip as it finishes.
+    run_clips(jobs, comfy, poll_interval=5)
 
     print(f"\n{'='*60}")
     print("All scenes processed!")
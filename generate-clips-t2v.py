@@ -1,10 +1,14 @@
 #!/usr/bin/env python3
 """Generate LTX-2 text-to-video clips for Zynapse Content Factory demo."""
 
-import json, time, random, subprocess, sys, os, urllib.request, urllib.error
+import os
+
+from pipeline.comfy import ClipJob, get_client, run_clips, stable_seed
+from pipeline.comfy.templates import T2V, check_templates
 
 COMFY_URL = "http://172.18.64.1:8001"
 OUTPUT_DIR = "public/scenes"
+comfy = get_client(COMFY_URL)
 
 SCENES = [
     {
@@ -33,190 +37,29 @@ NEGATIVE = "static, frozen, no motion, blurry, low quality, distorted, text, wat
 
 
 def build_workflow(prompt, seed, prefix):
-    return {
-        "1": {
-            "class_type": "CheckpointLoaderSimple",
-            "inputs": {"ckpt_name": "ltx-2.3-22b-dev-fp8.safetensors"},
-        },
-        "2": {
-            "class_type": "DualCLIPLoader",
-            "inputs": {
-                "clip_name1": "gemma_3_12B_it.safetensors",
-                "clip_name2": "ltx-2.3_text_projection_bf16.safetensors",
-                "type": "ltx",
-            },
-        },
-        "3": {
-            "class_type": "LoraLoaderModelOnly",
-            "inputs": {
-                "model": ["1", 0],
-                "lora_name": "ltx-2.3-distilled-lora-384.safetensors",
-                "strength_model": 1.0,
-            },
-        },
-        "4": {
-            "class_type": "CLIPTextEncode",
-            "inputs": {"text": prompt, "clip": ["2", 0]},
-        },
-        "5": {
-            "class_type": "CLIPTextEncode",
-            "inputs": {"text": NEGATIVE, "clip": ["2", 0]},
-        },
-        "6": {
-            "class_type": "LTXVConditioning",
-            "inputs": {
-                "positive": ["4", 0],
-                "negative": ["5", 0],
-                "frame_rate": 25,
-            },
-        },
-        "7": {
-            "class_type": "EmptyLTXVLatentVideo",
-            "inputs": {
-                "width": 768,
-                "height": 512,
-                "length": 97,
-                "batch_size": 1,
-            },
-        },
-        "8": {
-            "class_type": "LTXVScheduler",
-            "inputs": {
-                "steps": 8,
-                "max_shift": 2.05,
-                "base_shift": 0.95,
-                "stretch": True,
-                "terminal": 0.1,
-                "latent": ["7", 0],
-            },
-        },
-        "9": {
-            "class_type": "RandomNoise",
-            "inputs": {"noise_seed": seed},
-        },
-        "10": {
-            "class_type": "CFGGuider",
-            "inputs": {
-                "model": ["3", 0],
-                "positive": ["6", 0],
-                "negative": ["6", 1],
-                "cfg": 1.0,
-            },
-        },
-        "11": {
-            "class_type": "KSamplerSelect",
-            "inputs": {"sampler_name": "euler"},
-        },
-        "12": {
-            "class_type": "SamplerCustomAdvanced",
-            "inputs": {
-                "noise": ["9", 0],
-                "guider": ["10", 0],
-                "sampler": ["11", 0],
-                "sigmas": ["8", 0],
-                "latent_image": ["7", 0],
-            },
-        },
-        "13": {
-            "class_type": "VAEDecode",
-            "inputs": {"samples": ["12", 0], "vae": ["1", 2]},
-        },
-        "14": {
-            "class_type": "CreateVideo",
-            "inputs": {"images": ["13", 0], "fps": 25.0},
-        },
-        "15": {
-            "class_type": "SaveVideo",
-            "inputs": {
-                "video": ["14", 0],
-                "filename_prefix": prefix,
-                "format": "mp4",
-                "codec": "h264",
-            },
-        },
-    }
-
-
-def submit_workflow(workflow):
-    data = json.dumps({"prompt": workflow}).encode()
-    req = urllib.request.Request(
-        f"{COMFY_URL}/prompt",
-        data=data,
-        headers={"Content-Type": "application/json"},
-    )
-    resp = urllib.request.urlopen(req)
-    return json.loads(resp.read())["prompt_id"]
-
-
-def poll_completion(prompt_id, timeout=300):
-    start = time.time()
-    while time.time() - start < timeout:
-        try:
-            resp = urllib.request.urlopen(f"{COMFY_URL}/history/{prompt_id}")
-            data = json.loads(resp.read())
-            if prompt_id in data:
-                status = data[prompt_id].get("status", {}).get("status_str", "")
-                outputs = data[prompt_id].get("outputs", {})
-                if status == "error":
-                    msgs = data[prompt_id].get("status", {}).get("messages", [])
-                    print(f"  ERROR: {msgs}")
-                    return None
-                if outputs:
-                    return data[prompt_id]
-        except Exception as e:
-            print(f"  Poll error: {e}")
-        time.sleep(5)
-    print(f"  TIMEOUT after {timeout}s")
-    return None
-
-
-def download_video(result, output_path):
-    outputs = result.get("outputs", {})
-    for nid, out in outputs.items():
-        for key in ["gifs", "videos", "images"]:
-            if key in out:
-                for item in out[key]:
-                    fn = item.get("filename", "")
-                    subfolder = item.get("subfolder", "")
-                    if fn.endswith(".mp4") or fn.endswith(".webm"):
-                        url = f"{COMFY_URL}/view?filename={fn}&type=output"
-                        if subfolder:
-                            url += f"&subfolder={subfolder}"
-                        urllib.request.urlretrieve(url, output_path)
-                        print(f"  Downloaded: {output_path}")
-                        return True
-    print("  No video file found in outputs")
-    return False
+    return T2V.build(prompt=prompt, seed=seed, negative=NEGATIVE, prefix=prefix)
 
 
 def main():
+    check_templates(comfy, T2V)
     os.makedirs(OUTPUT_DIR, exist_ok=True)
 
+    jobs = []
     for scene in SCENES:
         idx = scene["index"]
         prefix = f"scene_{idx}"
         output_path = f"{OUTPUT_DIR}/scene-{idx}-a.mp4"
-        seed = random.randint(1, 2**31)
-
-        print(f"\n=== Scene {idx} ===")
-        print(f"  Prompt: {scene['prompt'][:80]}...")
+        seed = stable_seed(scene["prompt"])
 
-        workflow = build_workflow(scene["prompt"], seed, prefix)
-        prompt_id = submit_workflow(workflow)
-        print(f"  Submitted: {prompt_id}")
+        print(f"=== Scene {idx} === {scene['prompt'][:80]}...")
+        jobs.append(ClipJob(f"scene-{idx}-a", output_path,
+                            build_workflow(scene["prompt"], seed, prefix)))
 
-        result = poll_completion(prompt_id, timeout=300)
-        if result:
-            download_video(result, output_path)
-            # Verify
-            dur = subprocess.run(
-                ["ffprobe", "-v", "error", "-show_entries", "format=duration",
-                 "-of", "csv=p=0", output_path],
-                capture_output=True, text=True
-            )
-            print(f"  Duration: {dur.stdout.strip()}s")
-        else:
-            print(f"  FAILED for scene {idx}")
+    # Queues every scene at once; clips are downloaded and their durations
+    # verified as they finish.
+    report = run_clips(jobs, comfy, poll_interval=5)
+    for result in report.failed:
+        print(f"  FAILED for {result.job.name}: {result.error}")
 
     print("\n=== All clips generated ===")
 
@@ -2,15 +2,16 @@
 """Generate LTX-2 video clips for Zero-Employee Enterprise video.
 Uses image-to-video for scene 0 (has reference image), text-to-video for rest."""
 
-import json
-import time
-import random
-import requests
 import subprocess
 import os
 
+from pipeline.comfy import (
+    ClipJob, get_client, print_result, run_clips, stable_seed,
+)
+
 COMFY_URL = "http://172.18.64.1:8001"
 PROJECT_DIR = "/home/aten/zkagi-video-engine"
+comfy = get_client(COMFY_URL)
 
 # Scene clips: (scene_idx, sub_clip_letter, num_frames, mode, prompt)
 # mode: "i2v" = image-to-video, "t2v" = text-to-video
@@ -99,81 +100,9 @@ def build_t2v_workflow(prompt, num_frames, seed, prefix):
 
 def upload_image(filepath):
     """Upload an image to ComfyUI and return its name."""
-    filename = os.path.basename(filepath)
-    with open(filepath, 'rb') as f:
-        resp = requests.post(f"{COMFY_URL}/upload/image",
-            files={"image": (filename, f, "image/png")},
-            data={"overwrite": "true"})
-    result = resp.json()
-    print(f"  Uploaded {filename}: {result}", flush=True)
-    return result.get("name", filename)
-
-
-def submit_workflow(workflow):
-    """Submit a workflow to ComfyUI and return prompt_id."""
-    resp = requests.post(f"{COMFY_URL}/prompt", json={"prompt": workflow})
-    result = resp.json()
-    if "error" in result:
-        print(f"  ERROR: {result['error']}", flush=True)
-        if "node_errors" in result:
-            for nid, err in result["node_errors"].items():
-                print(f"    Node {nid}: {err}", flush=True)
-        return None
-    prompt_id = result["prompt_id"]
-    print(f"  Submitted: {prompt_id}", flush=True)
-    return prompt_id
-
-
-def poll_completion(prompt_id, timeout=600):
-    """Poll until workflow completes."""
-    start = time.time()
-    while time.time() - start < timeout:
-        try:
-            resp = requests.get(f"{COMFY_URL}/history/{prompt_id}", timeout=10)
-            data = resp.json()
-            if prompt_id in data:
-                status = data[prompt_id].get("status", {}).get("status_str", "")
-                outputs = data[prompt_id].get("outputs", {})
-                if status == "error":
-                    print(f"  ERROR in workflow", flush=True)
-                    msgs = data[prompt_id].get("status", {}).get("messages", [])
-                    for msg in msgs:
-                        print(f"    {msg}", flush=True)
-                    return None
-                if outputs:
-                    return outputs
-        except Exception as e:
-            print(f"  Poll error: {e}", flush=True)
-        time.sleep(5)
-    print(f"  TIMEOUT", flush=True)
-    return None
-
-
-def download_video(outputs, dest_path):
-    """Download the output video."""
-    for nid, out in outputs.items():
-        for key in ["gifs", "videos", "images"]:
-            if key in out:
-                for item in out[key]:
-                    fn = item.get("filename", "")
-                    subfolder = item.get("subfolder", "")
-                    if fn.endswith(".mp4"):
-                        url = f"{COMFY_URL}/view?filename={fn}&type=output"
-                        if subfolder:
-                            url += f"&subfolder={subfolder}"
-                        resp = requests.get(url)
-                        with open(dest_path, "wb") as f:
-                            f.write(resp.content)
-                        result = subprocess.run(
-                            ["ffprobe", "-v", "error", "-show_entries", "format=duration",
-                             "-of", "csv=p=0", dest_path],
-                            capture_output=True, text=True)
-                        duration = result.stdout.strip()
-                        size_mb = os.path.getsize(dest_path) / (1024 * 1024)
-                        print(f"  Downloaded: {os.path.basename(dest_path)} ({duration}s, {size_mb:.1f}MB)", flush=True)
-                        return True
-    print(f"  No video found in outputs", flush=True)
-    return False
+    name = comfy.upload_image(filepath)
+    print(f"  Uploaded {os.path.basename(filepath)}: {name}", flush=True)
+    return name
 
 
 def extract_first_frame(video_path, image_path):
@@ -199,42 +128,35 @@ def main():
     else:
         print("\n[1] No reference image for scene 0, will use t2v", flush=True)
 
-    # Generate all clips
+    # Generate all clips. The runner groups the i2v clip and the t2v clips
+    # of each length so ComfyUI does not swap models between every prompt.
     print(f"\n[2] Generating {len(CLIPS)} video clips...", flush=True)
-    completed = 0
-
-    for i, (scene_idx, sub, frames, mode, prompt) in enumerate(CLIPS):
+    jobs = []
+    for scene_idx, sub, frames, mode, prompt in CLIPS:
         label = f"scene-{scene_idx}-{sub}"
         prefix = f"scene_{scene_idx}_{sub}"
         dest = f"{PROJECT_DIR}/public/scenes/{label}.mp4"
-
-        print(f"\n--- Clip {i+1}/{len(CLIPS)}: {label} ({mode}, {frames}f) ---", flush=True)
-
-        seed = random.randint(1, 2**31)
+        seed = stable_seed(mode, prompt)
 
         if mode == "i2v" and scene_idx in image_names:
             workflow = build_i2v_workflow(image_names[scene_idx], prompt, frames, seed, prefix)
         else:
             if mode == "i2v":
-                print(f"  No image available, falling back to t2v", flush=True)
+                print(f"  {label}: no image available, falling back to t2v", flush=True)
             workflow = build_t2v_workflow(prompt, frames, seed, prefix)
-
-        prompt_id = submit_workflow(workflow)
-        if not prompt_id:
-            print(f"  FAILED to submit {label}", flush=True)
-            continue
-
-        outputs = poll_completion(prompt_id, timeout=600)
-        if outputs:
-            if download_video(outputs, dest):
-                completed += 1
-                # Extract first frame as PNG for KenBurns fallback
-                png_path = f"{PROJECT_DIR}/public/scenes/{label}.png"
-                extract_first_frame(dest, png_path)
-                if os.path.exists(png_path):
-                    print(f"  Extracted first frame: {label}.png", flush=True)
-        else:
-            print(f"  FAILED to generate {label}", flush=True)
+        jobs.append(ClipJob(label, dest, workflow, timeout=600))
+
+    def on_result(result):
+        print_result(result)
+        if result.ok:
+            # Extract first frame as PNG for KenBurns fallback
+            png_path = result.job.dest[:-len(".mp4")] + ".png"
+            extract_first_frame(result.job.dest, png_path)
+            if os.path.exists(png_path):
+                print(f"  Extracted first frame: {os.path.basename(png_path)}", flush=True)
+
+    report = run_clips(jobs, comfy, on_result=on_result, poll_interval=5)
+    completed = len(report.ok)
 
     print(f"\n{'=' * 60}", flush=True)
     print(f"Complete: {completed}/{len(CLIPS)} clips generated", flush=True)
@@ -1,16 +1,14 @@
 #!/usr/bin/env python3
 """Generate LTX-2 text-to-video clips for Zynapse Content Factory demo."""
 
-import json
-import time
-import random
-import urllib.request
-import urllib.error
 import subprocess
 import os
 
+from pipeline.comfy import ClipJob, get_client, run_clips, stable_seed
+
 COMFY_URL = "http://172.18.64.1:8001"
 OUTPUT_DIR = "/home/aten/zkagi-video-engine/public/scenes"
+comfy = get_client(COMFY_URL)
 
 SCENES = [
     {
@@ -166,88 +164,22 @@ def build_workflow(scene_index: int, prompt: str, seed: int) -> dict:
     }
 
 
-def submit_workflow(workflow: dict) -> str:
-    data = json.dumps({"prompt": workflow}).encode("utf-8")
-    req = urllib.request.Request(
-        f"{COMFY_URL}/prompt",
-        data=data,
-        headers={"Content-Type": "application/json"},
-    )
-    resp = urllib.request.urlopen(req)
-    result = json.loads(resp.read())
-    return result["prompt_id"]
-
-
-def poll_completion(prompt_id: str, timeout: int = 300) -> dict:
-    start = time.time()
-    while time.time() - start < timeout:
-        try:
-            resp = urllib.request.urlopen(f"{COMFY_URL}/history/{prompt_id}")
-            data = json.loads(resp.read())
-            if prompt_id in data:
-                status = data[prompt_id].get("status", {}).get("status_str", "")
-                outputs = data[prompt_id].get("outputs", {})
-                if status == "error":
-                    print(f"  ERROR: {json.dumps(data[prompt_id].get('status', {}))}")
-                    return None
-                if outputs:
-                    return data[prompt_id]
-        except Exception as e:
-            print(f"  Poll error: {e}")
-        time.sleep(3)
-    print(f"  TIMEOUT after {timeout}s")
-    return None
-
-
-def download_video(result: dict, output_path: str) -> bool:
-    outputs = result.get("outputs", {})
-    for nid, out in outputs.items():
-        for key in ["gifs", "videos", "images"]:
-            if key in out:
-                for item in out[key]:
-                    fn = item.get("filename", "")
-                    subfolder = item.get("subfolder", "")
-                    if fn.endswith(".mp4"):
-                        url = f"{COMFY_URL}/view?filename={fn}&type=output"
-                        if subfolder:
-                            url += f"&subfolder={subfolder}"
-                        urllib.request.urlretrieve(url, output_path)
-                        print(f"  Downloaded: {output_path}")
-                        return True
-    print("  No MP4 found in outputs")
-    return False
-
-
 def main():
     os.makedirs(OUTPUT_DIR, exist_ok=True)
 
+    jobs = []
     for scene in SCENES:
         idx = scene["index"]
         prompt = scene["prompt"]
-        seed = random.randint(1, 2**31)
+        seed = stable_seed(prompt)
         output_path = os.path.join(OUTPUT_DIR, f"scene-{idx}-a.mp4")
 
-        print(f"\n{'='*60}")
-        print(f"Scene {idx}: Generating text-to-video clip...")
-        print(f"  Prompt: {prompt[:80]}...")
-        print(f"  Seed: {seed}")
+        print(f"Scene {idx} (seed {seed}): {prompt[:80]}...")
+        jobs.append(ClipJob(f"scene-{idx}-a", output_path, build_workflow(idx, prompt, seed)))
 
-        workflow = build_workflow(idx, prompt, seed)
-        prompt_id = submit_workflow(workflow)
-        print(f"  Submitted: {prompt_id}")
-
-        result = poll_completion(prompt_id, timeout=300)
-        if result:
-            download_video(result, output_path)
-            # Verify
-            dur = subprocess.run(
-                ["ffprobe", "-v", "error", "-show_entries", "format=duration",
-                 "-of", "csv=p=0", output_path],
-                capture_output=True, text=True
-            )
-            print(f"  Duration: {dur.stdout.strip()}s")
-        else:
-            print(f"  FAILED for scene {idx}")
+    # Queues every scene at once; clips are downloaded and their durations
+    # verified as they finish.
+    run_clips(jobs, comfy)
 
     # Extract Ken Burns overflow frames from each video
     print(f"\n{'='*60}")
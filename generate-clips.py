@@ -1,9 +1,13 @@
 #!/usr/bin/env python3
 """Generate all LTX-2 text-to-video clips for PawPad seed-roast video."""
-import json, time, random, sys, os, subprocess
+import sys, os
+
+from pipeline.comfy import ClipJob, get_client, run_clips, stable_seed
+from pipeline.comfy.templates import T2V, check_templates
 
 COMFY_URL = "http://172.18.64.1:8001"
 OUTPUT_DIR = "/home/aten/zkagi-video-engine/public/scenes"
+comfy = get_client(COMFY_URL)
 os.makedirs(OUTPUT_DIR, exist_ok=True)
 
 # All clips: (filename, prompt)
@@ -62,223 +66,28 @@ CLIPS = [
 NEG_PROMPT = "static, frozen, no motion, blurry, low quality, distorted, text, watermark, jittery, flickering, ugly, deformed, extra limbs, bad anatomy, words, letters, numbers"
 
 def build_workflow(prompt, seed, length=97):
-    return {
-        # 1. Load checkpoint (MODEL + VAE)
-        "1": {
-            "class_type": "CheckpointLoaderSimple",
-            "inputs": {"ckpt_name": "ltx-2.3-22b-dev-fp8.safetensors"}
-        },
-        # 2. Load text encoder (CLIP)
-        "2": {
-            "class_type": "DualCLIPLoader",
-            "inputs": {
-                "clip_name1": "gemma_3_12B_it.safetensors",
-                "clip_name2": "ltx-2.3_text_projection_bf16.safetensors",
-                "type": "ltx"
-            }
-        },
-        # 3. Apply distilled LoRA (8-step mode)
-        "3": {
-            "class_type": "LoraLoaderModelOnly",
-            "inputs": {
-                "model": ["1", 0],
-                "lora_name": "ltx-2.3-distilled-lora-384.safetensors",
-                "strength_model": 1.0
-            }
-        },
-        # 4. Positive prompt
-        "4": {
-            "class_type": "CLIPTextEncode",
-            "inputs": {
-                "text": prompt,
-                "clip": ["2", 0]
-            }
-        },
-        # 5. Negative prompt
-        "5": {
-            "class_type": "CLIPTextEncode",
-            "inputs": {
-                "text": NEG_PROMPT,
-                "clip": ["2", 0]
-            }
-        },
-        # 6. LTX conditioning
-        "6": {
-            "class_type": "LTXVConditioning",
-            "inputs": {
-                "positive": ["4", 0],
-                "negative": ["5", 0],
-                "frame_rate": 25
-            }
-        },
-        # 7. Empty video latent
-        "7": {
-            "class_type": "EmptyLTXVLatentVideo",
-            "inputs": {
-                "width": 768,
-                "height": 512,
-                "length": length,
-                "batch_size": 1
-            }
-        },
-        # 8. Scheduler (distilled: 8 steps)
-        "8": {
-            "class_type": "LTXVScheduler",
-            "inputs": {
-                "steps": 8,
-                "max_shift": 2.05,
-                "base_shift": 0.95,
-                "stretch": True,
-                "terminal": 0.1,
-                "latent": ["7", 0]
-            }
-        },
-        # 9. Random noise
-        "9": {
-            "class_type": "RandomNoise",
-            "inputs": {"noise_seed": seed}
-        },
-        # 10. CFG Guider (cfg=1.0 for distilled)
-        "10": {
-            "class_type": "CFGGuider",
-            "inputs": {
-                "model": ["3", 0],
-                "positive": ["6", 0],
-                "negative": ["6", 1],
-                "cfg": 1.0
-            }
-        },
-        # 11. Sampler select
-        "11": {
-            "class_type": "KSamplerSelect",
-            "inputs": {"sampler_name": "euler"}
-        },
-        # 12. Sample
-        "12": {
-            "class_type": "SamplerCustomAdvanced",
-            "inputs": {
-                "noise": ["9", 0],
-                "guider": ["10", 0],
-                "sampler": ["11", 0],
-                "sigmas": ["8", 0],
-                "latent_image": ["7", 0]
-            }
-        },
-        # 13. VAE Decode (skip SeparateAVLatent for video-only)
-        "13": {
-            "class_type": "VAEDecode",
-            "inputs": {
-                "samples": ["12", 0],
-                "vae": ["1", 2]
-            }
-        },
-        # 14. Create video from images
-        "14": {
-            "class_type": "CreateVideo",
-            "inputs": {
-                "images": ["13", 0],
-                "fps": 25.0
-            }
-        },
-        # 15. Save video
-        "15": {
-            "class_type": "SaveVideo",
-            "inputs": {
-                "video": ["14", 0],
-                "filename_prefix": "pawpad_clip",
-                "format": "mp4",
-                "codec": "h264"
-            }
-        }
-    }
-
-
-def submit_workflow(workflow):
-    import urllib.request
-    data = json.dumps({"prompt": workflow}).encode()
-    req = urllib.request.Request(f"{COMFY_URL}/prompt", data=data,
-                                 headers={"Content-Type": "application/json"})
-    resp = urllib.request.urlopen(req)
-    return json.loads(resp.read())["prompt_id"]
-
-
-def poll_until_done(prompt_id, timeout=300):
-    import urllib.request
-    start = time.time()
-    while time.time() - start < timeout:
-        try:
-            resp = urllib.request.urlopen(f"{COMFY_URL}/history/{prompt_id}")
-            data = json.loads(resp.read())
-            if prompt_id in data:
-                status = data[prompt_id].get("status", {}).get("status_str", "")
-                outputs = data[prompt_id].get("outputs", {})
-                if status == "error":
-                    msgs = data[prompt_id].get("status", {}).get("messages", [])
-                    return "ERROR", None, str(msgs)
-                if outputs:
-                    return "DONE", data[prompt_id], None
-        except Exception as e:
-            pass
-        time.sleep(3)
-    return "TIMEOUT", None, None
-
-
-def download_output(history_data, output_path):
-    import urllib.request
-    outputs = history_data.get("outputs", {})
-    for nid, out in outputs.items():
-        for key in ["gifs", "videos", "images"]:
-            if key in out:
-                for item in out[key]:
-                    fn = item.get("filename", "")
-                    if fn.endswith(".mp4") or fn.endswith(".webm"):
-                        url = f"{COMFY_URL}/view?filename={fn}&type=output"
-                        urllib.request.urlretrieve(url, output_path)
-                        return True
-    return False
+    return T2V.build(prompt=prompt, seed=seed, length=length, negative=NEG_PROMPT,
+                     prefix="pawpad_clip")
 
 
 def main():
+    check_templates(comfy, T2V)
     start_idx = int(sys.argv[1]) if len(sys.argv) > 1 else 0
     end_idx = int(sys.argv[2]) if len(sys.argv) > 2 else len(CLIPS)
 
     total = end_idx - start_idx
     print(f"Generating clips {start_idx} to {end_idx-1} ({total} clips)")
 
+    jobs = []
     for i in range(start_idx, end_idx):
         filename, prompt = CLIPS[i]
         output_path = os.path.join(OUTPUT_DIR, filename)
 
-        # Skip if already exists and is > 10KB
-        if os.path.exists(output_path) and os.path.getsize(output_path) > 10000:
-            print(f"[{i+1}/{len(CLIPS)}] SKIP {filename} (already exists)")
-            continue
-
-        seed = random.randint(1, 999999999)
-        workflow = build_workflow(prompt, seed)
-
-        print(f"[{i+1}/{len(CLIPS)}] Submitting {filename}...")
-        try:
-            prompt_id = submit_workflow(workflow)
-            print(f"  Prompt ID: {prompt_id}")
-        except Exception as e:
-            print(f"  ERROR submitting: {e}")
-            continue
-
-        print(f"  Polling for completion...")
-        status, data, err = poll_until_done(prompt_id, timeout=300)
-
-        if status == "DONE":
-            if download_output(data, output_path):
-                size = os.path.getsize(output_path)
-                print(f"  DONE: {filename} ({size} bytes)")
-            else:
-                print(f"  ERROR: Could not find video in outputs")
-        elif status == "ERROR":
-            print(f"  ERROR: {err}")
-        else:
-            print(f"  TIMEOUT after 300s")
+        seed = stable_seed(prompt)
+        jobs.append(ClipJob(filename, output_path, build_workflow(prompt, seed)))
 
+    # Keeps the ComfyUI queue topped up and downloads clips as they finish.
+    run_clips(jobs, comfy)
     print("\nAll done!")
 
 
@@ -1,9 +1,12 @@
 #!/usr/bin/env python3
 """Generate LTX-2 video clips for 'Don't Be Dave' video."""
-import json, time, random, subprocess, sys, os
+import os
+
+from pipeline.comfy import ClipJob, get_client, run_clips, stable_seed
 
 COMFY_URL = "http://172.18.64.1:8001"
 SCENES_DIR = "public/scenes"
+comfy = get_client(COMFY_URL)
 
 CLIPS = [
     # (image_file, output_file, motion_prompt, frames)
@@ -49,18 +52,11 @@ CLIPS = [
 
 def upload_image(image_name):
     """Upload image to ComfyUI, return the uploaded filename."""
-    filepath = os.path.join(SCENES_DIR, image_name)
-    result = subprocess.run(
-        ["curl", "-s", "-X", "POST", f"{COMFY_URL}/upload/image",
-         "-F", f"image=@{filepath}", "-F", "type=input"],
-        capture_output=True, text=True
-    )
-    data = json.loads(result.stdout)
-    return data.get("name", image_name)
+    return comfy.upload_image(os.path.join(SCENES_DIR, image_name))
 
 def build_workflow(uploaded_name, motion_prompt, frames=97):
     """Build the LTX-2 img2vid workflow with distilled LoRA."""
-    seed = random.randint(1, 2**31)
+    seed = stable_seed(uploaded_name, motion_prompt)
     return {
         # Node 1: CheckpointLoaderSimple → MODEL(0), CLIP(1 unused), VAE(2)
         "1": {
@@ -210,99 +206,24 @@ def build_workflow(uploaded_name, motion_prompt, frames=97):
         }
     }
 
-def submit_workflow(workflow):
-    """Submit workflow to ComfyUI, return prompt_id."""
-    payload = json.dumps({"prompt": workflow})
-    result = subprocess.run(
-        ["curl", "-s", "-X", "POST", f"{COMFY_URL}/prompt",
-         "-H", "Content-Type: application/json", "-d", payload],
-        capture_output=True, text=True
-    )
-    data = json.loads(result.stdout)
-    if "prompt_id" not in data:
-        print(f"  ERROR: {data}")
-        return None
-    return data["prompt_id"]
-
-def poll_completion(prompt_id, timeout=300):
-    """Poll until workflow completes. Return output filename."""
-    start = time.time()
-    while time.time() - start < timeout:
-        result = subprocess.run(
-            ["curl", "-s", f"{COMFY_URL}/history/{prompt_id}"],
-            capture_output=True, text=True
-        )
-        data = json.loads(result.stdout)
-        if prompt_id in data:
-            status = data[prompt_id].get("status", {}).get("status_str", "")
-            if status == "error":
-                msgs = data[prompt_id].get("status", {}).get("messages", [])
-                print(f"  ERROR: {msgs}")
-                return None
-            outputs = data[prompt_id].get("outputs", {})
-            if outputs:
-                # Find the video file
-                for nid, out in outputs.items():
-                    for key in ["gifs", "videos", "images"]:
-                        if key in out:
-                            for item in out[key]:
-                                fn = item.get("filename", "")
-                                if fn.endswith(".mp4") or fn.endswith(".webm"):
-                                    return fn
-                print(f"  WARNING: No video in outputs: {outputs.keys()}")
-                return None
-        time.sleep(3)
-    print("  TIMEOUT")
-    return None
-
-def download_output(filename, output_path):
-    """Download the output file from ComfyUI."""
-    subprocess.run(
-        ["curl", "-s", f"{COMFY_URL}/view?filename={filename}&type=output",
-         "--output", output_path],
-        capture_output=True
-    )
-
-def main():
-    total = len(CLIPS)
-    for i, (img, out, prompt, frames) in enumerate(CLIPS):
-        print(f"\n[{i+1}/{total}] Processing {img} → {out}")
-        out_path = os.path.join(SCENES_DIR, out)
-
-        # Skip if already exists
-        if os.path.exists(out_path) and os.path.getsize(out_path) > 10000:
-            print(f"  SKIP (already exists: {os.path.getsize(out_path)} bytes)")
-            continue
-
-        # Upload
+def clip_workflow(img, prompt, frames):
+    """Workflow builder for one clip; uploads its image when the runner asks."""
+    def build():
         print(f"  Uploading {img}...")
         uploaded = upload_image(img)
-        print(f"  Uploaded as: {uploaded}")
-
-        # Build & submit workflow
-        print(f"  Submitting workflow ({frames} frames)...")
-        wf = build_workflow(uploaded, prompt, frames)
-        pid = submit_workflow(wf)
-        if not pid:
-            print("  FAILED to submit")
-            continue
-        print(f"  Prompt ID: {pid}")
-
-        # Poll
-        print(f"  Waiting for completion...")
-        start_t = time.time()
-        output_fn = poll_completion(pid)
-        elapsed = time.time() - start_t
-        if not output_fn:
-            print(f"  FAILED after {elapsed:.0f}s")
-            continue
-        print(f"  Done in {elapsed:.0f}s → {output_fn}")
-
-        # Download
-        download_output(output_fn, out_path)
-        size = os.path.getsize(out_path)
-        print(f"  Saved: {out_path} ({size/1024:.0f}KB)")
+        print(f"  Uploaded as: {uploaded} ({frames} frames)")
+        return build_workflow(uploaded, prompt, frames)
+    return build
 
+def main():
+    jobs = []
+    for img, out, prompt, frames in CLIPS:
+        jobs.append(ClipJob(out, os.path.join(SCENES_DIR, out),
+                            clip_workflow(img, prompt, frames)))
+
+    # Queues the clips back to back and downloads each one as it finishes;
+    # a failed upload, submit or download fails that clip, not the batch.
+    run_clips(jobs, comfy)
     print("\n=== ALL CLIPS DONE ===")
 
 if __name__ == "__main__":
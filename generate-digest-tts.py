@@ -1,14 +1,19 @@
 #!/usr/bin/env python3
 """Generate TTS audio for all 7 scenes of the daily AI digest using pad voice."""
-import os, sys, time, wave, subprocess
+import os, sys, time
+
+from pipeline.tts import (TTSClient, TTSJob, Voice, postprocess_many, summarize,
+                          write_manifest)
+from pipeline.tts.manifest import scene_paths
+from pipeline.tts.post import enabled as post_enabled, print_post
 
-TTS_URL = "https://avatar.zkagi.ai/v1/clone-tts"
 REF_AUDIO = "voices/pad.wav"
 REF_TEXT = "Today, software handles our money, our health, our work."
 OUTPUT_DIR = "public/audio"
 os.makedirs(OUTPUT_DIR, exist_ok=True)
 
 FILENAME_PREFIX = "digest"
+PAD_FRAMES = 20        # small pad after each line
 
 # TTS speaks at ~2.2 words/sec. Target: ~75s total.
 SCENES = [
@@ -35,38 +40,7 @@ SCENES = [
 ]
 
 
-def generate_tts(text, output_path):
-    """Use curl to call TTS endpoint (more reliable multipart handling)."""
-    result = subprocess.run([
-        "curl", "-s", "-X", "POST",
-        "-F", f"ref_audio=@{REF_AUDIO}",
-        "-F", f"ref_text={REF_TEXT}",
-        "-F", f"text={text}",
-        "-F", "cfg_value=2.0",
-        "-F", "steps=15",
-        "-o", output_path,
-        "-w", "%{http_code}",
-        TTS_URL,
-    ], capture_output=True, text=True, timeout=120)
-
-    http_code = result.stdout.strip()
-    if http_code != "200":
-        raise Exception(f"HTTP {http_code}: {result.stderr}")
-
-    return os.path.getsize(output_path)
-
-
-def get_wav_duration(path):
-    """Get duration of a WAV file in seconds."""
-    try:
-        with wave.open(path, 'r') as w:
-            frames = w.getnframes()
-            rate = w.getframerate()
-            return frames / rate
-    except Exception:
-        # Fallback: estimate from file size (PCM 16-bit mono 44100Hz)
-        size = os.path.getsize(path)
-        return (size - 44) / (44100 * 2)
+VOICE = Voice("pad", REF_AUDIO, REF_TEXT, cfg_value="2.0", steps="15")
 
 
 def main():
@@ -74,42 +48,29 @@ def main():
     end_idx = int(sys.argv[2]) if len(sys.argv) > 2 else len(SCENES)
 
     print(f"Generating TTS for scenes {start_idx} to {end_idx - 1}")
-    durations = {}
-
-    for i in range(start_idx, end_idx):
-        output_path = os.path.join(OUTPUT_DIR, f"{FILENAME_PREFIX}-{i}.wav")
-
-        # Skip if already exists and is reasonable size
-        if os.path.exists(output_path) and os.path.getsize(output_path) > 5000:
-            dur = get_wav_duration(output_path)
-            durations[i] = dur
-            print(f"  [scene-{i}] SKIP (exists, {dur:.2f}s)")
-            continue
-
-        print(f"  [scene-{i}] Generating: {SCENES[i][:60]}...")
-        try:
-            size = generate_tts(SCENES[i], output_path)
-            dur = get_wav_duration(output_path)
-            durations[i] = dur
-            print(f"  [scene-{i}] DONE: {size} bytes, {dur:.2f}s")
-        except Exception as e:
-            print(f"  [scene-{i}] ERROR: {e}")
-
-    print("\n=== DURATIONS ===")
-    total = 0
-    for i in sorted(durations.keys()):
-        print(f"  Scene {i}: {durations[i]:.2f}s")
-        total += durations[i]
-    print(f"  TOTAL SPEECH: {total:.2f}s")
-
-    # Print frame calculation helper
-    print("\n=== FRAME CALCULATION (30fps) ===")
-    for i in sorted(durations.keys()):
-        audio_frames = int(durations[i] * 30)
-        padded = audio_frames + 20  # add small pad
-        print(f"  Scene {i}: {durations[i]:.2f}s → {audio_frames} audio frames → {padded} with pad")
-    total_frames = sum(int(d * 30) + 20 for d in durations.values())
-    print(f"  TOTAL FRAMES: {total_frames}")
+    jobs = [TTSJob(SCENES[i], VOICE, os.path.join(OUTPUT_DIR, f"{FILENAME_PREFIX}-{i}.wav"),
+                   name=f"scene-{i}")
+            for i in range(start_idx, end_idx)]
+
+    # All scenes are requested at once.  Unchanged lines come from the audio
+    # cache; without it, files already on disk are kept as they are.
+    t0 = time.monotonic()
+    with TTSClient(max_connections=len(jobs)) as tts:
+        results = tts.synthesize_many(jobs, skip_existing=tts.cache is None)
+    print(summarize(results, time.monotonic() - t0))
+
+    # Same head/tail silence and loudness for every new line.
+    fresh = [r.job.dest for r in results if r.ok and not r.skipped]
+    if fresh and post_enabled():
+        print("\n=== POST-PROCESSING ===")
+        print_post(postprocess_many(fresh))
+
+    # Frame budget of every digest scene on disk, not just this run's range.
+    paths = scene_paths(OUTPUT_DIR, f"{FILENAME_PREFIX}-{{}}.wav", len(SCENES))
+    manifest = write_manifest(paths, os.path.join(OUTPUT_DIR, f"{FILENAME_PREFIX}-manifest.json"),
+                              pad=PAD_FRAMES, tail=0)
+    print("\n=== FRAME BUDGET (30fps) ===")
+    print(manifest.table())
 
 
 if __name__ == "__main__":
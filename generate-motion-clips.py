@@ -14,25 +14,23 @@ Usage examples:
 """
 
 import argparse
-import json
 import os
 import random
-import shutil
-import subprocess
 import sys
-import time
-import urllib.error
-import urllib.parse
 import urllib.request
 
 from PIL import Image, ImageDraw, ImageFont
 
+from pipeline.comfy import ClipJob, get_client, run_clips, stable_seed
+from pipeline.comfy.templates import MOTION, check_templates
+
 # ---------------------------------------------------------------------------
 # Configuration
 # ---------------------------------------------------------------------------
 
 COMFY_URL = "http://172.18.64.1:8001"
 W, H = 768, 512
+comfy = get_client(COMFY_URL)
 
 FONT_DIR = os.path.join(os.path.dirname(__file__), "assets", "fonts")
 FONT_PATH = os.path.join(FONT_DIR, "Inter-Bold.ttf")
@@ -554,35 +552,7 @@ def render_grid(title: str, stats: list) -> Image.Image:
 
 def upload_image(image_path: str) -> str:
     """Upload an image to ComfyUI and return the server-side filename."""
-    filename = os.path.basename(image_path)
-    with open(image_path, "rb") as f:
-        file_data = f.read()
-
-    # Build multipart/form-data manually (no external deps)
-    boundary = f"----PythonBoundary{random.randint(100000, 999999)}"
-    body = b""
-    body += f"--{boundary}\r\n".encode()
-    body += (
-        f'Content-Disposition: form-data; name="image"; '
-        f'filename="{filename}"\r\n'
-    ).encode()
-    body += b"Content-Type: image/png\r\n\r\n"
-    body += file_data
-    body += b"\r\n"
-    body += f"--{boundary}\r\n".encode()
-    body += b'Content-Disposition: form-data; name="overwrite"\r\n\r\n'
-    body += b"true\r\n"
-    body += f"--{boundary}--\r\n".encode()
-
-    req = urllib.request.Request(
-        f"{COMFY_URL}/upload/image",
-        data=body,
-        headers={"Content-Type": f"multipart/form-data; boundary={boundary}"},
-        method="POST",
-    )
-    with urllib.request.urlopen(req) as resp:
-        result = json.loads(resp.read())
-    server_name = result.get("name", filename)
+    server_name = comfy.upload_image(image_path)
     print(f"  Uploaded image: {server_name}")
     return server_name
 
@@ -595,223 +565,8 @@ def build_i2v_workflow(image_name: str, prefix: str, seed: int,
     Uses DualCLIPLoader, LTXVPreprocess, LTXVImgToVideo at low strength
     to preserve the template layout while adding subtle ambient motion.
     """
-    return {
-        # 1: CheckpointLoaderSimple -> MODEL(0), CLIP(1, unused), VAE(2)
-        "1": {
-            "class_type": "CheckpointLoaderSimple",
-            "inputs": {
-                "ckpt_name": "ltx-2.3-22b-dev-fp8.safetensors",
-            },
-        },
-        # 2: DualCLIPLoader -> CLIP(0)
-        "2": {
-            "class_type": "DualCLIPLoader",
-            "inputs": {
-                "clip_name1": "gemma_3_12B_it.safetensors",
-                "clip_name2": "ltx-2.3_text_projection_bf16.safetensors",
-                "type": "ltx",
-            },
-        },
-        # 3: LoraLoaderModelOnly -> MODEL(0)
-        "3": {
-            "class_type": "LoraLoaderModelOnly",
-            "inputs": {
-                "model": ["1", 0],
-                "lora_name": "ltx-2.3-distilled-lora-384.safetensors",
-                "strength_model": 1.0,
-            },
-        },
-        # 4: LoadImage -> IMAGE(0)
-        "4": {
-            "class_type": "LoadImage",
-            "inputs": {
-                "image": image_name,
-            },
-        },
-        # 5: LTXVPreprocess -> IMAGE(0)
-        "5": {
-            "class_type": "LTXVPreprocess",
-            "inputs": {
-                "image": ["4", 0],
-                "img_compression": 35,
-            },
-        },
-        # 6: CLIPTextEncode (positive) -> CONDITIONING(0)
-        "6": {
-            "class_type": "CLIPTextEncode",
-            "inputs": {
-                "text": MOTION_PROMPT,
-                "clip": ["2", 0],
-            },
-        },
-        # 7: CLIPTextEncode (negative) -> CONDITIONING(0)
-        "7": {
-            "class_type": "CLIPTextEncode",
-            "inputs": {
-                "text": NEGATIVE_PROMPT,
-                "clip": ["2", 0],
-            },
-        },
-        # 8: LTXVConditioning -> positive(0), negative(1)
-        "8": {
-            "class_type": "LTXVConditioning",
-            "inputs": {
-                "positive": ["6", 0],
-                "negative": ["7", 0],
-                "frame_rate": 25,
-            },
-        },
-        # 9: LTXVImgToVideo -> positive(0), negative(1), latent(2)
-        "9": {
-            "class_type": "LTXVImgToVideo",
-            "inputs": {
-                "positive": ["8", 0],
-                "negative": ["8", 1],
-                "vae": ["1", 2],
-                "image": ["5", 0],
-                "width": W,
-                "height": H,
-                "length": 97,
-                "batch_size": 1,
-                "strength": strength,
-            },
-        },
-        # 10: LTXVScheduler -> SIGMAS(0)
-        "10": {
-            "class_type": "LTXVScheduler",
-            "inputs": {
-                "steps": 8,
-                "max_shift": 2.05,
-                "base_shift": 0.95,
-                "stretch": True,
-                "terminal": 0.1,
-                "latent": ["9", 2],
-            },
-        },
-        # 11: RandomNoise -> NOISE(0)
-        "11": {
-            "class_type": "RandomNoise",
-            "inputs": {
-                "noise_seed": seed,
-            },
-        },
-        # 12: CFGGuider -> GUIDER(0)
-        "12": {
-            "class_type": "CFGGuider",
-            "inputs": {
-                "model": ["3", 0],
-                "positive": ["8", 0],
-                "negative": ["8", 1],
-                "cfg": 1.0,
-            },
-        },
-        # 13: KSamplerSelect -> SAMPLER(0)
-        "13": {
-            "class_type": "KSamplerSelect",
-            "inputs": {
-                "sampler_name": "euler",
-            },
-        },
-        # 14: SamplerCustomAdvanced -> LATENT(0), denoised(1)
-        "14": {
-            "class_type": "SamplerCustomAdvanced",
-            "inputs": {
-                "noise": ["11", 0],
-                "guider": ["12", 0],
-                "sampler": ["13", 0],
-                "sigmas": ["10", 0],
-                "latent_image": ["9", 2],
-            },
-        },
-        # 15: VAEDecode -> IMAGE(0)
-        "15": {
-            "class_type": "VAEDecode",
-            "inputs": {
-                "samples": ["14", 0],
-                "vae": ["1", 2],
-            },
-        },
-        # 16: CreateVideo -> VIDEO(0)
-        "16": {
-            "class_type": "CreateVideo",
-            "inputs": {
-                "images": ["15", 0],
-                "fps": 25.0,
-            },
-        },
-        # 17: SaveVideo
-        "17": {
-            "class_type": "SaveVideo",
-            "inputs": {
-                "video": ["16", 0],
-                "filename_prefix": prefix,
-                "format": "mp4",
-                "codec": "h264",
-            },
-        },
-    }
-
-
-def submit_workflow(workflow: dict) -> str:
-    """Submit a workflow to ComfyUI and return the prompt_id."""
-    payload = json.dumps({"prompt": workflow}).encode("utf-8")
-    req = urllib.request.Request(
-        f"{COMFY_URL}/prompt",
-        data=payload,
-        headers={"Content-Type": "application/json"},
-    )
-    with urllib.request.urlopen(req) as resp:
-        data = json.loads(resp.read())
-    return data["prompt_id"]
-
-
-def poll_completion(prompt_id: str, timeout: int = 300) -> dict | None:
-    """Poll ComfyUI history until the workflow completes or times out."""
-    start = time.time()
-    while time.time() - start < timeout:
-        try:
-            with urllib.request.urlopen(
-                f"{COMFY_URL}/history/{prompt_id}"
-            ) as resp:
-                history = json.loads(resp.read())
-            if prompt_id in history:
-                entry = history[prompt_id]
-                status = entry.get("status", {}).get("status_str", "")
-                if status == "error":
-                    msgs = entry.get("status", {}).get("messages", [])
-                    print(f"  ERROR: {msgs}")
-                    return None
-                outputs = entry.get("outputs", {})
-                if outputs:
-                    return outputs
-        except Exception as e:
-            print(f"  Poll error: {e}")
-        time.sleep(5)
-    print(f"  TIMEOUT after {timeout}s")
-    return None
-
-
-def download_video(outputs: dict, dest: str) -> bool:
-    """Find the MP4 file in ComfyUI outputs and download it."""
-    for nid, out in outputs.items():
-        for key in ["gifs", "videos", "images"]:
-            if key in out:
-                for item in out[key]:
-                    fn = item.get("filename", "")
-                    subfolder = item.get("subfolder", "")
-                    if fn.endswith(".mp4") or fn.endswith(".webm"):
-                        url = (
-                            f"{COMFY_URL}/view?"
-                            f"filename={urllib.parse.quote(fn)}&type=output"
-                        )
-                        if subfolder:
-                            url += f"&subfolder={urllib.parse.quote(subfolder)}"
-                        urllib.request.urlretrieve(url, dest)
-                        size = os.path.getsize(dest)
-                        print(f"  Downloaded: {dest} ({size:,} bytes)")
-                        return True
-    print("  No video file found in outputs")
-    return False
+    return MOTION.build(image=image_name, prompt=MOTION_PROMPT, negative=NEGATIVE_PROMPT,
+                        seed=seed, strength=strength, prefix=prefix)
 
 
 # ---------------------------------------------------------------------------
@@ -888,45 +643,28 @@ def generate_motion_clip(template_type: str, args: argparse.Namespace):
     img.save(template_png, "PNG")
     print(f"  Template saved: {template_png}")
 
-    # 3. Upload the template image to ComfyUI
-    print(f"\nUploading template to ComfyUI...")
-    server_image_name = upload_image(template_png)
-
-    # 4. Build and submit the I2V workflow
-    seed = random.randint(1, 2**31)
+    # 3. Upload the template, render it through I2V and download the result.
+    # The runner retries failures by class and verifies the download.
+    check_templates(comfy, MOTION)
+    seed = stable_seed(output)
     prefix = os.path.splitext(os.path.basename(output))[0].replace("-", "_")
-    workflow = build_i2v_workflow(
-        image_name=server_image_name,
-        prefix=prefix,
-        seed=seed,
-        strength=0.25,
-    )
-    print(f"\nSubmitting I2V workflow (seed={seed}, strength=0.25)...")
-    prompt_id = submit_workflow(workflow)
-    print(f"  Prompt ID: {prompt_id}")
-
-    # 5. Poll for completion
-    print(f"  Polling for completion...")
-    outputs = poll_completion(prompt_id, timeout=300)
-    if not outputs:
-        print("  FAILED: workflow did not complete")
-        sys.exit(1)
 
-    # 6. Download the result
-    if not download_video(outputs, output):
-        print("  FAILED: could not download video")
-        sys.exit(1)
-
-    # 7. Verify duration
-    try:
-        dur = subprocess.run(
-            ["ffprobe", "-v", "error", "-show_entries", "format=duration",
-             "-of", "csv=p=0", output],
-            capture_output=True, text=True,
+    def workflow() -> dict:
+        print("\nUploading template to ComfyUI...")
+        server_image_name = upload_image(template_png)
+        print(f"Submitting I2V workflow (seed={seed}, strength=0.25)...")
+        return build_i2v_workflow(
+            image_name=server_image_name,
+            prefix=prefix,
+            seed=seed,
+            strength=0.25,
         )
-        print(f"  Duration: {dur.stdout.strip()}s")
-    except FileNotFoundError:
-        print("  (ffprobe not found, skipping duration check)")
+
+    report = run_clips([ClipJob(os.path.basename(output), output, workflow)], comfy,
+                       poll_interval=5)
+    if report.failed:
+        print(f"  FAILED: {report.failed[0].error}")
+        sys.exit(1)
 
     print(f"\n{'=' * 60}")
     print(f"Motion clip generated: {output}")
@@ -1,16 +1,11 @@
 #!/usr/bin/env python3
 """Generate remaining LTX-2 video clips with 97 frames to avoid OOM."""
 
-import json
-import time
-import random
-import requests
-import subprocess
-import sys
-import os
+from pipeline.comfy import ClipJob, get_client, run_clips, stable_seed
 
 COMFY_URL = "http://172.18.64.1:8001"
 PROJECT_DIR = "/home/aten/zkagi-video-engine"
+comfy = get_client(COMFY_URL)
 
 # Remaining clips to generate (all 97 frames to avoid OOM)
 CLIPS = [
@@ -61,78 +56,23 @@ def main():
     image_names = {}
     for scene_idx in range(5):
         img_path = f"{PROJECT_DIR}/public/scenes/scene-{scene_idx}-a.png"
-        fn = os.path.basename(img_path)
-        with open(img_path, 'rb') as f:
-            resp = requests.post(f"{COMFY_URL}/upload/image", files={"image": (fn, f, "image/png")}, data={"overwrite": "true"})
-        image_names[scene_idx] = resp.json().get("name", fn)
+        image_names[scene_idx] = comfy.upload_image(img_path)
         print(f"  Uploaded scene-{scene_idx}: {image_names[scene_idx]}", flush=True)
 
-    print(f"\nSubmitting {len(CLIPS)} workflows...", flush=True)
     jobs = []
     for scene_idx, sub, motion in CLIPS:
         prefix = f"scene_{scene_idx}_{sub}"
-        seed = random.randint(1, 2**31)
+        seed = stable_seed(image_names[scene_idx], motion)
         workflow = build_workflow(image_names[scene_idx], motion, seed, prefix)
-        resp = requests.post(f"{COMFY_URL}/prompt", json={"prompt": workflow})
-        result = resp.json()
-        if "error" in result:
-            print(f"  ERROR submitting {prefix}: {result.get('error','?')}", flush=True)
-            if "node_errors" in result:
-                for nid, err in result["node_errors"].items():
-                    print(f"    Node {nid}: {err}", flush=True)
-            continue
-        pid = result["prompt_id"]
         dest = f"{PROJECT_DIR}/public/scenes/scene-{scene_idx}-{sub}.mp4"
-        jobs.append((pid, dest, f"scene-{scene_idx}-{sub}"))
-        print(f"  Queued: {prefix} → {pid[:12]}...", flush=True)
+        jobs.append(ClipJob(f"scene-{scene_idx}-{sub}", dest, workflow, timeout=600))
 
-    print(f"\nWaiting for {len(jobs)} clips...", flush=True)
-    completed = 0
-    for pid, dest, label in jobs:
-        print(f"\n  Generating {label}...", flush=True)
-        start = time.time()
-        while time.time() - start < 600:
-            resp = requests.get(f"{COMFY_URL}/history/{pid}")
-            data = resp.json()
-            if pid in data:
-                status = data[pid].get("status", {}).get("status_str", "")
-                outputs = data[pid].get("outputs", {})
-                if status == "error":
-                    msgs = data[pid].get("status", {}).get("messages", [])
-                    print(f"  ERROR: {label}", flush=True)
-                    for m in msgs[-2:]:
-                        if isinstance(m, list) and len(m) > 1:
-                            err_msg = str(m[1])[:300]
-                            print(f"    {m[0]}: {err_msg}", flush=True)
-                    break
-                if outputs:
-                    # Download the video
-                    for nid, out in outputs.items():
-                        for key in ["images", "animated", "videos", "gifs"]:
-                            if key in out and isinstance(out[key], list):
-                                for item in out[key]:
-                                    if isinstance(item, dict):
-                                        fn = item.get("filename", "")
-                                        if fn.endswith(".mp4"):
-                                            sf = item.get("subfolder", "")
-                                            url = f"{COMFY_URL}/view?filename={fn}&type=output"
-                                            if sf:
-                                                url += f"&subfolder={sf}"
-                                            r = requests.get(url)
-                                            with open(dest, "wb") as f:
-                                                f.write(r.content)
-                                            dur = subprocess.run(["ffprobe", "-v", "error", "-show_entries", "format=duration", "-of", "csv=p=0", dest], capture_output=True, text=True).stdout.strip()
-                                            sz = os.path.getsize(dest) / (1024*1024)
-                                            print(f"  DONE: {label} ({dur}s, {sz:.1f}MB)", flush=True)
-                                            completed += 1
-                    break
-            elapsed = int(time.time() - start)
-            if elapsed % 30 == 0 and elapsed > 0:
-                print(f"    ...{elapsed}s elapsed", flush=True)
-            time.sleep(5)
+    # Keeps the ComfyUI queue topped up and downloads clips as they finish.
+    print(f"\nGenerating {len(jobs)} clips...", flush=True)
+    report = run_clips(jobs, comfy, poll_interval=5)
 
     print(f"\n{'='*50}", flush=True)
-    print(f"Completed: {completed}/{len(jobs)} clips", flush=True)
+    print(f"Completed: {len(report.ok)}/{len(jobs)} clips", flush=True)
 
 
 if __name__ == "__main__":
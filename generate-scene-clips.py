@@ -1,16 +1,14 @@
 #!/usr/bin/env python3
 """Generate LTX-2 video clips for all scenes via ComfyUI."""
 
-import json
-import time
-import random
-import requests
-import subprocess
 import sys
-import os
+
+from pipeline.comfy import ClipJob, get_client, run_clips, stable_seed
+from pipeline.comfy.templates import I2V, check_templates
 
 COMFY_URL = "http://172.18.64.1:8001"
 PROJECT = "/home/aten/zkagi-video-engine"
+comfy = get_client(COMFY_URL)
 
 # Motion prompts for each scene (motion-focused, ~50-70 words)
 SCENE_PROMPTS = {
@@ -23,267 +21,43 @@ SCENE_PROMPTS = {
 
 def upload_image(filepath):
     """Upload an image to ComfyUI and return the filename."""
-    name = os.path.basename(filepath)
-    with open(filepath, 'rb') as f:
-        resp = requests.post(
-            f"{COMFY_URL}/upload/image",
-            files={"image": (name, f, "image/png")},
-            data={"overwrite": "true"}
-        )
-    resp.raise_for_status()
-    result = resp.json()
-    return result.get("name", name)
+    return comfy.upload_image(filepath)
 
 def build_workflow(uploaded_image_name, motion_prompt, scene_idx):
     """Build the img-to-video workflow with distilled LoRA."""
-    seed = random.randint(1, 2**31)
-
-    workflow = {
-        # 1. Load checkpoint (MODEL + VAE)
-        "1": {
-            "class_type": "CheckpointLoaderSimple",
-            "inputs": {
-                "ckpt_name": "ltx-2.3-22b-dev-fp8.safetensors"
-            }
-        },
-        # 2. Load text encoder (CLIP only)
-        "2": {
-            "class_type": "DualCLIPLoader",
-            "inputs": {
-                "clip_name1": "gemma_3_12B_it.safetensors",
-                "clip_name2": "ltx-2.3_text_projection_bf16.safetensors",
-                "type": "ltx"
-            }
-        },
-        # 3. Apply distilled LoRA to model
-        "3": {
-            "class_type": "LoraLoaderModelOnly",
-            "inputs": {
-                "model": ["1", 0],
-                "lora_name": "ltx-2.3-distilled-lora-384.safetensors",
-                "strength_model": 1.0
-            }
-        },
-        # 4. Load reference image
-        "4": {
-            "class_type": "LoadImage",
-            "inputs": {
-                "image": uploaded_image_name
-            }
-        },
-        # 5. Preprocess image
-        "5": {
-            "class_type": "LTXVPreprocess",
-            "inputs": {
-                "image": ["4", 0],
-                "img_compression": 35
-            }
-        },
-        # 6. Positive prompt (motion-focused)
-        "6": {
-            "class_type": "CLIPTextEncode",
-            "inputs": {
-                "text": motion_prompt,
-                "clip": ["2", 0]
-            }
-        },
-        # 7. Negative prompt
-        "7": {
-            "class_type": "CLIPTextEncode",
-            "inputs": {
-                "text": "static, frozen, no motion, blurry, low quality, distorted, text, watermark, jittery, flickering, ugly, deformed",
-                "clip": ["2", 0]
-            }
-        },
-        # 8. LTX conditioning with frame rate
-        "8": {
-            "class_type": "LTXVConditioning",
-            "inputs": {
-                "positive": ["6", 0],
-                "negative": ["7", 0],
-                "frame_rate": 25
-            }
-        },
-        # 9. LTXVImgToVideo — inserts reference image, creates latent
-        "9": {
-            "class_type": "LTXVImgToVideo",
-            "inputs": {
-                "positive": ["8", 0],
-                "negative": ["8", 1],
-                "vae": ["1", 2],
-                "image": ["5", 0],
-                "width": 768,
-                "height": 512,
-                "length": 97,
-                "batch_size": 1,
-                "strength": 1.0
-            }
-        },
-        # 10. Scheduler
-        "10": {
-            "class_type": "LTXVScheduler",
-            "inputs": {
-                "steps": 8,
-                "max_shift": 2.05,
-                "base_shift": 0.95,
-                "stretch": True,
-                "terminal": 0.1,
-                "latent": ["9", 2]
-            }
-        },
-        # 11. Random noise
-        "11": {
-            "class_type": "RandomNoise",
-            "inputs": {
-                "noise_seed": seed
-            }
-        },
-        # 12. CFG Guider
-        "12": {
-            "class_type": "CFGGuider",
-            "inputs": {
-                "model": ["3", 0],
-                "positive": ["9", 0],
-                "negative": ["9", 1],
-                "cfg": 1.0
-            }
-        },
-        # 13. Sampler select
-        "13": {
-            "class_type": "KSamplerSelect",
-            "inputs": {
-                "sampler_name": "euler"
-            }
-        },
-        # 14. Sample
-        "14": {
-            "class_type": "SamplerCustomAdvanced",
-            "inputs": {
-                "noise": ["11", 0],
-                "guider": ["12", 0],
-                "sampler": ["13", 0],
-                "sigmas": ["10", 0],
-                "latent_image": ["9", 2]
-            }
-        },
-        # 15. VAE Decode (skip SeparateAVLatent for video-only)
-        "15": {
-            "class_type": "VAEDecode",
-            "inputs": {
-                "samples": ["14", 0],
-                "vae": ["1", 2]
-            }
-        },
-        # 16. Create VIDEO from IMAGE sequence
-        "16": {
-            "class_type": "CreateVideo",
-            "inputs": {
-                "images": ["15", 0],
-                "fps": 25.0
-            }
-        },
-        # 17. Save video
-        "17": {
-            "class_type": "SaveVideo",
-            "inputs": {
-                "video": ["16", 0],
-                "filename_prefix": f"scene_{scene_idx}_a",
-                "format": "mp4",
-                "codec": "h264"
-            }
-        }
-    }
-    return workflow
-
-def submit_workflow(workflow):
-    """Submit workflow to ComfyUI and return prompt_id."""
-    resp = requests.post(
-        f"{COMFY_URL}/prompt",
-        json={"prompt": workflow}
-    )
-    resp.raise_for_status()
-    return resp.json()["prompt_id"]
-
-def poll_completion(prompt_id, timeout=300):
-    """Poll for workflow completion."""
-    start = time.time()
-    while time.time() - start < timeout:
-        resp = requests.get(f"{COMFY_URL}/history/{prompt_id}")
-        data = resp.json()
-        if prompt_id in data:
-            status = data[prompt_id].get("status", {}).get("status_str", "")
-            outputs = data[prompt_id].get("outputs", {})
-            if status == "error":
-                print(f"  ERROR: {json.dumps(data[prompt_id].get('status', {}), indent=2)}")
-                return None
-            if outputs:
-                return data[prompt_id]
-        time.sleep(3)
-    print(f"  TIMEOUT after {timeout}s")
-    return None
+    seed = stable_seed(uploaded_image_name, motion_prompt)
+    return I2V.build(image=uploaded_image_name, prompt=motion_prompt, seed=seed,
+                     prefix=f"scene_{scene_idx}_a")
 
-def download_video(prompt_id, result, output_path):
-    """Download the generated video."""
-    outputs = result.get("outputs", {})
-    for nid, out in outputs.items():
-        for key in ["gifs", "videos", "images"]:
-            if key in out:
-                for item in out[key]:
-                    fn = item.get("filename", "")
-                    subfolder = item.get("subfolder", "")
-                    if fn.endswith(".mp4") or fn.endswith(".webm"):
-                        url = f"{COMFY_URL}/view?filename={fn}&type=output"
-                        if subfolder:
-                            url += f"&subfolder={subfolder}"
-                        resp = requests.get(url)
-                        resp.raise_for_status()
-                        with open(output_path, "wb") as f:
-                            f.write(resp.content)
-                        print(f"  Downloaded: {output_path} ({len(resp.content)} bytes)")
-                        return True
-    print(f"  No video found in outputs")
-    return False
+def scene_workflow(img_path, motion_prompt, scene_idx):
+    """Workflow builder for one scene; uploads its image when the runner asks."""
+    def build():
+        print(f"  Uploading {img_path}...")
+        uploaded_name = upload_image(img_path)
+        print(f"  Uploaded as: {uploaded_name}")
+        return build_workflow(uploaded_name, motion_prompt, scene_idx)
+    return build
 
 def main():
+    check_templates(comfy, I2V)
     scenes = [0, 1, 2, 3, 4]
     if len(sys.argv) > 1:
         scenes = [int(x) for x in sys.argv[1:]]
 
+    jobs = []
     for scene_idx in scenes:
-        print(f"\n{'='*60}")
-        print(f"Scene {scene_idx}")
-        print(f"{'='*60}")
-
-        # Upload reference image
         img_path = f"{PROJECT}/public/scenes/scene-{scene_idx}-a.png"
-        print(f"  Uploading {img_path}...")
-        uploaded_name = upload_image(img_path)
-        print(f"  Uploaded as: {uploaded_name}")
-
-        # Build and submit workflow
+        output_path = f"{PROJECT}/public/scenes/scene-{scene_idx}-a.mp4"
         prompt = SCENE_PROMPTS[scene_idx]
-        print(f"  Motion prompt: {prompt[:80]}...")
-        workflow = build_workflow(uploaded_name, prompt, scene_idx)
-
-        prompt_id = submit_workflow(workflow)
-        print(f"  Submitted: {prompt_id}")
-
-        # Poll for completion
-        print(f"  Waiting for completion...")
-        result = poll_completion(prompt_id, timeout=300)
-
-        if result:
-            output_path = f"{PROJECT}/public/scenes/scene-{scene_idx}-a.mp4"
-            download_video(prompt_id, result, output_path)
-
-            # Check duration
-            dur = subprocess.run(
-                ["ffprobe", "-v", "error", "-show_entries", "format=duration", "-of", "csv=p=0", output_path],
-                capture_output=True, text=True
-            )
-            print(f"  Duration: {dur.stdout.strip()}s")
-        else:
-            print(f"  FAILED for scene {scene_idx}")
+        print(f"Scene {scene_idx} motion prompt: {prompt[:80]}...")
+        jobs.append(ClipJob(f"scene-{scene_idx}-a", output_path,
+                            scene_workflow(img_path, prompt, scene_idx)))
+
+    # All scenes are queued at once; each clip is downloaded (and its
+    # duration checked) as soon as it finishes.
+    report = run_clips(jobs, comfy, poll_interval=3)
+    for result in report.failed:
+        print(f"  FAILED for {result.job.name}: {result.error}")
 
     print(f"\nAll done!")
 
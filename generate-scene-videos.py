@@ -1,15 +1,14 @@
 #!/usr/bin/env python3
 """Generate LTX-2 video clips for each scene via ComfyUI."""
 
-import json
-import time
-import random
-import requests
 import sys
 import os
 
+from pipeline.comfy import ClipJob, get_client, run_clips, stable_seed
+
 COMFY_URL = "http://172.18.64.1:8001"
 SCENES_DIR = "/home/aten/zkagi-video-engine/public/scenes"
+comfy = get_client(COMFY_URL)
 
 # Motion prompts per scene (novel-like, descriptive)
 MOTION_PROMPTS = [
@@ -32,7 +31,7 @@ MOTION_PROMPTS = [
 def build_workflow(image_filename: str, motion_prompt: str, scene_prefix: str, seed: int = None):
     """Build ComfyUI workflow for image-to-video generation."""
     if seed is None:
-        seed = random.randint(0, 2**31)
+        seed = stable_seed(image_filename, motion_prompt)
 
     return {
         # 1. CheckpointLoaderSimple → MODEL(0), CLIP(1, unused), VAE(2)
@@ -195,110 +194,26 @@ def build_workflow(image_filename: str, motion_prompt: str, scene_prefix: str, s
 
 def upload_image(filepath: str) -> str:
     """Upload image to ComfyUI and return the server filename."""
-    filename = os.path.basename(filepath)
-    with open(filepath, 'rb') as f:
-        resp = requests.post(
-            f"{COMFY_URL}/upload/image",
-            files={"image": (filename, f, "image/png")},
-            data={"overwrite": "true"}
-        )
-    result = resp.json()
-    return result.get("name", filename)
-
-
-def submit_workflow(workflow: dict) -> str:
-    """Submit workflow and return prompt_id."""
-    resp = requests.post(
-        f"{COMFY_URL}/prompt",
-        json={"prompt": workflow}
-    )
-    data = resp.json()
-    if "error" in data:
-        print(f"  ERROR submitting: {data['error']}")
-        if "node_errors" in data:
-            for nid, err in data["node_errors"].items():
-                print(f"    Node {nid}: {err}")
-        return None
-    return data["prompt_id"]
-
-
-def poll_completion(prompt_id: str, timeout: int = 300) -> dict:
-    """Poll until workflow completes. Returns output dict or None."""
-    start = time.time()
-    while time.time() - start < timeout:
-        try:
-            resp = requests.get(f"{COMFY_URL}/history/{prompt_id}", timeout=10)
-            data = resp.json()
-            if prompt_id in data:
-                status = data[prompt_id].get("status", {}).get("status_str", "")
-                if status == "error":
-                    print(f"  Workflow ERROR")
-                    return None
-                outputs = data[prompt_id].get("outputs", {})
-                if outputs:
-                    return outputs
-        except Exception as e:
-            print(f"  Poll error: {e}")
-        time.sleep(3)
-    print(f"  TIMEOUT after {timeout}s")
-    return None
-
+    return comfy.upload_image(filepath)
 
-def download_video(outputs: dict, dest_path: str) -> bool:
-    """Download the output video from ComfyUI."""
-    for nid, out in outputs.items():
-        for key in ["gifs", "videos", "images"]:
-            if key in out:
-                for item in out[key]:
-                    fn = item.get("filename", "")
-                    subfolder = item.get("subfolder", "")
-                    if fn.endswith(".mp4"):
-                        url = f"{COMFY_URL}/view?filename={fn}&type=output"
-                        if subfolder:
-                            url += f"&subfolder={subfolder}"
-                        resp = requests.get(url)
-                        with open(dest_path, "wb") as f:
-                            f.write(resp.content)
-                        print(f"  Downloaded: {dest_path} ({len(resp.content)} bytes)")
-                        return True
-    print(f"  No video found in outputs")
-    return False
 
-
-def generate_scene(scene_idx: int):
-    """Generate video clip for a single scene."""
+def scene_job(scene_idx: int) -> ClipJob | None:
+    """Clip job for a single scene; its image is uploaded when the runner asks."""
     image_path = f"{SCENES_DIR}/scene-{scene_idx}-a.png"
     output_path = f"{SCENES_DIR}/scene-{scene_idx}-a.mp4"
     motion_prompt = MOTION_PROMPTS[scene_idx]
 
-    print(f"\n{'='*60}")
-    print(f"SCENE {scene_idx}: Generating video clip")
-    print(f"{'='*60}")
-
-    # 1. Upload image
-    print(f"  Uploading {image_path}...")
     if not os.path.exists(image_path):
         print(f"  ERROR: Image not found: {image_path}")
-        return False
-    server_filename = upload_image(image_path)
-    print(f"  Uploaded as: {server_filename}")
-
-    # 2. Build and submit workflow
-    workflow = build_workflow(server_filename, motion_prompt, f"scene-{scene_idx}-a")
-    print(f"  Submitting workflow...")
-    prompt_id = submit_workflow(workflow)
-    if not prompt_id:
-        return False
-    print(f"  Prompt ID: {prompt_id}")
+        return None
 
-    # 3. Poll for completion
-    print(f"  Generating video (~60s)...")
-    outputs = poll_completion(prompt_id, timeout=300)
-    if not outputs:
-        return False
+    def workflow() -> dict:
+        print(f"  Uploading {image_path}...")
+        server_filename = upload_image(image_path)
+        print(f"  Uploaded as: {server_filename}")
+        return build_workflow(server_filename, motion_prompt, f"scene-{scene_idx}-a")
 
-    # 4. Download
-    return download_video(outputs, output_path)
+    return ClipJob(f"scene-{scene_idx}-a", output_path, workflow)
 
 
 def main():
@@ -309,12 +224,13 @@ def main():
         scenes = list(range(5))
 
     print(f"Generating videos for scenes: {scenes}")
-    results = {}
-    for idx in scenes:
-        success = generate_scene(idx)
-        results[idx] = success
-        if not success:
-            print(f"  FAILED scene {idx}")
+    jobs = {idx: scene_job(idx) for idx in scenes}
+
+    # All scenes render back to back (~60s each); each clip is downloaded
+    # as soon as it finishes.
+    report = run_clips([job for job in jobs.values() if job is not None], comfy)
+    done = {r.job.name for r in report.ok}
+    results = {idx: job is not None and job.name in done for idx, job in jobs.items()}
 
     print(f"\n{'='*60}")
     print("RESULTS:")
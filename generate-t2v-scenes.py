@@ -1,9 +1,12 @@
 #!/usr/bin/env python3
 """Generate LTX-2 text-to-video clips for all scenes via ComfyUI (video-only, no audio)."""
-import json, time, random, subprocess, sys, os
+import os
+
+from pipeline.comfy import ClipJob, get_client, run_clips, stable_seed
 
 COMFY_URL = "http://172.18.64.1:8001"
 OUTPUT_DIR = "/home/aten/zkagi-video-engine/public/scenes"
+comfy = get_client(COMFY_URL)
 
 SCENES = [
     {
@@ -191,83 +194,17 @@ def build_workflow(prompt, filename_prefix, seed, length=161):
         },
     }
 
-def submit_workflow(workflow):
-    import urllib.request
-    data = json.dumps({"prompt": workflow}).encode()
-    req = urllib.request.Request(
-        f"{COMFY_URL}/prompt",
-        data=data,
-        headers={"Content-Type": "application/json"},
-    )
-    try:
-        resp = urllib.request.urlopen(req)
-        result = json.loads(resp.read())
-        return result["prompt_id"]
-    except urllib.error.HTTPError as e:
-        body = e.read().decode()
-        print(f"  HTTP {e.code}: {body}", file=sys.stderr)
-        return None
-
-def poll_completion(prompt_id, timeout=600):
-    import urllib.request
-    start = time.time()
-    while time.time() - start < timeout:
-        resp = urllib.request.urlopen(f"{COMFY_URL}/history/{prompt_id}")
-        data = json.loads(resp.read())
-        if prompt_id in data:
-            status = data[prompt_id].get("status", {}).get("status_str", "")
-            if status == "error":
-                msgs = data[prompt_id].get("status", {}).get("messages", [])
-                print(f"  ERROR: {msgs}", file=sys.stderr)
-                return None
-            outputs = data[prompt_id].get("outputs", {})
-            if outputs:
-                return outputs
-        time.sleep(5)
-    print(f"  TIMEOUT after {timeout}s", file=sys.stderr)
-    return None
-
-def download_video(outputs, dest_path):
-    import urllib.request
-    for nid, out in outputs.items():
-        for key in ["gifs", "videos", "images"]:
-            if key in out:
-                for item in out[key]:
-                    fn = item.get("filename", "")
-                    if fn.endswith(".mp4") or fn.endswith(".webm"):
-                        subfolder = item.get("subfolder", "")
-                        url = f"{COMFY_URL}/view?filename={fn}&type=output"
-                        if subfolder:
-                            url += f"&subfolder={subfolder}"
-                        urllib.request.urlretrieve(url, dest_path)
-                        return True
-    return False
-
 def main():
     os.makedirs(OUTPUT_DIR, exist_ok=True)
-    for i, scene in enumerate(SCENES):
-        seed = random.randint(1, 2**31)
-        print(f"\n=== Generating {scene['name']} (seed={seed}) ===")
+    jobs = []
+    for scene in SCENES:
+        seed = stable_seed(scene["prompt"])
+        print(f"{scene['name']}: seed={seed}")
         workflow = build_workflow(scene["prompt"], scene["name"], seed, length=161)
-        prompt_id = submit_workflow(workflow)
-        if not prompt_id:
-            print(f"  FAILED to submit {scene['name']}")
-            continue
-        print(f"  Submitted: {prompt_id}")
-        outputs = poll_completion(prompt_id, timeout=600)
-        if outputs:
-            dest = os.path.join(OUTPUT_DIR, scene["output"])
-            if download_video(outputs, dest):
-                dur = subprocess.run(
-                    ["ffprobe", "-v", "error", "-show_entries", "format=duration",
-                     "-of", "csv=p=0", dest],
-                    capture_output=True, text=True,
-                ).stdout.strip()
-                print(f"  Saved: {dest} ({dur}s)")
-            else:
-                print(f"  ERROR: No video in outputs")
-        else:
-            print(f"  FAILED to generate {scene['name']}")
+        jobs.append(ClipJob(scene["name"], os.path.join(OUTPUT_DIR, scene["output"]),
+                            workflow, timeout=600))
+    # Keeps the ComfyUI queue topped up and downloads clips as they finish.
+    run_clips(jobs, comfy, poll_interval=5)
 
 if __name__ == "__main__":
     main()
@@ -1,6 +1,9 @@
-import requests, os, sys, concurrent.futures
+import os, time
+
+from pipeline.tts import (TTSClient, TTSJob, postprocess_many, summarize, voices_from_cfg,
+                          write_manifest)
+from pipeline.tts.post import enabled as post_enabled, print_post
 
-TTS_URL = "https://avatar.zkagi.ai/v1/clone-tts"
 AUDIO_DIR = "/home/aten/zkagi-video-engine/public/audio"
 VOICES_DIR = "/home/aten/zkagi-video-engine/voices"
 os.makedirs(AUDIO_DIR, exist_ok=True)
@@ -28,42 +31,26 @@ VOICE_CFG = {
     },
 }
 
-def generate_tts(scene):
-    idx = scene["idx"]
-    voice = VOICE_CFG[scene["voice"]]
-    out_path = os.path.join(AUDIO_DIR, f"scene-{idx}.wav")
-    
-    with open(voice["ref_audio"], "rb") as f:
-        files = {"ref_audio": ("ref.wav", f, "audio/wav")}
-        data = {
-            "ref_text": voice["ref_text"],
-            "text": scene["text"],
-            "cfg_value": voice["cfg_value"],
-            "steps": voice["steps"],
-        }
-        resp = requests.post(TTS_URL, files=files, data=data, timeout=60)
-    
-    if resp.status_code == 200 and len(resp.content) > 1000:
-        with open(out_path, "wb") as f:
-            f.write(resp.content)
-        # Get duration
-        import wave
-        with wave.open(out_path, "rb") as w:
-            dur = w.getnframes() / w.getframerate()
-        print(f"  Scene {idx}: {dur:.2f}s ({len(resp.content)} bytes)")
-        return idx, dur
-    else:
-        print(f"  Scene {idx}: FAILED ({resp.status_code}, {len(resp.content)} bytes)")
-        return idx, None
+VOICES = voices_from_cfg(VOICE_CFG)
 
 print("Generating TTS audio for all scenes...")
-with concurrent.futures.ThreadPoolExecutor(max_workers=5) as executor:
-    futures = {executor.submit(generate_tts, s): s for s in SCENES}
-    results = {}
-    for future in concurrent.futures.as_completed(futures):
-        idx, dur = future.result()
-        results[idx] = dur
+t0 = time.monotonic()
+jobs = [TTSJob(s["text"], VOICES[s["voice"]], os.path.join(AUDIO_DIR, f"scene-{s['idx']}.wav"),
+               name=f"scene-{s['idx']}") for s in SCENES]
+with TTSClient(max_connections=len(jobs)) as tts:
+    done = tts.synthesize_many(jobs)
+results = {s["idx"]: r.duration if r.ok else None for s, r in zip(SCENES, done)}
 
 print("\n=== TTS Results ===")
 for idx in sorted(results.keys()):
     print(f"Scene {idx}: {results[idx]}s" if results[idx] else f"Scene {idx}: FAILED")
+print(summarize(done, time.monotonic() - t0))
+
+paths = {s["idx"]: r.job.dest for s, r in zip(SCENES, done) if r.ok}
+if paths and post_enabled():
+    print("\n=== Post-processing ===")
+    print_post(postprocess_many(list(paths.values())))
+if len(paths) == len(SCENES):
+    manifest = write_manifest(paths)
+    print("\n=== Frame budget (30fps) ===")
+    print(manifest.table())
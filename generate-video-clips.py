@@ -1,10 +1,14 @@
 #!/usr/bin/env python3
 """Generate LTX-2 video clips from reference images via ComfyUI."""
 
-import requests, json, time, random, sys, os
+import os
+
+from pipeline.comfy import ClipJob, get_client, run_clips, stable_seed
+from pipeline.comfy.templates import I2V, check_templates
 
 COMFY_URL = "http://172.18.64.1:8001"
 SCENE_DIR = "/home/aten/zkagi-video-engine/public/scenes"
+comfy = get_client(COMFY_URL)
 
 CHECKPOINT = "ltx-2.3-22b-dev-fp8.safetensors"
 TEXT_ENCODER = "gemma_3_12B_it.safetensors"
@@ -57,274 +61,43 @@ CLIPS = [
 
 def upload_image(image_path):
     """Upload image to ComfyUI and return its name."""
-    with open(image_path, "rb") as f:
-        resp = requests.post(f"{COMFY_URL}/upload/image",
-            files={"image": (os.path.basename(image_path), f, "image/png")},
-            data={"type": "input", "overwrite": "true"},
-            timeout=30)
-    if resp.status_code == 200:
-        return resp.json().get("name", os.path.basename(image_path))
-    raise Exception(f"Upload failed: {resp.status_code} {resp.text[:200]}")
+    return comfy.upload_image(image_path)
 
 def build_workflow(uploaded_image_name, motion_prompt, filename_prefix, seed=None):
     """Build LTX-2 image-to-video workflow."""
     if seed is None:
-        seed = random.randint(0, 2**32 - 1)
-
-    return {
-        # 1: Load checkpoint → MODEL(0), CLIP(1, unused), VAE(2)
-        "1": {
-            "class_type": "CheckpointLoaderSimple",
-            "inputs": {"ckpt_name": CHECKPOINT}
-        },
-        # 2: Load text encoder → CLIP(0)
-        "2": {
-            "class_type": "DualCLIPLoader",
-            "inputs": {
-                "clip_name1": "gemma_3_12B_it.safetensors",
-                "clip_name2": "ltx-2.3_text_projection_bf16.safetensors",
-                "type": "ltx"
-            }
-        },
-        # 3: Apply distilled LoRA → MODEL(0)
-        "3": {
-            "class_type": "LoraLoaderModelOnly",
-            "inputs": {
-                "model": ["1", 0],
-                "lora_name": LORA,
-                "strength_model": 1.0
-            }
-        },
-        # 4: Load reference image → IMAGE(0)
-        "4": {
-            "class_type": "LoadImage",
-            "inputs": {"image": uploaded_image_name}
-        },
-        # 5: Preprocess image → IMAGE(0)
-        "5": {
-            "class_type": "LTXVPreprocess",
-            "inputs": {
-                "image": ["4", 0],
-                "img_compression": 35
-            }
-        },
-        # 6: Positive prompt → CONDITIONING(0)
-        "6": {
-            "class_type": "CLIPTextEncode",
-            "inputs": {
-                "text": motion_prompt,
-                "clip": ["2", 0]
-            }
-        },
-        # 7: Negative prompt → CONDITIONING(0)
-        "7": {
-            "class_type": "CLIPTextEncode",
-            "inputs": {
-                "text": NEG_PROMPT,
-                "clip": ["2", 0]
-            }
-        },
-        # 8: LTX conditioning → positive(0), negative(1)
-        "8": {
-            "class_type": "LTXVConditioning",
-            "inputs": {
-                "positive": ["6", 0],
-                "negative": ["7", 0],
-                "frame_rate": 25
-            }
-        },
-        # 9: Image-to-video → positive(0), negative(1), latent(2)
-        "9": {
-            "class_type": "LTXVImgToVideo",
-            "inputs": {
-                "positive": ["8", 0],
-                "negative": ["8", 1],
-                "vae": ["1", 2],
-                "image": ["5", 0],
-                "width": WIDTH,
-                "height": HEIGHT,
-                "length": FRAMES,
-                "batch_size": 1,
-                "strength": 1.0
-            }
-        },
-        # 10: Scheduler → SIGMAS(0)
-        "10": {
-            "class_type": "LTXVScheduler",
-            "inputs": {
-                "steps": STEPS,
-                "max_shift": 2.05,
-                "base_shift": 0.95,
-                "stretch": True,
-                "terminal": 0.1,
-                "latent": ["9", 2]
-            }
-        },
-        # 11: Random noise → NOISE(0)
-        "11": {
-            "class_type": "RandomNoise",
-            "inputs": {"noise_seed": seed}
-        },
-        # 12: CFG Guider → GUIDER(0)
-        "12": {
-            "class_type": "CFGGuider",
-            "inputs": {
-                "model": ["3", 0],
-                "positive": ["9", 0],
-                "negative": ["9", 1],
-                "cfg": CFG
-            }
-        },
-        # 13: Sampler select → SAMPLER(0)
-        "13": {
-            "class_type": "KSamplerSelect",
-            "inputs": {"sampler_name": "euler"}
-        },
-        # 14: Sample → LATENT(0), LATENT(1)
-        "14": {
-            "class_type": "SamplerCustomAdvanced",
-            "inputs": {
-                "noise": ["11", 0],
-                "guider": ["12", 0],
-                "sampler": ["13", 0],
-                "sigmas": ["10", 0],
-                "latent_image": ["9", 2]
-            }
-        },
-        # 15: VAE Decode → IMAGE(0) [skip SeparateAVLatent for video-only]
-        "15": {
-            "class_type": "VAEDecode",
-            "inputs": {
-                "samples": ["14", 0],
-                "vae": ["1", 2]
-            }
-        },
-        # 16: Create video → VIDEO(0)
-        "16": {
-            "class_type": "CreateVideo",
-            "inputs": {
-                "images": ["15", 0],
-                "fps": 25.0
-            }
-        },
-        # 17: Save video
-        "17": {
-            "class_type": "SaveVideo",
-            "inputs": {
-                "video": ["16", 0],
-                "filename_prefix": filename_prefix,
-                "format": "mp4",
-                "codec": "h264"
-            }
-        }
-    }
-
-def submit_workflow(workflow):
-    """Submit workflow and return prompt_id."""
-    resp = requests.post(f"{COMFY_URL}/prompt",
-        json={"prompt": workflow}, timeout=30)
-    if resp.status_code == 200:
-        data = resp.json()
-        if "error" in data:
-            raise Exception(f"Workflow error: {json.dumps(data['error'])[:500]}")
-        return data["prompt_id"]
-    raise Exception(f"Submit failed: {resp.status_code} {resp.text[:500]}")
-
-def poll_completion(prompt_id, timeout=300):
-    """Poll until completion. Returns output dict or raises."""
-    start = time.time()
-    while time.time() - start < timeout:
-        resp = requests.get(f"{COMFY_URL}/history/{prompt_id}", timeout=10)
-        if resp.status_code == 200:
-            data = resp.json()
-            if prompt_id in data:
-                entry = data[prompt_id]
-                status = entry.get("status", {}).get("status_str", "")
-                if status == "error":
-                    msgs = entry.get("status", {}).get("messages", [])
-                    raise Exception(f"Generation error: {msgs}")
-                outputs = entry.get("outputs", {})
-                if outputs:
-                    return outputs
-        time.sleep(5)
-    raise Exception(f"Timeout after {timeout}s")
+        seed = stable_seed(uploaded_image_name, motion_prompt)
+    return I2V.build(image=uploaded_image_name, prompt=motion_prompt, seed=seed,
+                     negative=NEG_PROMPT, length=FRAMES, width=WIDTH, height=HEIGHT,
+                     steps=STEPS, prefix=filename_prefix)
 
-def download_video(prompt_id, outputs, dest_path):
-    """Download the generated video file."""
-    for nid, out in outputs.items():
-        for key in ["gifs", "videos", "images"]:
-            if key in out:
-                for item in out[key]:
-                    fn = item.get("filename", "")
-                    subfolder = item.get("subfolder", "")
-                    if fn.endswith(".mp4") or fn.endswith(".webm"):
-                        url = f"{COMFY_URL}/view?filename={fn}&type=output"
-                        if subfolder:
-                            url += f"&subfolder={subfolder}"
-                        resp = requests.get(url, timeout=60)
-                        if resp.status_code == 200 and len(resp.content) > 1000:
-                            with open(dest_path, "wb") as f:
-                                f.write(resp.content)
-                            return True
-    return False
-
-def process_clip(clip_name, image_file, motion_prompt):
-    """Upload image, generate video clip, download result."""
+def clip_job(clip_name, image_file, motion_prompt):
+    """Clip job for one reference image; the image is uploaded when the runner asks."""
     image_path = os.path.join(SCENE_DIR, image_file)
     dest_path = os.path.join(SCENE_DIR, f"{clip_name}.mp4")
 
-    print(f"\n{'='*60}")
-    print(f"Processing: {clip_name}")
-    print(f"  Image: {image_file}")
-    print(f"  Prompt: {motion_prompt[:80]}...")
-
-    # Upload image
-    print(f"  Uploading image...")
-    uploaded_name = upload_image(image_path)
-    print(f"  Uploaded as: {uploaded_name}")
-
-    # Build and submit workflow
-    print(f"  Building workflow...")
-    workflow = build_workflow(uploaded_name, motion_prompt, f"ltx_{clip_name}")
-
-    print(f"  Submitting to ComfyUI...")
-    prompt_id = submit_workflow(workflow)
-    print(f"  Prompt ID: {prompt_id}")
+    print(f"{clip_name}: {image_file}: {motion_prompt[:80]}...")
 
-    # Poll for completion
-    print(f"  Generating (8 steps, ~60s)...")
-    t0 = time.time()
-    outputs = poll_completion(prompt_id, timeout=300)
-    elapsed = time.time() - t0
-    print(f"  Generated in {elapsed:.1f}s")
+    def workflow():
+        uploaded_name = upload_image(image_path)
+        print(f"  {clip_name}: uploaded as {uploaded_name}")
+        return build_workflow(uploaded_name, motion_prompt, f"ltx_{clip_name}")
 
-    # Download
-    print(f"  Downloading video...")
-    if download_video(prompt_id, outputs, dest_path):
-        size = os.path.getsize(dest_path)
-        print(f"  Saved: {dest_path} ({size} bytes)")
-        return True
-    else:
-        print(f"  WARNING: Could not download video for {clip_name}")
-        return False
+    return ClipJob(clip_name, dest_path, workflow)
 
 # Main
+check_templates(comfy, I2V)
 print(f"Generating {len(CLIPS)} video clips via LTX-2 ComfyUI")
 print(f"Settings: {FRAMES} frames, {STEPS} steps, CFG {CFG}, {WIDTH}x{HEIGHT}")
 print(f"LoRA: {LORA}")
 
-results = {}
-for clip_name, image_file, motion_prompt in CLIPS:
-    try:
-        ok = process_clip(clip_name, image_file, motion_prompt)
-        results[clip_name] = ok
-    except Exception as e:
-        print(f"  ERROR: {e}")
-        results[clip_name] = False
+# Every clip is queued up front (8 steps, ~60s each); each one is downloaded
+# while the next renders, and a failing clip does not stop the others.
+report = run_clips([clip_job(*clip) for clip in CLIPS], comfy, poll_interval=5)
+done = {r.job.name for r in report.ok}
 
 print(f"\n{'='*60}")
 print(f"=== Video Generation Results ===")
-ok_count = sum(1 for v in results.values() if v)
-print(f"{ok_count}/{len(CLIPS)} clips generated successfully")
-for name, ok in results.items():
-    print(f"  {name}: {'OK' if ok else 'FAILED'}")
+print(f"{len(done)}/{len(CLIPS)} clips generated successfully")
+for name, _, _ in CLIPS:
+    print(f"  {name}: {'OK' if name in done else 'FAILED'}")
@@ -1,17 +1,14 @@
 #!/usr/bin/env python3
 """Generate LTX-2 video clips for Zero-Employee Enterprise video via ComfyUI."""
 
-import json
-import random
-import time
-import subprocess
 import sys
-import urllib.request
-import urllib.parse
 import os
 
+from pipeline.comfy import ClipJob, get_client, run_clips, stable_seed
+
 COMFY_URL = "http://172.18.64.1:8001"
 SCENES_DIR = "public/scenes"
+comfy = get_client(COMFY_URL)
 
 # Motion prompts per scene (novel-like, descriptive, 40-80 words)
 MOTION_PROMPTS = [
@@ -36,35 +33,12 @@ NEGATIVE_PROMPT = "static, frozen, no motion, blurry, low quality, distorted, te
 
 def upload_image(filepath):
     """Upload an image to ComfyUI and return the server filename."""
-    import mimetypes
-    filename = os.path.basename(filepath)
-
-    boundary = f"----PythonBoundary{random.randint(100000,999999)}"
-
-    with open(filepath, 'rb') as f:
-        file_data = f.read()
-
-    body = (
-        f'--{boundary}\r\n'
-        f'Content-Disposition: form-data; name="image"; filename="{filename}"\r\n'
-        f'Content-Type: image/png\r\n\r\n'
-    ).encode() + file_data + f'\r\n--{boundary}--\r\n'.encode()
-
-    req = urllib.request.Request(
-        f"{COMFY_URL}/upload/image",
-        data=body,
-        headers={"Content-Type": f"multipart/form-data; boundary={boundary}"},
-        method="POST"
-    )
-
-    resp = urllib.request.urlopen(req)
-    result = json.loads(resp.read())
-    return result.get("name", filename)
+    return comfy.upload_image(filepath)
 
 
 def build_workflow(image_name, motion_prompt, scene_idx):
     """Build LTX-2 img-to-video workflow."""
-    seed = random.randint(1, 2**32 - 1)
+    seed = stable_seed(image_name, motion_prompt)
 
     workflow = {
         # 1. CheckpointLoaderSimple → MODEL(0), CLIP(1), VAE(2)
@@ -227,69 +201,14 @@ def build_workflow(image_name, motion_prompt, scene_idx):
     return workflow
 
 
-def submit_workflow(workflow):
-    """Submit workflow to ComfyUI and return prompt_id."""
-    data = json.dumps({"prompt": workflow}).encode()
-    req = urllib.request.Request(
-        f"{COMFY_URL}/prompt",
-        data=data,
-        headers={"Content-Type": "application/json"},
-        method="POST"
-    )
-    resp = urllib.request.urlopen(req)
-    result = json.loads(resp.read())
-    if "error" in result:
-        print(f"  ERROR submitting: {result['error']}")
-        if "node_errors" in result:
-            for nid, err in result["node_errors"].items():
-                print(f"    Node {nid}: {err}")
-        return None
-    return result["prompt_id"]
-
-
-def poll_completion(prompt_id, timeout=300):
-    """Poll until workflow completes or errors."""
-    start = time.time()
-    while time.time() - start < timeout:
-        try:
-            resp = urllib.request.urlopen(f"{COMFY_URL}/history/{prompt_id}")
-            data = json.loads(resp.read())
-            if prompt_id in data:
-                status = data[prompt_id].get("status", {}).get("status_str", "")
-                outputs = data[prompt_id].get("outputs", {})
-                if status == "error":
-                    print(f"  ERROR in workflow")
-                    # Try to get error details
-                    msgs = data[prompt_id].get("status", {}).get("messages", [])
-                    for msg in msgs:
-                        print(f"    {msg}")
-                    return None
-                if outputs:
-                    return outputs
-        except Exception as e:
-            pass
-        time.sleep(5)
-    print(f"  TIMEOUT after {timeout}s")
-    return None
-
-
-def download_video(outputs, output_path):
-    """Download the generated video from ComfyUI output."""
-    for nid, out in outputs.items():
-        for key in ['gifs', 'videos', 'images']:
-            if key in out:
-                for item in out[key]:
-                    fn = item.get('filename', '')
-                    subfolder = item.get('subfolder', '')
-                    if fn.endswith('.mp4') or fn.endswith('.webm'):
-                        url = f"{COMFY_URL}/view?filename={urllib.parse.quote(fn)}&type=output"
-                        if subfolder:
-                            url += f"&subfolder={urllib.parse.quote(subfolder)}"
-                        urllib.request.urlretrieve(url, output_path)
-                        print(f"  Downloaded: {output_path}")
-                        return True
-    print(f"  No video found in outputs")
-    return False
+def scene_workflow(img_path, scene_idx):
+    """Workflow builder for one scene; uploads its image when the runner asks."""
+    def build():
+        print(f"  Uploading {img_path}...")
+        uploaded_name = upload_image(img_path)
+        print(f"  Uploaded as: {uploaded_name}")
+        return build_workflow(uploaded_name, MOTION_PROMPTS[scene_idx], scene_idx)
+    return build
 
 
 def main():
@@ -297,53 +216,19 @@ def main():
     if len(sys.argv) > 1:
         scenes = [int(x) for x in sys.argv[1:]]
 
+    jobs = []
     for i in scenes:
-        print(f"\n{'='*60}")
-        print(f"SCENE {i}: Generating video clip")
-        print(f"{'='*60}")
-
         img_path = f"{SCENES_DIR}/scene-{i}-a.png"
         output_path = f"{SCENES_DIR}/scene-{i}-a.mp4"
 
         if not os.path.exists(img_path):
             print(f"  SKIP: {img_path} not found")
             continue
+        jobs.append(ClipJob(f"scene-{i}-a", output_path, scene_workflow(img_path, i)))
 
-        # Upload image
-        print(f"  Uploading {img_path}...")
-        uploaded_name = upload_image(img_path)
-        print(f"  Uploaded as: {uploaded_name}")
-
-        # Build and submit workflow
-        print(f"  Building workflow...")
-        workflow = build_workflow(uploaded_name, MOTION_PROMPTS[i], i)
-
-        print(f"  Submitting to ComfyUI...")
-        prompt_id = submit_workflow(workflow)
-        if not prompt_id:
-            print(f"  FAILED to submit scene {i}")
-            continue
-        print(f"  Prompt ID: {prompt_id}")
-
-        # Poll for completion
-        print(f"  Generating (~1 min)...")
-        outputs = poll_completion(prompt_id, timeout=300)
-        if not outputs:
-            print(f"  FAILED scene {i}")
-            continue
-
-        # Download
-        download_video(outputs, output_path)
-
-        # Verify
-        if os.path.exists(output_path):
-            size = os.path.getsize(output_path) / 1024
-            result = subprocess.run(
-                ["ffprobe", "-v", "error", "-show_entries", "format=duration", "-of", "csv=p=0", output_path],
-                capture_output=True, text=True
-            )
-            dur = result.stdout.strip()
-            print(f"  Size: {size:.0f}KB, Duration: {dur}s")
+    # All scenes are queued at once (~1 min each); each clip is downloaded
+    # and its duration checked as it finishes.
+    run_clips(jobs, comfy, poll_interval=5)
 
     print(f"\n{'='*60}")
     print("ALL DONE")
@@ -1,13 +1,13 @@
 #!/usr/bin/env python3
 """Generate LTX-2 text-to-video clips for Zynapse story via ComfyUI."""
 
-import json
-import time
 import subprocess
-import random
 import sys
 
+from pipeline.comfy import ClipJob, get_client, run_clips, stable_seed
+
 COMFY_URL = "http://172.18.64.1:8001"
+comfy = get_client(COMFY_URL)
 
 # Motion prompts for each scene (novel-like, 40-80 words, with movement)
 SCENES = [
@@ -190,98 +190,24 @@ def build_txt2vid_workflow(prompt: str, prefix: str, seed: int) -> dict:
     }
 
 
-def submit_workflow(workflow: dict) -> str:
-    """Submit workflow to ComfyUI and return prompt_id."""
-    payload = json.dumps({"prompt": workflow})
-    result = subprocess.run(
-        ["curl", "-s", "-X", "POST", f"{COMFY_URL}/prompt",
-         "-H", "Content-Type: application/json", "-d", payload],
-        capture_output=True, text=True, timeout=30
-    )
-    resp = json.loads(result.stdout)
-    if "prompt_id" not in resp:
-        print(f"ERROR submitting: {resp}")
-        sys.exit(1)
-    return resp["prompt_id"]
-
-
-def poll_completion(prompt_id: str, timeout_s: int = 300) -> dict:
-    """Poll for workflow completion."""
-    start = time.time()
-    while time.time() - start < timeout_s:
-        result = subprocess.run(
-            ["curl", "-s", f"{COMFY_URL}/history/{prompt_id}"],
-            capture_output=True, text=True, timeout=15
-        )
-        try:
-            data = json.loads(result.stdout)
-        except json.JSONDecodeError:
-            time.sleep(3)
-            continue
-
-        if prompt_id in data:
-            status = data[prompt_id].get("status", {}).get("status_str", "")
-            outputs = data[prompt_id].get("outputs", {})
-            if status == "error":
-                print(f"ERROR: Workflow failed")
-                print(json.dumps(data[prompt_id].get("status", {}), indent=2))
-                sys.exit(1)
-            if outputs:
-                return data[prompt_id]
-        time.sleep(5)
-    print(f"TIMEOUT waiting for {prompt_id}")
-    sys.exit(1)
-
-
-def download_video(history: dict, output_path: str):
-    """Download the output video file."""
-    outputs = history.get("outputs", {})
-    for nid, out in outputs.items():
-        for key in ["gifs", "videos", "images"]:
-            if key in out:
-                for item in out[key]:
-                    fn = item.get("filename", "")
-                    subfolder = item.get("subfolder", "")
-                    if fn.endswith(".mp4") or fn.endswith(".webm"):
-                        url = f"{COMFY_URL}/view?filename={fn}&type=output"
-                        if subfolder:
-                            url += f"&subfolder={subfolder}"
-                        subprocess.run(
-                            ["curl", "-s", url, "--output", output_path],
-                            timeout=30
-                        )
-                        print(f"  Downloaded: {output_path}")
-                        return
-    print(f"  WARNING: No video found in outputs")
-
-
 def main():
+    jobs = []
     for scene in SCENES:
         idx = scene["index"]
         prefix = scene["prefix"]
         prompt = scene["prompt"]
-        seed = 10000 + idx * 1000 + random.randint(0, 999)
+        seed = 10000 + idx * 1000 + stable_seed(prompt) % 1000
         output_path = f"public/scenes/scene-{idx}-a.mp4"
 
-        print(f"\n{'='*60}")
-        print(f"Scene {idx}: Generating text-to-video clip...")
-        print(f"  Seed: {seed}")
-        print(f"  Prompt: {prompt[:80]}...")
+        print(f"Scene {idx} (seed {seed}): {prompt[:80]}...")
+        jobs.append(ClipJob(f"scene-{idx}-a", output_path,
+                            build_txt2vid_workflow(prompt, prefix, seed)))
 
-        workflow = build_txt2vid_workflow(prompt, prefix, seed)
-        prompt_id = submit_workflow(workflow)
-        print(f"  Submitted: {prompt_id}")
-
-        history = poll_completion(prompt_id)
-        download_video(history, output_path)
-
-        # Verify the file
-        result = subprocess.run(
-            ["ffprobe", "-v", "error", "-show_entries", "format=duration",
-             "-of", "csv=p=0", output_path],
-            capture_output=True, text=True
-        )
-        print(f"  Duration: {result.stdout.strip()}s")
+    # Queues every scene at once; clips are downloaded and their durations
+    # verified as they finish.
+    report = run_clips(jobs, comfy, poll_interval=5)
+    if report.failed:
+        sys.exit(1)
 
     print(f"\n{'='*60}")
     print("All video clips generated!")
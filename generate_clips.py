@@ -2,21 +2,18 @@
 """LTX-2 Video Generation — 12 clips for PawPad wallet creation demo (60s)
 TEXT-TO-VIDEO mode (image gen server down) — uses LTX-2 text-to-video directly."""
 
-import json
-import time
-import random
 import sys
-import os
 import subprocess
-import urllib.request
-import urllib.parse
-import urllib.error
+
+from pipeline.comfy import ClipJob, get_client, run_clips, stable_seed
+from pipeline.comfy.templates import T2V, check_templates
 
 COMFY_URL = "http://" + subprocess.check_output(
     "ip route show default | awk '{print $3}'", shell=True
 ).decode().strip() + ":8001"
 
 SCENES_DIR = "/home/aten/zkagi-video-engine/public/scenes"
+comfy = get_client(COMFY_URL)
 
 print(f"ComfyUI URL: {COMFY_URL}")
 
@@ -49,184 +46,37 @@ CLIP_ORDER = ["0-a", "0-b", "0-c", "1-a", "1-b", "1-c", "2-a", "2-b", "2-c", "3-
 def build_t2v_workflow(prompt, seed, output_prefix):
     """Build LTX-2 TEXT-TO-VIDEO workflow with distilled LoRA (8 steps, CFG 1.0)."""
     negative = "static, frozen, no motion, blurry, low quality, distorted, text, words, letters, watermark, jittery, flickering, ugly, deformed, amateur"
-    return {
-        # Load model + VAE
-        "1": {"class_type": "CheckpointLoaderSimple", "inputs": {"ckpt_name": "ltx-2.3-22b-dev-fp8.safetensors"}},
-        # Load text encoder (CLIP)
-        "2": {"class_type": "DualCLIPLoader", "inputs": {"clip_name1": "gemma_3_12B_it.safetensors", "clip_name2": "ltx-2.3_text_projection_bf16.safetensors", "type": "ltx"}},
-        # Apply distilled LoRA for 8-step fast generation
-        "3": {"class_type": "LoraLoaderModelOnly", "inputs": {"model": ["1", 0], "lora_name": "ltx-2.3-distilled-lora-384.safetensors", "strength_model": 1.0}},
-        # Positive prompt
-        "4": {"class_type": "CLIPTextEncode", "inputs": {"text": prompt, "clip": ["2", 0]}},
-        # Negative prompt
-        "5": {"class_type": "CLIPTextEncode", "inputs": {"text": negative, "clip": ["2", 0]}},
-        # LTX conditioning with frame rate
-        "6": {"class_type": "LTXVConditioning", "inputs": {"positive": ["4", 0], "negative": ["5", 0], "frame_rate": 25}},
-        # Empty video latent (768x512, 97 frames = 3.88s at 25fps)
-        "7": {"class_type": "EmptyLTXVLatentVideo", "inputs": {"width": 768, "height": 512, "length": 97, "batch_size": 1}},
-        # LTX Scheduler (8 steps for distilled)
-        "8": {"class_type": "LTXVScheduler", "inputs": {"steps": 8, "max_shift": 2.05, "base_shift": 0.95, "stretch": True, "terminal": 0.1, "latent": ["7", 0]}},
-        # Random noise
-        "9": {"class_type": "RandomNoise", "inputs": {"noise_seed": seed}},
-        # CFG Guider (CFG 1.0 for distilled)
-        "10": {"class_type": "CFGGuider", "inputs": {"model": ["3", 0], "positive": ["6", 0], "negative": ["6", 1], "cfg": 1.0}},
-        # Sampler
-        "11": {"class_type": "KSamplerSelect", "inputs": {"sampler_name": "euler"}},
-        # Sample
-        "12": {"class_type": "SamplerCustomAdvanced", "inputs": {"noise": ["9", 0], "guider": ["10", 0], "sampler": ["11", 0], "sigmas": ["8", 0], "latent_image": ["7", 0]}},
-        # VAE Decode (skip SeparateAVLatent for video-only)
-        "13": {"class_type": "VAEDecode", "inputs": {"samples": ["12", 0], "vae": ["1", 2]}},
-        # Create video from frames
-        "14": {"class_type": "CreateVideo", "inputs": {"images": ["13", 0], "fps": 25.0}},
-        # Save video
-        "15": {"class_type": "SaveVideo", "inputs": {"video": ["14", 0], "filename_prefix": output_prefix, "format": "mp4", "codec": "h264"}},
-    }
-
-
-def submit_and_wait(workflow, clip_id):
-    """Submit workflow and poll until completion."""
-    payload = json.dumps({"prompt": workflow}).encode()
-    req = urllib.request.Request(f"{COMFY_URL}/prompt", data=payload, headers={"Content-Type": "application/json"})
-    try:
-        resp = urllib.request.urlopen(req)
-        result = json.loads(resp.read())
-    except urllib.error.HTTPError as e:
-        error_body = e.read().decode()
-        print(f"  SUBMIT FAILED ({e.code}): {error_body[:500]}")
-        return None
-
-    prompt_id = result.get("prompt_id")
-    if not prompt_id:
-        print(f"  SUBMIT FAILED: {result}")
-        return None
-
-    print(f"  Submitted: {prompt_id}")
-
-    start = time.time()
-    while True:
-        try:
-            resp = urllib.request.urlopen(f"{COMFY_URL}/history/{prompt_id}")
-            history = json.loads(resp.read())
-        except Exception as e:
-            print(f"  Poll error: {e}")
-            time.sleep(5)
-            continue
-
-        if prompt_id in history:
-            entry = history[prompt_id]
-            status_str = entry.get("status", {}).get("status_str", "")
-            outputs = entry.get("outputs", {})
-
-            if status_str == "error":
-                msgs = entry.get("status", {}).get("messages", [])
-                if msgs:
-                    last = msgs[-1]
-                    if isinstance(last, (list, tuple)) and len(last) > 1:
-                        err_info = last[1] if isinstance(last[1], dict) else str(last[1])
-                        print(f"  ERROR: {err_info.get('exception_message','?')[:300] if isinstance(err_info,dict) else str(err_info)[:300]}")
-                    else:
-                        print(f"  ERROR: {str(last)[:300]}")
-                else:
-                    print("  ERROR: unknown")
-                return None
-
-            if outputs:
-                elapsed = time.time() - start
-                print(f"  Done in {elapsed:.0f}s")
-                for nid, out in outputs.items():
-                    for key in ["gifs", "videos", "images"]:
-                        if key in out:
-                            for item in out[key]:
-                                fn = item.get("filename", "")
-                                if fn.endswith(".mp4") or fn.endswith(".webm"):
-                                    return fn
-                print("  No video file in output!")
-                return None
-
-        elapsed = time.time() - start
-        if elapsed > 300:
-            print(f"  TIMEOUT after {elapsed:.0f}s")
-            return None
-        time.sleep(5)
-
-
-def download_video(filename, output_path):
-    """Download generated video from ComfyUI."""
-    for subfolder in ["pawpad", ""]:
-        try:
-            params = f"filename={urllib.parse.quote(os.path.basename(filename))}&type=output"
-            if subfolder:
-                params += f"&subfolder={subfolder}"
-            url = f"{COMFY_URL}/view?{params}"
-            urllib.request.urlretrieve(url, output_path)
-            size = os.path.getsize(output_path)
-            if size > 10000:
-                dur = subprocess.check_output(
-                    ["ffprobe", "-v", "error", "-show_entries", "format=duration", "-of", "csv=p=0", output_path]
-                ).decode().strip()
-                print(f"  Saved: {output_path} ({size}B, {dur}s)")
-                return True
-        except Exception:
-            continue
-
-    try:
-        url = f"{COMFY_URL}/view?filename={urllib.parse.quote(filename)}&type=output"
-        urllib.request.urlretrieve(url, output_path)
-        size = os.path.getsize(output_path)
-        if size > 10000:
-            dur = subprocess.check_output(
-                ["ffprobe", "-v", "error", "-show_entries", "format=duration", "-of", "csv=p=0", output_path]
-            ).decode().strip()
-            print(f"  Saved: {output_path} ({size}B, {dur}s)")
-            return True
-    except Exception as e:
-        print(f"  Download failed: {e}")
-    return False
+    return T2V.build(prompt=prompt, seed=seed, negative=negative, prefix=output_prefix)
 
 
 # Main
+# With --skip-existing, finished clips the clip cache does not know are kept
+# (clips it does know are restored from it, or re-rendered if they changed).
 skip_existing = "--skip-existing" in sys.argv
 only_clip = None
 for arg in sys.argv[1:]:
     if arg != "--skip-existing" and not arg.startswith("-"):
         only_clip = arg
 
+check_templates(comfy, T2V)
 clip_list = [only_clip] if only_clip else CLIP_ORDER
 total = len(clip_list)
-failed = 0
-
-for i, clip_id in enumerate(clip_list):
-    output_path = f"{SCENES_DIR}/scene-{clip_id}.mp4"
-
-    if skip_existing and os.path.exists(output_path) and os.path.getsize(output_path) > 10000:
-        print(f"\n[{i+1}/{total}] SKIP {clip_id} (already exists)")
-        continue
-
-    print(f"\n{'='*60}")
-    print(f"[{i+1}/{total}] Generating clip: scene-{clip_id}")
-    print(f"{'='*60}")
 
+jobs = []
+for clip_id in clip_list:
     prompt = CLIPS[clip_id]
-    seed = random.randint(1, 2**31)
+    seed = stable_seed(prompt)
     prefix = f"pawpad/scene_{clip_id.replace('-', '_')}"
-    workflow = build_t2v_workflow(prompt, seed, prefix)
-
-    print(f"  Submitting text-to-video workflow...")
-    video_filename = submit_and_wait(workflow, clip_id)
-
-    if video_filename:
-        ok = download_video(video_filename, output_path)
-        if ok:
-            print(f"  [OK] scene-{clip_id}")
-        else:
-            print(f"  [FAIL] Download failed for scene-{clip_id}")
-            failed += 1
-    else:
-        print(f"  [FAIL] scene-{clip_id}")
-        failed += 1
+    jobs.append(ClipJob(f"scene-{clip_id}", f"{SCENES_DIR}/scene-{clip_id}.mp4",
+                        build_t2v_workflow(prompt, seed, prefix)))
+
+# Failed clips are retried automatically (new seed, shorter clip or backoff,
+# depending on the error); whatever still fails is listed below.
+report = run_clips(jobs, comfy, poll_interval=5, skip_existing=skip_existing)
+failed = len(report.failed)
 
 print(f"\n{'='*60}")
 print(f"SUMMARY: {total - failed}/{total} clips generated successfully")
 print(f"{'='*60}")
-if failed:
-    print(f"Failed: {failed} clips. Re-run with: python3 generate_clips.py <clip-id>")
+for result in report.failed:
+    print(f"Failed: {result.job.name}: {result.error}")
@@ -0,0 +1,6 @@
+"""Shared Python helpers for the clip and narration scripts.
+
+The top-level ``generate-*.py`` scripts are run directly (``python3
+generate-clips.py``), so the repository root is already on ``sys.path`` and
+they can ``import pipeline`` without any installation step.
+"""
@@ -0,0 +1,65 @@
+"""ComfyUI client shared by all clip-generation scripts."""
+
+from .cache import ClipCache, stable_seed, workflow_key
+from .client import (
+    DEFAULT_COMFY_URL,
+    ComfyClient,
+    ComfyConnectionError,
+    ComfyDownloadError,
+    ComfyError,
+    ComfyExecutionError,
+    ComfyHTTPError,
+    ComfyTimeout,
+    ComfyValidationError,
+    describe_messages,
+    execution_window,
+    find_video,
+    get_client,
+    iter_outputs,
+)
+from .draft import DraftMode
+from .events import ComfyEvents, PromptProgress
+from .journal import ClipJournal
+from .priority import BATCH, INTERACTIVE
+from .retry import RetryPolicy, classify
+from .runner import ClipJob, ClipResult, ClipRunner, RunReport, print_result, run_clips
+from .telemetry import ClipTelemetry
+from .templates import TemplateError, WorkflowTemplate, check_templates
+
+__all__ = [
+    "BATCH",
+    "DEFAULT_COMFY_URL",
+    "INTERACTIVE",
+    "ClipCache",
+    "ClipJob",
+    "ClipJournal",
+    "ClipResult",
+    "ClipRunner",
+    "ClipTelemetry",
+    "ComfyClient",
+    "ComfyConnectionError",
+    "ComfyDownloadError",
+    "ComfyError",
+    "ComfyEvents",
+    "ComfyExecutionError",
+    "ComfyHTTPError",
+    "ComfyTimeout",
+    "ComfyValidationError",
+    "DraftMode",
+    "PromptProgress",
+    "RetryPolicy",
+    "RunReport",
+    "TemplateError",
+    "WorkflowTemplate",
+    "check_templates",
+    "classify",
+    "describe_messages",
+    "execution_window",
+    "find_video",
+    "get_client",
+    "iter_outputs",
+    "print_result",
+    "run_clips",
+    "stable_seed",
+    "workflow_key",
+]
@@ -0,0 +1,175 @@
+"""Maintenance commands: ``python3 -m pipeline.comfy <command> ...``."""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+import time
+
+from .cache import DEFAULT_CACHE_DIR, ClipCache
+
+
+def cmd_cache(argv: list[str]) -> int:
+    """cache [forget FILE... | clear] -- inspect or prune the clip cache."""
+    cache = ClipCache(os.environ.get("CLIP_CACHE_DIR") or DEFAULT_CACHE_DIR)
+    if argv[:1] == ["forget"]:
+        for output in argv[1:]:
+            print(f"{output}: dropped {cache.forget(output)} cached clip(s)")
+        return 0
+    if argv[:1] == ["clear"]:
+        cache.clear()
+        print(f"Cleared {cache.root}")
+        return 0
+    keys = list(cache.keys())
+    size = sum(os.path.getsize(cache.path(k)) for k in keys if os.path.exists(cache.path(k)))
+    print(f"{cache.root}: {len(keys)} clips, {size / (1 << 20):.1f} MB")
+    return 0
+
+
+def _mock_options(parser: argparse.ArgumentParser):
+    parser.add_argument("--latency", default="lognormal:2:0.2",
+                        help="per-clip render time spec (see pipeline.comfy.mock)")
+    parser.add_argument("--fail", type=float, default=0.0, help="share of prompts that error")
+    parser.add_argument("--oom", type=float, default=0.0, help="share of prompts that OOM")
+    parser.add_argument("--model-load", type=float, default=0.0,
+                        help="seconds added when the model files change")
+    parser.add_argument("--oom-above", type=int, default=None, metavar="FRAMES",
+                        help="prompts longer than this always run out of memory")
+    parser.add_argument("--seed", type=int, default=0)
+
+
+def cmd_mock(argv: list[str]) -> int:
+    """mock [--port N] [--latency SPEC] [--fail R] [--oom R] -- serve a fake ComfyUI"""
+    from .mock import MockComfy
+
+    parser = argparse.ArgumentParser(prog="python3 -m pipeline.comfy mock")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8188)
+    _mock_options(parser)
+    args = parser.parse_args(argv)
+    server = MockComfy(args.host, args.port, latency=args.latency, fail_rate=args.fail,
+                       oom_rate=args.oom, model_load=args.model_load, seed=args.seed,
+                       oom_frames=args.oom_above)
+    server.start()
+    print(f"Mock ComfyUI on {server.url} (Ctrl-C to stop)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+    return 0
+
+
+def cmd_bench(argv: list[str]) -> int:
+    """bench [--clips N] [--hosts N] [--depth N] ... -- time the clip runner offline"""
+    from .mock import benchmark, format_benchmark
+
+    parser = argparse.ArgumentParser(prog="python3 -m pipeline.comfy bench")
+    parser.add_argument("--clips", type=int, default=24)
+    parser.add_argument("--hosts", type=int, default=1)
+    parser.add_argument("--depth", type=int, default=None,
+                        help="prompts queued per host (default COMFY_QUEUE_DEPTH)")
+    parser.add_argument("--length", type=int, default=97, help="frames per clip")
+    parser.add_argument("--no-websocket", action="store_true",
+                        help="complete prompts by polling /history only")
+    parser.add_argument("--poll-interval", type=float, default=3.0)
+    parser.add_argument("--mixed", action="store_true",
+                        help="alternate LoRA strengths and clip lengths")
+    parser.add_argument("--no-reorder", action="store_true",
+                        help="submit in list order instead of grouping by model")
+    parser.add_argument("--interactive", type=int, default=0,
+                        help="interactive clips to submit once the batch is running")
+    parser.add_argument("--retries", type=int, default=None,
+                        help="retries per clip (default CLIP_RETRIES; 0 = off)")
+    parser.add_argument("--no-priority", action="store_true",
+                        help="queue interactive clips as batch work, without a batch limit")
+    parser.add_argument("--json", action="store_true", help="print the result as JSON")
+    _mock_options(parser)
+    args = parser.parse_args(argv)
+    result = benchmark(args.clips, hosts=args.hosts, depth=args.depth, latency=args.latency,
+                       fail_rate=args.fail, oom_rate=args.oom, model_load=args.model_load,
+                       length=args.length, seed=args.seed,
+                       use_websocket=not args.no_websocket, poll_interval=args.poll_interval,
+                       mixed=args.mixed, reorder=not args.no_reorder,
+                       interactive=args.interactive, priority=not args.no_priority,
+                       oom_frames=args.oom_above, retries=args.retries)
+    print(json.dumps(result, indent=2) if args.json else format_benchmark(result))
+    return 0
+
+
+def cmd_telemetry(argv: list[str]) -> int:
+    """telemetry [--hours H] [--prometheus] -- per-host clip timing summary"""
+    from .telemetry import DEFAULT_TELEMETRY_DIR, load_records, prometheus_text, summarize
+
+    parser = argparse.ArgumentParser(prog="python3 -m pipeline.comfy telemetry")
+    parser.add_argument("--file", default=os.path.join(
+        os.environ.get("CLIP_TELEMETRY_DIR") or DEFAULT_TELEMETRY_DIR, "clips.jsonl"))
+    parser.add_argument("--hours", type=float, default=None,
+                        help="only clips that finished in the last H hours")
+    parser.add_argument("--prometheus", action="store_true",
+                        help="print the records as Prometheus text instead")
+    args = parser.parse_args(argv)
+    since = time.time() - args.hours * 3600 if args.hours else None
+    records = load_records(args.file, since)
+    if args.prometheus:
+        sys.stdout.write(prometheus_text(records))
+    else:
+        print(summarize(records))
+    return 0
+
+
+def cmd_promote(argv: list[str]) -> int:
+    """promote DRAFT|DIR... [--force] [--dry-run] -- re-render drafts at final quality"""
+    from .draft import DraftError, find_drafts, load_draft, promote
+
+    parser = argparse.ArgumentParser(prog="python3 -m pipeline.comfy promote")
+    parser.add_argument("paths", nargs="+", help="draft clips, sidecars or folders of drafts")
+    parser.add_argument("--force", action="store_true",
+                        help="also re-render drafts that were promoted before")
+    parser.add_argument("--dry-run", action="store_true", help="list what would be rendered")
+    args = parser.parse_args(argv)
+    try:
+        drafts = [d for path in args.paths
+                  for d in (find_drafts(path, include_promoted=args.force)
+                            if os.path.isdir(path) else [load_draft(path)])]
+    except DraftError as e:
+        print(e, file=sys.stderr)
+        return 1
+    for d in drafts:
+        print(f"  {d['name']}: seed {d['seed']} -> {d['dest']}")
+    if not drafts:
+        print("no drafts to promote")
+    if args.dry_run or not drafts:
+        return 0
+    try:
+        report = promote(drafts)
+    except DraftError as e:
+        print(e, file=sys.stderr)
+        return 1
+    return 0 if not report.failed else 1
+
+
+COMMANDS = {
+    "cache": cmd_cache,
+    "mock": cmd_mock,
+    "bench": cmd_bench,
+    "telemetry": cmd_telemetry,
+    "promote": cmd_promote,
+}
+
+
+def main(argv: list[str]) -> int:
+    if not argv or argv[0] not in COMMANDS:
+        print(__doc__.strip())
+        for fn in COMMANDS.values():
+            print(f"  {fn.__doc__}")
+        return 2
+    return COMMANDS[argv[0]](argv[1:])
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
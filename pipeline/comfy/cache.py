@@ -0,0 +1,189 @@
+"""Content-addressed cache of rendered clips, keyed on the workflow graph.
+
+A clip is reused only when the exact graph that produced it is submitted
+again: same checkpoint, LoRA, prompts, seed, length, resolution and input
+image bytes.  Output file names do not matter: ``filename_prefix`` is left
+out of the key and uploaded images are keyed by content hash, not by the
+name ComfyUI stored them under.
+
+Entries live under ``CLIP_CACHE_DIR`` (default
+``~/.cache/zkagi-video-engine/clips``) as ``<key>.mp4`` plus ``<key>.json``
+metadata.  Set ``CLIP_CACHE=off`` to bypass it.
+
+    python3 -m pipeline.comfy cache                 # stats
+    python3 -m pipeline.comfy cache forget FILE...  # drop entries for outputs
+    python3 -m pipeline.comfy cache clear
+"""
+
+from __future__ import annotations
+
+import copy
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+
+CACHE_VERSION = 1
+CACHED_PREFIX = "cache:"
+
+# Inputs that only name the output file and never change its pixels.
+_NAME_ONLY_INPUTS = ("filename_prefix",)
+_IMAGE_LOADERS = ("LoadImage",)
+
+DEFAULT_CACHE_DIR = os.path.join(
+    os.environ.get("XDG_CACHE_HOME", os.path.expanduser("~/.cache")),
+    "zkagi-video-engine", "clips")
+
+
+def stable_seed(*parts, bits: int = 31) -> int:
+    """Deterministic sampler seed for a clip.
+
+    Random seeds make every rerun a cache miss; hashing the prompt keeps
+    unchanged scenes identical.  Set ``CLIP_SEED_SALT`` to re-roll them all.
+    """
+    text = "\x1f".join(str(p) for p in parts) + os.environ.get("CLIP_SEED_SALT", "")
+    digest = hashlib.sha256(text.encode()).digest()
+    return int.from_bytes(digest[:8], "big") % ((1 << bits) - 1) + 1
+
+
+def canonical_workflow(workflow: dict, uploads: dict | None = None) -> dict:
+    """Copy of ``workflow`` with name-only inputs removed and images hashed."""
+    uploads = uploads or {}
+    graph = copy.deepcopy(workflow)
+    for node in graph.values():
+        inputs = node.get("inputs", {})
+        for name in _NAME_ONLY_INPUTS:
+            inputs.pop(name, None)
+        if node.get("class_type") in _IMAGE_LOADERS and "image" in inputs:
+            image = inputs["image"]
+            if image in uploads:
+                inputs["image"] = "sha256:" + uploads[image]
+    return graph
+
+
+def workflow_key(workflow: dict, uploads: dict | None = None) -> str:
+    """Hex SHA-256 of the canonical JSON form of ``workflow``."""
+    payload = json.dumps(
+        {"v": CACHE_VERSION, "graph": canonical_workflow(workflow, uploads)},
+        sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class ClipCache:
+    """On-disk clip store; safe to share between concurrent scripts."""
+
+    def __init__(self, root: str = DEFAULT_CACHE_DIR):
+        self.root = root
+
+    @classmethod
+    def from_env(cls) -> "ClipCache | None":
+        if os.environ.get("CLIP_CACHE", "").lower() in ("0", "off", "no", "false"):
+            return None
+        return cls(os.environ.get("CLIP_CACHE_DIR") or DEFAULT_CACHE_DIR)
+
+    def __repr__(self):
+        return f"ClipCache({self.root!r})"
+
+    def path(self, key: str, ext: str = ".mp4") -> str:
+        return os.path.join(self.root, key[:2], key + ext)
+
+    def key(self, workflow: dict, uploads: dict | None = None) -> str:
+        return workflow_key(workflow, uploads)
+
+    def has(self, key: str) -> bool:
+        return os.path.isfile(self.path(key)) and os.path.isfile(self.path(key, ".json"))
+
+    def meta(self, key: str) -> dict | None:
+        try:
+            with open(self.path(key, ".json")) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def entry(self, key: str) -> dict:
+        """A ``/history``-shaped entry whose only output is the cached clip."""
+        item = {"filename": key + ".mp4", "subfolder": key, "type": "cache"}
+        return {
+            "prompt_id": CACHED_PREFIX + key,
+            "outputs": {"cache": {"videos": [item]}},
+            "status": {"status_str": "success", "completed": True, "messages": []},
+        }
+
+    def _write_atomic(self, dest: str, write):
+        os.makedirs(os.path.dirname(dest), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(dest), prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                write(f)
+            os.replace(tmp, dest)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+            raise
+
+    def put(self, key: str, src: str, workflow: dict | None = None, **meta):
+        """Store the clip at ``src`` under ``key`` (video first, then metadata)."""
+        def copy_clip(f):
+            with open(src, "rb") as s:
+                shutil.copyfileobj(s, f, 1 << 20)
+
+        self._write_atomic(self.path(key), copy_clip)
+        record = {
+            "key": key,
+            "created": time.time(),
+            "size": os.path.getsize(src),
+            "source": os.path.abspath(src),
+            **meta,
+        }
+        if workflow is not None:
+            record["workflow"] = workflow
+        blob = json.dumps(record, indent=2, sort_keys=True).encode()
+        self._write_atomic(self.path(key, ".json"), lambda f: f.write(blob))
+
+    def restore(self, key: str, dest: str) -> int:
+        """Copy a cached clip to ``dest`` and return its size."""
+        # A copy rather than a hardlink: scripts rewrite outputs in place.
+        self._write_atomic(os.path.abspath(dest), lambda f: self._copy_out(key, f))
+        return os.path.getsize(dest)
+
+    def _copy_out(self, key: str, f):
+        with open(self.path(key), "rb") as s:
+            shutil.copyfileobj(s, f, 1 << 20)
+
+    def remove(self, key: str):
+        for ext in (".json", ".mp4"):
+            try:
+                os.unlink(self.path(key, ext))
+            except FileNotFoundError:
+                pass
+
+    def keys(self):
+        if not os.path.isdir(self.root):
+            return
+        for shard in sorted(os.listdir(self.root)):
+            folder = os.path.join(self.root, shard)
+            if os.path.isdir(folder):
+                for name in sorted(os.listdir(folder)):
+                    if name.endswith(".json"):
+                        yield name[:-5]
+
+    def sources(self) -> set[str]:
+        """Absolute paths the cached clips were last written to."""
+        return {source for key in self.keys()
+                if (source := (self.meta(key) or {}).get("source"))}
+
+    def forget(self, output: str) -> int:
+        """Drop every entry that was last written to ``output``."""
+        target = os.path.abspath(output)
+        dropped = 0
+        for key in list(self.keys()):
+            if (self.meta(key) or {}).get("source") == target:
+                self.remove(key)
+                dropped += 1
+        return dropped
+
+    def clear(self):
+        shutil.rmtree(self.root, ignore_errors=True)
+
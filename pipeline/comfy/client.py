@@ -0,0 +1,728 @@
+"""Pooled HTTP client for the ComfyUI API.
+
+Every clip script used to open a fresh ``urllib`` connection for each
+``/prompt``, ``/history`` poll and ``/view`` download.  ``ComfyClient`` keeps
+a small pool of keep-alive connections per host, caps the number of requests
+in flight, and gives every call the same timeout, retry and error semantics.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import http.client
+import json
+import mimetypes
+import os
+import queue
+import threading
+import time
+import urllib.parse
+import uuid
+
+from .cache import CACHED_PREFIX, ClipCache
+
+DEFAULT_COMFY_URL = os.environ.get("COMFY_URL", "http://172.18.64.1:8001")
+
+VIDEO_EXTENSIONS = (".mp4", ".webm")
+OUTPUT_KEYS = ("gifs", "videos", "images")
+UPLOAD_CHUNK = 1 << 20
+
+# Errors that mean the socket is unusable; the request is retried on a
+# fresh connection.
+_NETWORK_ERRORS = (
+    http.client.HTTPException,
+    ConnectionError,
+    TimeoutError,
+    OSError,
+)
+
+
+# ---------------------------------------------------------------------------
+# Errors
+# ---------------------------------------------------------------------------
+
+class ComfyError(Exception):
+    """Base class for every error raised by the ComfyUI client."""
+
+
+class ComfyConnectionError(ComfyError):
+    """The ComfyUI host could not be reached after all retries.
+
+    ``sent`` is False when the request provably never reached ComfyUI (the
+    connection failed before it was written, or a stale keep-alive socket
+    was hung up on); a POST that failed that way is safe to send again.
+    For a ``submit`` that failed after sending, ``prompt_id`` is the id the
+    prompt was sent under, to look it up once the host answers again.
+    """
+
+    def __init__(self, message: str, *, sent: bool = False, prompt_id: str | None = None):
+        self.sent = sent
+        self.prompt_id = prompt_id
+        super().__init__(message)
+
+
+class ComfyHTTPError(ComfyError):
+    """ComfyUI answered with a non-2xx status."""
+
+    def __init__(self, status: int, body: bytes, path: str = ""):
+        self.status = status
+        self.body = body
+        self.path = path
+        super().__init__(f"HTTP {status} on {path}: {body[:500].decode(errors='replace')}")
+
+    def json(self) -> dict:
+        try:
+            return json.loads(self.body)
+        except ValueError:
+            return {}
+
+
+class ComfyValidationError(ComfyHTTPError):
+    """``/prompt`` rejected the workflow (``error`` / ``node_errors``)."""
+
+    @property
+    def error(self):
+        return self.json().get("error")
+
+    @property
+    def node_errors(self) -> dict:
+        return self.json().get("node_errors") or {}
+
+
+class ComfyExecutionError(ComfyError):
+    """The prompt was accepted but finished with ``status_str == "error"``."""
+
+    def __init__(self, prompt_id: str, messages: list):
+        self.prompt_id = prompt_id
+        self.messages = messages
+        super().__init__(f"prompt {prompt_id} failed: {describe_messages(messages)}")
+
+
+class ComfyDownloadError(ComfyError):
+    """An output could not be fetched intact."""
+
+
+class ComfyTimeout(ComfyError):
+    """The prompt did not finish within the allotted time."""
+
+    def __init__(self, prompt_id: str, timeout: float):
+        self.prompt_id = prompt_id
+        self.timeout = timeout
+        super().__init__(f"prompt {prompt_id} not finished after {timeout:.0f}s")
+
+
+def describe_messages(messages: list) -> str:
+    """Summarise ComfyUI ``status.messages`` into one readable line."""
+    for kind, payload in reversed(messages or []):
+        if kind == "execution_error" and isinstance(payload, dict):
+            node = payload.get("node_type", "?")
+            return f"{node}: {payload.get('exception_message', '').strip()[:300]}"
+    return str(messages)[:300] if messages else "unknown error"
+
+
+# ---------------------------------------------------------------------------
+# Connection pool
+# ---------------------------------------------------------------------------
+
+class _ConnectionPool:
+    """LIFO pool of keep-alive ``HTTPConnection`` objects for one host."""
+
+    def __init__(self, base_url: str, max_connections: int, timeout: float):
+        parts = urllib.parse.urlsplit(base_url)
+        self.scheme = parts.scheme or "http"
+        self.host = parts.hostname or "localhost"
+        self.port = parts.port
+        self.prefix = parts.path.rstrip("/")
+        self.timeout = timeout
+        self._idle: queue.LifoQueue = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(max_connections)
+
+    def _new(self) -> http.client.HTTPConnection:
+        cls = (http.client.HTTPSConnection if self.scheme == "https"
+               else http.client.HTTPConnection)
+        return cls(self.host, self.port, timeout=self.timeout)
+
+    def acquire(self) -> tuple[http.client.HTTPConnection, bool]:
+        """Return ``(conn, reused)``; blocks while all slots are busy."""
+        self._slots.acquire()
+        try:
+            return self._idle.get_nowait(), True
+        except queue.Empty:
+            return self._new(), False
+
+    def release(self, conn: http.client.HTTPConnection, reusable: bool = True):
+        if reusable:
+            self._idle.put(conn)
+        else:
+            conn.close()
+        self._slots.release()
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+
+
+class Response:
+    """A streamed response that returns its connection to the pool on close."""
+
+    def __init__(self, pool: _ConnectionPool, conn, resp: http.client.HTTPResponse):
+        self._pool = pool
+        self._conn = conn
+        self._resp = resp
+        self.status = resp.status
+        self.headers = resp.headers
+
+    def read(self, amt: int | None = None) -> bytes:
+        return self._resp.read(amt)
+
+    def close(self):
+        if self._conn is None:
+            return
+        # Drain so the keep-alive connection can carry the next request.
+        reusable = not self._resp.will_close
+        try:
+            self._resp.read()
+        except _NETWORK_ERRORS:
+            reusable = False
+        self._pool.release(self._conn, reusable)
+        self._conn = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# ---------------------------------------------------------------------------
+# Uploads
+# ---------------------------------------------------------------------------
+
+def file_digest(path: str) -> tuple[str, int]:
+    """``(sha256 hex, size)`` of a file, read in chunks."""
+    h = hashlib.sha256()
+    size = 0
+    with open(path, "rb") as f:
+        while chunk := f.read(UPLOAD_CHUNK):
+            h.update(chunk)
+            size += len(chunk)
+    return h.hexdigest(), size
+
+
+class MultipartFile:
+    """``multipart/form-data`` body for one image, streamed from disk.
+
+    Iterating yields the part headers, the file in ``UPLOAD_CHUNK`` blocks
+    and the form fields.  The file is reopened on every iteration, so the
+    client can resend the body when a retry needs it.
+    """
+
+    def __init__(self, path: str, filename: str, fields: dict | None = None,
+                 field: str = "image"):
+        self.path = path
+        self.boundary = uuid.uuid4().hex
+        ctype = mimetypes.guess_type(filename)[0] or "image/png"
+        self._head = (
+            f"--{self.boundary}\r\n"
+            f'Content-Disposition: form-data; name="{field}"; filename="{filename}"\r\n'
+            f"Content-Type: {ctype}\r\n\r\n"
+        ).encode()
+        tail = "".join(
+            f"\r\n--{self.boundary}\r\n"
+            f'Content-Disposition: form-data; name="{key}"\r\n\r\n{value}'
+            for key, value in (fields or {}).items())
+        self._tail = f"{tail}\r\n--{self.boundary}--\r\n".encode()
+
+    @property
+    def content_type(self) -> str:
+        return f"multipart/form-data; boundary={self.boundary}"
+
+    def __len__(self) -> int:
+        return len(self._head) + os.path.getsize(self.path) + len(self._tail)
+
+    def __iter__(self):
+        yield self._head
+        with open(self.path, "rb") as f:
+            while chunk := f.read(UPLOAD_CHUNK):
+                yield chunk
+        yield self._tail
+
+
+# ---------------------------------------------------------------------------
+# Client
+# ---------------------------------------------------------------------------
+
+class ComfyClient:
+    """Thread-safe ComfyUI API client with a keep-alive connection pool.
+
+    ``max_connections`` bounds how many requests run concurrently against the
+    host; callers beyond that block until a connection frees up.  Network
+    faults are retried ``retries`` times with exponential backoff starting at
+    ``backoff`` seconds.  ``POST /prompt`` is only retried when the failure
+    happened on a stale pooled connection, so a workflow is never queued twice.
+
+    With ``use_websocket`` (the default) the client subscribes to ComfyUI's
+    ``/ws`` stream on first submit and ``wait`` returns as soon as the output
+    node reports; ``/history`` is then only polled every
+    ``ws_fallback_interval`` seconds as a safety net, or every
+    ``poll_interval`` seconds while the websocket is down.
+
+    With a ``cache`` (``get_client`` wires in ``ClipCache.from_env()``),
+    ``submit`` answers a workflow that was rendered before with a
+    ``cache:<key>`` prompt id; ``wait`` and ``download`` then serve the
+    stored clip without touching the server, and every fresh video
+    ``download`` is added to the cache.
+    """
+
+    def __init__(self, base_url: str | None = None, *, max_connections: int = 4,
+                 timeout: float = 30.0, retries: int = 3, backoff: float = 1.0,
+                 client_id: str | None = None, use_websocket: bool = True,
+                 ws_fallback_interval: float = 30.0, on_event=None,
+                 cache: ClipCache | None = None, output_dir: str | None = None):
+        self.base_url = (base_url or DEFAULT_COMFY_URL).rstrip("/")
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.client_id = client_id or uuid.uuid4().hex
+        self.use_websocket = use_websocket
+        self.ws_fallback_interval = ws_fallback_interval
+        self.on_event = on_event
+        self._pool = _ConnectionPool(self.base_url, max_connections, timeout)
+        self._events = None
+        self._events_lock = threading.Lock()
+        self.cache = cache
+        # Local mount of the server's output folder, for zero-copy downloads.
+        self.output_dir = (output_dir if output_dir is not None
+                           else os.environ.get("COMFY_OUTPUT_DIR") or None)
+        self.uploads: dict[str, str] = {}   # ComfyUI input name -> sha256
+        self.sources: dict[str, str] = {}   # ComfyUI input name -> local file
+        self._prompt_keys: dict[str, tuple[str, dict]] = {}
+        self._item_keys: dict[tuple, tuple[str, dict]] = {}
+        # Prompts queued by an earlier process: their /ws events went to
+        # that process's client id, so they are tracked by polling.
+        self._foreign: set[str] = set()
+
+    def __repr__(self):
+        return f"ComfyClient({self.base_url!r})"
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        if self._events is not None:
+            self._events.close()
+        self._pool.close()
+
+    # -- websocket ------------------------------------------------------------
+
+    def watch(self):
+        """Start (once) and return the ``/ws`` listener for this client."""
+        from .events import ComfyEvents
+
+        with self._events_lock:
+            if self._events is None:
+                self._events = ComfyEvents(self.base_url, self.client_id,
+                                           on_event=self.on_event)
+                self._events.start()
+            return self._events
+
+    def progress(self, prompt_id: str):
+        """Return the websocket ``PromptProgress`` for a prompt, if listening."""
+        if self._events is None:
+            return None
+        return self._events.progress(prompt_id)
+
+    # -- transport ----------------------------------------------------------
+
+    def request(self, method: str, path: str, body: bytes | MultipartFile | None = None,
+                headers: dict | None = None, *, idempotent: bool | None = None,
+                stream: bool = False):
+        """Send one request and return the body bytes (or a ``Response``).
+
+        ``body`` may also be a ``MultipartFile``, which is streamed.
+
+        Raises ``ComfyHTTPError`` on non-2xx answers and
+        ``ComfyConnectionError`` once the retries are exhausted.
+        """
+        if idempotent is None:
+            idempotent = method in ("GET", "HEAD")
+        url = self._pool.prefix + path
+        attempt = 0
+        while True:
+            conn, reused = self._pool.acquire()
+            sent = False
+            try:
+                conn.request(method, url, body=body, headers=headers or {})
+                sent = True
+                resp = conn.getresponse()
+            except _NETWORK_ERRORS as e:
+                self._pool.release(conn, reusable=False)
+                # A kept-alive socket the server already closed fails while
+                # sending, or is hung up on before any byte of the answer:
+                # the request never reached ComfyUI, so even a POST can go
+                # again at once.  A timeout or a broken answer after a full
+                # send may mean it did (a second /prompt is a second job).
+                stale = reused and (not sent or isinstance(e, http.client.RemoteDisconnected))
+                if not (idempotent or stale) or attempt >= self.retries:
+                    raise ComfyConnectionError(
+                        f"{method} {self.base_url}{path}: {e}",
+                        sent=sent and not stale) from e
+                attempt += 1
+                if not stale:
+                    time.sleep(self.backoff * 2 ** (attempt - 1))
+                continue
+
+            wrapped = Response(self._pool, conn, resp)
+            if not 200 <= resp.status < 300:
+                data = wrapped.read()
+                wrapped.close()
+                cls = ComfyValidationError if path == "/prompt" else ComfyHTTPError
+                raise cls(resp.status, data, path)
+            if stream:
+                return wrapped
+            try:
+                return wrapped.read()
+            finally:
+                wrapped.close()
+
+    def get_json(self, path: str, params: dict | None = None):
+        if params:
+            path += "?" + urllib.parse.urlencode(params)
+        return json.loads(self.request("GET", path))
+
+    def post_json(self, path: str, payload: dict, *, idempotent: bool = False):
+        data = json.dumps(payload).encode("utf-8")
+        raw = self.request("POST", path, data,
+                           {"Content-Type": "application/json"},
+                           idempotent=idempotent)
+        return json.loads(raw) if raw else {}
+
+    # -- API ------------------------------------------------------------------
+
+    def submit(self, workflow: dict, *, front: bool = False) -> str:
+        """Queue a workflow and return its ``prompt_id``.
+
+        With ``front`` the prompt goes ahead of everything already pending.
+        The id is chosen here and sent along, so a ``ComfyConnectionError``
+        after the POST went out can name the prompt ComfyUI may have queued.
+        """
+        key = self.cache.key(workflow, self.uploads) if self.cache else None
+        if key is not None and self.cache.has(key):
+            return CACHED_PREFIX + key
+        if self.use_websocket:
+            # Subscribe before queueing so no progress message is missed.
+            self.watch()
+        prompt_id = str(uuid.uuid4())
+        payload = {"prompt": workflow, "client_id": self.client_id, "prompt_id": prompt_id}
+        if front:
+            payload["front"] = True
+        try:
+            result = self.post_json("/prompt", payload)
+        except ComfyConnectionError as e:
+            if e.sent:
+                e.prompt_id = prompt_id
+            raise
+        if key is not None:
+            self._prompt_keys[result["prompt_id"]] = (key, workflow)
+        return result["prompt_id"]
+
+    @staticmethod
+    def is_cached(prompt_id: str) -> bool:
+        """True for prompt ids that ``submit`` answered from the clip cache."""
+        return prompt_id.startswith(CACHED_PREFIX)
+
+    def backend_for(self, prompt_id: str) -> "ComfyClient":
+        """The client that owns ``prompt_id`` (always ``self``; see ``ComfyPool``)."""
+        return self
+
+    def adopt(self, prompt_id: str, *, host: str | None = None, key: str | None = None,
+              workflow: dict | None = None) -> "ComfyClient | None":
+        """Take over a prompt an earlier run submitted (see ``ClipJournal``).
+
+        Returns the client that will ``wait`` on it, or None when ``host``
+        is not this server.  With ``key`` the finished clip is still added
+        to the cache on download.
+        """
+        if host is not None and host.rstrip("/") != self.base_url:
+            return None
+        self._foreign.add(prompt_id)
+        if key is not None and self.cache is not None:
+            self._prompt_keys[prompt_id] = (key, workflow)
+        return self
+
+    def prompt_state(self, prompt_id: str) -> str | None:
+        """Where ComfyUI has a prompt: success, error, running, pending or None."""
+        entry = self.history(prompt_id)
+        if entry is not None:
+            status = entry.get("status", {})
+            if status.get("status_str") == "error":
+                return "error"
+            if entry.get("outputs") or status.get("completed"):
+                return "success"
+        q = self.queue()
+        for state, items in (("running", q.get("queue_running", [])),
+                             ("pending", q.get("queue_pending", []))):
+            if any(len(item) > 1 and item[1] == prompt_id for item in items):
+                return state
+        return None
+
+    def history(self, prompt_id: str) -> dict | None:
+        """Return the ``/history`` entry for a prompt, or None if not finished."""
+        return self.get_json(f"/history/{prompt_id}").get(prompt_id)
+
+    def queue(self) -> dict:
+        return self.get_json("/queue")
+
+    def system_stats(self) -> dict:
+        return self.get_json("/system_stats")
+
+    def object_info(self) -> dict:
+        return self.get_json("/object_info")
+
+    def wait(self, prompt_id: str, timeout: float = 300,
+             poll_interval: float = 3.0) -> dict:
+        """Block until the prompt finishes and return its history entry.
+
+        Completion comes from the websocket when it is connected, otherwise
+        from polling ``/history``.  Raises ``ComfyExecutionError`` if ComfyUI
+        reports an error and ``ComfyTimeout`` if nothing arrives within
+        ``timeout`` seconds.  Transient network faults while polling are
+        swallowed and retried.
+        """
+        if self.is_cached(prompt_id):
+            return self.cache.entry(prompt_id[len(CACHED_PREFIX):])
+        try:
+            entry = self._wait(prompt_id, timeout, poll_interval)
+        finally:
+            self._foreign.discard(prompt_id)
+        cached = self._prompt_keys.pop(prompt_id, None)
+        item = find_video(entry) if cached else None
+        if item is not None:
+            self._item_keys[_item_id(item)] = cached
+        return entry
+
+    def _wait(self, prompt_id: str, timeout: float, poll_interval: float) -> dict:
+        events = self._events if self.use_websocket and prompt_id not in self._foreign else None
+        state = events.progress(prompt_id) if events is not None else None
+        deadline = time.monotonic() + timeout
+        next_poll = time.monotonic()
+        while True:
+            if state is not None and state.done.is_set():
+                if state.status == "error":
+                    raise ComfyExecutionError(prompt_id, state.messages)
+                if state.outputs:
+                    return state.entry()
+                # Fully cached prompts finish without "executed" messages;
+                # the outputs are only in /history.
+                state = None
+                next_poll = time.monotonic()
+
+            now = time.monotonic()
+            if now >= next_poll:
+                entry = self._poll_history(prompt_id)
+                if entry is not None:
+                    return entry
+                live = state is not None and events.connected.is_set()
+                next_poll = now + (self.ws_fallback_interval if live else poll_interval)
+
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise ComfyTimeout(prompt_id, timeout)
+            pause = max(0.0, min(next_poll - time.monotonic(), remaining))
+            if state is not None:
+                state.done.wait(pause)
+            else:
+                time.sleep(pause)
+
+    def _poll_history(self, prompt_id: str) -> dict | None:
+        """One ``/history`` check: the finished entry, None, or raise."""
+        try:
+            entry = self.history(prompt_id)
+        except ComfyConnectionError:
+            return None
+        if entry is None:
+            return None
+        status = entry.get("status", {})
+        if status.get("status_str") == "error":
+            raise ComfyExecutionError(prompt_id, status.get("messages", []))
+        if entry.get("outputs") or status.get("completed"):
+            return entry
+        return None
+
+    def view(self, item: dict, *, stream: bool = True, headers: dict | None = None):
+        """Open ``/view`` for an output item (``filename``/``subfolder``/``type``)."""
+        if item.get("type") == "cache":
+            return open(self.cache.path(item["subfolder"]), "rb")
+        params = {"filename": item["filename"], "type": item.get("type") or "output"}
+        if item.get("subfolder"):
+            params["subfolder"] = item["subfolder"]
+        return self.request("GET", "/view?" + urllib.parse.urlencode(params),
+                            None, headers, stream=stream)
+
+    def download(self, item: dict, dest: str) -> int:
+        """Fetch an output file to ``dest`` and return the byte count.
+
+        The file only appears at ``dest`` once it is complete and verified;
+        see ``pipeline.comfy.transfer``.  Raises ``ComfyDownloadError`` if it
+        cannot be fetched intact.
+        """
+        from . import transfer
+
+        if item.get("type") == "cache":
+            return self.cache.restore(item["subfolder"], dest)
+        local = transfer.local_path(self.output_dir, item)
+        if local is not None:
+            transfer.link_or_copy(local, dest)
+        else:
+            transfer.fetch(self, item, dest, attempts=self.retries + 2)
+        cached = self._item_keys.pop(_item_id(item), None)
+        if cached is not None:
+            key, workflow = cached
+            self.cache.put(key, dest, workflow, host=self.base_url,
+                           output=item["filename"])
+        return os.path.getsize(dest)
+
+    def has_input(self, name: str, size: int | None = None) -> bool:
+        """True if the input folder already holds ``name`` (of ``size`` bytes)."""
+        subfolder, _, filename = name.rpartition("/")
+        query = urllib.parse.urlencode({"filename": filename, "subfolder": subfolder,
+                                        "type": "input"})
+        try:
+            with self.request("HEAD", "/view?" + query, stream=True) as resp:
+                length = resp.headers.get("Content-Length")
+        except ComfyError:
+            # 404, or a server that cannot answer HEAD: just upload.
+            return False
+        return size is None or length is None or int(length) == size
+
+    def upload_image(self, path: str, *, name: str | None = None,
+                     overwrite: bool = True) -> str:
+        """Upload a local image to the ComfyUI input folder, return its name.
+
+        Without ``name`` the file is stored as ``<stem>-<sha256[:16]><ext>``
+        and nothing is sent when the server already has that name, so
+        re-running a script (or another script using the same image) costs
+        one ``HEAD``.  The body is streamed from disk.
+        """
+        digest, size = file_digest(path)
+        if name is None:
+            stem, ext = os.path.splitext(os.path.basename(path))
+            name = f"{stem}-{digest[:16]}{ext}"
+            if self.uploads.get(name) == digest or self.has_input(name, size):
+                self.uploads[name] = digest
+                self.sources[name] = os.path.abspath(path)
+                return name
+        body = MultipartFile(path, name, {"overwrite": "true" if overwrite else "false"})
+        raw = self.request(
+            "POST", "/upload/image", body,
+            {"Content-Type": body.content_type, "Content-Length": str(len(body))},
+            idempotent=True,
+        )
+        result = json.loads(raw)
+        if result.get("subfolder"):
+            stored = f"{result['subfolder']}/{result['name']}"
+        else:
+            stored = result.get("name", name)
+        self.uploads[stored] = digest
+        self.sources[stored] = os.path.abspath(path)
+        return stored
+
+    def run(self, workflow: dict, dest: str, *, timeout: float = 300,
+            poll_interval: float = 3.0) -> dict:
+        """Submit, wait and download the first video output to ``dest``.
+
+        Returns the history entry.  Raises ``ComfyError`` subclasses on
+        failure, including ``ComfyError`` when no video was produced.
+        """
+        prompt_id = self.submit(workflow)
+        entry = self.wait(prompt_id, timeout=timeout, poll_interval=poll_interval)
+        item = find_video(entry)
+        if item is None:
+            raise ComfyError(f"prompt {prompt_id} produced no video output")
+        self.download(item, dest)
+        return entry
+
+
+# ---------------------------------------------------------------------------
+# Output helpers
+# ---------------------------------------------------------------------------
+
+def _item_id(item: dict) -> tuple:
+    return item.get("type"), item.get("subfolder", ""), item["filename"]
+
+
+def iter_outputs(entry: dict):
+    """Yield every output item of a history entry (or bare outputs dict)."""
+    outputs = entry["outputs"] if "outputs" in entry else entry
+    for node_out in outputs.values():
+        if not isinstance(node_out, dict):
+            continue
+        for key in OUTPUT_KEYS:
+            for item in node_out.get(key, ()):
+                if isinstance(item, dict) and item.get("filename"):
+                    yield item
+
+
+def find_video(entry: dict, extensions: tuple = VIDEO_EXTENSIONS) -> dict | None:
+    """Return the first video output item of a history entry, or None."""
+    for item in iter_outputs(entry):
+        if item["filename"].endswith(extensions):
+            return item
+    return None
+
+
+def execution_window(entry: dict) -> tuple[float, float] | None:
+    """Return ComfyUI's ``(start, end)`` execution timestamps in seconds.
+
+    Newer ComfyUI builds stamp ``execution_start`` and ``execution_success``
+    (or ``execution_error``) in ``status.messages``; older ones do not, in
+    which case None is returned.
+    """
+    start = end = None
+    for kind, payload in entry.get("status", {}).get("messages", []) or []:
+        ts = payload.get("timestamp") if isinstance(payload, dict) else None
+        if ts is None:
+            continue
+        if kind == "execution_start":
+            start = ts / 1000.0
+        elif kind in ("execution_success", "execution_error", "execution_interrupted"):
+            end = ts / 1000.0
+    if start is None or end is None:
+        return None
+    return start, end
+
+
+_default_clients: dict = {}
+_default_lock = threading.Lock()
+
+
+def get_client(base_url: str | None = None, **kwargs):
+    """Return a process-wide shared client for ``base_url``.
+
+    ``kwargs`` are passed to ``ComfyClient`` the first time a host is seen;
+    unless given, ``cache`` comes from ``ClipCache.from_env()``.
+
+    When ``COMFY_BACKENDS`` is set it overrides ``base_url``: one host gives
+    a plain client for it, several give a shared ``ComfyPool``.
+    """
+    from .pool import ComfyPool, load_backends
+
+    kwargs.setdefault("cache", ClipCache.from_env())
+    backends = load_backends()
+    if len(backends) > 1:
+        key = ",".join(b.url for b in backends)
+        with _default_lock:
+            if key not in _default_clients:
+                _default_clients[key] = ComfyPool(backends, **kwargs)
+            return _default_clients[key]
+    url = (backends[0].url if backends else base_url or DEFAULT_COMFY_URL).rstrip("/")
+    with _default_lock:
+        if url not in _default_clients:
+            _default_clients[url] = ComfyClient(url, **kwargs)
+        return _default_clients[url]
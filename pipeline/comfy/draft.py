@@ -0,0 +1,221 @@
+"""Cheap draft renders and one-command promotion to final quality.
+
+Every clip used to be rendered at 768x512, 97-161 frames and 8 steps before
+anyone saw whether its prompt worked.  With ``CLIP_DRAFT=1`` the runner
+rewrites each workflow before submitting it: half the resolution (kept a
+multiple of 32), half the frames (still ``8k+1``) and 4 sampler steps,
+which is roughly a sixteenth of the GPU time.  Drafts are written to a
+``drafts/`` folder next to the real output, each with a ``.json`` sidecar
+holding the full-quality workflow, its seed and prompt, and the local files
+behind its uploaded images.
+
+Promoting re-renders approved drafts from their sidecars with the same
+prompt and seed, to the path the script would have written::
+
+    CLIP_DRAFT=1 python3 generate-healthcare-clips.py
+    python3 -m pipeline.comfy promote public/scenes/drafts/scene-0-a.mp4 ...
+    python3 -m pipeline.comfy promote public/scenes     # every unpromoted draft
+"""
+
+from __future__ import annotations
+
+import copy
+import json
+import os
+import time
+from dataclasses import dataclass, replace
+
+from pipeline.plan import ltx_length
+
+from .client import ComfyError, file_digest
+from .retry import _SEED_INPUTS
+
+DRAFT_DIR = "drafts"
+
+_SCHEDULERS = ("LTXVScheduler", "BasicScheduler", "KSampler", "KSamplerAdvanced")
+
+
+class DraftError(ComfyError):
+    """A draft cannot be promoted (missing sidecar, changed input image ...)."""
+
+
+def _enabled(value: str) -> bool:
+    return value.strip().lower() in ("1", "on", "yes", "true")
+
+
+def workflow_seeds(workflow: dict) -> list[int]:
+    return [node["inputs"][key] for node in workflow.values() for key in _SEED_INPUTS
+            if isinstance(node.get("inputs", {}).get(key), int)]
+
+
+def workflow_prompt(workflow: dict) -> str | None:
+    """The first text prompt in the graph (the positive one in our templates)."""
+    for node in workflow.values():
+        if node.get("class_type") == "CLIPTextEncode":
+            text = node.get("inputs", {}).get("text")
+            if isinstance(text, str):
+                return text
+    return None
+
+
+def workflow_images(workflow: dict) -> list[str]:
+    return [node["inputs"]["image"] for node in workflow.values()
+            if node.get("class_type") == "LoadImage"
+            and isinstance(node.get("inputs", {}).get("image"), str)]
+
+
+@dataclass
+class DraftMode:
+    scale: float = 0.5              # of width and height
+    length_factor: float = 0.5      # of the frame count
+    steps: int = 4
+    min_length: int = 25
+    folder: str = DRAFT_DIR
+
+    @classmethod
+    def from_env(cls) -> "DraftMode | None":
+        return cls() if _enabled(os.environ.get("CLIP_DRAFT", "")) else None
+
+    def workflow(self, workflow: dict) -> dict:
+        """Copy of ``workflow`` at draft quality."""
+        graph = copy.deepcopy(workflow)
+        for node in graph.values():
+            inputs = node.get("inputs", {})
+            for key in ("width", "height"):
+                if isinstance(inputs.get(key), int):
+                    inputs[key] = max(64, round(inputs[key] * self.scale / 32) * 32)
+            length = inputs.get("length")
+            if isinstance(length, int) and length > self.min_length:
+                inputs["length"] = max(ltx_length(self.min_length),
+                                       ltx_length(int(length * self.length_factor)))
+            if node.get("class_type") in _SCHEDULERS and isinstance(inputs.get("steps"), int):
+                inputs["steps"] = min(inputs["steps"], self.steps)
+            if isinstance(inputs.get("filename_prefix"), str):
+                inputs["filename_prefix"] = "draft_" + inputs["filename_prefix"]
+        return graph
+
+    def path(self, dest: str) -> str:
+        return os.path.join(os.path.dirname(dest), self.folder, os.path.basename(dest))
+
+    def job(self, job, client):
+        """The draft version of a ``ClipJob``; the final graph rides in ``meta``."""
+        workflow = job.workflow() if callable(job.workflow) else job.workflow
+        sources = getattr(client, "sources", {})
+        final = {
+            "name": job.name,
+            "dest": os.path.abspath(job.dest),
+            "workflow": workflow,
+            "inputs": [{"name": name, "path": sources.get(name),
+                        "sha256": client.uploads.get(name)}
+                       for name in workflow_images(workflow)],
+        }
+        return replace(job, dest=self.path(job.dest), workflow=self.workflow(workflow),
+                       meta={**job.meta, "final": final})
+
+    def record(self, result) -> str | None:
+        """Write the sidecar of a finished draft; returns its path."""
+        final = result.job.meta.get("final")
+        if final is None or not result.ok:
+            return None
+        workflow = final["workflow"]
+        sidecar = {
+            **final,
+            "draft": os.path.abspath(result.job.dest),
+            "seed": (workflow_seeds(workflow) or [None])[0],
+            "prompt": workflow_prompt(workflow),
+            "settings": {"scale": self.scale, "length_factor": self.length_factor,
+                         "steps": self.steps},
+            "created": time.time(),
+            "promoted": None,
+        }
+        path = sidecar_path(result.job.dest)
+        _write_json(path, sidecar)
+        return path
+
+
+DEFAULT_DRAFT = DraftMode.from_env()
+
+
+# ---------------------------------------------------------------------------
+# Promotion
+# ---------------------------------------------------------------------------
+
+def sidecar_path(draft: str) -> str:
+    return os.path.splitext(draft)[0] + ".json"
+
+
+def _write_json(path: str, data: dict):
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp, path)
+
+
+def load_draft(path: str) -> dict:
+    """The sidecar of a draft clip (or the sidecar itself)."""
+    sidecar = path if path.endswith(".json") else sidecar_path(path)
+    try:
+        with open(sidecar) as f:
+            data = json.load(f)
+    except (OSError, ValueError) as e:
+        raise DraftError(f"{path}: no readable draft sidecar ({e})") from e
+    data["sidecar"] = sidecar
+    return data
+
+
+def find_drafts(folder: str, *, include_promoted: bool = False) -> list[dict]:
+    """Every draft in ``folder`` (or its ``drafts/`` subfolder)."""
+    if os.path.isdir(os.path.join(folder, DRAFT_DIR)):
+        folder = os.path.join(folder, DRAFT_DIR)
+    drafts = []
+    for name in sorted(os.listdir(folder)):
+        if name.endswith(".json"):
+            draft = load_draft(os.path.join(folder, name))
+            if include_promoted or not draft.get("promoted"):
+                drafts.append(draft)
+    return drafts
+
+
+def final_workflow(draft: dict, client) -> dict:
+    """The draft's full-quality graph, with its input images on ``client``."""
+    workflow = copy.deepcopy(draft["workflow"])
+    renamed = {}
+    for image in draft.get("inputs", []):
+        path = image.get("path")
+        if not path:
+            # Uploaded by name only: it has to be on the server already.
+            continue
+        if not os.path.exists(path):
+            raise DraftError(f"{draft['name']}: input image {path} is gone")
+        if image.get("sha256") and file_digest(path)[0] != image["sha256"]:
+            raise DraftError(f"{draft['name']}: {path} changed since the draft was made")
+        renamed[image["name"]] = client.upload_image(path)
+    for node in workflow.values():
+        if node.get("class_type") == "LoadImage" and node["inputs"].get("image") in renamed:
+            node["inputs"]["image"] = renamed[node["inputs"]["image"]]
+    return workflow
+
+
+def promote(drafts: list[dict], client=None, **kwargs):
+    """Re-render ``drafts`` at final quality; returns the ``RunReport``.
+
+    Each sidecar is stamped with the time its clip was promoted, so
+    ``find_drafts`` skips it afterwards.  Keyword arguments go to
+    ``run_clips``.
+    """
+    from .client import get_client
+    from .runner import ClipJob, run_clips
+
+    client = client or get_client()
+    jobs, by_dest = [], {}
+    for draft in drafts:
+        jobs.append(ClipJob(draft["name"], draft["dest"], final_workflow(draft, client)))
+        by_dest[draft["dest"]] = draft
+    kwargs["draft"] = None
+    report = run_clips(jobs, client, **kwargs)
+    for result in report.ok:
+        draft = by_dest[result.job.dest]
+        sidecar = draft.pop("sidecar")
+        draft["promoted"] = time.time()
+        _write_json(sidecar, draft)
+    return report
@@ -0,0 +1,324 @@
+"""Push-based prompt completion over the ComfyUI ``/ws`` websocket.
+
+ComfyUI streams ``execution_start``, ``executing``, ``progress``,
+``executed``, ``execution_success`` and ``execution_error`` messages to the
+``clientId`` a prompt was submitted with.  ``ComfyEvents`` keeps one
+listener thread per client, records per-node progress for every prompt it
+hears about, and wakes waiters the moment a prompt's output node finishes,
+so ``ComfyClient.wait`` no longer sleeps between ``/history`` polls.
+
+Only the stdlib is used; the websocket framing below covers what ComfyUI
+sends (text, binary previews, ping/close) and nothing more.
+"""
+
+from __future__ import annotations
+
+import base64
+import hashlib
+import json
+import os
+import socket
+import ssl
+import struct
+import threading
+import time
+import urllib.parse
+from dataclasses import dataclass, field
+from typing import Callable
+
+from .client import find_video
+
+_WS_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+OP_CONT, OP_TEXT, OP_BINARY, OP_CLOSE, OP_PING, OP_PONG = 0x0, 0x1, 0x2, 0x8, 0x9, 0xA
+
+
+class WebSocketClosed(ConnectionError):
+    """The server closed the websocket or the socket dropped."""
+
+
+# ---------------------------------------------------------------------------
+# Minimal RFC 6455 client
+# ---------------------------------------------------------------------------
+
+class WebSocket:
+    """Blocking client-side websocket: ``recv()`` returns whole messages."""
+
+    def __init__(self, url: str, timeout: float | None = None):
+        parts = urllib.parse.urlsplit(url)
+        secure = parts.scheme in ("wss", "https")
+        host = parts.hostname or "localhost"
+        port = parts.port or (443 if secure else 80)
+        path = (parts.path or "/") + (f"?{parts.query}" if parts.query else "")
+
+        sock = socket.create_connection((host, port), timeout=timeout)
+        if secure:
+            sock = ssl.create_default_context().wrap_socket(sock, server_hostname=host)
+        self._sock = sock
+        self._rfile = sock.makefile("rb")
+        self._send_lock = threading.Lock()
+
+        key = base64.b64encode(os.urandom(16)).decode()
+        request = (
+            f"GET {path} HTTP/1.1\r\n"
+            f"Host: {host}:{port}\r\n"
+            "Upgrade: websocket\r\n"
+            "Connection: Upgrade\r\n"
+            f"Sec-WebSocket-Key: {key}\r\n"
+            "Sec-WebSocket-Version: 13\r\n\r\n"
+        )
+        sock.sendall(request.encode())
+
+        status = self._rfile.readline().decode("latin-1")
+        headers = {}
+        while True:
+            line = self._rfile.readline().decode("latin-1").strip()
+            if not line:
+                break
+            name, _, value = line.partition(":")
+            headers[name.strip().lower()] = value.strip()
+        expected = base64.b64encode(
+            hashlib.sha1((key + _WS_GUID).encode()).digest()).decode()
+        if status.split()[1:2] != ["101"] or headers.get("sec-websocket-accept") != expected:
+            self.close()
+            raise WebSocketClosed(f"websocket handshake failed: {status.strip()}")
+
+    def settimeout(self, timeout: float | None):
+        self._sock.settimeout(timeout)
+
+    def _read_exact(self, n: int) -> bytes:
+        data = self._rfile.read(n)
+        if len(data) < n:
+            raise WebSocketClosed("connection dropped")
+        return data
+
+    def _read_frame(self) -> tuple[bool, int, bytes]:
+        b1, b2 = self._read_exact(2)
+        fin, opcode = bool(b1 & 0x80), b1 & 0x0F
+        length = b2 & 0x7F
+        if length == 126:
+            length = struct.unpack(">H", self._read_exact(2))[0]
+        elif length == 127:
+            length = struct.unpack(">Q", self._read_exact(8))[0]
+        mask = self._read_exact(4) if b2 & 0x80 else None
+        payload = self._read_exact(length)
+        if mask:
+            payload = bytes(b ^ mask[i % 4] for i, b in enumerate(payload))
+        return fin, opcode, payload
+
+    def send(self, payload: bytes, opcode: int = OP_TEXT):
+        header = bytearray([0x80 | opcode])
+        n = len(payload)
+        if n < 126:
+            header.append(0x80 | n)
+        elif n < 1 << 16:
+            header += bytes([0x80 | 126]) + struct.pack(">H", n)
+        else:
+            header += bytes([0x80 | 127]) + struct.pack(">Q", n)
+        mask = os.urandom(4)
+        masked = bytes(b ^ mask[i % 4] for i, b in enumerate(payload))
+        with self._send_lock:
+            self._sock.sendall(bytes(header) + mask + masked)
+
+    def recv(self) -> tuple[int, bytes]:
+        """Return the next ``(opcode, payload)`` data message."""
+        message, message_op = b"", None
+        while True:
+            fin, opcode, payload = self._read_frame()
+            if opcode == OP_PING:
+                self.send(payload, OP_PONG)
+                continue
+            if opcode == OP_PONG:
+                continue
+            if opcode == OP_CLOSE:
+                try:
+                    self.send(payload[:2], OP_CLOSE)
+                except OSError:
+                    pass
+                raise WebSocketClosed("server closed websocket")
+            if opcode != OP_CONT:
+                message_op = opcode
+            message += payload
+            if fin:
+                return message_op, message
+
+    def close(self):
+        try:
+            self._sock.close()
+        except OSError:
+            pass
+
+
+# ---------------------------------------------------------------------------
+# Prompt progress tracking
+# ---------------------------------------------------------------------------
+
+@dataclass
+class PromptProgress:
+    """What the websocket has told us about one prompt so far."""
+
+    prompt_id: str
+    status: str = "pending"          # pending | running | success | error
+    node: str | None = None          # node currently executing
+    nodes: dict = field(default_factory=dict)    # node id -> (value, max)
+    cached: list = field(default_factory=list)
+    outputs: dict = field(default_factory=dict)  # node id -> output dict
+    messages: list = field(default_factory=list)
+    started_at: float | None = None   # ComfyUI timestamps, seconds
+    finished_at: float | None = None
+    done: threading.Event = field(default_factory=threading.Event, repr=False)
+
+    @property
+    def fraction(self) -> float:
+        """Sampler progress of the current node in [0, 1]."""
+        value, maximum = self.nodes.get(self.node, (0, 0))
+        return value / maximum if maximum else 0.0
+
+    def entry(self) -> dict:
+        """Shape the collected data like a ``/history`` entry."""
+        return {
+            "prompt_id": self.prompt_id,
+            "outputs": dict(self.outputs),
+            "status": {
+                "status_str": self.status,
+                "completed": self.status == "success",
+                "messages": list(self.messages),
+            },
+        }
+
+
+def _timestamp(data: dict) -> float:
+    ts = data.get("timestamp")
+    return ts / 1000.0 if ts else time.time()
+
+
+class ComfyEvents:
+    """Background listener on ``/ws?clientId=...`` for one ``ComfyClient``.
+
+    ``on_event(kind, data)`` is called from the listener thread for every
+    JSON message; use it for progress bars.  The listener reconnects with
+    backoff until ``close()``; while it is down ``connected`` is cleared and
+    waiters fall back to ``/history`` polling.
+    """
+
+    def __init__(self, base_url: str, client_id: str, *,
+                 on_event: Callable[[str, dict], None] | None = None,
+                 reconnect_delay: float = 2.0, keep: int = 512):
+        scheme = "wss" if base_url.startswith("https") else "ws"
+        host = base_url.split("://", 1)[-1]
+        self.url = f"{scheme}://{host}/ws?clientId={client_id}"
+        self.on_event = on_event
+        self.reconnect_delay = reconnect_delay
+        self.keep = keep
+        self.connected = threading.Event()
+        self._prompts: dict[str, PromptProgress] = {}
+        self._lock = threading.Lock()
+        self._closed = threading.Event()
+        self._ws: WebSocket | None = None
+        self._thread = threading.Thread(target=self._run, name="comfy-ws", daemon=True)
+
+    def start(self, wait: float = 2.0) -> "ComfyEvents":
+        """Start the listener and give it up to ``wait`` seconds to connect."""
+        if not self._thread.is_alive():
+            self._thread.start()
+        self.connected.wait(wait)
+        return self
+
+    def close(self):
+        self._closed.set()
+        if self._ws is not None:
+            self._ws.close()
+
+    def progress(self, prompt_id: str) -> PromptProgress:
+        """Return (creating if needed) the progress record for a prompt."""
+        with self._lock:
+            state = self._prompts.get(prompt_id)
+            if state is None:
+                state = self._prompts[prompt_id] = PromptProgress(prompt_id)
+                if len(self._prompts) > self.keep:
+                    for old in [p for p, s in self._prompts.items()
+                                if s.done.is_set()][: len(self._prompts) - self.keep]:
+                        del self._prompts[old]
+            return state
+
+    def forget(self, prompt_id: str):
+        with self._lock:
+            self._prompts.pop(prompt_id, None)
+
+    # -- listener -------------------------------------------------------------
+
+    def _run(self):
+        delay = self.reconnect_delay
+        while not self._closed.is_set():
+            try:
+                self._ws = WebSocket(self.url, timeout=10)
+                self._ws.settimeout(None)
+                self.connected.set()
+                delay = self.reconnect_delay
+                while True:
+                    opcode, payload = self._ws.recv()
+                    if opcode == OP_TEXT:
+                        self._dispatch(json.loads(payload))
+            except (OSError, ValueError):
+                pass
+            finally:
+                self.connected.clear()
+                if self._ws is not None:
+                    self._ws.close()
+            self._closed.wait(delay)
+            delay = min(delay * 2, 30.0)
+
+    def _dispatch(self, message: dict):
+        kind = message.get("type", "")
+        data = message.get("data") or {}
+        prompt_id = data.get("prompt_id")
+        if prompt_id:
+            self._apply(self.progress(prompt_id), kind, data)
+        if self.on_event is not None:
+            try:
+                self.on_event(kind, data)
+            except Exception:
+                pass
+
+    @staticmethod
+    def _apply(state: PromptProgress, kind: str, data: dict):
+        if kind == "execution_start":
+            state.status = "running"
+            state.started_at = _timestamp(data)
+            state.messages.append([kind, data])
+        elif kind == "execution_cached":
+            state.cached = list(data.get("nodes") or [])
+            state.messages.append([kind, data])
+        elif kind == "executing":
+            node = data.get("node")
+            if node is None:
+                # Legacy end-of-prompt marker (no execution_success).
+                if state.status != "error":
+                    state.status = "success"
+                    state.finished_at = state.finished_at or time.time()
+                state.done.set()
+            else:
+                state.status = "running"
+                state.node = str(node)
+        elif kind == "progress":
+            state.nodes[str(data.get("node"))] = (data.get("value", 0), data.get("max", 0))
+        elif kind == "executed":
+            node = str(data.get("node"))
+            state.outputs[node] = data.get("output") or {}
+            state.nodes.setdefault(node, (1, 1))
+            # The SaveVideo node is the last thing our graphs run: resolve
+            # now instead of waiting for the execution_success round trip.
+            if find_video({node: state.outputs[node]}) is not None and state.status != "error":
+                state.status = "success"
+                state.finished_at = _timestamp(data)
+                state.done.set()
+        elif kind == "execution_success":
+            state.status = "success"
+            state.finished_at = _timestamp(data)
+            state.messages.append([kind, data])
+            state.done.set()
+        elif kind in ("execution_error", "execution_interrupted"):
+            state.status = "error"
+            state.finished_at = _timestamp(data)
+            state.messages.append([kind, data])
+            state.done.set()
@@ -0,0 +1,125 @@
+"""Append-only journal of clip submissions, for resuming after a crash.
+
+``ClipRunner`` writes one JSON line per state change of every clip it
+submits: ``submitted`` (with the ComfyUI ``prompt_id`` and backend),
+``finished``, ``downloaded`` or ``failed``.  When a script is killed
+mid-run its prompts keep rendering on ComfyUI; on the next run the runner
+finds them in the journal by workflow hash and, if ``/history`` or
+``/queue`` still knows the prompt, waits for it instead of queueing the
+same clip a second time.
+
+Journals live in ``CLIP_JOURNAL_DIR`` (default
+``~/.cache/zkagi-video-engine/journal``), one ``<script>.jsonl`` per
+script.  ``CLIP_JOURNAL=off`` disables them.  Clips that were downloaded
+or failed are dropped when the journal is next opened, so it only ever
+holds the unfinished tail of the last run.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+
+from .cache import DEFAULT_CACHE_DIR
+
+DEFAULT_JOURNAL_DIR = os.path.join(os.path.dirname(DEFAULT_CACHE_DIR), "journal")
+
+SUBMITTED, FINISHED, DOWNLOADED, FAILED = "submitted", "finished", "downloaded", "failed"
+_OPEN_STATES = (SUBMITTED, FINISHED)
+
+
+def _script_name() -> str:
+    name = os.path.splitext(os.path.basename(sys.argv[0] or ""))[0]
+    return name or "interactive"
+
+
+class ClipJournal:
+    """JSONL journal keyed on the workflow hash; safe to share between threads."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._open: dict[str, dict] = {}
+        self._load()
+
+    @classmethod
+    def from_env(cls, name: str | None = None) -> "ClipJournal | None":
+        if os.environ.get("CLIP_JOURNAL", "").lower() in ("0", "off", "no", "false"):
+            return None
+        root = os.environ.get("CLIP_JOURNAL_DIR") or DEFAULT_JOURNAL_DIR
+        return cls(os.path.join(root, f"{name or _script_name()}.jsonl"))
+
+    def __repr__(self):
+        return f"ClipJournal({self.path!r}, open={len(self._open)})"
+
+    def _load(self):
+        lines = 0
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                for line in f:
+                    lines += 1
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue    # torn last line from a crash
+                    key = record.get("key")
+                    if not key:
+                        continue
+                    if record.get("state") in _OPEN_STATES:
+                        self._open[key] = record
+                    else:
+                        self._open.pop(key, None)
+        except FileNotFoundError:
+            return
+        if lines > len(self._open):
+            self._rewrite()
+
+    def _rewrite(self):
+        """Replace the file with just the open records (atomically)."""
+        folder = os.path.dirname(self.path) or "."
+        fd, tmp = tempfile.mkstemp(dir=folder, prefix=".journal-")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                for record in self._open.values():
+                    f.write(json.dumps(record, sort_keys=True) + "\n")
+            os.replace(tmp, self.path)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+            raise
+
+    def record(self, key: str, state: str, **fields):
+        """Append a state change for the clip whose workflow hashes to ``key``."""
+        record = {"t": round(time.time(), 3), "key": key, "state": state}
+        previous = self._open.get(key)
+        if previous is not None:
+            # Carry prompt id / host forward so every line stands alone.
+            for name in ("clip", "dest", "prompt_id", "host"):
+                if name in previous:
+                    record.setdefault(name, previous[name])
+        record.update({k: v for k, v in fields.items() if v is not None})
+        line = json.dumps(record, sort_keys=True) + "\n"
+        with self._lock:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line)
+                f.flush()
+                os.fsync(f.fileno())
+            if state in _OPEN_STATES:
+                self._open[key] = record
+            else:
+                self._open.pop(key, None)
+
+    def pending(self, key: str) -> dict | None:
+        """The last open record for ``key``: a prompt that may still be alive."""
+        with self._lock:
+            record = self._open.get(key)
+            return dict(record) if record is not None else None
+
+    def open_records(self) -> list[dict]:
+        with self._lock:
+            return [dict(r) for r in self._open.values()]
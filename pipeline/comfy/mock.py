@@ -0,0 +1,955 @@
+"""Offline stand-in for a ComfyUI host, for benchmarking without a GPU.
+
+``MockComfy`` speaks enough of the ComfyUI API for the clip scripts and the
+``pipeline.comfy`` client: ``/prompt``, ``/history``, ``/view`` (with
+``Range``), ``/upload/image``, ``/queue``, ``/interrupt``, ``/system_stats``,
+``/object_info`` and the ``/ws`` event stream.  One worker thread plays the
+GPU: prompts run strictly one after another, each sleeping for a latency
+drawn from a configurable distribution, and finish with a tiny synthetic MP4
+of the requested length.  A share of prompts can be made to fail, either
+with a generic node exception or a CUDA out-of-memory error.
+
+The server counts every request and records when the "GPU" was busy, so
+``benchmark`` can report how much of a run the orchestration left the GPU
+idle::
+
+    python3 -m pipeline.comfy bench --clips 24 --latency lognormal:2:0.2
+    python3 -m pipeline.comfy mock --port 8188   # point COMFY_URL at it
+
+Latency specs are ``SECONDS``, ``fixed:S``, ``uniform:LO:HI``,
+``normal:MEAN:SD`` or ``lognormal:MEDIAN:SIGMA``; the drawn value is for a
+97-frame, 768x512, 8-step clip and scales with the requested length,
+resolution and step count.
+"""
+
+from __future__ import annotations
+
+import base64
+import collections
+import hashlib
+import itertools
+import json
+import math
+import os
+import random
+import socket
+import struct
+import tempfile
+import threading
+import time
+import urllib.parse
+from email.parser import BytesParser
+from email.policy import HTTP
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable
+
+from .events import _WS_GUID, OP_BINARY, OP_CLOSE, OP_PING, OP_PONG, OP_TEXT
+from .schedule import model_signature
+
+REFERENCE_FRAMES = 97
+REFERENCE_PIXELS, REFERENCE_STEPS = 768 * 512, 8
+VRAM_TOTAL = 24 << 30
+
+OOM_MESSAGE = (
+    "Allocation on device 0 would exceed allowed memory. "
+    "(out of memory)\nCurrently allocated     : 21.43 GiB"
+)
+
+
+# ---------------------------------------------------------------------------
+# Latency distributions
+# ---------------------------------------------------------------------------
+
+def parse_latency(spec: str | float) -> Callable[[random.Random], float]:
+    """Turn a latency spec into ``draw(rng) -> seconds``."""
+    if isinstance(spec, (int, float)):
+        return lambda rng: float(spec)
+    kind, _, rest = str(spec).partition(":")
+    if not rest:
+        kind, rest = "fixed", kind
+    try:
+        args = [float(a) for a in rest.split(":")]
+    except ValueError:
+        raise ValueError(f"bad latency spec {spec!r}") from None
+    if kind == "fixed" and len(args) == 1:
+        return lambda rng: args[0]
+    if kind == "uniform" and len(args) == 2:
+        return lambda rng: rng.uniform(args[0], args[1])
+    if kind == "normal" and len(args) == 2:
+        return lambda rng: max(0.0, rng.gauss(args[0], args[1]))
+    if kind == "lognormal" and len(args) == 2:
+        return lambda rng: rng.lognormvariate(math.log(args[0]), args[1])
+    raise ValueError(f"bad latency spec {spec!r}")
+
+
+# ---------------------------------------------------------------------------
+# Synthetic MP4
+# ---------------------------------------------------------------------------
+
+def _box(kind: bytes, *payload: bytes) -> bytes:
+    body = b"".join(payload)
+    return struct.pack(">I", 8 + len(body)) + kind + body
+
+
+def _full_box(kind: bytes, version: int, flags: int, *payload: bytes) -> bytes:
+    return _box(kind, struct.pack(">I", (version << 24) | flags), *payload)
+
+
+_MATRIX = struct.pack(">9I", 0x10000, 0, 0, 0, 0x10000, 0, 0, 0, 0x40000000)
+
+
+def synthetic_mp4(frames: int = REFERENCE_FRAMES, fps: int = 25, *,
+                  width: int = 768, height: int = 512, size: int = 64 << 10) -> bytes:
+    """A minimal MP4 that ffprobe reads as ``frames / fps`` seconds long.
+
+    The samples are filler bytes, not decodable video; the container
+    structure and duration are real, which is all the pipeline checks.
+    """
+    frames = max(1, int(frames))
+    fps = max(1, int(round(fps)))
+    sample = max(16, size // frames)
+    duration_ms = frames * 1000 // fps
+
+    ftyp = _box(b"ftyp", b"isom", struct.pack(">I", 512), b"isomiso2mp41")
+    visual_entry = _box(
+        b"mp4v",
+        bytes(6), struct.pack(">H", 1), bytes(16),
+        struct.pack(">HH", width, height),
+        struct.pack(">II", 0x00480000, 0x00480000), bytes(4),
+        struct.pack(">H", 1), bytes(32), struct.pack(">Hh", 0x18, -1),
+    )
+
+    def moov(chunk_offset: int) -> bytes:
+        stbl = _box(
+            b"stbl",
+            _full_box(b"stsd", 0, 0, struct.pack(">I", 1), visual_entry),
+            _full_box(b"stts", 0, 0, struct.pack(">III", 1, frames, 1)),
+            _full_box(b"stsc", 0, 0, struct.pack(">IIII", 1, 1, frames, 1)),
+            _full_box(b"stsz", 0, 0, struct.pack(">II", sample, frames)),
+            _full_box(b"stco", 0, 0, struct.pack(">II", 1, chunk_offset)),
+        )
+        minf = _box(
+            b"minf",
+            _full_box(b"vmhd", 0, 1, bytes(8)),
+            _box(b"dinf", _full_box(b"dref", 0, 0, struct.pack(">I", 1),
+                                    _full_box(b"url ", 0, 1))),
+            stbl,
+        )
+        mdia = _box(
+            b"mdia",
+            _full_box(b"mdhd", 0, 0, struct.pack(">IIIIHH", 0, 0, fps, frames, 0x55C4, 0)),
+            _full_box(b"hdlr", 0, 0, bytes(4), b"vide", bytes(12), b"VideoHandler\0"),
+            minf,
+        )
+        tkhd = _full_box(
+            b"tkhd", 0, 3,
+            struct.pack(">IIIII", 0, 0, 1, 0, duration_ms), bytes(8),
+            struct.pack(">hhhH", 0, 0, 0, 0), _MATRIX,
+            struct.pack(">II", width << 16, height << 16),
+        )
+        mvhd = _full_box(
+            b"mvhd", 0, 0,
+            struct.pack(">IIII", 0, 0, 1000, duration_ms),
+            struct.pack(">IH", 0x10000, 0x100), bytes(10), _MATRIX, bytes(24),
+            struct.pack(">I", 2),
+        )
+        return _box(b"moov", mvhd, _box(b"trak", tkhd, mdia))
+
+    # moov comes first (faststart), so its size fixes the data offset.
+    offset = len(ftyp) + len(moov(0)) + 8
+    return ftyp + moov(offset) + _box(b"mdat", b"\0" * (sample * frames))
+
+
+# ---------------------------------------------------------------------------
+# Graph inspection
+# ---------------------------------------------------------------------------
+
+# Output types of the node classes our templates use, for /object_info.
+NODE_OUTPUTS = {
+    "CheckpointLoaderSimple": ["MODEL", "CLIP", "VAE"],
+    "DualCLIPLoader": ["CLIP"],
+    "LoraLoaderModelOnly": ["MODEL"],
+    "LoraLoader": ["MODEL", "CLIP"],
+    "CLIPTextEncode": ["CONDITIONING"],
+    "LTXVConditioning": ["CONDITIONING", "CONDITIONING"],
+    "EmptyLTXVLatentVideo": ["LATENT"],
+    "LoadImage": ["IMAGE", "MASK"],
+    "LTXVPreprocess": ["IMAGE"],
+    "LTXVImgToVideo": ["CONDITIONING", "CONDITIONING", "LATENT"],
+    "LTXVScheduler": ["SIGMAS"],
+    "RandomNoise": ["NOISE"],
+    "CFGGuider": ["GUIDER"],
+    "KSamplerSelect": ["SAMPLER"],
+    "SamplerCustomAdvanced": ["LATENT", "LATENT"],
+    "VAEDecode": ["IMAGE"],
+    "CreateVideo": ["VIDEO"],
+    "SaveVideo": [],
+}
+_FREE_TEXT = {"text", "filename_prefix", "image"}
+
+
+def _is_link(value) -> bool:
+    return isinstance(value, list) and len(value) == 2 and isinstance(value[0], str)
+
+
+def object_info_for(graphs) -> dict:
+    """A ``/object_info`` schema that accepts exactly the given graphs' nodes."""
+    info: dict = {}
+    for graph in graphs:
+        for node in graph.values():
+            cls = node["class_type"]
+            spec = info.setdefault(cls, {
+                "input": {"required": {}, "optional": {}},
+                "output": NODE_OUTPUTS.get(cls, []),
+                "output_node": cls.startswith("Save"),
+                "name": cls, "display_name": cls, "category": "mock",
+            })["input"]["required"]
+            for key, value in node["inputs"].items():
+                if _is_link(value):
+                    outputs = NODE_OUTPUTS.get(graph[value[0]]["class_type"], [])
+                    kind = outputs[value[1]] if value[1] < len(outputs) else "*"
+                    spec[key] = (kind,)
+                elif isinstance(value, bool):
+                    spec[key] = ("BOOLEAN", {"default": value})
+                elif isinstance(value, int):
+                    spec[key] = ("INT", {"default": value, "min": 0, "max": 2 ** 53})
+                elif isinstance(value, float):
+                    spec[key] = ("FLOAT", {"default": value, "min": 0.0, "max": 1e6})
+                elif key in _FREE_TEXT or not str(value).endswith(".safetensors"):
+                    spec[key] = ("STRING", {})
+                else:
+                    choices = spec.get(key, ([],))[0]
+                    if value not in choices:
+                        choices = [*choices, value]
+                    spec[key] = (choices,)
+    return info
+
+
+def _clip_shape(graph: dict) -> tuple[int, float]:
+    """Requested ``(frames, fps)`` of a video graph; batches play back to back."""
+    frames, fps, batch = REFERENCE_FRAMES, 25.0, 1
+    for node in graph.values():
+        inputs = node.get("inputs", {})
+        if isinstance(inputs.get("length"), int):
+            frames = inputs["length"]
+            if isinstance(inputs.get("batch_size"), int):
+                batch = max(1, inputs["batch_size"])
+        for key in ("fps", "frame_rate"):
+            if node.get("class_type") == "CreateVideo" and isinstance(inputs.get(key), (int, float)):
+                fps = float(inputs[key])
+    return frames * batch, fps
+
+
+def _clip_cost(graph: dict) -> float:
+    """GPU time of a graph relative to a 768x512, 8-step reference clip."""
+    pixels, steps = REFERENCE_PIXELS, REFERENCE_STEPS
+    for node in graph.values():
+        inputs = node.get("inputs", {})
+        if isinstance(inputs.get("width"), int) and isinstance(inputs.get("height"), int):
+            pixels = inputs["width"] * inputs["height"]
+        if node.get("class_type") == "LTXVScheduler" and isinstance(inputs.get("steps"), int):
+            steps = inputs["steps"]
+    return pixels / REFERENCE_PIXELS * steps / REFERENCE_STEPS
+
+
+def _check_graph(graph) -> dict:
+    """``node_errors`` for obviously broken graphs (empty when fine)."""
+    if not isinstance(graph, dict) or not graph:
+        return {"": "prompt is not a non-empty node dict"}
+    errors = {}
+    for node_id, node in graph.items():
+        if not isinstance(node, dict) or "class_type" not in node:
+            errors[node_id] = "missing class_type"
+            continue
+        for key, value in node.get("inputs", {}).items():
+            if _is_link(value) and value[0] not in graph:
+                errors[node_id] = f"input {key} links to missing node {value[0]}"
+    if not any(str(n.get("class_type", "")).startswith("Save")
+               for n in graph.values() if isinstance(n, dict)):
+        errors.setdefault("", "prompt has no output node")
+    return errors
+
+
+# ---------------------------------------------------------------------------
+# Server
+# ---------------------------------------------------------------------------
+
+class _Job:
+    __slots__ = ("number", "prompt_id", "graph", "client_id", "extra")
+
+    def __init__(self, number, prompt_id, graph, client_id, extra):
+        self.number = number
+        self.prompt_id = prompt_id
+        self.graph = graph
+        self.client_id = client_id
+        self.extra = extra
+
+    def queue_item(self) -> list:
+        outputs = [n for n, node in self.graph.items()
+                   if str(node.get("class_type", "")).startswith("Save")]
+        return [self.number, self.prompt_id, self.graph, self.extra, outputs]
+
+
+class _WebSocketPeer:
+    """Server side of one ``/ws`` connection (unmasked frames out)."""
+
+    def __init__(self, sock: socket.socket, client_id: str):
+        self.sock = sock
+        self.client_id = client_id
+        self.lock = threading.Lock()
+
+    def send_json(self, message: dict) -> bool:
+        payload = json.dumps(message).encode()
+        n = len(payload)
+        if n < 126:
+            head = struct.pack(">BB", 0x80 | OP_TEXT, n)
+        elif n < 1 << 16:
+            head = struct.pack(">BBH", 0x80 | OP_TEXT, 126, n)
+        else:
+            head = struct.pack(">BBQ", 0x80 | OP_TEXT, 127, n)
+        try:
+            with self.lock:
+                self.sock.sendall(head + payload)
+            return True
+        except OSError:
+            return False
+
+
+class MockComfy:
+    """A single-GPU fake ComfyUI server on ``host:port`` (0 = pick a port).
+
+    ``latency`` is a spec for ``parse_latency``; ``fail_rate`` and
+    ``oom_rate`` are the shares of prompts that end in a node exception or
+    an out-of-memory error halfway through sampling.  ``model_load`` seconds
+    are added whenever a prompt needs different model files than the one
+    before it.  Prompts longer than ``oom_frames`` always run out of
+    memory.  ``seed`` makes latencies and failures reproducible.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, *,
+                 latency: str | float = "fixed:1", fail_rate: float = 0.0,
+                 oom_rate: float = 0.0, model_load: float = 0.0,
+                 oom_frames: int | None = None, output_bytes: int = 64 << 10, steps: int = 8, seed: int | None = None,
+                 object_info: dict | None = None, name: str = "mock"):
+        self.draw_latency = parse_latency(latency)
+        self.fail_rate = fail_rate
+        self.oom_rate = oom_rate
+        self.oom_frames = oom_frames
+        self.model_load = model_load
+        self.output_bytes = output_bytes
+        self.steps = max(1, steps)
+        self.name = name
+        self._object_info = object_info
+        self._rng = random.Random(seed)
+
+        self.requests: collections.Counter = collections.Counter()
+        self.busy: list[tuple[float, float]] = []
+        self.model_loads = 0
+        self.completed = 0
+        self.failed = 0
+
+        self._lock = threading.Lock()
+        self._wake = threading.Condition(self._lock)
+        self._pending: collections.deque[_Job] = collections.deque()
+        self._running: _Job | None = None
+        self._history: dict[str, dict] = {}
+        self._files: dict[tuple[str, str, str], bytes] = {}
+        self._peers: list[_WebSocketPeer] = []
+        self._numbers = itertools.count()
+        self._counter = itertools.count(1)
+        self._interrupt = threading.Event()
+        self._stopped = threading.Event()
+        self._loaded: tuple | None = None
+
+        handler = type("Handler", (_Handler,), {"mock": self})
+        self._server = ThreadingHTTPServer((host, port), handler)
+        self._server.daemon_threads = True
+        self._threads = [
+            threading.Thread(target=self._server.serve_forever, name="mock-http", daemon=True),
+            threading.Thread(target=self._worker, name="mock-gpu", daemon=True),
+        ]
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def __repr__(self):
+        return f"MockComfy({self.url!r})"
+
+    def start(self) -> "MockComfy":
+        for t in self._threads:
+            if not t.is_alive():
+                t.start()
+        return self
+
+    def stop(self):
+        self._stopped.set()
+        with self._wake:
+            self._wake.notify_all()
+        self._server.shutdown()
+        self._server.server_close()
+        for peer in list(self._peers):
+            try:
+                peer.sock.close()
+            except OSError:
+                pass
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def busy_seconds(self) -> float:
+        return sum(b - a for a, b in self.busy)
+
+    # -- state helpers ----------------------------------------------------------
+
+    def object_info(self) -> dict:
+        if self._object_info is None:
+            from .templates import TEMPLATES
+
+            graphs = [t.build(**{p: t.graph[t.params[p][0][0]]["inputs"][t.params[p][0][1]]
+                                 for p in t.params if p not in t.defaults})
+                      for t in TEMPLATES.values()]
+            self._object_info = object_info_for(graphs)
+        return self._object_info
+
+    def queue_state(self) -> dict:
+        with self._lock:
+            running = [self._running.queue_item()] if self._running else []
+            return {"queue_running": running,
+                    "queue_pending": [j.queue_item() for j in self._pending]}
+
+    def _queue_remaining(self) -> int:
+        return len(self._pending) + (1 if self._running else 0)
+
+    def enqueue(self, graph: dict, client_id: str, *, front: bool = False,
+                extra: dict | None = None, prompt_id: str | None = None) -> tuple[str, int]:
+        if not prompt_id:
+            prompt_id = hashlib.sha1(os.urandom(16)).hexdigest()
+            prompt_id = "-".join((prompt_id[:8], prompt_id[8:12], prompt_id[12:16],
+                                  prompt_id[16:20], prompt_id[20:32]))
+        with self._wake:
+            number = -next(self._numbers) if front else next(self._numbers)
+            job = _Job(number, prompt_id, graph, client_id, extra or {})
+            if front:
+                self._pending.appendleft(job)
+            else:
+                self._pending.append(job)
+            self._wake.notify()
+        self._broadcast_status()
+        return prompt_id, number
+
+    def delete(self, prompt_ids) -> int:
+        drop = set(prompt_ids)
+        with self._lock:
+            before = len(self._pending)
+            self._pending = collections.deque(
+                j for j in self._pending if j.prompt_id not in drop)
+            removed = before - len(self._pending)
+        self._broadcast_status()
+        return removed
+
+    def clear(self):
+        with self._lock:
+            self._pending.clear()
+        self._broadcast_status()
+
+    def interrupt(self):
+        self._interrupt.set()
+
+    def add_peer(self, peer: _WebSocketPeer):
+        with self._lock:
+            self._peers.append(peer)
+            remaining = self._queue_remaining()
+        peer.send_json({"type": "status", "data": {
+            "status": {"exec_info": {"queue_remaining": remaining}}, "sid": peer.client_id}})
+
+    def drop_peer(self, peer: _WebSocketPeer):
+        with self._lock:
+            if peer in self._peers:
+                self._peers.remove(peer)
+
+    def _send(self, client_id: str | None, kind: str, data: dict):
+        with self._lock:
+            peers = [p for p in self._peers if client_id is None or p.client_id == client_id]
+        for peer in peers:
+            if not peer.send_json({"type": kind, "data": data}):
+                self.drop_peer(peer)
+
+    def _broadcast_status(self):
+        with self._lock:
+            remaining = self._queue_remaining()
+        self._send(None, "status", {"status": {"exec_info": {"queue_remaining": remaining}}})
+
+    # -- the "GPU" --------------------------------------------------------------
+
+    def _worker(self):
+        while not self._stopped.is_set():
+            with self._wake:
+                while not self._pending and not self._stopped.is_set():
+                    self._wake.wait()
+                if self._stopped.is_set():
+                    return
+                job = self._running = self._pending.popleft()
+            self._interrupt.clear()
+            try:
+                self._execute(job)
+            finally:
+                with self._lock:
+                    self._running = None
+                self._broadcast_status()
+
+    def _execute(self, job: _Job):
+        pid, cid, graph = job.prompt_id, job.client_id, job.graph
+        frames, fps = _clip_shape(graph)
+        with self._lock:
+            latency = (self.draw_latency(self._rng) * frames / REFERENCE_FRAMES
+                       * _clip_cost(graph))
+            roll = self._rng.random()
+        too_long = self.oom_frames is not None and frames > self.oom_frames
+        outcome = ("oom" if too_long or roll < self.oom_rate
+                   else "error" if roll < self.oom_rate + self.fail_rate else "ok")
+
+        start = time.time()
+        messages = [["execution_start", {"prompt_id": pid, "timestamp": int(start * 1000)}]]
+        self._send(cid, "execution_start", messages[0][1])
+        cached = {"nodes": [], "prompt_id": pid, "timestamp": int(start * 1000)}
+        messages.append(["execution_cached", cached])
+        self._send(cid, "execution_cached", cached)
+
+        key = model_signature(graph)
+        if key != self._loaded:
+            self.model_loads += 1
+            self._loaded = key
+            latency += self.model_load
+
+        order = list(graph)
+        sampler = next((n for n in order if graph[n].get("class_type") == "SamplerCustomAdvanced"),
+                       order[len(order) // 2])
+        save = next((n for n in reversed(order)
+                     if str(graph[n].get("class_type", "")).startswith("Save")), order[-1])
+        step_time = latency / self.steps
+        status, error = "success", None
+        for node in order:
+            self._send(cid, "executing", {"node": node, "display_node": node, "prompt_id": pid})
+            if node != sampler:
+                continue
+            for step in range(1, self.steps + 1):
+                if self._interrupt.wait(step_time):
+                    status, error = "interrupted", None
+                    break
+                self._send(cid, "progress", {"value": step, "max": self.steps,
+                                             "prompt_id": pid, "node": node})
+                if outcome != "ok" and step == self.steps // 2:
+                    status = "error"
+                    error = (("torch.OutOfMemoryError", OOM_MESSAGE) if outcome == "oom"
+                             else ("RuntimeError", "mock failure injected by fail_rate"))
+                    break
+            if status != "success":
+                break
+
+        end = time.time()
+        outputs = {}
+        stamp = int(end * 1000)
+        if status == "success":
+            item = self._store_output(graph[save].get("inputs", {}), frames, fps)
+            outputs[save] = {"images": [item], "animated": [True]}
+            self._send(cid, "executed", {"node": save, "display_node": save,
+                                         "output": outputs[save], "prompt_id": pid})
+            messages.append(["execution_success", {"prompt_id": pid, "timestamp": stamp}])
+            self.completed += 1
+        elif status == "error":
+            messages.append(["execution_error", {
+                "prompt_id": pid, "node_id": sampler,
+                "node_type": graph[sampler].get("class_type", "?"), "executed": order[:order.index(sampler)],
+                "exception_type": error[0], "exception_message": error[1],
+                "traceback": [], "current_inputs": {}, "current_outputs": {},
+                "timestamp": stamp}])
+            self.failed += 1
+        else:
+            messages.append(["execution_interrupted", {
+                "prompt_id": pid, "node_id": sampler,
+                "node_type": graph[sampler].get("class_type", "?"),
+                "executed": order[:order.index(sampler)], "timestamp": stamp}])
+            self.failed += 1
+        self.busy.append((start, end))
+
+        with self._lock:
+            self._history[pid] = {
+                "prompt": job.queue_item(),
+                "outputs": outputs,
+                "status": {"status_str": "success" if status == "success" else "error",
+                           "completed": status == "success", "messages": messages},
+                "meta": {},
+            }
+        self._send(cid, messages[-1][0], messages[-1][1])
+        self._send(cid, "executing", {"node": None, "prompt_id": pid})
+
+    def _store_output(self, inputs: dict, frames: int, fps: float) -> dict:
+        prefix = str(inputs.get("filename_prefix") or "ComfyUI")
+        subfolder, base = os.path.split(prefix)
+        filename = f"{base}_{next(self._counter):05d}_.mp4"
+        data = synthetic_mp4(frames, fps, size=self.output_bytes)
+        with self._lock:
+            self._files[("output", subfolder, filename)] = data
+        return {"filename": filename, "subfolder": subfolder, "type": "output"}
+
+    def store_input(self, name: str, data: bytes, subfolder: str = "",
+                    overwrite: bool = True) -> str:
+        with self._lock:
+            if not overwrite:
+                stem, ext = os.path.splitext(name)
+                for i in itertools.count(1):
+                    if ("input", subfolder, name) not in self._files:
+                        break
+                    name = f"{stem} ({i}){ext}"
+            self._files[("input", subfolder, name)] = data
+        return name
+
+    def file(self, kind: str, subfolder: str, filename: str) -> bytes | None:
+        with self._lock:
+            return self._files.get((kind, subfolder, filename))
+
+    def history(self, prompt_id: str | None = None, max_items: int | None = None) -> dict:
+        with self._lock:
+            if prompt_id is None:
+                items = list(self._history.items())
+                return dict(items[-max_items:] if max_items else items)
+            entry = self._history.get(prompt_id)
+            return {prompt_id: entry} if entry is not None else {}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    mock: MockComfy
+
+    def log_message(self, *args):
+        pass
+
+    def _route(self) -> tuple[str, dict]:
+        parts = urllib.parse.urlsplit(self.path)
+        params = dict(urllib.parse.parse_qsl(parts.query))
+        route = parts.path.rstrip("/") or "/"
+        label = "/history" if route.startswith("/history") else route
+        with self.mock._lock:
+            self.mock.requests[f"{self.command} {label}"] += 1
+        return route, params
+
+    def _send(self, status: int, body: bytes = b"", content_type: str = "application/json",
+              headers: dict | None = None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(body)
+
+    def _json(self, payload, status: int = 200):
+        self._send(status, json.dumps(payload).encode())
+
+    def _body(self) -> bytes:
+        length = int(self.headers.get("Content-Length") or 0)
+        return self.rfile.read(length) if length else b""
+
+    # -- GET --------------------------------------------------------------------
+
+    def do_GET(self):
+        route, params = self._route()
+        mock = self.mock
+        if route == "/ws":
+            return self._websocket(params.get("clientId") or os.urandom(8).hex())
+        if route == "/history":
+            max_items = int(params["max_items"]) if params.get("max_items") else None
+            return self._json(mock.history(max_items=max_items))
+        if route.startswith("/history/"):
+            return self._json(mock.history(route.split("/", 2)[2]))
+        if route == "/view":
+            return self._view(params)
+        if route == "/queue":
+            return self._json(mock.queue_state())
+        if route == "/prompt":
+            with mock._lock:
+                remaining = mock._queue_remaining()
+            return self._json({"exec_info": {"queue_remaining": remaining}})
+        if route == "/system_stats":
+            # Pretend VRAM fills up with queued work so pools see a difference.
+            with mock._lock:
+                used = min(VRAM_TOTAL, mock._queue_remaining() * (4 << 30))
+            return self._json({
+                "system": {"os": "mock", "comfyui_version": "mock", "python_version": "",
+                           "embedded_python": False},
+                "devices": [{"name": f"{mock.name} (mock)", "type": "cuda", "index": 0,
+                             "vram_total": VRAM_TOTAL, "vram_free": VRAM_TOTAL - used,
+                             "torch_vram_total": VRAM_TOTAL,
+                             "torch_vram_free": VRAM_TOTAL - used}],
+            })
+        if route == "/object_info":
+            return self._json(mock.object_info())
+        if route.startswith("/object_info/"):
+            cls = route.split("/", 2)[2]
+            info = mock.object_info()
+            return self._json({cls: info[cls]} if cls in info else {})
+        self._send(404, b"Not Found", "text/plain")
+
+    do_HEAD = do_GET
+
+    def _view(self, params: dict):
+        data = self.mock.file(params.get("type") or "output", params.get("subfolder", ""),
+                              params.get("filename", ""))
+        if data is None:
+            return self._send(404, b"Not Found", "text/plain")
+        ctype = "video/mp4" if params.get("filename", "").endswith(".mp4") else "image/png"
+        total = len(data)
+        rng = self.headers.get("Range", "")
+        if rng.startswith("bytes="):
+            first, _, last = rng[6:].partition("-")
+            start = int(first or 0)
+            end = int(last) if last else total - 1
+            if start >= total:
+                return self._send(416, b"", ctype, {"Content-Range": f"bytes */{total}"})
+            end = min(end, total - 1)
+            return self._send(206, data[start:end + 1], ctype,
+                              {"Content-Range": f"bytes {start}-{end}/{total}",
+                               "Accept-Ranges": "bytes"})
+        self._send(200, data, ctype, {"Accept-Ranges": "bytes"})
+
+    # -- POST -------------------------------------------------------------------
+
+    def do_POST(self):
+        route, _ = self._route()
+        mock = self.mock
+        body = self._body()
+        if route == "/prompt":
+            try:
+                payload = json.loads(body or b"{}")
+            except ValueError:
+                return self._json({"error": {"type": "invalid_prompt",
+                                             "message": "body is not JSON"},
+                                   "node_errors": {}}, 400)
+            graph = payload.get("prompt")
+            node_errors = _check_graph(graph)
+            if node_errors:
+                return self._json({
+                    "error": {"type": "prompt_outputs_failed_validation",
+                              "message": "Prompt outputs failed validation",
+                              "details": "", "extra_info": {}},
+                    "node_errors": {k: {"errors": [{"type": "invalid", "message": v,
+                                                    "details": v, "extra_info": {}}],
+                                        "dependent_outputs": [], "class_type": ""}
+                                    for k, v in node_errors.items()},
+                }, 400)
+            prompt_id, number = mock.enqueue(
+                graph, payload.get("client_id") or "", front=bool(payload.get("front")),
+                extra=payload.get("extra_data"), prompt_id=payload.get("prompt_id"))
+            return self._json({"prompt_id": prompt_id, "number": number, "node_errors": {}})
+        if route == "/upload/image":
+            return self._upload(body)
+        if route == "/queue":
+            payload = json.loads(body or b"{}")
+            if payload.get("clear"):
+                mock.clear()
+            if payload.get("delete"):
+                mock.delete(payload["delete"])
+            return self._send(200)
+        if route == "/interrupt":
+            mock.interrupt()
+            return self._send(200)
+        self._send(404, b"Not Found", "text/plain")
+
+    def _upload(self, body: bytes):
+        ctype = self.headers.get("Content-Type", "")
+        message = BytesParser(policy=HTTP).parsebytes(
+            f"Content-Type: {ctype}\r\n\r\n".encode() + body)
+        fields, image = {}, None
+        for part in message.iter_parts() if message.is_multipart() else ():
+            name = part.get_param("name", header="content-disposition")
+            if name == "image" and part.get_filename():
+                image = (part.get_filename(), part.get_payload(decode=True) or b"")
+            elif name:
+                fields[name] = (part.get_payload(decode=True) or b"").decode()
+        if image is None:
+            return self._send(400, b"no image field", "text/plain")
+        subfolder = fields.get("subfolder", "")
+        overwrite = fields.get("overwrite", "").lower() == "true"
+        stored = self.mock.store_input(image[0], image[1], subfolder, overwrite)
+        self._json({"name": stored, "subfolder": subfolder, "type": "input"})
+
+    # -- websocket --------------------------------------------------------------
+
+    def _websocket(self, client_id: str):
+        key = self.headers.get("Sec-WebSocket-Key", "")
+        accept = base64.b64encode(hashlib.sha1((key + _WS_GUID).encode()).digest()).decode()
+        self.send_response(101, "Switching Protocols")
+        self.send_header("Upgrade", "websocket")
+        self.send_header("Connection", "Upgrade")
+        self.send_header("Sec-WebSocket-Accept", accept)
+        self.end_headers()
+        self.wfile.flush()
+        peer = _WebSocketPeer(self.connection, client_id)
+        self.mock.add_peer(peer)
+        try:
+            while True:
+                opcode, payload = self._read_frame()
+                if opcode == OP_CLOSE:
+                    break
+                if opcode == OP_PING:
+                    with peer.lock:
+                        self.connection.sendall(struct.pack(">BB", 0x80 | OP_PONG, len(payload))
+                                                + payload)
+                elif opcode not in (OP_TEXT, OP_BINARY, OP_PONG):
+                    break
+        except (OSError, ValueError, struct.error):
+            pass
+        finally:
+            self.mock.drop_peer(peer)
+            self.close_connection = True
+
+    def _read_frame(self) -> tuple[int, bytes]:
+        head = self.rfile.read(2)
+        if len(head) < 2:
+            raise ValueError("websocket closed")
+        opcode, n = head[0] & 0x0F, head[1] & 0x7F
+        if n == 126:
+            n = struct.unpack(">H", self.rfile.read(2))[0]
+        elif n == 127:
+            n = struct.unpack(">Q", self.rfile.read(8))[0]
+        mask = self.rfile.read(4) if head[1] & 0x80 else b""
+        data = self.rfile.read(n)
+        if mask:
+            data = bytes(b ^ mask[i % 4] for i, b in enumerate(data))
+        return opcode, data
+
+
+# ---------------------------------------------------------------------------
+# Benchmark
+# ---------------------------------------------------------------------------
+
+def benchmark(clips: int = 24, *, hosts: int = 1, depth: int | None = None,
+              latency: str = "lognormal:2:0.2", fail_rate: float = 0.0,
+              oom_rate: float = 0.0, model_load: float = 0.0, length: int = 97,
+              seed: int | None = 0, use_websocket: bool = True,
+              poll_interval: float = 3.0, mixed: bool = False,
+              reorder: bool = True, interactive: int = 0,
+              priority: bool = True, oom_frames: int | None = None,
+              retries: int | None = None) -> dict:
+    """Run a generate-clips.py-style batch against ``hosts`` mock servers.
+
+    Returns wall time, the servers' busy/idle split and request counts, and
+    the runner's own report, so two versions of the orchestration can be
+    compared on identical synthetic load.  ``mixed`` alternates two LoRA
+    strengths and two clip lengths, like the mixed t2v/i2v scripts do, to
+    exercise model-reload scheduling.  ``interactive`` clips arrive from a
+    second runner once the batch is under way; without ``priority`` they
+    queue like batch work and batch submissions are not held back.
+    ``retries`` overrides ``CLIP_RETRIES`` (0 turns retrying off).
+    """
+    from .client import ComfyClient
+    from .pool import ComfyPool, load_backends
+    from .priority import BATCH, DEFAULT_BATCH_LIMIT, INTERACTIVE
+    from .retry import DEFAULT_RETRY, RetryPolicy
+    from .runner import ClipJob, ClipRunner, DEFAULT_DEPTH
+    from .templates import T2V
+    from .cache import stable_seed
+
+    servers = [MockComfy(latency=latency, fail_rate=fail_rate, oom_rate=oom_rate,
+                         model_load=model_load, oom_frames=oom_frames, name=f"mock{i}",
+                         seed=None if seed is None else seed + i).start()
+               for i in range(hosts)]
+    limit = DEFAULT_BATCH_LIMIT if priority else 0
+    if retries is None:
+        policy = DEFAULT_RETRY
+    else:
+        policy = RetryPolicy(retries=retries, backoff=0.1) if retries > 0 else None
+
+    def connect():
+        if hosts > 1:
+            return ComfyPool(load_backends(",".join(s.url for s in servers)),
+                             cache=None, use_websocket=use_websocket)
+        return ComfyClient(servers[0].url, use_websocket=use_websocket)
+
+    def make_jobs(out: str, name: str, count: int) -> list:
+        jobs = []
+        for i in range(count):
+            prompt = f"{name} clip {i}: a slow dolly shot over a neon city"
+            variant = {"lora_strength": (1.0, 0.6)[i % 2],
+                       "length": (length, length + 64)[i // 2 % 2]} if mixed else {"length": length}
+            jobs.append(ClipJob(f"{name}-{i}.mp4", os.path.join(out, f"{name}-{i}.mp4"),
+                                T2V.build(prompt=prompt, seed=stable_seed(prompt),
+                                          prefix="bench_clip", **variant)))
+        return jobs
+
+    def run(client, jobs: list, priority_class: str):
+        return ClipRunner(client, depth=DEFAULT_DEPTH if depth is None else depth,
+                          poll_interval=poll_interval, on_result=lambda r: None,
+                          reorder=reorder, priority=priority_class,
+                          batch_limit=limit, retry=policy,
+                          on_retry=lambda r, retry: None).run(jobs)
+
+    try:
+        client = connect()
+        with tempfile.TemporaryDirectory(prefix="comfy-bench-") as out:
+            late: list = []
+            if interactive:
+                # The interactive request arrives once the batch has the GPU.
+                def arrive():
+                    while sum(s.completed for s in servers) < 1:
+                        time.sleep(0.01)
+                    with connect() as other:
+                        late.append(run(other, make_jobs(out, "interactive", interactive),
+                                        INTERACTIVE if priority else BATCH))
+                arrival = threading.Thread(target=arrive, daemon=True)
+                arrival.start()
+            report = run(client, make_jobs(out, "benchmark", clips), BATCH)
+            if interactive:
+                arrival.join()
+        client.close()
+    finally:
+        for s in servers:
+            s.stop()
+
+    waits = report.queue_waits()
+    for extra in late:
+        # Keyed by the arrival, not by the class it was submitted as.
+        waits["interactive"] = next(iter(extra.queue_waits().values()))
+    busy = sum(s.busy_seconds() for s in servers)
+    requests: collections.Counter = collections.Counter()
+    for s in servers:
+        requests.update(s.requests)
+    return {
+        "clips": clips + interactive,
+        "hosts": hosts,
+        "ok": len(report.ok) + sum(len(extra.ok) for extra in late),
+        "failed": len(report.failed) + sum(len(extra.failed) for extra in late),
+        "retries": sum(len(r.retries) for r in report.results),
+        "wall": report.wall,
+        "gpu_busy": busy,
+        "gpu_idle_fraction": max(0.0, 1 - busy / (report.wall * hosts)) if report.wall else 0.0,
+        "runner_duty_cycle": report.duty_cycle,
+        "model_loads": sum(s.model_loads for s in servers),
+        "planned_loads_avoided": report.plan.loads_avoided if report.plan else 0,
+        "queue_wait": waits,
+        "requests": dict(sorted(requests.items())),
+        "total_requests": sum(requests.values()),
+    }
+
+
+def format_benchmark(result: dict) -> str:
+    lines = [
+        f"{result['ok']}/{result['clips']} clips OK on {result['hosts']} mock host(s) "
+        f"in {result['wall']:.2f}s, {result['retries']} retried attempt(s)",
+        f"GPU busy {result['gpu_busy']:.2f}s, idle {result['gpu_idle_fraction']:.1%} "
+        f"(runner duty cycle {result['runner_duty_cycle']:.1%}), "
+        f"{result['model_loads']} model load(s), "
+        f"{result['planned_loads_avoided']} avoided by reordering",
+    ]
+    lines += [f"queue wait, {name}: {w['clips']} clip(s), avg {w['mean']:.2f}s, "
+              f"max {w['max']:.2f}s, held back avg {w['held']:.2f}s"
+              for name, w in result["queue_wait"].items()]
+    lines.append(f"{result['total_requests']} requests:")
+    lines += [f"  {count:6d}  {route}" for route, count in result["requests"].items()]
+    return "\n".join(lines)
@@ -0,0 +1,322 @@
+"""Spread prompts across several ComfyUI hosts.
+
+``ComfyPool`` looks like a ``ComfyClient`` to the scripts (``submit``,
+``wait``, ``download``, ``upload_image`` ...) but owns one client per
+backend.  Each ``submit`` goes to the healthy backend with the shortest
+queue, judged from ``/queue`` and ``/system_stats`` probes plus the prompts
+we have sent it since the last probe; ties go to the host with more free
+VRAM.  The pool remembers which host took each prompt, so ``wait`` and
+``download`` always talk to the machine that actually rendered the clip.
+A host that cannot be reached loses the prompt to the next one; a host
+whose connection failed after the prompt was sent keeps it, since it may
+have queued it already.
+
+Backends come from ``COMFY_BACKENDS``: either a comma-separated URL list or
+the path to a JSON file such as::
+
+    {"backends": [
+        {"url": "http://172.18.64.1:8001", "name": "4090",
+         "output_dir": "/mnt/comfy/output"},
+        {"url": "http://10.0.0.12:8188", "name": "a6000", "weight": 2}
+    ]}
+
+``weight`` scales how much queue a host is allowed before it looks busy;
+``output_dir`` is a local mount of that host's output folder, which lets
+downloads hardlink instead of going over HTTP.
+Without ``COMFY_BACKENDS`` the scripts keep using their own ``COMFY_URL``.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+
+from .cache import CACHED_PREFIX, ClipCache
+from .client import ComfyClient, ComfyConnectionError, ComfyError, find_video, iter_outputs
+
+PROBE_TTL = 2.0          # seconds a probe result is trusted
+RETRY_UNHEALTHY = 30.0   # seconds before a failed host is probed again
+
+
+@dataclass
+class Backend:
+    url: str
+    name: str = ""
+    weight: float = 1.0
+    output_dir: str = ""
+    client: ComfyClient | None = field(default=None, repr=False)
+    prober: ComfyClient | None = field(default=None, repr=False)
+    healthy: bool = True
+    queue_remaining: int = 0
+    vram_free: int = 0
+    sent: int = 0               # prompts submitted since the last probe
+    probed_at: float = 0.0
+    submitted: int = 0          # lifetime counter, for the summary
+
+    @property
+    def load(self) -> float:
+        return (self.queue_remaining + self.sent) / self.weight
+
+
+def load_backends(spec: str | None = None) -> list[Backend]:
+    """Parse ``COMFY_BACKENDS`` (URL list or JSON file path)."""
+    spec = spec if spec is not None else os.environ.get("COMFY_BACKENDS", "")
+    spec = spec.strip()
+    if not spec:
+        return []
+    if os.path.isfile(spec):
+        with open(spec) as f:
+            data = json.load(f)
+        entries = data.get("backends", data) if isinstance(data, dict) else data
+    else:
+        entries = [u for u in spec.split(",") if u.strip()]
+    backends = []
+    for entry in entries:
+        if isinstance(entry, str):
+            entry = {"url": entry}
+        url = entry["url"].strip().rstrip("/")
+        backends.append(Backend(url, entry.get("name") or url.split("://")[-1],
+                                float(entry.get("weight", 1.0)),
+                                entry.get("output_dir", "")))
+    return backends
+
+
+class ComfyPool:
+    """Least-loaded dispatch over several ``ComfyClient`` backends."""
+
+    def __init__(self, backends: list[Backend], *, cache: ClipCache | None = None,
+                 **client_kwargs):
+        if not backends:
+            raise ValueError("ComfyPool needs at least one backend")
+        self.cache = cache
+        self.backends = backends
+        for b in backends:
+            b.client = ComfyClient(b.url, cache=cache, output_dir=b.output_dir,
+                                   **client_kwargs)
+            # Probes use their own short-fused connection so a dead host
+            # cannot stall dispatch for the full request timeout.
+            b.prober = ComfyClient(b.url, max_connections=1, timeout=3.0,
+                                   retries=0, use_websocket=False)
+        self.uploads: dict[str, str] = {}
+        self.sources: dict[str, str] = {}
+        self._owner: dict[str, Backend] = {}
+        self._lock = threading.Lock()
+        self._probed = threading.Event()
+
+    def __repr__(self):
+        return f"ComfyPool({[b.name for b in self.backends]!r})"
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        for b in self.backends:
+            b.client.close()
+            b.prober.close()
+
+    @property
+    def base_url(self) -> str:
+        return ",".join(b.url for b in self.backends)
+
+    # -- load probing -----------------------------------------------------------
+
+    def _probe(self, b: Backend):
+        # The probes run without the pool lock, so a slow or dead host only
+        # delays the thread probing it; the results are swapped in under it.
+        try:
+            q = b.prober.queue()
+            stats = b.prober.system_stats()
+            devices = stats.get("devices") or [{}]
+            state = (len(q.get("queue_running", [])) + len(q.get("queue_pending", [])),
+                     int(devices[0].get("vram_free", 0)))
+        except Exception:
+            # Unreachable, or answering something that is not ComfyUI's
+            # /queue and /system_stats: either way, not a host to send to.
+            state = None
+        with self._lock:
+            b.healthy = state is not None
+            if state is not None:
+                b.queue_remaining, b.vram_free = state
+                b.sent = 0
+            b.probed_at = time.monotonic()
+
+    def refresh(self, force: bool = False):
+        """Re-probe backends whose numbers are stale."""
+        with self._lock:
+            now = time.monotonic()
+            stale = [b for b in self.backends
+                     if force or now - b.probed_at > (PROBE_TTL if b.healthy else RETRY_UNHEALTHY)]
+            # Claim them, so other submitters keep using the current numbers
+            # instead of probing the same host again.
+            for b in stale:
+                b.probed_at = now
+        if not stale:
+            # Before the first probe there are no numbers to go on at all.
+            self._probed.wait()
+            return
+        try:
+            if len(stale) == 1:
+                self._probe(stale[0])
+            else:
+                with ThreadPoolExecutor(len(stale)) as ex:
+                    list(ex.map(self._probe, stale))
+        finally:
+            # Even a failed probe must release the submitters waiting on it.
+            self._probed.set()
+
+    def _pick(self, exclude: set) -> Backend | None:
+        candidates = [b for b in self.backends if b.healthy and b.url not in exclude]
+        if not candidates:
+            return None
+        return min(candidates, key=lambda b: (b.load, -b.vram_free))
+
+    def _reserve(self, exclude: set) -> Backend | None:
+        """Pick a backend and count the prompt against it before it is sent."""
+        with self._lock:
+            b = self._pick(exclude)
+            if b is not None:
+                b.sent += 1
+            return b
+
+    # -- client interface -------------------------------------------------------
+
+    def submit(self, workflow: dict, *, front: bool = False) -> str:
+        """Queue ``workflow`` on the least-loaded healthy backend."""
+        if self.cache is not None:
+            key = self.cache.key(workflow, self.uploads)
+            if self.cache.has(key):
+                return CACHED_PREFIX + key
+        tried: set = set()
+        while True:
+            self.refresh()
+            b = self._reserve(tried)
+            if b is None and not tried:
+                # Everything looked down; give them one more chance.
+                self.refresh(force=True)
+                b = self._reserve(tried)
+            if b is None:
+                raise ComfyConnectionError(f"no healthy ComfyUI backend in {self.base_url}")
+            try:
+                prompt_id = b.client.submit(workflow, front=front)
+            except ComfyConnectionError as e:
+                if e.sent:
+                    # The POST went out before the connection failed, so the
+                    # host may have queued it: sending it to another one
+                    # could render the clip twice.  Let the caller decide.
+                    if e.prompt_id:
+                        with self._lock:
+                            self._owner[e.prompt_id] = b
+                    raise
+                with self._lock:
+                    b.healthy = False
+                    b.sent -= 1
+                tried.add(b.url)
+                continue
+            with self._lock:
+                b.submitted += 1
+                self._owner[prompt_id] = b
+            return prompt_id
+
+    def backend_for(self, prompt_id: str) -> ComfyClient:
+        """The client of the host that took ``prompt_id``."""
+        b = self._owner.get(prompt_id)
+        return b.client if b is not None else self.backends[0].client
+
+    @staticmethod
+    def is_cached(prompt_id: str) -> bool:
+        return prompt_id.startswith(CACHED_PREFIX)
+
+    def adopt(self, prompt_id: str, *, host: str | None = None, key: str | None = None,
+              workflow: dict | None = None) -> ComfyClient | None:
+        """Re-own a prompt from an earlier run; None if ``host`` is not in the pool."""
+        for b in self.backends:
+            if host is None or b.url == host.rstrip("/"):
+                client = b.client.adopt(prompt_id, key=key, workflow=workflow)
+                with self._lock:
+                    self._owner[prompt_id] = b
+                return client
+        return None
+
+    def prompt_state(self, prompt_id: str) -> str | None:
+        return self.backend_for(prompt_id).prompt_state(prompt_id)
+
+    def wait(self, prompt_id: str, timeout: float = 300,
+             poll_interval: float = 3.0) -> dict:
+        """Wait on the owning host; output items are tagged with its URL."""
+        client = self.backend_for(prompt_id)
+        entry = client.wait(prompt_id, timeout=timeout, poll_interval=poll_interval)
+        for item in iter_outputs(entry):
+            item.setdefault("host", client.base_url)
+        return entry
+
+    def history(self, prompt_id: str) -> dict | None:
+        return self.backend_for(prompt_id).history(prompt_id)
+
+    def progress(self, prompt_id: str):
+        return self.backend_for(prompt_id).progress(prompt_id)
+
+    def _client_for_item(self, item: dict) -> ComfyClient:
+        for b in self.backends:
+            if b.url == item.get("host"):
+                return b.client
+        return self.backends[0].client
+
+    def view(self, item: dict, *, stream: bool = True, headers: dict | None = None):
+        return self._client_for_item(item).view(item, stream=stream, headers=headers)
+
+    def download(self, item: dict, dest: str) -> int:
+        """Fetch an output from the host that produced it."""
+        return self._client_for_item(item).download(item, dest)
+
+    def upload_image(self, path: str, *, name: str | None = None,
+                     overwrite: bool = True) -> str:
+        """Upload to every healthy backend so any of them can take the job."""
+        self.refresh()
+        targets = [b for b in self.backends if b.healthy] or self.backends
+        with ThreadPoolExecutor(len(targets)) as ex:
+            names = list(ex.map(
+                lambda b: b.client.upload_image(path, name=name, overwrite=overwrite),
+                targets))
+        for b in targets:
+            self.uploads.update(b.client.uploads)
+            self.sources.update(b.client.sources)
+        return names[0]
+
+    def run(self, workflow: dict, dest: str, *, timeout: float = 300,
+            poll_interval: float = 3.0) -> dict:
+        """Same contract as ``ComfyClient.run``."""
+        prompt_id = self.submit(workflow)
+        entry = self.wait(prompt_id, timeout=timeout, poll_interval=poll_interval)
+        item = find_video(entry)
+        if item is None:
+            raise ComfyError(f"prompt {prompt_id} produced no video output")
+        self.download(item, dest)
+        return entry
+
+    def queue(self) -> dict:
+        """Merged ``/queue`` of all healthy backends."""
+        merged = {"queue_running": [], "queue_pending": []}
+        for b in self.backends:
+            try:
+                q = b.client.queue()
+            except ComfyError:
+                continue
+            merged["queue_running"] += q.get("queue_running", [])
+            merged["queue_pending"] += q.get("queue_pending", [])
+        return merged
+
+    def system_stats(self) -> dict:
+        return self.backends[0].client.system_stats()
+
+    def object_info(self) -> dict:
+        return self.backends[0].client.object_info()
+
+    def summary(self) -> str:
+        return ", ".join(f"{b.name}: {b.submitted}" for b in self.backends)
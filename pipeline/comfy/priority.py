@@ -0,0 +1,88 @@
+"""Interactive and batch priority classes on a shared ComfyUI queue.
+
+ComfyUI runs one FIFO per host, so a ``/video`` request from Telegram used
+to sit behind whatever a backfill or calendar run had already queued.  Two
+classes fix that:
+
+* ``interactive`` prompts are submitted with ``front: true`` and jump every
+  pending prompt; they only wait for the one that is running.
+* ``batch`` prompts are held back on our side while the server queue
+  (everyone's prompts, running + pending) is ``COMFY_BATCH_LIMIT`` deep or
+  more, so a late interactive prompt never has much to overtake and batch
+  work stays cancellable until it is really about to run.
+
+The class comes from ``COMFY_PRIORITY`` (default ``batch``); the Telegram
+bot sets it to ``interactive`` for ``/video`` jobs.  ``ClipRunner`` records
+how long each clip was held back and how long it then queued on ComfyUI,
+and reports both per class.
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from .client import ComfyError
+
+INTERACTIVE, BATCH = "interactive", "batch"
+PRIORITIES = (INTERACTIVE, BATCH)
+
+DEFAULT_BATCH_LIMIT = int(os.environ.get("COMFY_BATCH_LIMIT", "2"))
+
+
+def default_priority() -> str:
+    """The priority class from ``COMFY_PRIORITY``."""
+    value = os.environ.get("COMFY_PRIORITY", "").strip().lower() or BATCH
+    if value not in PRIORITIES:
+        raise ValueError(f"COMFY_PRIORITY must be one of {PRIORITIES}, not {value!r}")
+    return value
+
+
+def queue_depth(client) -> int | None:
+    """Prompts running or pending on ``client``'s server(s); None if unreachable."""
+    try:
+        q = client.queue()
+    except (ComfyError, ValueError):
+        return None
+    return len(q.get("queue_running", [])) + len(q.get("queue_pending", []))
+
+
+class BatchGate:
+    """Admit batch submissions only while the server queue is shallow.
+
+    ``limit`` is per host; a ``ComfyPool`` gets ``limit`` times its number of
+    backends.  A limit of 0 disables the gate.  Admission and the submit it
+    guards are serialized, so concurrent waiters cannot all slip in on the
+    same probe.  The queue is re-probed every ``poll_interval`` seconds, or
+    as soon as ``notify`` reports that one of our prompts finished.
+    """
+
+    def __init__(self, client, limit: int = DEFAULT_BATCH_LIMIT,
+                 poll_interval: float = 1.0):
+        self.client = client
+        hosts = len(getattr(client, "backends", ())) or 1
+        self.limit = max(0, limit) * hosts
+        self.poll_interval = poll_interval
+        self._lock = threading.Lock()
+        self._changed = threading.Condition()
+
+    @contextmanager
+    def admit(self):
+        """Block until there is room; yields the seconds spent waiting."""
+        start = time.monotonic()
+        with self._lock:
+            while self.limit:
+                depth = queue_depth(self.client)
+                # An unreachable server is the submit's problem, not ours.
+                if depth is None or depth < self.limit:
+                    break
+                with self._changed:
+                    self._changed.wait(self.poll_interval)
+            yield time.monotonic() - start
+
+    def notify(self):
+        """A prompt left the queue: re-probe now rather than at the next poll."""
+        with self._changed:
+            self._changed.notify_all()
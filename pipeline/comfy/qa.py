@@ -0,0 +1,82 @@
+"""Reject frozen and flickering clips as soon as they are downloaded.
+
+Every script asks LTX for no "static, frozen, no motion ... jittery,
+flickering" output in its negative prompt, but nothing looked at what came
+back: a dead clip was found in the Remotion preview, or by a viewer.
+``ClipRunner`` now passes each downloaded clip through a ``QAGate`` on its
+download workers, so the check overlaps the next clip's rendering instead
+of adding to the run.  The clip is decoded small (``pipeline.frames``) and
+fails when
+
+* it barely moves (``motion`` under ``CLIP_QA_MIN_MOTION``, default 0.5),
+* its frames jitter back and forth (``jitter`` over ``CLIP_QA_MAX_JITTER``,
+  default 1.5; sensor-like noise sits around 1.7, a smooth pan near 0.3),
+* or the brightness pops (``jump`` over ``CLIP_QA_MAX_JUMP``, default 24).
+
+A failed clip raises ``ClipQAError``, which the retry policy answers with a
+new seed.  ``CLIP_QA=off`` disables the gate; it is also off without
+ffmpeg or NumPy.
+"""
+
+from __future__ import annotations
+
+import os
+import subprocess
+from dataclasses import dataclass
+
+from pipeline.frames import HAVE_FFMPEG, HAVE_NUMPY, FrameStats, decode_gray, measure
+
+from .client import ComfyError
+
+
+class ClipQAError(ComfyError):
+    """A downloaded clip failed the frozen / flicker checks."""
+
+    def __init__(self, path: str, problems: list[str], stats: FrameStats | None = None):
+        self.path = path
+        self.problems = problems
+        self.stats = stats
+        super().__init__(f"QA failed for {os.path.basename(path)}: " + "; ".join(problems))
+
+
+@dataclass
+class QAGate:
+    min_motion: float = 0.5
+    max_jitter: float = 1.5
+    max_jump: float = 24.0
+
+    @classmethod
+    def from_env(cls) -> "QAGate | None":
+        if not (HAVE_FFMPEG and HAVE_NUMPY):
+            return None
+        if os.environ.get("CLIP_QA", "").lower() in ("0", "off", "no", "false"):
+            return None
+        return cls(float(os.environ.get("CLIP_QA_MIN_MOTION", cls.min_motion)),
+                   float(os.environ.get("CLIP_QA_MAX_JITTER", cls.max_jitter)),
+                   float(os.environ.get("CLIP_QA_MAX_JUMP", cls.max_jump)))
+
+    def problems(self, stats: FrameStats) -> list[str]:
+        found = []
+        if stats.frames < 3:
+            found.append(f"only {stats.frames} frame(s) decoded")
+        if stats.motion < self.min_motion:
+            found.append(f"frozen (motion {stats.motion:.2f} < {self.min_motion})")
+        elif stats.jitter > self.max_jitter:
+            found.append(f"jittery (jitter {stats.jitter:.2f} > {self.max_jitter})")
+        if stats.jump > self.max_jump:
+            found.append(f"flicker (brightness jump {stats.jump:.1f} > {self.max_jump})")
+        return found
+
+    def check(self, path: str) -> FrameStats:
+        """Measure ``path``; raises ``ClipQAError`` if it fails a threshold."""
+        try:
+            stats = measure(decode_gray(path))
+        except (OSError, subprocess.SubprocessError) as e:
+            raise ClipQAError(path, [f"could not decode: {e}"]) from e
+        problems = self.problems(stats)
+        if problems:
+            raise ClipQAError(path, problems, stats)
+        return stats
+
+
+DEFAULT_QA = QAGate.from_env()
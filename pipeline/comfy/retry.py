@@ -0,0 +1,213 @@
+"""Classify failed prompts and decide how to retry them.
+
+Every script used to handle failures its own way: print ``ERROR`` and move
+on, ask the operator to rerun a clip by hand, or die on the first dropped
+connection.  ``ClipRunner`` now asks a ``RetryPolicy`` what to do with
+each failure, by class:
+
+==============  ===========================================  =============
+class           recognised by                                action
+==============  ===========================================  =============
+``oom``         out-of-memory text in ``status.messages``    reduce length
+``execution``   any other node exception                     new seed
+``network``     connection errors, HTTP 5xx / 429            backoff
+``timeout``     ``ComfyTimeout`` (the prompt is still live)  wait again
+``qa``          ``ClipQAError``: frozen or flickering clip   new seed
+``validation``  graph rejected by ``/prompt``, other 4xx     fail fast
+``fatal``       interrupted prompts, anything else           fail fast
+==============  ===========================================  =============
+
+Reduced clips are re-rendered at 3/4 of the length (still ``8k+1``) after
+waiting for the GPU to report free VRAM again.  A network failure is only
+resubmitted once the host confirms it does not have the prompt: a
+``/prompt`` POST that timed out after it was sent, or a connection lost
+while waiting, may have left the job queued, and ``ClipRunner`` then waits
+on that prompt instead of rendering the clip twice.  ``CLIP_RETRIES`` sets how
+many retries a clip gets (default 2, ``0`` disables retrying).
+"""
+
+from __future__ import annotations
+
+import copy
+import os
+import time
+from dataclasses import dataclass, field
+
+from pipeline.plan import MIN_FRAMES, ltx_length
+
+from .cache import stable_seed
+from .client import (
+    ComfyConnectionError,
+    ComfyError,
+    ComfyExecutionError,
+    ComfyHTTPError,
+    ComfyTimeout,
+)
+from .qa import ClipQAError
+
+OOM, EXECUTION, NETWORK, TIMEOUT, QA, VALIDATION, FATAL = (
+    "oom", "execution", "network", "timeout", "qa", "validation", "fatal")
+BACKOFF, RESEED, REDUCE, WAIT, FAIL = "backoff", "reseed", "reduce", "wait", "fail"
+
+DEFAULT_ACTIONS = {
+    OOM: REDUCE,
+    EXECUTION: RESEED,
+    NETWORK: BACKOFF,
+    TIMEOUT: WAIT,
+    QA: RESEED,
+    VALIDATION: FAIL,
+    FATAL: FAIL,
+}
+
+_OOM_MARKERS = ("out of memory", "outofmemory", "allocation on device",
+                "cuda error: out of memory", "not enough memory")
+_SEED_INPUTS = ("noise_seed", "seed")
+
+
+def _execution_error(messages: list) -> dict:
+    for kind, payload in reversed(messages or []):
+        if kind in ("execution_error", "execution_interrupted") and isinstance(payload, dict):
+            return {"kind": kind, **payload}
+    return {}
+
+
+def classify(error: BaseException) -> str:
+    """Failure class of an exception raised while rendering a clip."""
+    if isinstance(error, ComfyExecutionError):
+        detail = _execution_error(error.messages)
+        if detail.get("kind") == "execution_interrupted":
+            return FATAL
+        text = f"{detail.get('exception_type', '')} {detail.get('exception_message', '')}"
+        if any(marker in text.lower() for marker in _OOM_MARKERS):
+            return OOM
+        return EXECUTION
+    if isinstance(error, ComfyTimeout):
+        return TIMEOUT
+    if isinstance(error, ClipQAError):
+        return QA
+    if isinstance(error, ComfyConnectionError):
+        return NETWORK
+    if isinstance(error, ComfyHTTPError):
+        if error.status >= 500 or error.status == 429:
+            return NETWORK
+        if 400 <= error.status < 500:
+            return VALIDATION
+    return FATAL
+
+
+# ---------------------------------------------------------------------------
+# Workflow edits
+# ---------------------------------------------------------------------------
+
+def reseed(workflow: dict, attempt: int) -> dict:
+    """Copy of ``workflow`` with every sampler seed re-rolled for ``attempt``."""
+    graph = copy.deepcopy(workflow)
+    for node in graph.values():
+        inputs = node.get("inputs", {})
+        for name in _SEED_INPUTS:
+            if isinstance(inputs.get(name), int):
+                inputs[name] = stable_seed(inputs[name], "retry", attempt)
+    return graph
+
+
+def reduce_length(workflow: dict, factor: float = 0.75,
+                  min_length: int = MIN_FRAMES) -> dict | None:
+    """Copy with shorter latent videos; None if they are already minimal."""
+    graph = copy.deepcopy(workflow)
+    changed = False
+    for node in graph.values():
+        inputs = node.get("inputs", {})
+        length = inputs.get("length")
+        if isinstance(length, int) and length > min_length:
+            inputs["length"] = max(ltx_length(min_length), ltx_length(int(length * factor)))
+            changed = changed or inputs["length"] < length
+    return graph if changed else None
+
+
+def _lengths(workflow: dict) -> list[int]:
+    return [n["inputs"]["length"] for n in workflow.values()
+            if isinstance(n.get("inputs", {}).get("length"), int)]
+
+
+# ---------------------------------------------------------------------------
+# Policy
+# ---------------------------------------------------------------------------
+
+@dataclass
+class Retry:
+    """One planned retry: what failed, what to change and how long to wait."""
+
+    kind: str
+    action: str
+    delay: float
+    workflow: dict = field(repr=False)
+
+    def describe(self, before: dict | None = None) -> str:
+        text = f"{self.kind}: {self.action}"
+        if self.action == REDUCE and before is not None:
+            old, new = _lengths(before), _lengths(self.workflow)
+            if old and new:
+                text += f" {old[0]}->{new[0]} frames"
+        if self.delay:
+            text += f" after {self.delay:.1f}s"
+        return text
+
+
+@dataclass
+class RetryPolicy:
+    retries: int = 2                  # extra attempts per clip
+    backoff: float = 5.0              # first delay; doubles per attempt
+    max_backoff: float = 120.0
+    length_factor: float = 0.75
+    min_length: int = MIN_FRAMES
+    vram_free: float = 0.5            # share of VRAM that must be free after an OOM
+    actions: dict = field(default_factory=lambda: dict(DEFAULT_ACTIONS))
+
+    @classmethod
+    def from_env(cls) -> "RetryPolicy | None":
+        retries = int(os.environ.get("CLIP_RETRIES", "2"))
+        return cls(retries=retries) if retries > 0 else None
+
+    def delay(self, attempt: int) -> float:
+        return min(self.max_backoff, self.backoff * 2 ** (attempt - 1))
+
+    def plan(self, error: BaseException, attempt: int, workflow: dict) -> Retry | None:
+        """The retry after failed ``attempt`` (1-based), or None to give up."""
+        if attempt > self.retries:
+            return None
+        kind = classify(error)
+        action = self.actions.get(kind, FAIL)
+        if action == FAIL:
+            return None
+        if action == REDUCE:
+            reduced = reduce_length(workflow, self.length_factor, self.min_length)
+            if reduced is None:
+                return Retry(kind, BACKOFF, self.delay(attempt), workflow)
+            return Retry(kind, REDUCE, self.delay(attempt), reduced)
+        if action == RESEED:
+            return Retry(kind, RESEED, 0.0, reseed(workflow, attempt))
+        if action == WAIT:
+            return Retry(kind, WAIT, 0.0, workflow)
+        return Retry(kind, action, self.delay(attempt), workflow)
+
+    def pause(self, client, retry: Retry):
+        """Sleep out ``retry.delay``; after an OOM, end early once VRAM is free."""
+        deadline = time.monotonic() + retry.delay
+        while True:
+            left = deadline - time.monotonic()
+            if left <= 0:
+                return
+            if retry.kind == OOM and self._vram_ok(client):
+                return
+            time.sleep(min(1.0, left))
+
+    def _vram_ok(self, client) -> bool:
+        try:
+            devices = client.system_stats().get("devices") or [{}]
+        except (ComfyError, ValueError):
+            return False
+        total = devices[0].get("vram_total") or 0
+        return bool(total) and devices[0].get("vram_free", 0) >= self.vram_free * total
+
+
+DEFAULT_RETRY = RetryPolicy.from_env()
@@ -0,0 +1,667 @@
+"""Pipelined clip runner: keep the GPU queue full, download as clips finish.
+
+The original scripts ran ``submit -> poll -> download`` one clip at a time,
+so the GPU sat idle through every download, every ffprobe and every submit
+round trip.  ``ClipRunner`` keeps ``depth`` prompts queued on ComfyUI at all
+times, tops the queue back up the moment any prompt finishes, and hands
+finished clips to a small download pool that fetches and verifies them in
+completion order while the next clip is already rendering.
+
+At the end it reports the GPU duty cycle: the union of the intervals during
+which ComfyUI was executing one of our prompts, divided by wall time.
+
+Before submitting, the batch is reordered so prompts that load the same
+models run back to back (see ``pipeline.comfy.schedule``).
+
+Jobs carry a priority class (see ``pipeline.comfy.priority``): interactive
+clips go to the front of the ComfyUI queue, batch clips wait until the
+server queue is shallow.
+
+Failed clips are retried according to a ``RetryPolicy`` (see
+``pipeline.comfy.retry``): a new seed after a node error, a shorter clip
+after an out-of-memory error, a backoff after a network fault.
+
+With a ``journal`` every submission is logged, and a rerun after a crash
+waits on prompts that are still queued or already finished on ComfyUI
+instead of rendering them again.  With ``telemetry`` every finished clip
+leaves a timing record (see ``pipeline.comfy.telemetry``).
+
+In draft mode (``CLIP_DRAFT=1``, see ``pipeline.comfy.draft``) clips are
+rendered small and short into ``drafts/`` for review, to be promoted later.
+Jobs with ``variants`` render several seeds in one batched prompt and keep
+the best-scoring one (see ``pipeline.comfy.variants``).  Downloaded clips
+go through a frozen / flicker ``QAGate`` and are re-rendered with a new
+seed when they fail it (see ``pipeline.comfy.qa``).
+
+A clip whose destination already holds a finished output is not rendered
+again when the clip cache cannot vouch for it: with ``CLIP_CACHE=off``, or
+for outputs written before the cache knew them (the first run after
+upgrading).  Outputs the cache did write go through it, so a changed
+prompt still re-renders.  ``CLIP_SKIP_EXISTING=off`` renders everything.
+"""
+
+from __future__ import annotations
+
+import os
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field, replace
+from typing import Callable
+
+from pipeline.frames import HAVE_FFMPEG, HAVE_NUMPY, FrameStats
+from pipeline.media import HAVE_FFPROBE, probe_duration
+
+from .cache import CACHED_PREFIX, workflow_key
+from .client import (
+    ComfyClient,
+    ComfyConnectionError,
+    ComfyError,
+    ComfyExecutionError,
+    ComfyHTTPError,
+    describe_messages,
+    execution_window,
+    find_video,
+    get_client,
+)
+from .draft import DEFAULT_DRAFT, DraftMode
+from .journal import DOWNLOADED, FAILED, FINISHED, SUBMITTED, ClipJournal
+from .retry import DEFAULT_RETRY, NETWORK, WAIT, Retry, RetryPolicy
+from .priority import DEFAULT_BATCH_LIMIT, INTERACTIVE, PRIORITIES, BatchGate, default_priority
+from .qa import DEFAULT_QA, ClipQAError, QAGate
+from .schedule import SchedulePlan, loaded_signature, plan_order
+from .telemetry import ClipTelemetry
+from .variants import DEFAULT_VARIANTS, VariantPick, batch_size, pick_variant, with_batch
+
+DEFAULT_DEPTH = int(os.environ.get("COMFY_QUEUE_DEPTH", "2"))
+DEFAULT_SKIP_EXISTING = os.environ.get("CLIP_SKIP_EXISTING", "").lower() not in (
+    "0", "off", "no", "false")
+MIN_CLIP_BYTES = 10_000
+
+
+@dataclass
+class ClipJob:
+    """One clip to render.
+
+    ``workflow`` may be a dict or a zero-argument callable that builds it;
+    callables run just before submission, so per-clip uploads and seeds
+    happen only for clips that are actually rendered.  ``priority`` is
+    ``"interactive"`` or ``"batch"``; None uses the runner's class.
+    ``variants`` is how many seeds to render in one batch and pick from;
+    None uses the runner's setting.
+    """
+
+    name: str
+    dest: str
+    workflow: dict | Callable[[], dict]
+    timeout: float = 300
+    priority: str | None = None
+    variants: int | None = None
+    meta: dict = field(default_factory=dict)
+
+
+@dataclass
+class ClipResult:
+    job: ClipJob
+    ok: bool = False
+    prompt_id: str | None = None
+    error: str | None = None
+    size: int = 0
+    duration: float | None = None     # seconds of video, from ffprobe
+    submitted_at: float = 0.0         # local wall clock
+    finished_at: float = 0.0
+    busy: tuple[float, float] | None = None  # GPU execution window
+    busy_estimated: bool = False      # no server timestamps; window is a guess
+    host: str = ""                    # ComfyUI backend that rendered it
+    cached: bool = False              # served from the clip cache
+    reattached: bool = False          # prompt left queued by an earlier run
+    skipped: bool = False             # output already there; not rendered
+    key: str | None = None            # workflow hash, when journaling
+    priority: str = ""
+    held: float = 0.0                 # seconds held back before submitting
+    submit_latency: float | None = None   # POST /prompt round trip
+    download_seconds: float | None = None
+    attempts: int = 1
+    retries: list[str] = field(default_factory=list)   # why each retry happened
+    variants: int = 1                 # seeds rendered in the batch
+    variant: VariantPick | None = None
+    qa: FrameStats | None = None      # measured by the QA gate
+
+    @property
+    def queue_wait(self) -> float | None:
+        """Seconds between submission and the GPU starting on the prompt."""
+        if self.busy is None or self.cached or self.reattached:
+            return None
+        return max(0.0, self.busy[0] - self.submitted_at)
+
+
+@dataclass
+class RunReport:
+    results: list[ClipResult]
+    wall: float
+    busy: float                       # GPU-seconds, summed over hosts
+    gpus: int = 1
+    plan: SchedulePlan | None = None
+
+    @property
+    def ok(self) -> list[ClipResult]:
+        return [r for r in self.results if r.ok]
+
+    @property
+    def failed(self) -> list[ClipResult]:
+        return [r for r in self.results if not r.ok]
+
+    @property
+    def duty_cycle(self) -> float:
+        return self.busy / (self.wall * self.gpus) if self.wall > 0 else 0.0
+
+    def queue_waits(self) -> dict[str, dict]:
+        """Per priority class: clips, mean/max queue wait and mean hold-back."""
+        waits = {}
+        for priority in PRIORITIES:
+            results = [r for r in self.results if r.priority == priority and not r.skipped]
+            queued = [r.queue_wait for r in results if r.queue_wait is not None]
+            if not results:
+                continue
+            waits[priority] = {
+                "clips": len(results),
+                "mean": sum(queued) / len(queued) if queued else 0.0,
+                "max": max(queued, default=0.0),
+                "held": sum(r.held for r in results) / len(results),
+            }
+        return waits
+
+    def summary(self) -> str:
+        cached = sum(1 for r in self.results if r.ok and r.cached)
+        skipped = sum(1 for r in self.results if r.skipped)
+        reattached = sum(1 for r in self.results if r.reattached)
+        retried = sum(1 for r in self.results if r.ok and r.retries)
+        resumed = f", {skipped} already there" if skipped else ""
+        resumed += f", {reattached} reattached" if reattached else ""
+        resumed += f", {retried} after retries" if retried else ""
+        text = (f"{len(self.ok)}/{len(self.results)} clips OK "
+                f"({cached} from cache{resumed}) in {self.wall:.0f}s, "
+                f"GPU busy {self.busy:.0f}s on {self.gpus} host(s) "
+                f"({self.duty_cycle:.0%} duty cycle)")
+        if self.plan is not None:
+            text += f"\n{self.plan.summary()}"
+        waits = [f"{name} {w['clips']} clip(s) avg {w['mean']:.1f}s, max {w['max']:.1f}s"
+                 + (f", held back avg {w['held']:.1f}s" if w["held"] >= 0.05 else "")
+                 for name, w in self.queue_waits().items()]
+        if waits:
+            text += "\nqueue wait: " + "; ".join(waits)
+        return text
+
+
+def _batch_path(dest: str) -> str:
+    """Where the whole batch of a variant job is downloaded before picking."""
+    return f"{dest}.batch{os.path.splitext(dest)[1]}"
+
+
+def _union_length(intervals: list[tuple[float, float]]) -> float:
+    total, end = 0.0, None
+    for a, b in sorted(intervals):
+        if end is None or a > end:
+            total += b - a
+            end = b
+        elif b > end:
+            total += b - end
+            end = b
+    return total
+
+
+class ClipRunner:
+    """Render many clips through one ComfyUI host with a saturated queue.
+
+    ``depth`` is how many of our prompts may sit on each ComfyUI queue at
+    once (running + pending); with a ``ComfyPool`` the total in flight is
+    ``depth`` times the number of backends.  Two is enough to hide the
+    submit/download gap; more only helps when prompts are very short.  ``on_result`` is called
+    from the runner thread for every finished clip, in completion order.
+    ``journal`` (see ``ClipJournal``) makes the run resumable after a crash.
+    With ``reorder`` (the default) jobs are submitted grouped by the models
+    they load rather than in list order; callable workflows are then built
+    up front.  ``priority`` is the class of jobs that do not name one
+    (``COMFY_PRIORITY`` by default); interactive jobs are submitted first,
+    and batch jobs only while the server queue is under ``batch_limit``.
+    ``retry`` decides which failures are retried and how (``CLIP_RETRIES``
+    by default; None never retries).  ``telemetry`` receives a timing record
+    for every finished clip.  With ``draft`` (``CLIP_DRAFT`` by default)
+    every job is rendered at draft quality next to its real destination.
+    ``variants`` applies to jobs that do not set their own (``CLIP_VARIANTS``
+    by default; batching needs ffmpeg to split and score the result).
+    ``qa`` checks every downloaded clip on the download workers (None skips
+    it); failures are retried like any other error.  With ``skip_existing``
+    (``CLIP_SKIP_EXISTING`` by default) a finished output the clip cache
+    did not write is kept instead of rendered again.
+    """
+
+    def __init__(self, client: ComfyClient | None = None, *,
+                 depth: int = DEFAULT_DEPTH, download_workers: int = 2,
+                 verify: bool = True, poll_interval: float = 3.0,
+                 on_result: Callable[[ClipResult], None] | None = None,
+                 journal: ClipJournal | None = None, reorder: bool = True,
+                 priority: str | None = None, batch_limit: int = DEFAULT_BATCH_LIMIT,
+                 retry: RetryPolicy | None = DEFAULT_RETRY,
+                 on_retry: Callable[[ClipResult, Retry], None] | None = None,
+                 telemetry: ClipTelemetry | None = None,
+                 draft: DraftMode | None = DEFAULT_DRAFT,
+                 variants: int = DEFAULT_VARIANTS,
+                 qa: QAGate | None = DEFAULT_QA,
+                 skip_existing: bool = DEFAULT_SKIP_EXISTING):
+        self.client = client or get_client()
+        self.hosts = len(getattr(self.client, "backends", ())) or 1
+        self.depth = max(1, depth) * self.hosts
+        self.download_workers = max(1, download_workers)
+        self.verify = verify
+        self.poll_interval = poll_interval
+        self.on_result = on_result or print_result
+        self.journal = journal
+        self.reorder = reorder
+        self.priority = priority or default_priority()
+        if self.priority not in PRIORITIES:
+            raise ValueError(f"priority must be one of {PRIORITIES}, not {self.priority!r}")
+        self.gate = BatchGate(self.client, batch_limit, min(1.0, poll_interval))
+        self.retry = retry
+        self.on_retry = on_retry or print_retry
+        self.telemetry = telemetry
+        self.draft = draft
+        self.variants = max(1, variants)
+        self.qa = qa
+        self.skip_existing = skip_existing
+        self._lock = threading.Lock()
+        self._last_finish: dict[str, float] = {}
+
+    # -- stages -----------------------------------------------------------------
+
+    def _render(self, job: ClipJob, result: ClipResult, retry: Retry | None = None) -> dict:
+        if retry is not None:
+            result.error = None
+            if retry.delay:
+                owner = self.client.backend_for(result.prompt_id) if result.prompt_id else self.client
+                self.retry.pause(owner, retry)
+            if retry.action == WAIT:
+                return self._wait(job, result)
+            if retry.kind == NETWORK and result.prompt_id and self._landed(job, result):
+                # The connection failed after ComfyUI took the prompt: wait
+                # on it rather than queue the same clip a second time.
+                return self._wait(job, result)
+            result.prompt_id, result.reattached, result.busy = None, False, None
+            result.busy_estimated, result.submitted_at = False, 0.0
+            result.submit_latency = None
+        workflow = job.workflow() if callable(job.workflow) else job.workflow
+        variants = job.variants or self.variants
+        if variants > 1 and HAVE_FFMPEG and HAVE_NUMPY and batch_size(workflow) == 1:
+            workflow = with_batch(workflow, variants) or workflow
+        job.workflow = workflow
+        result.variants = batch_size(workflow)
+        if self.journal is not None:
+            result.key = workflow_key(workflow, self.client.uploads)
+            result.prompt_id = self._reattach(result.key, workflow)
+            result.reattached = result.prompt_id is not None
+        if result.prompt_id is None:
+            result.prompt_id = self._submit(workflow, result)
+        result.submitted_at = time.time()
+        result.host = self.client.backend_for(result.prompt_id).base_url
+        result.cached = self.client.is_cached(result.prompt_id)
+        if self.journal is not None and not (result.cached or result.reattached):
+            self.journal.record(result.key, SUBMITTED, clip=job.name, dest=job.dest,
+                                prompt_id=result.prompt_id, host=result.host)
+        return self._wait(job, result)
+
+    def _wait(self, job: ClipJob, result: ClipResult) -> dict:
+        # The prompt may sit behind up to depth-1 of ours before it starts.
+        try:
+            entry = self.client.wait(result.prompt_id,
+                                     timeout=job.timeout * result.variants
+                                     * self.depth // self.hosts,
+                                     poll_interval=self.poll_interval)
+        finally:
+            self.gate.notify()
+        result.finished_at = time.time()
+        if not result.cached:
+            result.busy = self._busy_window(result, entry)
+            self._journal(result, FINISHED)
+        return entry
+
+    def _submit(self, workflow: dict, result: ClipResult) -> str:
+        if result.priority == INTERACTIVE:
+            return self._timed_submit(workflow, result, front=True)
+        with self.gate.admit() as held:
+            result.held = held
+            return self._timed_submit(workflow, result)
+
+    def _timed_submit(self, workflow: dict, result: ClipResult, **kwargs) -> str:
+        start = time.monotonic()
+        prompt_id = self.client.submit(workflow, **kwargs)
+        result.submit_latency = time.monotonic() - start
+        return prompt_id
+
+    def _landed(self, job: ClipJob, result: ClipResult) -> bool:
+        """Whether ``result.prompt_id`` is on ComfyUI despite the failed call.
+
+        Errors asking the host propagate: while it cannot tell, the clip is
+        neither waited on nor sent again.
+        """
+        owner = self.client.backend_for(result.prompt_id)
+        if owner.prompt_state(result.prompt_id) not in ("success", "running", "pending"):
+            return False
+        if not result.submitted_at:
+            # The submit itself failed after sending; record it now.
+            result.submitted_at = time.time()
+            result.host = owner.base_url
+            if self.journal is not None:
+                self.journal.record(result.key, SUBMITTED, clip=job.name, dest=job.dest,
+                                    prompt_id=result.prompt_id, host=result.host)
+        return True
+
+    def _reattach(self, key: str, workflow: dict) -> str | None:
+        """Prompt id of a live submission of ``workflow`` from an earlier run."""
+        record = self.journal.pending(key)
+        if record is None or not record.get("prompt_id"):
+            return None
+        cache = getattr(self.client, "cache", None)
+        if cache is not None and cache.has(key):
+            return None     # submit() answers it from the cache
+        prompt_id = record["prompt_id"]
+        owner = self.client.adopt(prompt_id, host=record.get("host"), key=key,
+                                  workflow=workflow)
+        if owner is None:
+            return None
+        try:
+            state = owner.prompt_state(prompt_id)
+        except (ComfyError, ValueError):
+            state = None
+        # A failed or forgotten prompt (e.g. ComfyUI restarted) is rendered again.
+        return prompt_id if state in ("success", "running", "pending") else None
+
+    def _journal(self, result: ClipResult, state: str, **fields):
+        if self.journal is not None and result.key is not None and not result.cached:
+            self.journal.record(result.key, state, **fields)
+
+    def _busy_window(self, result: ClipResult, entry: dict) -> tuple[float, float]:
+        state = self.client.progress(result.prompt_id)
+        if state is not None and state.started_at and state.finished_at:
+            return state.started_at, state.finished_at
+        window = execution_window(entry)
+        if window is not None:
+            return window
+        # No server timestamps: assume prompts run back to back, so this one
+        # started when it was submitted or when the previous one finished.
+        result.busy_estimated = True
+        with self._lock:
+            start = max(result.submitted_at, self._last_finish.get(result.host, 0.0))
+            self._last_finish[result.host] = result.finished_at
+        return start, result.finished_at
+
+    def _fetch(self, job: ClipJob, result: ClipResult, entry: dict) -> ClipResult:
+        item = find_video(entry)
+        if item is None:
+            result.error = "no video in outputs"
+            return result
+        os.makedirs(os.path.dirname(job.dest) or ".", exist_ok=True)
+        start = time.monotonic()
+        if result.variants > 1:
+            result.error = self._pick_variant(job, result, item, start)
+        else:
+            result.size = self.client.download(item, job.dest)
+            result.download_seconds = time.monotonic() - start
+        if self.verify and result.error is None:
+            result.error = self._check(job.dest, result)
+        if self.qa is not None and result.error is None:
+            result.qa = self.qa.check(job.dest)
+        result.ok = result.error is None
+        return result
+
+    def _pick_variant(self, job: ClipJob, result: ClipResult, item: dict,
+                      start: float) -> str | None:
+        batch = _batch_path(job.dest)
+        try:
+            self.client.download(item, batch)
+            result.download_seconds = time.monotonic() - start
+            result.variant = pick_variant(batch, result.variants, job.dest)
+            result.size = os.path.getsize(job.dest)
+        except (ValueError, OSError, subprocess.SubprocessError) as e:
+            return f"picking a variant failed: {e}"
+        finally:
+            if os.path.exists(batch):
+                os.unlink(batch)
+        return None
+
+    @staticmethod
+    def _check(path: str, result: ClipResult) -> str | None:
+        if result.size < MIN_CLIP_BYTES:
+            return f"output too small ({result.size} bytes)"
+        if HAVE_FFPROBE:
+            result.duration = probe_duration(path)
+            if not result.duration:
+                return "ffprobe could not read the output"
+        return None
+
+    def _plan_retry(self, result: ClipResult, error: ComfyError) -> Retry | None:
+        if self.retry is None or result.cached and not isinstance(error, ClipQAError):
+            return None
+        job = result.job
+        workflow = job.workflow if not callable(job.workflow) else None
+        retry = self.retry.plan(error, result.attempts, workflow) if workflow else None
+        if retry is None:
+            return None
+        result.retries.append(retry.describe(workflow))
+        result.attempts += 1
+        result.job = replace(job, workflow=retry.workflow)
+        self.on_retry(result, retry)
+        return retry
+
+    def _reject(self, result: ClipResult):
+        """Keep a clip that failed QA from being served from the cache again."""
+        cache = getattr(self.client, "cache", None)
+        if cache is None or not result.prompt_id:
+            return
+        if self.client.is_cached(result.prompt_id):
+            cache.remove(result.prompt_id[len(CACHED_PREFIX):])
+        else:
+            cache.remove(workflow_key(result.job.workflow, self.client.uploads))
+
+    def _fail(self, result: ClipResult, error: Exception):
+        """Record an unexpected exception from one clip as that clip's failure."""
+        result.error = f"{type(error).__name__}: {error}"
+        result.ok = False
+        if result.key is None and self.journal is not None:
+            # Nothing was hashed yet (the workflow did not build); journal by name.
+            result.key = f"clip:{result.job.name}"
+        self._journal(result, FAILED, error=result.error)
+
+    def _existing(self, jobs: list[ClipJob]) -> tuple[list[ClipJob], list[ClipResult]]:
+        """Split off jobs whose output is already there and the cache did not
+        write; those would otherwise go back to the GPU on every rerun."""
+        if not self.skip_existing:
+            return jobs, []
+        cache = getattr(self.client, "cache", None)
+        known = cache.sources() if cache is not None else set()
+        todo, kept = [], []
+        for job in jobs:
+            dest = self.draft.path(job.dest) if self.draft is not None else job.dest
+            try:
+                size = os.path.getsize(dest)
+            except OSError:
+                size = 0
+            target = os.path.abspath(dest)
+            if size < MIN_CLIP_BYTES or target in known or _batch_path(target) in known:
+                todo.append(job)
+                continue
+            result = ClipResult(replace(job, dest=dest), ok=True, skipped=True, size=size,
+                                priority=job.priority or self.priority, attempts=0)
+            if HAVE_FFPROBE:
+                result.duration = probe_duration(dest)
+            kept.append(result)
+        return todo, kept
+
+    def _build(self, jobs: list[ClipJob]) -> tuple[list[ClipJob], list[ClipResult]]:
+        """Build callable workflows (as drafts in draft mode); clips that fail
+        to build come back as failed results instead of aborting the batch."""
+        built, failed = [], []
+        for job in jobs:
+            try:
+                if self.draft is not None:
+                    job = self.draft.job(job, self.client)
+                elif callable(job.workflow):
+                    job.workflow = job.workflow()
+            except Exception as e:
+                result = ClipResult(job, priority=job.priority or self.priority)
+                self._fail(result, e)
+                failed.append(result)
+                continue
+            built.append(job)
+        return built, failed
+
+    def _schedule(self, jobs: list[ClipJob]) -> tuple[list[ClipJob], SchedulePlan]:
+        """Order built jobs so clips sharing loaded models run back to back."""
+        plan = plan_order([job.workflow for job in jobs], loaded_signature(self.client))
+        return [jobs[i] for i in plan.order], plan
+
+    # -- driver -----------------------------------------------------------------
+
+    def run(self, jobs: list[ClipJob]) -> RunReport:
+        """Render ``jobs`` and return a report; never raises for a single clip."""
+        results: list[ClipResult] = []
+        start = time.time()
+        plan = None
+        jobs, kept = self._existing(jobs)
+        for result in kept:
+            results.append(result)
+            self.on_result(result)
+        if self.draft is not None or self.reorder and len(jobs) > 1:
+            jobs, unbuilt = self._build(jobs)
+            for result in unbuilt:
+                results.append(result)
+                if self.telemetry is not None:
+                    self.telemetry.record(result)
+                self.on_result(result)
+        if self.reorder and len(jobs) > 1:
+            jobs, plan = self._schedule(jobs)
+        pending = sorted(jobs, key=lambda job: (job.priority or self.priority) != INTERACTIVE)
+
+        with ThreadPoolExecutor(self.depth, thread_name_prefix="comfy-wait") as waiters, \
+                ThreadPoolExecutor(self.download_workers,
+                                   thread_name_prefix="comfy-fetch") as fetchers:
+            rendering: dict = {}
+            fetching: dict = {}
+            retrying: list = []
+            while pending or retrying or rendering or fetching:
+                while (retrying or pending) and len(rendering) < self.depth:
+                    if retrying:
+                        job, result, retry = retrying.pop(0)
+                    else:
+                        job, retry = pending.pop(0), None
+                        result = ClipResult(job, priority=job.priority or self.priority)
+                    rendering[waiters.submit(self._render, job, result, retry)] = result
+
+                done, _ = wait(list(rendering) + list(fetching),
+                               return_when=FIRST_COMPLETED)
+                for fut in done:
+                    if fut in rendering:
+                        result = rendering.pop(fut)
+                        try:
+                            entry = fut.result()
+                        except ComfyError as e:
+                            if isinstance(e, ComfyExecutionError):
+                                result.error = describe_messages(e.messages)
+                                self._journal(result, FAILED, error=result.error)
+                            elif isinstance(e, ComfyHTTPError):
+                                result.error = str(e)
+                                self._journal(result, FAILED, error=result.error)
+                            else:
+                                # Timeouts and lost connections leave the prompt
+                                # queued; keep it open for the next run.
+                                result.error = str(e)
+                                if isinstance(e, ComfyConnectionError) and e.prompt_id:
+                                    # A submit that failed after sending: the
+                                    # retry looks this id up before resending.
+                                    result.prompt_id = result.prompt_id or e.prompt_id
+                            retry = self._plan_retry(result, e)
+                            if retry is not None:
+                                retrying.append((result.job, result, retry))
+                                continue
+                        except Exception as e:
+                            # A malformed history, a template or disk error:
+                            # fail this clip, keep the others in flight.
+                            self._fail(result, e)
+                        else:
+                            fetching[fetchers.submit(self._fetch, result.job,
+                                                     result, entry)] = result
+                            continue
+                    else:
+                        result = fetching.pop(fut)
+                        try:
+                            fut.result()
+                        except ClipQAError as e:
+                            result.error, result.qa, result.ok = str(e), e.stats, False
+                            self._reject(result)
+                            retry = self._plan_retry(result, e)
+                            if retry is not None:
+                                retrying.append((result.job, result, retry))
+                                continue
+                            self._journal(result, FAILED, error=result.error)
+                        except (ComfyError, OSError) as e:
+                            result.error = str(e)
+                            result.ok = False
+                        except Exception as e:
+                            self._fail(result, e)
+                        if result.ok:
+                            self._journal(result, DOWNLOADED)
+                            if self.draft is not None:
+                                self.draft.record(result)
+                    results.append(result)
+                    if self.telemetry is not None:
+                        self.telemetry.record(result)
+                    self.on_result(result)
+
+        wall = time.time() - start
+        busy = 0.0
+        hosts = {r.host for r in results if r.busy}
+        for host in hosts:
+            busy += min(wall, _union_length([r.busy for r in results
+                                              if r.busy and r.host == host]))
+        return RunReport(results, wall, busy, self.hosts, plan)
+
+
+def print_result(result: ClipResult):
+    """Default ``on_result``: one status line per finished clip."""
+    job = result.job
+    if result.ok:
+        extra = f", {result.duration:.2f}s" if result.duration else ""
+        if result.variant is not None:
+            extra += f", {result.variant.describe()}"
+        label = ("EXISTS" if result.skipped else "CACHED" if result.cached
+                 else "RESUMED" if result.reattached else "DONE")
+        print(f"  {label}: {job.name} ({result.size} bytes{extra})")
+    else:
+        print(f"  ERROR: {job.name}: {result.error}")
+    sys.stdout.flush()
+
+
+def print_retry(result: ClipResult, retry: Retry):
+    """Default ``on_retry``: say what failed and what happens next."""
+    print(f"  RETRY {result.attempts}: {result.job.name}: {result.retries[-1]} "
+          f"({result.error})")
+    sys.stdout.flush()
+
+
+def run_clips(jobs: list[ClipJob], client: ComfyClient | None = None,
+              **kwargs) -> RunReport:
+    """Convenience wrapper: run ``jobs`` and print the duty-cycle summary.
+
+    Unless given, ``journal`` and ``telemetry`` come from the environment
+    (``ClipJournal.from_env()``, ``ClipTelemetry.from_env()``).
+    """
+    kwargs.setdefault("journal", ClipJournal.from_env())
+    kwargs.setdefault("telemetry", ClipTelemetry.from_env())
+    runner = ClipRunner(client, **kwargs)
+    report = runner.run(jobs)
+    print(f"\n{report.summary()}")
+    if runner.draft is not None and report.ok:
+        folder = os.path.dirname(report.ok[0].job.dest)
+        print(f"Drafts in {folder}; promote with: python3 -m pipeline.comfy promote {folder}")
+    return report
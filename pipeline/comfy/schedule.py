@@ -0,0 +1,144 @@
+"""Order a batch of prompts so ComfyUI reloads models as rarely as possible.
+
+ComfyUI keeps the outputs of every node whose inputs did not change since
+the previous prompt, so back-to-back prompts that share the checkpoint,
+text encoder and LoRA loaders skip loading the 22B checkpoint and the 12B
+Gemma encoder entirely.  A batch that alternates between graphs with
+different loaders (``LoraLoader`` vs ``LoraLoaderModelOnly``, another
+checkpoint or LoRA strength) pays for a full reload at every switch, and
+one that alternates latent shapes (97 vs 161 frames, t2v vs i2v)
+re-allocates the sampler's buffers.
+
+``plan_order`` groups workflows by model signature, then by latent shape,
+keeping the script's own order inside each group, and starts with the
+models the server has loaded already.  ``ClipRunner`` applies it before
+submitting; the resulting ``SchedulePlan`` says how many loads it saved.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+
+from .client import ComfyError
+
+_LATENT_KEYS = ("width", "height", "length", "batch_size")
+
+
+def _is_link(value) -> bool:
+    return isinstance(value, list) and len(value) == 2 and isinstance(value[0], str)
+
+
+def model_signature(workflow: dict) -> tuple:
+    """The model files and LoRA patches a graph loads, as a hashable tuple."""
+    signature = []
+    for node in workflow.values():
+        cls = str(node.get("class_type", ""))
+        if "Loader" not in cls:
+            continue
+        inputs = {k: v for k, v in node.get("inputs", {}).items() if not _is_link(v)}
+        signature.append((cls, tuple(sorted(inputs.items()))))
+    return tuple(sorted(signature))
+
+
+def shape_signature(workflow: dict) -> tuple:
+    """Conditioning path (t2v/i2v) and latent size of a video graph."""
+    kind = "t2v"
+    shape: tuple = ()
+    for node in workflow.values():
+        inputs = node.get("inputs", {})
+        if node.get("class_type") == "LoadImage":
+            kind = "i2v"
+        if isinstance(inputs.get("length"), int):
+            shape = tuple(inputs.get(k) for k in _LATENT_KEYS)
+    return (kind, *shape)
+
+
+def count_loads(signatures, loaded: tuple | None = None) -> int:
+    """How many times the model set changes along ``signatures``."""
+    loads, current = 0, loaded
+    for signature in signatures:
+        if signature != current:
+            loads += 1
+            current = signature
+    return loads
+
+
+@dataclass
+class SchedulePlan:
+    order: list[int]                  # indices into the original batch
+    loads: int                        # model loads in the planned order
+    loads_before: int                 # ... in the order the script gave
+    shape_changes: int = 0
+    shape_changes_before: int = 0
+    groups: list[tuple] = field(default_factory=list, repr=False)
+
+    @property
+    def loads_avoided(self) -> int:
+        return self.loads_before - self.loads
+
+    def summary(self) -> str:
+        return (f"{self.loads} model load(s), {self.loads_avoided} avoided by reordering; "
+                f"{self.shape_changes} latent shape change(s) "
+                f"(was {self.shape_changes_before})")
+
+
+def plan_order(workflows: list[dict], loaded: tuple | None = None) -> SchedulePlan:
+    """Submission order for ``workflows`` that keeps each model set together.
+
+    ``loaded`` is the model signature already resident on the server (see
+    ``loaded_signature``); its group goes first.  Groups otherwise keep the
+    order in which they first appear, so the script's priorities hold.
+    """
+    models = [model_signature(w) for w in workflows]
+    shapes = [shape_signature(w) for w in workflows]
+    groups: dict[tuple, dict[tuple, list[int]]] = {}
+    for i, (model, shape) in enumerate(zip(models, shapes)):
+        groups.setdefault(model, {}).setdefault(shape, []).append(i)
+
+    keys = list(groups)
+    if loaded in groups:
+        keys.remove(loaded)
+        keys.insert(0, loaded)
+    order: list[int] = []
+    last_shape = None
+    for model in keys:
+        by_shape = list(groups[model].items())
+        # Continue with the latent shape the previous group ended on.
+        by_shape.sort(key=lambda item: item[0] != last_shape)
+        for shape, indices in by_shape:
+            order.extend(indices)
+            last_shape = shape
+
+    return SchedulePlan(
+        order=order,
+        loads=count_loads((models[i] for i in order), loaded),
+        loads_before=count_loads(models, loaded),
+        shape_changes=max(0, count_loads(shapes[i] for i in order) - 1),
+        shape_changes_before=max(0, count_loads(shapes) - 1),
+        groups=keys,
+    )
+
+
+def loaded_signature(client) -> tuple | None:
+    """Model signature of the last prompt ``client``'s server will have run.
+
+    That is the last queued prompt if the queue is busy, else the most
+    recent history entry.  Best effort: None when it cannot be told
+    (including for a multi-host pool).
+    """
+    if getattr(client, "backends", None):
+        return None
+    try:
+        q = client.queue()
+        items = q.get("queue_pending", []) or q.get("queue_running", [])
+        if items:
+            last = max(items, key=lambda item: item[0])
+            return model_signature(last[2])
+        recent = client.get_json("/history", {"max_items": 1})
+    except (ComfyError, ValueError, LookupError, TypeError):
+        return None
+    for entry in recent.values():
+        prompt = entry.get("prompt") or []
+        if len(prompt) > 2 and isinstance(prompt[2], dict):
+            return model_signature(prompt[2])
+    return None
@@ -0,0 +1,240 @@
+"""Per-clip timing records for GPU capacity planning.
+
+The scripts only ever printed "Done in Ns", which lumps together the time
+a clip was held back, queued behind other prompts, executing on the GPU
+and being downloaded.  ``ClipTelemetry`` gets one record per finished clip
+from ``ClipRunner`` with each phase measured separately:
+
+``held``        seconds the batch gate kept the prompt on our side
+``submit``      ``POST /prompt`` round trip
+``queue``       submission to ComfyUI's ``execution_start``
+``execute``     ``execution_start`` to ``execution_success`` / ``_error``
+``download``    fetching the output, with its size in bytes
+
+plus host, priority class, attempts and the reason for every retry.
+Records are appended to ``CLIP_TELEMETRY_DIR/clips.jsonl`` (default
+``~/.cache/zkagi-video-engine/telemetry``; ``CLIP_TELEMETRY=off`` disables
+it).  With ``CLIP_METRICS_FILE`` set, the same numbers are also written as
+a Prometheus textfile (for node_exporter's textfile collector) after every
+clip; ``{script}`` in the path is replaced by the script name so parallel
+scripts do not overwrite each other.  Its counters cover the current run.
+
+    python3 -m pipeline.comfy telemetry             # per-host phase summary
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import tempfile
+import threading
+import time
+
+from .cache import DEFAULT_CACHE_DIR
+from .journal import _script_name
+
+DEFAULT_TELEMETRY_DIR = os.path.join(os.path.dirname(DEFAULT_CACHE_DIR), "telemetry")
+
+PHASES = ("held", "submit", "queue", "execute", "download")
+BUCKETS = (0.1, 0.5, 1, 2, 5, 10, 30, 60, 120, 300, 600, 1800)
+
+
+def _seconds(value: float | None) -> float | None:
+    return round(value, 3) if value is not None else None
+
+
+def clip_record(result, script: str | None = None) -> dict:
+    """The JSONL record for one finished ``ClipResult``."""
+    busy = result.busy
+    execute = busy[1] - busy[0] if busy and not result.busy_estimated else None
+    return {
+        "ts": round(result.finished_at or time.time(), 3),
+        "script": script or _script_name(),
+        "clip": result.job.name,
+        "dest": result.job.dest,
+        "host": result.host,
+        "prompt_id": result.prompt_id,
+        "priority": result.priority,
+        "ok": result.ok,
+        "error": result.error,
+        "cached": result.cached,
+        "reattached": result.reattached,
+        "attempts": result.attempts,
+        "retries": list(result.retries),
+        "held": _seconds(result.held),
+        "submit": _seconds(result.submit_latency),
+        "queue": _seconds(result.queue_wait),
+        "execute": _seconds(execute),
+        "download": _seconds(result.download_seconds),
+        "download_bytes": result.size,
+        "video_seconds": result.duration,
+        "variants": result.variants,
+        "variant": result.variant.index if result.variant is not None else None,
+    }
+
+
+def _status(record: dict) -> str:
+    if not record["ok"]:
+        return "failed"
+    return "cached" if record["cached"] else "ok"
+
+
+def _labels(**labels) -> str:
+    def escape(value) -> str:
+        return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    return "{" + ",".join(f'{k}="{escape(v)}"' for k, v in labels.items()) + "}"
+
+
+class _Histogram:
+    def __init__(self):
+        self.counts = [0] * len(BUCKETS)
+        self.total = 0.0
+        self.n = 0
+
+    def observe(self, value: float):
+        for i, bound in enumerate(BUCKETS):
+            if value <= bound:
+                self.counts[i] += 1
+        self.total += value
+        self.n += 1
+
+
+def prometheus_text(records: list[dict]) -> str:
+    """Counters and phase histograms over ``records``, in text format 0.0.4."""
+    clips: dict[tuple, int] = {}
+    retries: dict[tuple, int] = {}
+    downloaded: dict[tuple, int] = {}
+    phases: dict[tuple, _Histogram] = {}
+    last = 0.0
+    for r in records:
+        host = r["host"] or "unknown"
+        base = (r["script"], host)
+        key = base + (r["priority"], _status(r))
+        clips[key] = clips.get(key, 0) + 1
+        for reason in r["retries"]:
+            key = base + (reason.split(":", 1)[0],)
+            retries[key] = retries.get(key, 0) + 1
+        downloaded[base] = downloaded.get(base, 0) + r["download_bytes"]
+        for phase in PHASES:
+            if r[phase] is not None and not r["cached"]:
+                phases.setdefault(base + (phase,), _Histogram()).observe(r[phase])
+        last = max(last, r["ts"])
+
+    lines = ["# HELP comfy_clips_total Clips finished, by outcome.",
+             "# TYPE comfy_clips_total counter"]
+    for (script, host, priority, status), n in sorted(clips.items()):
+        labels = _labels(script=script, host=host, priority=priority, status=status)
+        lines.append(f"comfy_clips_total{labels} {n}")
+    lines += ["# HELP comfy_clip_retries_total Retries, by failure class.",
+              "# TYPE comfy_clip_retries_total counter"]
+    for (script, host, kind), n in sorted(retries.items()):
+        lines.append(f"comfy_clip_retries_total{_labels(script=script, host=host, kind=kind)} {n}")
+    lines += ["# HELP comfy_clip_download_bytes_total Bytes of clip output downloaded.",
+              "# TYPE comfy_clip_download_bytes_total counter"]
+    for (script, host), n in sorted(downloaded.items()):
+        lines.append(f"comfy_clip_download_bytes_total{_labels(script=script, host=host)} {n}")
+    lines += ["# HELP comfy_clip_phase_seconds Seconds per clip spent in each phase.",
+              "# TYPE comfy_clip_phase_seconds histogram"]
+    for (script, host, phase), h in sorted(phases.items()):
+        labels = dict(script=script, host=host, phase=phase)
+        for bound, n in zip(BUCKETS, h.counts):
+            lines.append(f"comfy_clip_phase_seconds_bucket{_labels(**labels, le=bound)} {n}")
+        lines.append(f"comfy_clip_phase_seconds_bucket{_labels(**labels, le='+Inf')} {h.n}")
+        lines.append(f"comfy_clip_phase_seconds_sum{_labels(**labels)} {h.total:.3f}")
+        lines.append(f"comfy_clip_phase_seconds_count{_labels(**labels)} {h.n}")
+    lines += ["# HELP comfy_clip_last_finished_seconds Unix time the last clip finished.",
+              "# TYPE comfy_clip_last_finished_seconds gauge",
+              f"comfy_clip_last_finished_seconds {last:.3f}"]
+    return "\n".join(lines) + "\n"
+
+
+class ClipTelemetry:
+    """Append clip records to a JSONL file and mirror them to a textfile."""
+
+    def __init__(self, path: str | None, metrics_path: str | None = None,
+                 script: str | None = None):
+        self.path = path
+        self.script = script or _script_name()
+        self.metrics_path = (metrics_path.replace("{script}", self.script)
+                             if metrics_path else None)
+        self.records: list[dict] = []
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls, script: str | None = None) -> "ClipTelemetry | None":
+        metrics = os.environ.get("CLIP_METRICS_FILE") or None
+        path = None
+        if os.environ.get("CLIP_TELEMETRY", "").lower() not in ("0", "off", "no", "false"):
+            root = os.environ.get("CLIP_TELEMETRY_DIR") or DEFAULT_TELEMETRY_DIR
+            path = os.path.join(root, "clips.jsonl")
+        if path is None and metrics is None:
+            return None
+        return cls(path, metrics, script)
+
+    def __repr__(self):
+        return f"ClipTelemetry({self.path!r}, metrics={self.metrics_path!r})"
+
+    def record(self, result) -> dict:
+        """Log one finished clip; returns the record."""
+        record = clip_record(result, self.script)
+        with self._lock:
+            self.records.append(record)
+            if self.path is not None:
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(record) + "\n")
+            if self.metrics_path is not None:
+                self._write_metrics()
+        return record
+
+    def _write_metrics(self):
+        # The textfile collector may read at any moment: write, then rename.
+        folder = os.path.dirname(self.metrics_path) or "."
+        os.makedirs(folder, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=folder, prefix=".clip-metrics-")
+        try:
+            with os.fdopen(fd, "w") as f:
+                f.write(prometheus_text(self.records))
+            os.chmod(tmp, 0o644)
+            os.replace(tmp, self.metrics_path)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+            raise
+
+
+def load_records(path: str, since: float | None = None) -> list[dict]:
+    """Records from a telemetry file, optionally only those after ``since``."""
+    records = []
+    try:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                if since is None or record.get("ts", 0) >= since:
+                    records.append(record)
+    except FileNotFoundError:
+        pass
+    return records
+
+
+def summarize(records: list[dict]) -> str:
+    """Per host: clips, failures, retries and mean/max of every phase."""
+    hosts: dict[str, list[dict]] = {}
+    for r in records:
+        hosts.setdefault(r.get("host") or "unknown", []).append(r)
+    lines = []
+    for host, rs in sorted(hosts.items()):
+        failed = sum(1 for r in rs if not r["ok"])
+        retried = sum(len(r["retries"]) for r in rs)
+        gb = sum(r["download_bytes"] for r in rs) / 1e9
+        lines.append(f"{host}: {len(rs)} clips, {failed} failed, {retried} retries, "
+                     f"{gb:.2f} GB downloaded")
+        for phase in PHASES:
+            values = [r[phase] for r in rs if r.get(phase) is not None and not r["cached"]]
+            if values:
+                lines.append(f"  {phase:<9} avg {sum(values) / len(values):7.1f}s  "
+                             f"max {max(values):7.1f}s  ({len(values)} clips)")
+    return "\n".join(lines) if lines else "no telemetry records"
@@ -0,0 +1,340 @@
+"""LTX-2.3 workflow templates: defined once, checked once, patched per clip.
+
+Every clip script used to carry its own 15-18 node dict literal of the same
+LTX-2.3 graph.  The graphs live here instead, as ``WorkflowTemplate``
+objects with named parameters (``prompt``, ``seed``, ``length`` ...) that
+map to the node inputs they patch.  ``build(**params)`` copies the graph and
+writes just those inputs, so building a few hundred clips costs nothing.
+
+``check_templates`` validates templates against ComfyUI's ``/object_info``
+(cached on disk for a day) at startup: unknown node classes, missing or
+misspelled inputs, links to the wrong output type, out-of-range numbers and
+model files the server does not have all fail before the first clip is
+queued instead of as a 400 from ``/prompt`` halfway through a batch.
+
+    from pipeline.comfy.templates import T2V, check_templates
+
+    check_templates(comfy, T2V)
+    workflow = T2V.build(prompt=text, seed=seed, prefix="scene_0")
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import time
+
+from .cache import DEFAULT_CACHE_DIR
+from .client import ComfyError
+
+CHECKPOINT = "ltx-2.3-22b-dev-fp8.safetensors"
+TEXT_ENCODER = "gemma_3_12B_it.safetensors"
+TEXT_PROJECTION = "ltx-2.3_text_projection_bf16.safetensors"
+DISTILLED_LORA = "ltx-2.3-distilled-lora-384.safetensors"
+
+WIDTH, HEIGHT, FPS, STEPS = 768, 512, 25, 8
+
+NEGATIVE_PROMPT = (
+    "static, frozen, no motion, blurry, low quality, distorted, text, watermark, "
+    "jittery, flickering, ugly, deformed"
+)
+
+SCHEMA_MAX_AGE = float(os.environ.get("COMFY_SCHEMA_MAX_AGE", 24 * 3600))
+
+
+class TemplateError(ComfyError):
+    """A template does not match the server's node schema."""
+
+    def __init__(self, template: str, problems: list[str]):
+        self.template = template
+        self.problems = problems
+        super().__init__(f"{template}: " + "; ".join(problems))
+
+
+# ---------------------------------------------------------------------------
+# Template
+# ---------------------------------------------------------------------------
+
+class WorkflowTemplate:
+    """A ComfyUI API graph plus the inputs each clip may change.
+
+    ``params`` maps a parameter name to one or more ``(node_id, input)``
+    targets; ``defaults`` supplies values for parameters a caller omits.
+    Parameters without a default must be passed to ``build``.
+    """
+
+    def __init__(self, name: str, graph: dict, params: dict, defaults: dict | None = None):
+        self.name = name
+        self.graph = graph
+        self.params = {k: [v] if isinstance(v, tuple) else list(v) for k, v in params.items()}
+        self.defaults = dict(defaults or {})
+        for param, targets in self.params.items():
+            for node, key in targets:
+                if node not in graph or key not in graph[node]["inputs"]:
+                    raise ValueError(f"{name}: {param} -> {node}.{key} is not in the graph")
+        # Nodes no parameter touches are shared between built graphs.
+        self._patched = {node for targets in self.params.values() for node, _ in targets}
+
+    def __repr__(self):
+        return f"WorkflowTemplate({self.name!r}, params={sorted(self.params)})"
+
+    def build(self, **values) -> dict:
+        """Return a fresh API graph with ``values`` patched in."""
+        unknown = set(values) - set(self.params)
+        if unknown:
+            raise TypeError(f"{self.name}: unknown parameter(s) {sorted(unknown)}")
+        merged = {**self.defaults, **values}
+        missing = set(self.params) - set(merged)
+        if missing:
+            raise TypeError(f"{self.name}: missing parameter(s) {sorted(missing)}")
+        graph = {}
+        for node_id, node in self.graph.items():
+            if node_id in self._patched:
+                node = {"class_type": node["class_type"], "inputs": dict(node["inputs"])}
+            graph[node_id] = node
+        for param, targets in self.params.items():
+            for node_id, key in targets:
+                graph[node_id]["inputs"][key] = merged[param]
+        return graph
+
+    def derive(self, name: str, *, defaults: dict | None = None) -> "WorkflowTemplate":
+        """Same graph under a new name with different default values."""
+        return WorkflowTemplate(name, self.graph, self.params, {**self.defaults, **(defaults or {})})
+
+
+# ---------------------------------------------------------------------------
+# LTX-2.3 graphs
+# ---------------------------------------------------------------------------
+
+def _loaders() -> dict:
+    return {
+        "1": {"class_type": "CheckpointLoaderSimple", "inputs": {"ckpt_name": CHECKPOINT}},
+        "2": {"class_type": "DualCLIPLoader", "inputs": {
+            "clip_name1": TEXT_ENCODER, "clip_name2": TEXT_PROJECTION, "type": "ltx"}},
+        "3": {"class_type": "LoraLoaderModelOnly", "inputs": {
+            "model": ["1", 0], "lora_name": DISTILLED_LORA, "strength_model": 1.0}},
+    }
+
+
+def _sampler(latent: list, positive: list, negative: list, first: int) -> dict:
+    """Scheduler -> noise -> guider -> sampler -> decode -> save, from ``first``."""
+    n = [str(first + i) for i in range(8)]
+    return {
+        n[0]: {"class_type": "LTXVScheduler", "inputs": {
+            "steps": STEPS, "max_shift": 2.05, "base_shift": 0.95, "stretch": True,
+            "terminal": 0.1, "latent": latent}},
+        n[1]: {"class_type": "RandomNoise", "inputs": {"noise_seed": 0}},
+        n[2]: {"class_type": "CFGGuider", "inputs": {
+            "model": ["3", 0], "positive": positive, "negative": negative, "cfg": 1.0}},
+        n[3]: {"class_type": "KSamplerSelect", "inputs": {"sampler_name": "euler"}},
+        n[4]: {"class_type": "SamplerCustomAdvanced", "inputs": {
+            "noise": [n[1], 0], "guider": [n[2], 0], "sampler": [n[3], 0],
+            "sigmas": [n[0], 0], "latent_image": latent}},
+        # Video only: the sampler output goes straight to the VAE, no
+        # SeparateAVLatent.
+        n[5]: {"class_type": "VAEDecode", "inputs": {"samples": [n[4], 0], "vae": ["1", 2]}},
+        n[6]: {"class_type": "CreateVideo", "inputs": {"images": [n[5], 0], "fps": float(FPS)}},
+        n[7]: {"class_type": "SaveVideo", "inputs": {
+            "video": [n[6], 0], "filename_prefix": "clip", "format": "mp4", "codec": "h264"}},
+    }
+
+
+def _t2v_graph() -> dict:
+    graph = _loaders()
+    graph.update({
+        "4": {"class_type": "CLIPTextEncode", "inputs": {"text": "", "clip": ["2", 0]}},
+        "5": {"class_type": "CLIPTextEncode", "inputs": {"text": NEGATIVE_PROMPT, "clip": ["2", 0]}},
+        "6": {"class_type": "LTXVConditioning", "inputs": {
+            "positive": ["4", 0], "negative": ["5", 0], "frame_rate": FPS}},
+        "7": {"class_type": "EmptyLTXVLatentVideo", "inputs": {
+            "width": WIDTH, "height": HEIGHT, "length": 97, "batch_size": 1}},
+    })
+    graph.update(_sampler(["7", 0], ["6", 0], ["6", 1], first=8))
+    return graph
+
+
+def _i2v_graph(guide_from_image: bool = True) -> dict:
+    graph = _loaders()
+    graph.update({
+        "4": {"class_type": "LoadImage", "inputs": {"image": ""}},
+        "5": {"class_type": "LTXVPreprocess", "inputs": {"image": ["4", 0], "img_compression": 35}},
+        "6": {"class_type": "CLIPTextEncode", "inputs": {"text": "", "clip": ["2", 0]}},
+        "7": {"class_type": "CLIPTextEncode", "inputs": {"text": NEGATIVE_PROMPT, "clip": ["2", 0]}},
+        "8": {"class_type": "LTXVConditioning", "inputs": {
+            "positive": ["6", 0], "negative": ["7", 0], "frame_rate": FPS}},
+        "9": {"class_type": "LTXVImgToVideo", "inputs": {
+            "positive": ["8", 0], "negative": ["8", 1], "vae": ["1", 2], "image": ["5", 0],
+            "width": WIDTH, "height": HEIGHT, "length": 97, "batch_size": 1, "strength": 1.0}},
+    })
+    # The motion pass guides with the plain text conditioning and lets the
+    # image only seed the latent, which keeps it closer to the template.
+    cond = "9" if guide_from_image else "8"
+    graph.update(_sampler(["9", 2], [cond, 0], [cond, 1], first=10))
+    return graph
+
+
+_COMMON = {
+    "lora_strength": ("3", "strength_model"),
+    "seed": ("9", "noise_seed"),
+    "steps": ("8", "steps"),
+    "prefix": ("15", "filename_prefix"),
+}
+
+T2V = WorkflowTemplate(
+    "ltx23-t2v", _t2v_graph(),
+    params={
+        "prompt": ("4", "text"),
+        "negative": ("5", "text"),
+        "length": ("7", "length"),
+        "width": ("7", "width"),
+        "height": ("7", "height"),
+        "batch_size": ("7", "batch_size"),
+        **_COMMON,
+    },
+    defaults={"negative": NEGATIVE_PROMPT, "length": 97, "width": WIDTH,
+              "height": HEIGHT, "batch_size": 1, "steps": STEPS, "prefix": "clip",
+              "lora_strength": 1.0},
+)
+
+_I2V_PARAMS = {
+    "image": ("4", "image"),
+    "prompt": ("6", "text"),
+    "negative": ("7", "text"),
+    "length": ("9", "length"),
+    "width": ("9", "width"),
+    "height": ("9", "height"),
+    "batch_size": ("9", "batch_size"),
+    "strength": ("9", "strength"),
+    "seed": ("11", "noise_seed"),
+    "steps": ("10", "steps"),
+    "prefix": ("17", "filename_prefix"),
+    "lora_strength": ("3", "strength_model"),
+}
+_I2V_DEFAULTS = {"negative": NEGATIVE_PROMPT, "length": 97, "width": WIDTH,
+                 "height": HEIGHT, "batch_size": 1, "strength": 1.0, "steps": STEPS,
+                 "prefix": "clip", "lora_strength": 1.0}
+
+I2V = WorkflowTemplate("ltx23-i2v", _i2v_graph(), _I2V_PARAMS, _I2V_DEFAULTS)
+
+# Low-strength i2v over a rendered motion-graphics template: keeps the
+# layout, adds ambient motion (generate-motion-clips.py).
+MOTION = WorkflowTemplate("ltx23-motion", _i2v_graph(guide_from_image=False), _I2V_PARAMS,
+                          {**_I2V_DEFAULTS, "strength": 0.25})
+
+TEMPLATES = {t.name: t for t in (T2V, I2V, MOTION)}
+
+
+# ---------------------------------------------------------------------------
+# Schema validation
+# ---------------------------------------------------------------------------
+
+def _schema_path(base_url: str) -> str:
+    tag = hashlib.sha1(base_url.encode()).hexdigest()[:12]
+    return os.path.join(os.path.dirname(DEFAULT_CACHE_DIR), f"object_info-{tag}.json")
+
+
+def object_info(client, *, max_age: float = SCHEMA_MAX_AGE, refresh: bool = False) -> dict:
+    """``/object_info`` for ``client``'s server, cached on disk for ``max_age``."""
+    path = _schema_path(client.base_url)
+    if not refresh:
+        try:
+            if time.time() - os.path.getmtime(path) < max_age:
+                with open(path) as f:
+                    return json.load(f)
+        except (OSError, ValueError):
+            pass
+    info = client.object_info()
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(info, f)
+    os.replace(tmp, path)
+    return info
+
+
+def _input_spec(schema: dict, key: str):
+    for section in ("required", "optional"):
+        spec = schema.get("input", {}).get(section, {})
+        if key in spec:
+            return section, spec[key]
+    return None, None
+
+
+def validate(template: WorkflowTemplate, info: dict) -> list[str]:
+    """Problems with ``template`` under the ``/object_info`` schema ``info``."""
+    problems = []
+    required = _required_params(template)
+    graph = template.build(**{p: _placeholder(template, p) for p in required})
+    # Per-clip values (prompt, image, seed) are only known at build time.
+    free = {target for p in required for target in template.params[p]}
+
+    for node_id, node in graph.items():
+        cls = node["class_type"]
+        schema = info.get(cls)
+        if schema is None:
+            problems.append(f"node {node_id}: unknown class {cls}")
+            continue
+        for key in schema.get("input", {}).get("required", {}):
+            if key not in node["inputs"]:
+                problems.append(f"node {node_id} ({cls}): missing input {key}")
+        for key, value in node["inputs"].items():
+            section, spec = _input_spec(schema, key)
+            if spec is None:
+                problems.append(f"node {node_id} ({cls}): no input named {key}")
+                continue
+            kind = spec[0] if spec else None
+            opts = spec[1] if len(spec) > 1 and isinstance(spec[1], dict) else {}
+            if isinstance(value, list) and len(value) == 2 and isinstance(value[0], str):
+                src = graph.get(value[0])
+                if src is None:
+                    problems.append(f"node {node_id}.{key}: link to missing node {value[0]}")
+                    continue
+                if src["class_type"] not in info:
+                    continue  # already reported as an unknown class
+                outputs = info[src["class_type"]].get("output", [])
+                if value[1] >= len(outputs):
+                    problems.append(f"node {node_id}.{key}: {src['class_type']} has no output {value[1]}")
+                elif isinstance(kind, str) and kind != "*" and outputs[value[1]] != kind:
+                    problems.append(f"node {node_id}.{key}: expects {kind}, "
+                                    f"got {outputs[value[1]]} from node {value[0]}")
+                continue
+            if (node_id, key) in free:
+                continue
+            if isinstance(kind, list):
+                if value not in kind:
+                    problems.append(f"node {node_id} ({cls}): {key}={value!r} not available on server")
+            elif kind in ("INT", "FLOAT") and isinstance(value, (int, float)):
+                if "min" in opts and value < opts["min"] or "max" in opts and value > opts["max"]:
+                    problems.append(f"node {node_id} ({cls}): {key}={value} outside "
+                                    f"[{opts.get('min')}, {opts.get('max')}]")
+    return problems
+
+
+def _required_params(template: WorkflowTemplate) -> list[str]:
+    return [p for p in template.params if p not in template.defaults]
+
+
+def _placeholder(template: WorkflowTemplate, param: str):
+    node_id, key = template.params[param][0]
+    return template.graph[node_id]["inputs"][key]
+
+
+def check_templates(client, *templates: WorkflowTemplate) -> dict:
+    """Validate ``templates`` (default: all) against the server; raise on problems.
+
+    Returns the ``/object_info`` used.  If the cached schema disagrees it is
+    refreshed once before giving up, so a newly installed node or model
+    does not need a manual cache purge.
+    """
+    templates = templates or tuple(TEMPLATES.values())
+    info = object_info(client)
+    for refreshed in (False, True):
+        failures = [(t, validate(t, info)) for t in templates]
+        failures = [(t, p) for t, p in failures if p]
+        if not failures:
+            return info
+        if not refreshed:
+            info = object_info(client, refresh=True)
+    template, problems = failures[0]
+    raise TemplateError(template.name, problems)
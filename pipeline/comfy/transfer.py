@@ -0,0 +1,155 @@
+"""Crash-safe output downloads for ``ComfyClient.download``.
+
+Clips are streamed into ``<dest>.<tag>.part`` next to the destination.  A
+dropped connection keeps the partial file and the next attempt asks for the
+rest with an HTTP ``Range`` header (ComfyUI's ``/view`` is served by aiohttp,
+which honours it).  Only a file whose size matches ``Content-Length`` and
+that ffprobe can read is renamed over ``dest``, so a truncated MP4 never
+appears under the final name.
+
+When the ComfyUI output folder is mounted on this machine (``output_dir``),
+the file is hardlinked, or reflinked on filesystems that support it, rather
+than pulled over HTTP.
+"""
+
+from __future__ import annotations
+
+import errno
+import hashlib
+import os
+import shutil
+import time
+
+from pipeline.media import HAVE_FFPROBE, probe_duration
+
+from .client import (
+    _NETWORK_ERRORS,
+    VIDEO_EXTENSIONS,
+    ComfyConnectionError,
+    ComfyDownloadError,
+    ComfyHTTPError,
+)
+
+CHUNK = 1 << 20
+FICLONE = 0x40049409  # linux/fs.h: _IOW(0x94, 9, int)
+
+
+def _part_path(dest: str, base_url: str, item: dict) -> str:
+    # Tagged with the source so a leftover from another clip is never resumed.
+    ident = f"{base_url}|{item.get('type')}|{item.get('subfolder', '')}|{item['filename']}"
+    return f"{dest}.{hashlib.sha1(ident.encode()).hexdigest()[:10]}.part"
+
+
+def _total_length(resp, offset: int) -> int | None:
+    """Full file size from ``Content-Range`` / ``Content-Length``."""
+    content_range = resp.headers.get("Content-Range", "")
+    if "/" in content_range:
+        total = content_range.rsplit("/", 1)[1]
+        if total.isdigit():
+            return int(total)
+    length = resp.headers.get("Content-Length")
+    return offset + int(length) if length and length.isdigit() else None
+
+
+def verify(path: str, expected: int | None = None, name: str | None = None):
+    """Raise ``ComfyDownloadError`` unless ``path`` looks like a whole file."""
+    size = os.path.getsize(path)
+    if expected is not None and size != expected:
+        raise ComfyDownloadError(f"{path}: got {size} of {expected} bytes")
+    if size == 0:
+        raise ComfyDownloadError(f"{path}: empty file")
+    if HAVE_FFPROBE and (name or path).lower().endswith(VIDEO_EXTENSIONS):
+        if not probe_duration(path):
+            raise ComfyDownloadError(f"{path}: ffprobe cannot read the video")
+
+
+def fetch(client, item: dict, dest: str, *, attempts: int = 5) -> int:
+    """Stream ``item`` from ``/view`` into ``dest``; return the byte count.
+
+    Raises ``ComfyDownloadError`` when the file cannot be fetched intact,
+    including HTTP errors from ``/view`` (the ``ComfyHTTPError`` is its
+    ``__cause__``).
+    """
+    part = _part_path(dest, client.base_url, item)
+    last_error: Exception | None = None
+    for attempt in range(attempts):
+        if attempt:
+            time.sleep(client.backoff * 2 ** (attempt - 1))
+        offset = os.path.getsize(part) if os.path.exists(part) else 0
+        headers = {"Range": f"bytes={offset}-"} if offset else None
+        try:
+            with client.view(item, headers=headers) as resp:
+                if offset and resp.status == 206:
+                    mode = "ab"
+                else:
+                    offset, mode = 0, "wb"
+                expected = _total_length(resp, offset)
+                with open(part, mode) as f:
+                    shutil.copyfileobj(resp, f, CHUNK)
+        except ComfyHTTPError as e:
+            if e.status != 416:
+                raise ComfyDownloadError(f"{item['filename']}: {e}") from e
+            # Range past the end: the partial file is stale, start over.
+            os.unlink(part)
+            last_error = e
+            continue
+        except (ComfyConnectionError, *_NETWORK_ERRORS) as e:
+            last_error = e
+            continue
+        if expected is not None and os.path.getsize(part) < expected:
+            last_error = ComfyDownloadError(
+                f"{item['filename']}: connection closed at "
+                f"{os.path.getsize(part)}/{expected} bytes")
+            continue
+        try:
+            verify(part, expected, dest)
+        except ComfyDownloadError as e:
+            os.unlink(part)
+            last_error = e
+            continue
+        os.replace(part, dest)
+        return os.path.getsize(dest)
+    raise ComfyDownloadError(
+        f"{item['filename']}: download failed after {attempts} attempts: {last_error}")
+
+
+def _reflink(src: str, dst: str):
+    import fcntl
+
+    with open(src, "rb") as s, open(dst, "wb") as d:
+        fcntl.ioctl(d.fileno(), FICLONE, s.fileno())
+
+
+def link_or_copy(src: str, dest: str) -> str:
+    """Place ``src`` at ``dest`` atomically; return how (link/reflink/copy)."""
+    tmp = f"{dest}.{os.getpid()}.link"
+    if os.path.lexists(tmp):
+        os.unlink(tmp)
+    try:
+        os.link(src, tmp)
+        how = "link"
+    except OSError as e:
+        if e.errno not in (errno.EXDEV, errno.EPERM, errno.EMLINK, errno.ENOTSUP):
+            raise
+        try:
+            _reflink(src, tmp)
+            how = "reflink"
+        except (OSError, ImportError):
+            shutil.copyfile(src, tmp)
+            how = "copy"
+    try:
+        verify(tmp, os.path.getsize(src), dest)
+        os.replace(tmp, dest)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
+    return how
+
+
+def local_path(output_dir: str | None, item: dict) -> str | None:
+    """Where ``item`` lives on a locally mounted ComfyUI output folder."""
+    if not output_dir or (item.get("type") or "output") != "output":
+        return None
+    path = os.path.join(output_dir, item.get("subfolder") or "", item["filename"])
+    return path if os.path.isfile(path) else None
@@ -0,0 +1,81 @@
+"""Render N seed variants of a clip in one prompt and keep the best one.
+
+A clip that came out static or jittery used to be rerolled by hand with a
+new seed, one full submission at a time.  With ``variants=N`` (per
+``ClipJob``, or ``CLIP_VARIANTS`` for every job) the runner sets the
+``batch_size`` of the graph's latent node to N instead: one execution,
+one model load and one text encode produce N videos from N different
+noise samples.  ComfyUI decodes the batch into one video with the
+variants back to back; after download it is split, every variant is
+scored on the CPU (``pipeline.frames.rank``: smooth motion, sharpness, no
+jitter) and the best one is written to the clip's ``dest``.
+
+Needs ffmpeg and NumPy; without them jobs render one variant as before.
+"""
+
+from __future__ import annotations
+
+import copy
+import os
+from dataclasses import dataclass, field
+
+from pipeline.frames import FrameStats, decode_gray, extract_frames, measure, rank
+
+DEFAULT_VARIANTS = int(os.environ.get("CLIP_VARIANTS", "1"))
+
+_LATENT_NODES = ("EmptyLTXVLatentVideo", "LTXVImgToVideo", "EmptyLatentImage")
+
+
+def with_batch(workflow: dict, n: int) -> dict | None:
+    """Copy of ``workflow`` rendering ``n`` variants; None if it cannot batch."""
+    graph = copy.deepcopy(workflow)
+    found = False
+    for node in graph.values():
+        inputs = node.get("inputs", {})
+        if node.get("class_type") in _LATENT_NODES and isinstance(inputs.get("batch_size"), int):
+            inputs["batch_size"] = n
+            found = True
+    return graph if found else None
+
+
+def batch_size(workflow: dict) -> int:
+    sizes = [node["inputs"]["batch_size"] for node in workflow.values()
+             if node.get("class_type") in _LATENT_NODES
+             and isinstance(node.get("inputs", {}).get("batch_size"), int)]
+    return max(sizes, default=1)
+
+
+@dataclass
+class VariantPick:
+    index: int                          # chosen variant, 0-based
+    scores: list[float]
+    stats: list[FrameStats] = field(repr=False)
+
+    def describe(self) -> str:
+        best = self.stats[self.index]
+        return (f"variant {self.index + 1}/{len(self.scores)} "
+                f"(motion {best.motion:.1f}, jitter {best.jitter:.2f}, "
+                f"sharpness {best.sharpness:.1f})")
+
+
+def pick_variant(batch: str, n: int, dest: str, *, keep: bool = False) -> VariantPick:
+    """Split the ``n``-variant video ``batch``, score, write the best to ``dest``.
+
+    With ``keep`` every variant is also saved as ``<dest stem>.vK.mp4``.
+    Raises ``ValueError`` if the video does not hold ``n`` equal parts and
+    ``subprocess.CalledProcessError`` if ffmpeg fails.
+    """
+    frames = decode_gray(batch)
+    per = len(frames) // n
+    if per < 2:
+        raise ValueError(f"{batch}: {len(frames)} frames cannot hold {n} variants")
+    stats = [measure(frames[i * per:(i + 1) * per]) for i in range(n)]
+    scores = rank(stats)
+    best = max(range(n), key=scores.__getitem__)
+    extract_frames(batch, dest, best * per, per)
+    if keep:
+        stem = os.path.splitext(dest)[0]
+        for i in range(n):
+            extract_frames(batch, f"{stem}.v{i + 1}.mp4", i * per, per)
+    return VariantPick(best, scores, stats)
+
@@ -0,0 +1,76 @@
+"""Small ffprobe/ffmpeg helpers shared by the clip and audio scripts."""
+
+from __future__ import annotations
+
+import os
+import shutil
+import struct
+import subprocess
+from dataclasses import dataclass
+
+HAVE_FFPROBE = shutil.which("ffprobe") is not None
+
+
+def probe_duration(path: str) -> float | None:
+    """Return the container duration in seconds, or None if unreadable."""
+    try:
+        out = subprocess.run(
+            ["ffprobe", "-v", "error", "-show_entries", "format=duration",
+             "-of", "csv=p=0", path],
+            capture_output=True, text=True, timeout=30,
+        ).stdout.strip()
+        return float(out)
+    except (OSError, ValueError, subprocess.TimeoutExpired):
+        return None
+
+
+@dataclass
+class WavInfo:
+    rate: int
+    channels: int
+    bits: int
+    frames: int
+
+    @property
+    def duration(self) -> float:
+        return self.frames / self.rate if self.rate else 0.0
+
+
+def wav_info(path: str) -> WavInfo | None:
+    """Format and length of a WAV file from its chunk headers alone.
+
+    Nothing is decoded, so float and ``WAVE_FORMAT_EXTENSIBLE`` files work
+    as well as PCM, and a ``data`` chunk whose size was never filled in
+    (streamed output) is measured up to the end of the file.  None if
+    ``path`` is not a RIFF/WAVE file.
+    """
+    try:
+        with open(path, "rb") as f:
+            riff = f.read(12)
+            if len(riff) < 12 or riff[:4] not in (b"RIFF", b"RF64") or riff[8:12] != b"WAVE":
+                return None
+            end = os.fstat(f.fileno()).st_size
+            fmt = None
+            while True:
+                head = f.read(8)
+                if len(head) < 8:
+                    return None
+                chunk, size = head[:4], struct.unpack("<I", head[4:])[0]
+                if chunk == b"fmt ":
+                    body = f.read(size + (size & 1))
+                    if len(body) < 16:
+                        return None
+                    _, channels, rate, _, align, bits = struct.unpack("<HHIIHH", body[:16])
+                    fmt = (rate, channels, bits, align or max(1, channels * bits // 8))
+                elif chunk == b"data":
+                    if fmt is None:
+                        return None
+                    start = f.tell()
+                    if size in (0, 0xFFFFFFFF) or start + size > end:
+                        size = end - start
+                    rate, channels, bits, align = fmt
+                    return WavInfo(rate, channels, bits, size // align)
+                else:
+                    f.seek(size + (size & 1), os.SEEK_CUR)
+    except (OSError, struct.error):
+        return None
@@ -0,0 +1,404 @@
+"""Plan LTX clip lengths and counts from the narration audio.
+
+The scripts used to work clip counts out by hand ("29.12s -> 3 clips,
+cycled", "97 frames @25fps = 3.88s -> 116 comp frames") and then render
+every clip at a fixed ``length=97`` or ``161``, throwing away whatever ran
+past the end of the scene.  ``plan_clips`` starts from the per-scene WAV
+durations instead and, for each scene, picks the fewest clips that can
+cover narration plus crossfades and the shortest LTX-valid lengths
+(``8k+1`` frames) that do it, so at most a few frames per scene are
+rendered and never shown.
+
+The plan is written to ``public/clip-plan.json``.  Clip scripts read each
+clip's ``length`` from it (``ClipPlan.length_for``); so far only
+``generate-healthcare-clips.py`` does, and it refuses a plan whose clips
+do not match its own (``ClipPlan.mismatches``).  Each scene also records
+where its clips would fall in composition frames, to check the plan by;
+no Remotion composition places clips from it.
+
+    python3 -m pipeline.plan --scenes 0,1,3,4 --max-clips 3
+
+Clip rendering need not wait for TTS: ``--predict CONFIG`` plans from the
+upper bound of each scene's predicted narration (``pipeline.tts.predict``).
+Planning again from the real audio keeps every clip that still covers its
+scene and lists the scenes whose clips have to be rendered again.
+
+    python3 -m pipeline.plan --predict configs/x.json    # before TTS
+    python3 -m pipeline.plan                             # after TTS
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import os
+import re
+import string
+import sys
+import tempfile
+from dataclasses import dataclass, field
+
+from pipeline.media import probe_duration, wav_info
+
+LTX_FPS = 25            # frame rate of the LTX-2.3 templates
+COMP_FPS = 30           # Remotion composition frame rate
+CROSSFADE = 8           # composition frames two clips overlap at a cut
+MIN_FRAMES = 49         # shortest clip worth a prompt (~2s)
+MAX_FRAMES = 161        # longest clip before LTX motion starts to drift
+
+DEFAULT_AUDIO_DIR = "public/audio"
+DEFAULT_PLAN_PATH = "public/clip-plan.json"
+
+
+def ltx_length(frames: int) -> int:
+    """Round ``frames`` up to the next length LTX accepts (8k + 1)."""
+    return max(1, 8 * math.ceil((frames - 1) / 8) + 1)
+
+
+def comp_frames(length: int, fps: int = COMP_FPS, ltx_fps: int = LTX_FPS) -> int:
+    """Whole composition frames an LTX clip of ``length`` frames lasts."""
+    return length * fps // ltx_fps
+
+
+def wav_duration(path: str) -> float | None:
+    """Duration of an audio file in seconds; WAV from its header, else ffprobe."""
+    info = wav_info(path)
+    if info is not None and info.rate:
+        return info.duration
+    return probe_duration(path) if os.path.exists(path) else None
+
+
+# ---------------------------------------------------------------------------
+# Plan
+# ---------------------------------------------------------------------------
+
+@dataclass
+class PlannedClip:
+    name: str                   # output file, e.g. scene-0-a.mp4
+    length: int                 # LTX frames to render (8k + 1)
+
+    @property
+    def seconds(self) -> float:
+        return self.length / LTX_FPS
+
+
+@dataclass
+class ScenePlan:
+    index: int
+    duration: float             # narration seconds
+    frames: int                 # composition frames, including padding
+    start: int = 0              # first composition frame of the scene
+    clips: list[PlannedClip] = field(default_factory=list)
+    cycled: bool = False        # clips repeat because max_clips was reached
+    timeline: list[dict] = field(default_factory=list)
+    predicted: dict | None = None   # seconds / low / high, when planned ahead of TTS
+
+    @property
+    def rendered_frames(self) -> int:
+        return sum(c.length for c in self.clips)
+
+    @property
+    def wasted_frames(self) -> int:
+        """Composition frames rendered but never on screen."""
+        if self.cycled or not self.clips:
+            return 0
+        shown = sum(t["durationInFrames"] for t in self.timeline)
+        return sum(comp_frames(c.length) for c in self.clips) - shown
+
+
+@dataclass
+class ClipPlan:
+    scenes: list[ScenePlan]
+    fps: int = COMP_FPS
+    ltx_fps: int = LTX_FPS
+    crossfade: int = CROSSFADE
+
+    @property
+    def total_frames(self) -> int:
+        return sum(s.frames for s in self.scenes)
+
+    @property
+    def rendered_seconds(self) -> float:
+        return sum(s.rendered_frames for s in self.scenes) / self.ltx_fps
+
+    @property
+    def wasted_seconds(self) -> float:
+        return sum(s.wasted_frames for s in self.scenes) / self.fps
+
+    def clips(self) -> list[PlannedClip]:
+        return [c for s in self.scenes for c in s.clips]
+
+    def length_for(self, name: str, default: int | None = None) -> int | None:
+        """Planned length of the clip rendered to ``name`` (basename match)."""
+        name = os.path.basename(name)
+        for clip in self.clips():
+            if clip.name == name:
+                return clip.length
+        return default
+
+    def mismatches(self, names) -> list[str]:
+        """Where the clip files ``names`` of a script and this plan disagree.
+
+        A plan made for another video leaves clips unplanned or plans clips
+        the script has no prompt for; its lengths must not be used.
+        """
+        names = {os.path.basename(n) for n in names}
+        scenes = {s.index for s in self.scenes}
+        problems = [f"{name}: planned, but not one of the script's clips"
+                    for name in sorted({c.name for c in self.clips()} - names)]
+        for name in sorted(names):
+            m = re.match(r"scene-(\d+)-", name)
+            if m and int(m.group(1)) not in scenes:
+                problems.append(f"{name}: scene {m.group(1)} is not in the plan")
+        return problems
+
+    def summary(self) -> str:
+        lines = []
+        for s in self.scenes:
+            lengths = "+".join(str(c.length) for c in s.clips) or "-"
+            note = ", cycled" if s.cycled else ""
+            lines.append(f"  scene {s.index}: {s.duration:.2f}s -> {s.frames} frames, "
+                         f"{len(s.clips)} clip(s) [{lengths}]{note}")
+        lines.append(f"{len(self.clips())} clips, {self.rendered_seconds:.2f}s of LTX "
+                     f"output, {self.wasted_seconds:.2f}s never shown")
+        return "\n".join(lines)
+
+    def to_dict(self) -> dict:
+        return {
+            "fps": self.fps,
+            "ltxFps": self.ltx_fps,
+            "crossfadeFrames": self.crossfade,
+            "totalFrames": self.total_frames,
+            "scenes": [{
+                "index": s.index,
+                "duration": round(s.duration, 3),
+                "frames": s.frames,
+                "start": s.start,
+                "cycled": s.cycled,
+                "clips": [{"name": c.name, "length": c.length} for c in s.clips],
+                "timeline": s.timeline,
+                **({"predicted": s.predicted} if s.predicted else {}),
+            } for s in self.scenes],
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "ClipPlan":
+        scenes = [ScenePlan(s["index"], s["duration"], s["frames"], s.get("start", 0),
+                            [PlannedClip(c["name"], c["length"]) for c in s["clips"]],
+                            s.get("cycled", False), s.get("timeline", []),
+                            s.get("predicted"))
+                  for s in data["scenes"]]
+        return cls(scenes, data.get("fps", COMP_FPS), data.get("ltxFps", LTX_FPS),
+                   data.get("crossfadeFrames", CROSSFADE))
+
+    def save(self, path: str = DEFAULT_PLAN_PATH):
+        """Write the plan as JSON, atomically."""
+        folder = os.path.dirname(path) or "."
+        os.makedirs(folder, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=folder, prefix=".clip-plan-")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(self.to_dict(), f, indent=2)
+                f.write("\n")
+            os.replace(tmp, path)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+            raise
+
+    @classmethod
+    def load(cls, path: str = DEFAULT_PLAN_PATH) -> "ClipPlan | None":
+        """The saved plan, or None when there is none."""
+        try:
+            with open(path) as f:
+                return cls.from_dict(json.load(f))
+        except FileNotFoundError:
+            return None
+
+
+# ---------------------------------------------------------------------------
+# Planning
+# ---------------------------------------------------------------------------
+
+def _clip_name(scene: int, i: int) -> str:
+    return f"scene-{scene}-{string.ascii_lowercase[i]}.mp4"
+
+
+def _split(need: int, n: int, min_frames: int, max_frames: int) -> list[int]:
+    """Shortest valid lengths for ``n`` clips giving ``need`` composition frames."""
+    lengths = [ltx_length(min_frames)] * n
+    while sum(comp_frames(L) for L in lengths) < need:
+        i = lengths.index(min(lengths))
+        if lengths[i] >= max_frames:
+            break
+        lengths[i] += 8
+    # Longest first: the last clip is the one that gets trimmed.
+    return sorted(lengths, reverse=True)
+
+
+def _timeline(clips: list[PlannedClip], frames: int, crossfade: int) -> list[dict]:
+    """``<Sequence>`` placements, in scene-relative composition frames."""
+    timeline, t, i = [], 0, 0
+    while clips and t < frames:
+        clip = clips[i % len(clips)]
+        shown = min(comp_frames(clip.length), frames - t)
+        timeline.append({"clip": clip.name, "from": t, "durationInFrames": shown})
+        if t + shown >= frames:
+            break
+        t += shown - crossfade
+        i += 1
+    return timeline
+
+
+def plan_scene(index: int, duration: float, *, max_clips: int | None = None,
+               min_clips: int = 1, pad: int = 0, crossfade: int = CROSSFADE,
+               min_frames: int = MIN_FRAMES, max_frames: int = MAX_FRAMES) -> ScenePlan:
+    """Clips for one scene of ``duration`` seconds plus ``pad`` frames."""
+    frames = math.ceil(round(duration * COMP_FPS, 6)) + pad
+    max_frames = ltx_length(max_frames)
+    cap = comp_frames(max_frames)
+    if cap <= crossfade:
+        raise ValueError(f"max_frames={max_frames} is shorter than the crossfade")
+    # n clips show n * cap - (n - 1) * crossfade frames at most.
+    n = max(min_clips, math.ceil((frames - crossfade) / (cap - crossfade)))
+    cycled = max_clips is not None and n > max_clips
+    if cycled:
+        lengths = [max_frames] * max_clips
+    else:
+        lengths = _split(frames + (n - 1) * crossfade, n, min_frames, max_frames)
+    clips = [PlannedClip(_clip_name(index, i), L) for i, L in enumerate(lengths)]
+    return ScenePlan(index, duration, frames, clips=clips, cycled=cycled,
+                     timeline=_timeline(clips, frames, crossfade))
+
+
+def plan_clips(durations: dict[int, float], *, video_scenes=None,
+               max_clips: int | dict[int, int] | None = None, **kwargs) -> ClipPlan:
+    """Plan every scene; only ``video_scenes`` (default: all) get clips.
+
+    ``max_clips`` caps the clips per scene (a number, or a dict by scene);
+    longer scenes cycle through their clips.  Other keyword arguments go
+    to ``plan_scene``.
+    """
+    scenes, start = [], 0
+    for index in sorted(durations):
+        cap = max_clips.get(index) if isinstance(max_clips, dict) else max_clips
+        scene = plan_scene(index, durations[index], max_clips=cap, **kwargs)
+        if video_scenes is not None and index not in video_scenes:
+            scene.clips, scene.timeline = [], []
+        scene.start = start
+        start += scene.frames
+        scenes.append(scene)
+    return ClipPlan(scenes, crossfade=kwargs.get("crossfade", CROSSFADE))
+
+
+def _shows(clips: list[PlannedClip], frames: int, crossfade: int, cycled: bool) -> bool:
+    """True if ``clips`` fill ``frames`` composition frames without running out."""
+    if cycled:
+        return True
+    shown = sum(comp_frames(c.length) for c in clips) - crossfade * max(0, len(clips) - 1)
+    return shown >= frames
+
+
+def reconcile(ahead: ClipPlan, plan: ClipPlan) -> list[int]:
+    """Keep the clips of ``ahead`` wherever they still cover ``plan``'s scenes.
+
+    ``ahead`` was made before the audio existed and its clips may already be
+    rendering.  A scene whose clips still last long enough keeps them, with
+    its timeline cut to the real length; the others keep ``plan``'s new
+    clips.  Returns the indexes of the scenes whose clips changed.
+    """
+    old = {s.index: s for s in ahead.scenes}
+    changed = []
+    for scene in plan.scenes:
+        before = old.get(scene.index)
+        if before is None or not scene.clips:
+            if scene.clips:
+                changed.append(scene.index)
+            continue
+        # Carried over so that planning again keeps reconciling with these clips.
+        scene.predicted = before.predicted
+        if before.clips and _shows(before.clips, scene.frames, plan.crossfade, before.cycled):
+            scene.clips, scene.cycled = before.clips, before.cycled
+            scene.timeline = _timeline(scene.clips, scene.frames, plan.crossfade)
+        else:
+            changed.append(scene.index)
+    return changed
+
+
+def predicted_durations(config: str) -> tuple[dict[int, float], dict[int, dict]]:
+    """Upper-bound narration per scene of ``config``, and the full predictions."""
+    from pipeline.tts.predict import predict_config
+
+    predictions = predict_config(config)
+    return ({i: p.high for i, p in predictions.items()},
+            {i: p.to_dict() for i, p in predictions.items()})
+
+
+def scene_durations(audio_dir: str = DEFAULT_AUDIO_DIR,
+                    pattern: str = "scene-{}.wav") -> dict[int, float]:
+    """Narration length of every ``scene-N.wav`` in ``audio_dir``."""
+    durations = {}
+    index = 0
+    while True:
+        path = os.path.join(audio_dir, pattern.format(index))
+        if not os.path.exists(path):
+            break
+        duration = wav_duration(path)
+        if duration is None:
+            raise ValueError(f"cannot read the duration of {path}")
+        durations[index] = duration
+        index += 1
+    return durations
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="python3 -m pipeline.plan",
+                                     description="Plan LTX clips from scene audio.")
+    parser.add_argument("--audio-dir", default=DEFAULT_AUDIO_DIR)
+    parser.add_argument("--pattern", default="scene-{}.wav",
+                        help="audio file name, {} is the scene index")
+    parser.add_argument("--scenes", default="",
+                        help="comma-separated scenes that get video clips (default: all)")
+    parser.add_argument("--max-clips", type=int, default=None,
+                        help="clips per scene before they are cycled")
+    parser.add_argument("--pad", type=int, default=0, help="frames added to each scene")
+    parser.add_argument("--max-frames", type=int, default=MAX_FRAMES)
+    parser.add_argument("--predict", metavar="CONFIG", default=None,
+                        help="plan from the predicted narration of a video config, "
+                             "before its audio exists")
+    parser.add_argument("--out", default=DEFAULT_PLAN_PATH)
+    args = parser.parse_args(argv)
+
+    predicted = {}
+    if args.predict:
+        durations, predicted = predicted_durations(args.predict)
+    else:
+        durations = scene_durations(args.audio_dir, args.pattern)
+    if not durations:
+        source = args.predict or f"{args.pattern.format('N')} files in {args.audio_dir}"
+        print(f"no scenes: {source}", file=sys.stderr)
+        return 1
+    video = {int(s) for s in args.scenes.split(",") if s.strip()} or None
+    plan = plan_clips(durations, video_scenes=video, max_clips=args.max_clips,
+                      pad=args.pad, max_frames=args.max_frames)
+    for scene in plan.scenes:
+        scene.predicted = predicted.get(scene.index)
+    ahead = None if args.predict else ClipPlan.load(args.out)
+    if ahead is not None and any(s.predicted for s in ahead.scenes):
+        changed = reconcile(ahead, plan)
+        for scene in plan.scenes:
+            p = next((s.predicted for s in ahead.scenes if s.index == scene.index), None)
+            if p:
+                note = "re-render" if scene.index in changed else "kept"
+                print(f"  scene {scene.index}: {scene.duration:.2f}s, predicted "
+                      f"{p['low']:.2f}-{p['high']:.2f}s -> clips {note}")
+        print(f"Scenes to render again: {', '.join(map(str, changed)) or 'none'}")
+    plan.save(args.out)
+    print(plan.summary())
+    print(f"Wrote {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
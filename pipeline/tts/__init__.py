@@ -0,0 +1,53 @@
+"""Narration helpers shared by the TTS scripts."""
+
+from .bundle import VoiceBundle, VoiceBundleError, build_bundle, bundled
+from .cache import AudioCache, speech_key
+from .client import (
+    DEFAULT_TTS_URL,
+    TTSAudioError,
+    TTSClient,
+    TTSConnectionError,
+    TTSError,
+    TTSHTTPError,
+    TTSJob,
+    TTSResult,
+    Voice,
+    load_voices,
+    print_result,
+    summarize,
+    voices_from_cfg,
+)
+from .manifest import AudioManifest, build_manifest, write_manifest
+from .post import PostResult, postprocess, postprocess_many
+from .predict import DurationModel, Prediction, predict_config
+
+__all__ = [
+    "AudioCache",
+    "AudioManifest",
+    "DEFAULT_TTS_URL",
+    "DurationModel",
+    "PostResult",
+    "Prediction",
+    "TTSAudioError",
+    "TTSClient",
+    "TTSConnectionError",
+    "TTSError",
+    "TTSHTTPError",
+    "TTSJob",
+    "TTSResult",
+    "Voice",
+    "VoiceBundle",
+    "VoiceBundleError",
+    "build_bundle",
+    "build_manifest",
+    "bundled",
+    "load_voices",
+    "postprocess",
+    "postprocess_many",
+    "predict_config",
+    "print_result",
+    "speech_key",
+    "summarize",
+    "voices_from_cfg",
+    "write_manifest",
+]
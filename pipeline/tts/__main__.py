@@ -0,0 +1,162 @@
+"""Maintenance commands: ``python3 -m pipeline.tts <command> ...``."""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+
+from .bundle import VoiceBundleError, build_bundle
+from .cache import DEFAULT_CACHE_DIR, DEFAULT_MAX_MB, AudioCache
+from .client import load_voices
+from .manifest import DEFAULT_AUDIO_DIR, DEFAULT_FPS, DEFAULT_TAIL, scene_paths, write_manifest
+from .post import postprocess_many, print_post
+from .predict import DurationModel, default_model_path, predict_config
+
+
+def cmd_cache(argv: list[str]) -> int:
+    """cache [clear | evict] -- inspect or prune the narration cache."""
+    cache = AudioCache(os.environ.get("TTS_CACHE_DIR") or DEFAULT_CACHE_DIR,
+                       int(float(os.environ.get("TTS_CACHE_MAX_MB", DEFAULT_MAX_MB)) * (1 << 20)))
+    if argv[:1] == ["clear"]:
+        cache.clear()
+        print(f"Cleared the narration lines in {cache.root}")
+        return 0
+    if argv[:1] == ["evict"]:
+        print(f"Dropped {cache.evict()} line(s) over {cache.max_bytes / (1 << 20):.0f} MB")
+        return 0
+    entries = cache.entries()
+    size = sum(size for _, size, _ in entries)
+    print(f"{cache.root}: {len(entries)} lines, {size / (1 << 20):.1f} MB "
+          f"of {cache.max_bytes / (1 << 20):.0f} MB")
+    return 0
+
+
+def cmd_bundle(argv: list[str]) -> int:
+    """bundle [CONFIG...] -- build the reference-voice bundles of video configs."""
+    status = 0
+    for config in argv or ["configs/default.json"]:
+        for name, voice in load_voices(config).items():
+            try:
+                bundle = build_bundle(voice)
+            except (VoiceBundleError, OSError) as e:
+                print(f"  {name}: {e}", file=sys.stderr)
+                status = 1
+                continue
+            print(f"  {name}: {bundle.source} {bundle.source_bytes / 1024:.0f} KB -> "
+                  f"{bundle.size / 1024:.0f} KB, {bundle.duration:.2f}s at {bundle.rate} Hz")
+    return status
+
+
+def cmd_predict(argv: list[str]) -> int:
+    """predict [--fit] [--config CONFIG | --voice NAME TEXT...] -- narration length."""
+    parser = argparse.ArgumentParser(prog="python3 -m pipeline.tts predict")
+    parser.add_argument("--fit", action="store_true",
+                        help="refit the model from the narration cache first")
+    parser.add_argument("--config", help="predict every scene of a video config")
+    parser.add_argument("--voice", default="*")
+    parser.add_argument("text", nargs="*")
+    args = parser.parse_args(argv)
+
+    if args.fit:
+        cache = AudioCache(os.environ.get("TTS_CACHE_DIR") or DEFAULT_CACHE_DIR)
+        model = DurationModel.from_cache(cache)
+        model.save()
+        for key, fit in model.fits.items():
+            a, b, c = fit.weights
+            print(f"  {key}: {a:.2f}s + {b:.3f}s/syllable + {c:.2f}s/pause, "
+                  f"+/-{fit.rel_sd * 100:.0f}% over {fit.n} line(s)")
+        print(f"Wrote {default_model_path()}")
+    else:
+        model = DurationModel.load()
+    if args.config:
+        for index, p in predict_config(args.config, model).items():
+            print(f"  scene {index}: {p.seconds:.2f}s ({p.low:.2f}-{p.high:.2f})")
+    for text in args.text:
+        p = model.predict(text, args.voice)
+        print(f"  {p.seconds:.2f}s ({p.low:.2f}-{p.high:.2f}, {p.samples} line(s) of history)")
+    return 0
+
+
+def cmd_manifest(argv: list[str]) -> int:
+    """manifest [--config CONFIG] [--pattern P] [--pad N] -- write manifest.json."""
+    parser = argparse.ArgumentParser(prog="python3 -m pipeline.tts manifest")
+    parser.add_argument("--config", help="video config embedded in the manifest; "
+                                         "also fixes the number of scenes")
+    parser.add_argument("--audio-dir", default=DEFAULT_AUDIO_DIR)
+    parser.add_argument("--pattern", default="scene-{}.wav",
+                        help="audio file name, {} is the scene index")
+    parser.add_argument("--fps", type=int, default=DEFAULT_FPS)
+    parser.add_argument("--pad", type=int, default=0, help="frames added to each scene")
+    parser.add_argument("--crossfade", type=int, default=0,
+                        help="frames each scene overlaps the next")
+    parser.add_argument("--tail", type=int, default=DEFAULT_TAIL,
+                        help="frames after the last scene")
+    parser.add_argument("--out", default=None,
+                        help="default: manifest.json in the audio folder")
+    args = parser.parse_args(argv)
+
+    config = None
+    if args.config:
+        with open(args.config) as f:
+            config = json.load(f)
+    count = len(config.get("scenes", [])) if config else None
+    paths = scene_paths(args.audio_dir, args.pattern, count)
+    if count is not None and len(paths) < count:
+        missing = sorted(set(range(count)) - set(paths))
+        print(f"missing audio for scene(s) {', '.join(map(str, missing))}", file=sys.stderr)
+        return 1
+    if not paths:
+        print(f"no {args.pattern.format('N')} files in {args.audio_dir}", file=sys.stderr)
+        return 1
+    try:
+        manifest = write_manifest(paths, args.out, fps=args.fps, pad=args.pad,
+                                  crossfade=args.crossfade, tail=args.tail, config=config)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 1
+    print(manifest.table())
+    print(f"Wrote {args.out or os.path.join(args.audio_dir, 'manifest.json')}")
+    return 0
+
+
+def cmd_post(argv: list[str]) -> int:
+    """post [--audio-dir D] [--pattern P] [FILE...] -- trim, normalize, resample."""
+    parser = argparse.ArgumentParser(prog="python3 -m pipeline.tts post")
+    parser.add_argument("--audio-dir", default=DEFAULT_AUDIO_DIR)
+    parser.add_argument("--pattern", default="scene-{}.wav",
+                        help="audio file name, {} is the scene index")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("files", nargs="*", help="default: every PATTERN file")
+    args = parser.parse_args(argv)
+
+    paths = args.files or list(scene_paths(args.audio_dir, args.pattern).values())
+    if not paths:
+        print(f"no {args.pattern.format('N')} files in {args.audio_dir}", file=sys.stderr)
+        return 1
+    results = postprocess_many(paths, workers=args.workers)
+    print_post(results)
+    return 0 if all(r.ok for r in results) else 1
+
+
+COMMANDS = {
+    "cache": cmd_cache,
+    "bundle": cmd_bundle,
+    "predict": cmd_predict,
+    "manifest": cmd_manifest,
+    "post": cmd_post,
+}
+
+
+def main(argv: list[str]) -> int:
+    if not argv or argv[0] not in COMMANDS:
+        print(__doc__.strip())
+        for fn in COMMANDS.values():
+            print(f"  {fn.__doc__}")
+        return 2
+    return COMMANDS[argv[0]](argv[1:])
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
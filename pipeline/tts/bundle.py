@@ -0,0 +1,191 @@
+"""Preprocessed reference clips ("voice bundles") for clone-tts requests.
+
+Every line of narration uploads its voice's reference clip, and the server
+decodes and resamples it again each time.  ``voices/pad.wav`` is a 44.1 kHz
+recording with silence at both ends; VoxCPM only listens to 16 kHz mono.
+``build_bundle`` trims the leading and trailing silence, downmixes to mono,
+resamples to ``TTS_REF_RATE`` (default 16000) as 16-bit PCM and checks
+that what is left lasts 3-10 s, the window the endpoint is made for.  The
+result is stored next to the narration cache (``<TTS_CACHE_DIR>/voices``)
+as ``<key>.wav`` plus a ``<key>.json`` with the transcript, keyed on the
+source clip's bytes and the settings, so it is built once per clip.
+
+``TTSClient`` bundles every voice it is given (``TTS_VOICE_BUNDLE=off``
+sends the raw clip) and memory-maps the bundle, so all requests share one
+copy.  A clip that cannot be bundled, such as one longer than 10 s, is
+sent as it is with a warning.
+
+    python3 -m pipeline.tts bundle configs/default.json
+"""
+
+from __future__ import annotations
+
+import json
+import math
+import os
+import tempfile
+import wave
+from dataclasses import dataclass, replace
+
+import numpy as np
+from scipy.signal import resample_poly
+
+from pipeline.comfy.client import file_digest
+
+from .cache import DEFAULT_CACHE_DIR
+from .client import TTSError, Voice
+
+BUNDLE_VERSION = 1
+DEFAULT_REF_RATE = int(os.environ.get("TTS_REF_RATE", "16000"))
+MIN_REF_SECONDS, MAX_REF_SECONDS = 3.0, 10.0
+
+SILENCE_DBFS = -45.0            # RMS of a 10 ms window below this is silence
+KEEP_SILENCE = 0.08             # seconds left before and after the speech
+
+
+class VoiceBundleError(TTSError):
+    """A reference clip cannot be turned into a bundle."""
+
+
+# ---------------------------------------------------------------------------
+# Signal
+# ---------------------------------------------------------------------------
+
+def read_mono(path: str) -> tuple[np.ndarray, int]:
+    """Samples of a PCM WAV in [-1, 1] (float64), channels averaged, and its rate."""
+    try:
+        with wave.open(path, "rb") as w:
+            channels, width, rate = w.getnchannels(), w.getsampwidth(), w.getframerate()
+            raw = w.readframes(w.getnframes())
+    except (EOFError, wave.Error) as e:
+        raise VoiceBundleError(f"{path}: not a PCM WAV file ({e})") from e
+    if width == 1:
+        samples = (np.frombuffer(raw, np.uint8).astype(np.float64) - 128) / 128
+    elif width == 2:
+        samples = np.frombuffer(raw, "<i2") / 32768
+    elif width == 3:
+        b = np.frombuffer(raw[:len(raw) - len(raw) % 3], np.uint8).reshape(-1, 3).astype(np.int32)
+        value = b[:, 0] | b[:, 1] << 8 | b[:, 2] << 16
+        samples = np.where(value >= 1 << 23, value - (1 << 24), value) / float(1 << 23)
+    elif width == 4:
+        samples = np.frombuffer(raw, "<i4") / float(1 << 31)
+    else:
+        raise VoiceBundleError(f"{path}: unsupported sample width {width}")
+    if channels > 1:
+        samples = samples[:len(samples) - len(samples) % channels]
+        samples = samples.reshape(-1, channels).mean(axis=1)
+    return samples, rate
+
+
+def trim_silence(samples: np.ndarray, rate: int, *, threshold_dbfs: float = SILENCE_DBFS,
+                 keep: float = KEEP_SILENCE) -> np.ndarray:
+    """``samples`` without the silence before the first and after the last sound."""
+    samples = np.asarray(samples, dtype=np.float64)
+    window = max(1, rate // 100)
+    level = 10 ** (threshold_dbfs / 20)
+    windows = -(-len(samples) // window)
+    padded = np.zeros(windows * window)
+    padded[:len(samples)] = samples ** 2
+    sums = padded.reshape(windows, window).sum(axis=1)
+    # The last window may be short: average over the samples it really has.
+    counts = np.full(windows, window)
+    if windows:
+        counts[-1] = len(samples) - (windows - 1) * window
+    loud = np.flatnonzero(np.sqrt(sums / np.maximum(counts, 1)) >= level) * window
+    if not len(loud):
+        return samples[:0]
+    pad = int(keep * rate)
+    return samples[max(0, loud[0] - pad):min(len(samples), loud[-1] + window + pad)]
+
+
+def resample(samples: np.ndarray, src: int, dst: int) -> np.ndarray:
+    """Resample to ``dst`` Hz with a polyphase anti-aliasing filter."""
+    samples = np.asarray(samples, dtype=np.float64)
+    if src == dst or not len(samples):
+        return samples.copy()
+    g = math.gcd(src, dst)
+    return resample_poly(samples, dst // g, src // g)
+
+
+def write_pcm16(path: str, samples: np.ndarray, rate: int):
+    pcm = np.clip(np.round(np.asarray(samples) * 32767), -32768, 32767).astype("<i2")
+    with wave.open(path, "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(rate)
+        w.writeframes(pcm.tobytes())
+
+
+# ---------------------------------------------------------------------------
+# Bundles
+# ---------------------------------------------------------------------------
+
+@dataclass
+class VoiceBundle:
+    path: str                   # the preprocessed WAV
+    ref_text: str
+    rate: int
+    duration: float
+    source: str
+    source_bytes: int
+
+    @property
+    def size(self) -> int:
+        return os.path.getsize(self.path)
+
+
+def bundle_dir() -> str:
+    return os.path.join(os.environ.get("TTS_CACHE_DIR") or DEFAULT_CACHE_DIR, "voices")
+
+
+def build_bundle(voice: Voice, *, rate: int = DEFAULT_REF_RATE,
+                 folder: str | None = None) -> VoiceBundle:
+    """The bundle for ``voice``, built on first use.
+
+    Raises ``VoiceBundleError`` if the clip is unreadable or its speech
+    does not last between 3 and 10 seconds.
+    """
+    folder = folder or bundle_dir()
+    digest, source_bytes = file_digest(voice.ref_audio)
+    key = f"{digest[:32]}-{rate}-v{BUNDLE_VERSION}"
+    wav, sidecar = os.path.join(folder, key + ".wav"), os.path.join(folder, key + ".json")
+    try:
+        with open(sidecar) as f:
+            meta = json.load(f)
+        if os.path.isfile(wav):
+            return VoiceBundle(wav, voice.ref_text, rate, meta["duration"],
+                               voice.ref_audio, source_bytes)
+    except (OSError, ValueError, KeyError):
+        pass
+
+    samples, src_rate = read_mono(voice.ref_audio)
+    samples = resample(trim_silence(samples, src_rate), src_rate, rate)
+    duration = len(samples) / rate
+    if not MIN_REF_SECONDS <= duration <= MAX_REF_SECONDS:
+        raise VoiceBundleError(
+            f"{voice.ref_audio}: {duration:.1f}s of speech after trimming; reference "
+            f"clips need {MIN_REF_SECONDS:.0f}-{MAX_REF_SECONDS:.0f}s")
+
+    os.makedirs(folder, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=folder, prefix=".tmp-", suffix=".wav")
+    os.close(fd)
+    try:
+        write_pcm16(tmp, samples, rate)
+        os.replace(tmp, wav)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
+    meta = {"source": os.path.abspath(voice.ref_audio), "sha256": digest,
+            "ref_text": voice.ref_text, "rate": rate, "duration": duration,
+            "version": BUNDLE_VERSION}
+    fd, tmp = tempfile.mkstemp(dir=folder, prefix=".tmp-")
+    with os.fdopen(fd, "w") as f:
+        json.dump(meta, f, indent=2, ensure_ascii=False)
+    os.replace(tmp, sidecar)
+    return VoiceBundle(wav, voice.ref_text, rate, duration, voice.ref_audio, source_bytes)
+
+
+def bundled(voice: Voice, **kwargs) -> Voice:
+    """``voice`` pointing at its bundle instead of the raw clip."""
+    return replace(voice, ref_audio=build_bundle(voice, **kwargs).path)
@@ -0,0 +1,200 @@
+"""Content-addressed cache of synthesized narration.
+
+A line is only sent to the TTS server when no earlier run produced it:
+the key covers the reference clip's bytes, its transcript, the text and
+every sampling setting (``cfg_value``, ``steps``, ``normalize``,
+``denoise``), so a visual-only rerun of a script makes no TTS calls at all,
+while a changed word or a new reference clip renders again.  File names do
+not matter.
+
+Entries live under ``TTS_CACHE_DIR`` (default
+``~/.cache/zkagi-video-engine/tts``) as ``<key>.wav`` plus ``<key>.json``.
+Hits are hardlinked into ``public/audio`` (copied across filesystems), so
+a cached line costs no disk space twice.  Every hit refreshes the entry's
+mtime; when the cache grows past ``TTS_CACHE_MAX_MB`` (default 1024) the
+least recently used entries are dropped.  ``TTS_CACHE=off`` bypasses it.
+
+    python3 -m pipeline.tts cache           # stats
+    python3 -m pipeline.tts cache clear
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+
+from pipeline.comfy.client import file_digest
+
+CACHE_VERSION = 1
+
+DEFAULT_CACHE_DIR = os.path.join(
+    os.environ.get("XDG_CACHE_HOME", os.path.expanduser("~/.cache")),
+    "zkagi-video-engine", "tts")
+DEFAULT_MAX_MB = 1024
+
+_SHARD = re.compile(r"[0-9a-f]{2}")
+
+
+def speech_key(ref_sha256: str, text: str, fields: dict) -> str:
+    """Hex SHA-256 of everything that changes the synthesized audio."""
+    payload = json.dumps({"v": CACHE_VERSION, "ref": ref_sha256, "text": text,
+                          **fields}, sort_keys=True, separators=(",", ":"),
+                         ensure_ascii=False)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class AudioCache:
+    """On-disk narration store; safe to share between concurrent scripts."""
+
+    def __init__(self, root: str = DEFAULT_CACHE_DIR, max_bytes: int = DEFAULT_MAX_MB << 20):
+        self.root = root
+        self.max_bytes = max_bytes
+        self._refs: dict[tuple, str] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> "AudioCache | None":
+        if os.environ.get("TTS_CACHE", "").lower() in ("0", "off", "no", "false"):
+            return None
+        return cls(os.environ.get("TTS_CACHE_DIR") or DEFAULT_CACHE_DIR,
+                   int(float(os.environ.get("TTS_CACHE_MAX_MB", DEFAULT_MAX_MB)) * (1 << 20)))
+
+    def __repr__(self):
+        return f"AudioCache({self.root!r})"
+
+    def path(self, key: str, ext: str = ".wav") -> str:
+        return os.path.join(self.root, key[:2], key + ext)
+
+    def ref_digest(self, path: str) -> str:
+        """SHA-256 of a reference clip, hashed once per file version."""
+        st = os.stat(path)
+        ident = (os.path.abspath(path), st.st_size, st.st_mtime_ns)
+        with self._lock:
+            digest = self._refs.get(ident)
+        if digest is None:
+            digest = file_digest(path)[0]
+            with self._lock:
+                self._refs[ident] = digest
+        return digest
+
+    def key(self, voice, text: str) -> str:
+        return speech_key(self.ref_digest(voice.ref_audio), text, voice.fields())
+
+    def meta(self, key: str) -> dict | None:
+        try:
+            with open(self.path(key, ".json")) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    # -- store ----------------------------------------------------------------
+
+    def _place(self, src: str, dest: str):
+        """Hardlink ``src`` to ``dest`` atomically, copying across devices."""
+        if os.path.exists(dest) and os.path.samefile(src, dest):
+            return      # already linked; renaming onto it would be a no-op
+        folder = os.path.dirname(dest) or "."
+        os.makedirs(folder, exist_ok=True)
+        tmp = os.path.join(folder, f".tmp-{uuid.uuid4().hex}")
+        try:
+            try:
+                os.link(src, tmp)
+            except OSError:
+                shutil.copyfile(src, tmp)
+            os.replace(tmp, dest)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+            raise
+
+    def get(self, key: str, dest: str) -> bool:
+        """Materialize the entry for ``key`` at ``dest``; False on a miss.
+
+        The entry's checksum is verified first: anything that rewrote a
+        hardlinked output in place rewrote the cached copy too, and such
+        an entry is dropped rather than served.
+        """
+        meta = self.meta(key)
+        wav = self.path(key)
+        if meta is None or not os.path.isfile(wav):
+            return False
+        if file_digest(wav) != (meta.get("sha256"), meta.get("size")):
+            self.remove(key)
+            return False
+        self._place(wav, dest)
+        try:
+            os.utime(wav)
+        except OSError:
+            pass
+        return True
+
+    def put(self, key: str, src: str, **meta):
+        """Store the audio at ``src`` under ``key`` (audio first, then metadata)."""
+        self._place(src, self.path(key))
+        digest, size = file_digest(self.path(key))
+        record = {"key": key, "created": time.time(), "sha256": digest, "size": size,
+                  "source": os.path.abspath(src), **meta}
+        blob = json.dumps(record, indent=2, sort_keys=True, ensure_ascii=False)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(self.path(key)), prefix=".tmp-")
+        with os.fdopen(fd, "w") as f:
+            f.write(blob)
+        os.replace(tmp, self.path(key, ".json"))
+        self.evict()
+
+    def remove(self, key: str):
+        for ext in (".json", ".wav"):
+            try:
+                os.unlink(self.path(key, ext))
+            except FileNotFoundError:
+                pass
+
+    # -- maintenance ----------------------------------------------------------
+
+    def _shards(self) -> list[str]:
+        """The ``<key[:2]>`` entry folders; not ``voices/`` or other neighbours."""
+        if not os.path.isdir(self.root):
+            return []
+        return [os.path.join(self.root, name) for name in os.listdir(self.root)
+                if _SHARD.fullmatch(name) and os.path.isdir(os.path.join(self.root, name))]
+
+    def entries(self) -> list[tuple[float, int, str]]:
+        """``(last used, size, key)`` of every entry, oldest first."""
+        found = []
+        for folder in self._shards():
+            shard = os.path.basename(folder)
+            for name in os.listdir(folder):
+                if name.endswith(".wav") and name.startswith(shard):
+                    try:
+                        st = os.stat(os.path.join(folder, name))
+                    except FileNotFoundError:
+                        continue
+                    found.append((st.st_mtime, st.st_size, name[:-4]))
+        return sorted(found)
+
+    def evict(self) -> int:
+        """Drop least recently used entries until under ``max_bytes``."""
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        dropped = 0
+        for _, size, key in entries:
+            if total <= self.max_bytes:
+                break
+            self.remove(key)
+            total -= size
+            dropped += 1
+        return dropped
+
+    def clear(self):
+        """Drop every entry; voice bundles and the duration model stay."""
+        for folder in self._shards():
+            shutil.rmtree(folder, ignore_errors=True)
+
+
+DEFAULT_AUDIO_CACHE = AudioCache.from_env()
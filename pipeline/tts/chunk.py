@@ -0,0 +1,216 @@
+"""Sentence-chunked synthesis for long narration.
+
+A 30 s scene sent to clone-tts as one request takes as long as the server
+needs for all of it, and one dropped connection or 5xx loses the whole
+line.  With ``TTS_CHUNK=1`` (or ``TTSClient(chunk_chars=...)``) a line
+longer than ``chunk_chars`` (default 160) is split at sentence ends, and
+over-long sentences at clause breaks; the chunks are rendered side by side
+through the same client, each retried, bundled and cached on its own, so
+the scene takes about as long as its longest sentence.
+
+The chunks are stitched into one WAV: the silence the server leaves around
+each chunk is trimmed to a natural pause (longer after a sentence than
+after a clause) and every join gets a short equal-power crossfade, so
+there are no clicks and no level dip.  Chunk timings go to a
+``<dest stem>.chunks.json`` sidecar.  Chunks are read as NumPy arrays:
+the silence edges come from one vectorized threshold per chunk and the
+crossfades are array expressions.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import re
+import shutil
+import tempfile
+import time
+import wave
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import replace
+
+import numpy as np
+
+from .client import DEFAULT_CHUNK_CHARS, TTSAudioError, TTSJob, TTSResult
+
+MIN_CHUNK_CHARS = 40            # shorter pieces are merged with a neighbour
+SENTENCE_PAUSE = 0.28           # seconds of silence kept between sentences
+CLAUSE_PAUSE = 0.12             # ... and between clauses of one sentence
+CROSSFADE = 0.015               # seconds; equal-power fade at every join
+SILENCE = 0.01                  # |sample| / full scale below this is silence
+
+_SENTENCE = re.compile(r"(?<=[.!?…])[\"')\]]*\s+")
+_CLAUSE = re.compile(r"(?<=[,;:—])\s+")
+
+
+# ---------------------------------------------------------------------------
+# Splitting
+# ---------------------------------------------------------------------------
+
+def _merge(pieces: list[tuple[str, bool]], min_chars: int) -> list[tuple[str, bool]]:
+    """Glue pieces shorter than ``min_chars`` onto the one before (or after)."""
+    merged: list[tuple[str, bool]] = []
+    for text, sentence_end in pieces:
+        if merged and (len(text) < min_chars or len(merged[-1][0]) < min_chars):
+            merged[-1] = (f"{merged[-1][0]} {text}", sentence_end)
+        else:
+            merged.append((text, sentence_end))
+    return merged
+
+
+def split_text(text: str, max_chars: int = DEFAULT_CHUNK_CHARS,
+               min_chars: int = MIN_CHUNK_CHARS) -> list[tuple[str, bool]]:
+    """``(chunk, ends a sentence)`` pieces of ``text``, each near ``max_chars``.
+
+    Sentences are packed together while they fit; one longer than
+    ``max_chars`` is cut at its clause breaks.  Words are never split.
+    """
+    text = " ".join(text.split())
+    if len(text) <= max_chars:
+        return [(text, True)] if text else []
+    pieces: list[tuple[str, bool]] = []
+    for sentence in _SENTENCE.split(text):
+        if len(sentence) <= max_chars:
+            pieces.append((sentence, True))
+            continue
+        clauses = _CLAUSE.split(sentence)
+        current = ""
+        for clause in clauses:
+            if current and len(current) + 1 + len(clause) > max_chars:
+                pieces.append((current, False))
+                current = clause
+            else:
+                current = f"{current} {clause}".strip()
+        pieces.append((current, True))
+    packed: list[tuple[str, bool]] = []
+    for piece, sentence_end in pieces:
+        if packed and packed[-1][1] and len(packed[-1][0]) + 1 + len(piece) <= max_chars:
+            packed[-1] = (f"{packed[-1][0]} {piece}", sentence_end)
+        else:
+            packed.append((piece, sentence_end))
+    return _merge(packed, min_chars)
+
+
+# ---------------------------------------------------------------------------
+# Stitching
+# ---------------------------------------------------------------------------
+
+def _read_pcm16(path: str) -> tuple[np.ndarray, int]:
+    """A 16-bit WAV as a ``(frames, channels)`` int16 array, and its rate."""
+    with wave.open(path, "rb") as w:
+        if w.getsampwidth() != 2:
+            raise TTSAudioError(f"{path}: {8 * w.getsampwidth()}-bit audio, expected 16-bit")
+        raw = w.readframes(w.getnframes())
+        rate, channels = w.getframerate(), w.getnchannels()
+    pcm = np.frombuffer(raw, "<i2", len(raw) // (2 * channels) * channels)
+    return pcm.reshape(-1, channels), rate
+
+
+def _edges(pcm: np.ndarray) -> tuple[int, int]:
+    """First and one-past-last frame louder than ``SILENCE``."""
+    loud = np.flatnonzero((np.abs(pcm.astype(np.int32)) > int(SILENCE * 32768)).any(axis=1))
+    if not len(loud):
+        return len(pcm), len(pcm)
+    return int(loud[0]), int(loud[-1]) + 1
+
+
+def stitch(paths: list[str], pauses: list[float], dest: str) -> list[dict]:
+    """Join chunk WAVs into ``dest``; returns each chunk's start and end (s).
+
+    ``pauses[i]`` is the silence wanted between chunk ``i`` and ``i + 1``;
+    the line keeps the first chunk's lead-in and the last chunk's tail.
+    """
+    pieces: list[np.ndarray] = []
+    timings = []
+    rate = channels = None
+    length = 0                  # frames in ``pieces`` so far
+    for i, path in enumerate(paths):
+        pcm, r = _read_pcm16(path)
+        c = pcm.shape[1]
+        if rate is None:
+            rate, channels = r, c
+        elif (r, c) != (rate, channels):
+            raise TTSAudioError(f"{path}: {r} Hz x{c}, other chunks are {rate} Hz x{channels}")
+        first, last = _edges(pcm)
+        lead = 0 if i == 0 else int(pauses[i - 1] / 2 * rate)
+        tail = 0 if i == len(paths) - 1 else int(pauses[i] / 2 * rate)
+        start = 0 if i == 0 else max(0, first - lead)
+        end = last + tail if i < len(paths) - 1 else len(pcm)
+        piece = pcm[start:end]
+        fade = min(int(CROSSFADE * rate), len(pieces[-1]), len(piece)) if pieces else 0
+        if fade:
+            # Equal-power crossfade: cos/sin gains keep the summed power flat.
+            t = ((np.arange(fade) + 0.5) / fade * np.pi / 2)[:, None]
+            mixed = pieces[-1][-fade:] * np.cos(t) + piece[:fade] * np.sin(t)
+            pieces[-1] = pieces[-1].copy()
+            pieces[-1][-fade:] = np.clip(np.round(mixed), -32768, 32767)
+            piece = piece[fade:]
+        offset = length - fade
+        timings.append({"start": round(offset / rate, 3),
+                        "end": round((offset + fade + len(piece)) / rate, 3)})
+        pieces.append(piece)
+        length += len(piece)
+    out = np.concatenate(pieces).astype("<i2")
+    folder = os.path.dirname(dest) or "."
+    fd, tmp = tempfile.mkstemp(dir=folder, prefix=".tts-", suffix=".wav")
+    os.close(fd)
+    try:
+        with wave.open(tmp, "wb") as w:
+            w.setnchannels(channels)
+            w.setsampwidth(2)
+            w.setframerate(rate)
+            w.writeframes(out.tobytes())
+        os.chmod(tmp, 0o644)
+        os.replace(tmp, dest)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
+    return timings
+
+
+def chunks_path(dest: str) -> str:
+    return os.path.splitext(dest)[0] + ".chunks.json"
+
+
+# ---------------------------------------------------------------------------
+# Synthesis
+# ---------------------------------------------------------------------------
+
+def synthesize_chunked(client, job: TTSJob, chunks: list[tuple[str, bool]]) -> TTSResult:
+    """Render ``chunks`` of ``job`` concurrently on ``client`` and stitch them."""
+    result = TTSResult(job)
+    start = time.monotonic()
+    folder = os.path.dirname(job.dest) or "."
+    os.makedirs(folder, exist_ok=True)
+    work = tempfile.mkdtemp(dir=folder, prefix=f".{job.name}-chunks-")
+    try:
+        parts = [replace(job, text=text, dest=os.path.join(work, f"{i}.wav"),
+                         name=f"{job.name}.{i}", meta={**job.meta, "chunk": i})
+                 for i, (text, _) in enumerate(chunks)]
+        with ThreadPoolExecutor(len(parts), thread_name_prefix="tts-chunk") as ex:
+            done = list(ex.map(client.synthesize, parts))
+        result.attempts = sum(r.attempts for r in done)
+        failed = [r for r in done if not r.ok]
+        if failed:
+            result.error = "; ".join(f"chunk {r.job.meta['chunk']}: {r.error}" for r in failed)
+        else:
+            pauses = [SENTENCE_PAUSE if sentence_end else CLAUSE_PAUSE
+                      for _, sentence_end in chunks]
+            timings = stitch([r.job.dest for r in done], pauses, job.dest)
+            result.chunks = [{"text": r.job.text, **t, "seconds": round(r.seconds, 3),
+                              "attempts": r.attempts, "cached": r.cached}
+                             for r, t in zip(done, timings)]
+            result.size = os.path.getsize(job.dest)
+            result.duration = timings[-1]["end"]
+            result.cached = all(r.cached for r in done)
+            result.ok = True
+            with open(chunks_path(job.dest), "w") as f:
+                json.dump({"text": job.text, "voice": job.voice.name,
+                           "chunks": result.chunks}, f, indent=2, ensure_ascii=False)
+    except (OSError, wave.Error, EOFError, TTSAudioError) as e:
+        result.error = str(e)
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+    result.seconds = time.monotonic() - start
+    return result
@@ -0,0 +1,429 @@
+"""Pooled client for the VoxCPM ``/v1/clone-tts`` endpoint.
+
+The narration scripts each talked to the TTS server their own way:
+``generate-digest-tts.py`` ran ``curl`` once per scene, one scene after
+another; ``generate-tts-all.py`` used bare ``requests.post`` calls from a
+thread pool, re-reading the reference WAV every time.  ``TTSClient`` keeps
+keep-alive connections to the server, caps the requests in flight, reads
+each reference clip once, retries dropped connections and 5xx answers with
+backoff, and times every request.  ``synthesize_many`` renders a whole
+script's scenes concurrently, so narration takes about as long as the
+slowest scene rather than the sum of all of them.
+
+    from pipeline.tts import TTSClient, TTSJob, load_voices
+
+    voices = load_voices("configs/default.json")
+    with TTSClient() as tts:
+        results = tts.synthesize_many([
+            TTSJob(text, voices["pad"], f"public/audio/scene-{i}.wav")
+            for i, text in enumerate(lines)])
+"""
+
+from __future__ import annotations
+
+import json
+import mmap
+import os
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from typing import Callable
+
+from pipeline.comfy.client import _NETWORK_ERRORS, _ConnectionPool
+from pipeline.media import wav_info
+
+from .cache import DEFAULT_AUDIO_CACHE, AudioCache
+
+DEFAULT_TTS_URL = os.environ.get("TTS_URL", "https://avatar.zkagi.ai")
+ENDPOINT = "/v1/clone-tts"
+DEFAULT_CONCURRENCY = int(os.environ.get("TTS_CONCURRENCY", "4"))
+MIN_AUDIO_BYTES = 1000
+DEFAULT_BUNDLE = os.environ.get("TTS_VOICE_BUNDLE", "").lower() not in (
+    "0", "off", "no", "false")
+DEFAULT_CHUNK_CHARS = 160
+
+
+def _chunk_from_env() -> int | None:
+    value = os.environ.get("TTS_CHUNK", "").strip().lower()
+    if value in ("", "0", "off", "no", "false"):
+        return None
+    return DEFAULT_CHUNK_CHARS if value in ("1", "on", "yes", "true") else int(value)
+
+
+DEFAULT_CHUNK = _chunk_from_env()
+
+
+# ---------------------------------------------------------------------------
+# Errors
+# ---------------------------------------------------------------------------
+
+class TTSError(Exception):
+    """Base class for every error raised by the TTS client."""
+
+
+class TTSConnectionError(TTSError):
+    """The TTS server could not be reached after all retries."""
+
+
+class TTSHTTPError(TTSError):
+    """The TTS server answered with a non-2xx status."""
+
+    def __init__(self, status: int, body: bytes):
+        self.status = status
+        self.body = body
+        super().__init__(f"HTTP {status}: {body[:300].decode(errors='replace')}")
+
+
+class TTSAudioError(TTSError):
+    """The server answered 200 but the body is not usable audio."""
+
+
+# ---------------------------------------------------------------------------
+# Voices
+# ---------------------------------------------------------------------------
+
+@dataclass
+class Voice:
+    """A reference clip plus the sampling settings to clone it with."""
+
+    name: str
+    ref_audio: str
+    ref_text: str
+    cfg_value: str = "2.0"
+    steps: str = "15"
+    normalize: str | None = None
+    denoise: str | None = None
+
+    @classmethod
+    def from_config(cls, name: str, cfg: dict, base_dir: str = ".") -> "Voice":
+        """Build from a ``VOICE_CFG`` entry or a ``configs/*.json`` voice block."""
+        def get(*keys, default=None):
+            for key in keys:
+                if cfg.get(key) is not None:
+                    return str(cfg[key])
+            return default
+
+        ref_audio = get("ref_audio", "refAudioPath")
+        ref_text = get("ref_text", "refText")
+        if ref_audio is None or ref_text is None:
+            raise ValueError(f"voice {name!r} needs a reference audio path and its text")
+        return cls(name, os.path.normpath(os.path.join(base_dir, ref_audio)), ref_text,
+                   get("cfg_value", "cfgValue", default="2.0"),
+                   get("steps", default="15"),
+                   get("normalize"), get("denoise"))
+
+    def fields(self) -> dict:
+        values = {"ref_text": self.ref_text, "cfg_value": self.cfg_value,
+                  "steps": self.steps, "normalize": self.normalize, "denoise": self.denoise}
+        return {k: v for k, v in values.items() if v is not None}
+
+
+def load_voices(path: str = "configs/default.json", base_dir: str = ".") -> dict[str, Voice]:
+    """Voices of every character in a video config (``characters.*.voice``)."""
+    with open(path) as f:
+        config = json.load(f)
+    return {cid: Voice.from_config(cid, char["voice"], base_dir)
+            for cid, char in config.get("characters", {}).items() if char.get("voice")}
+
+
+def voices_from_cfg(voice_cfg: dict, base_dir: str = ".") -> dict[str, Voice]:
+    """Voices from a script's ``VOICE_CFG`` dict."""
+    return {name: Voice.from_config(name, cfg, base_dir) for name, cfg in voice_cfg.items()}
+
+
+# ---------------------------------------------------------------------------
+# Jobs and results
+# ---------------------------------------------------------------------------
+
+@dataclass
+class TTSJob:
+    text: str
+    voice: Voice
+    dest: str
+    name: str = ""
+    meta: dict = field(default_factory=dict)
+
+    def __post_init__(self):
+        self.name = self.name or os.path.splitext(os.path.basename(self.dest))[0]
+
+
+@dataclass
+class TTSResult:
+    job: TTSJob
+    ok: bool = False
+    error: str | None = None
+    size: int = 0
+    duration: float | None = None     # seconds of audio
+    seconds: float = 0.0              # request time, including retries
+    attempts: int = 0
+    skipped: bool = False             # dest already existed
+    cached: bool = False              # served from the audio cache
+    chunks: list[dict] | None = None  # per-chunk timing of a chunked line
+
+
+def wav_seconds(path: str) -> float | None:
+    info = wav_info(path)
+    return info.duration if info is not None and info.rate else None
+
+
+# ---------------------------------------------------------------------------
+# Client
+# ---------------------------------------------------------------------------
+
+class TTSClient:
+    """Thread-safe ``/v1/clone-tts`` client with a keep-alive connection pool.
+
+    At most ``max_connections`` requests are in flight at once, whatever
+    the number of calling threads.  Dropped connections, timeouts and 5xx
+    or 429 answers are retried ``retries`` times with exponential backoff:
+    synthesis has no side effects, so a repeated request is harmless.
+
+    With a ``cache`` (by default ``AudioCache.from_env()``) lines that were
+    synthesized before, with the same voice and settings, are linked from
+    it instead of being requested again.  With ``bundle`` every voice is
+    sent as its trimmed 16 kHz mono bundle (``pipeline.tts.bundle``).
+    With ``chunk_chars`` longer lines are split into sentences rendered
+    side by side and stitched (``pipeline.tts.chunk``).
+    """
+
+    def __init__(self, base_url: str | None = None, *,
+                 max_connections: int = DEFAULT_CONCURRENCY, timeout: float = 120.0,
+                 retries: int = 3, backoff: float = 2.0,
+                 cache: AudioCache | None = DEFAULT_AUDIO_CACHE,
+                 bundle: bool = DEFAULT_BUNDLE, chunk_chars: int | None = DEFAULT_CHUNK):
+        self.base_url = (base_url or DEFAULT_TTS_URL).rstrip("/")
+        self.max_connections = max(1, max_connections)
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.cache = cache
+        self.bundle = bundle
+        self.chunk_chars = chunk_chars
+        self._voices: dict[tuple, Voice] = {}
+        self._voices_lock = threading.Lock()
+        self._pool = _ConnectionPool(self.base_url, self.max_connections, timeout)
+        self._refs: dict[str, mmap.mmap] = {}
+        self._refs_lock = threading.Lock()
+
+    def __repr__(self):
+        return f"TTSClient({self.base_url!r})"
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self._pool.close()
+        with self._refs_lock:
+            for data in self._refs.values():
+                data.close()
+            self._refs.clear()
+
+    # -- request --------------------------------------------------------------
+
+    def _ref_part(self, path: str, boundary: str) -> tuple[bytes, memoryview]:
+        """Headers and data of the ``ref_audio`` part.
+
+        The clip is mapped once per client and sent from the mapping, so
+        no request copies it.
+        """
+        with self._refs_lock:
+            data = self._refs.get(path)
+            if data is None:
+                with open(path, "rb") as f:
+                    data = self._refs[path] = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        ctype = "audio/mpeg" if path.lower().endswith(".mp3") else "audio/wav"
+        return (f"--{boundary}\r\n"
+                f'Content-Disposition: form-data; name="ref_audio"; '
+                f'filename="{os.path.basename(path)}"\r\n'
+                f"Content-Type: {ctype}\r\n\r\n").encode(), memoryview(data)
+
+    def _body(self, text: str, voice: Voice) -> tuple[list, str]:
+        """The multipart body as a list of parts, streamed by ``_post``."""
+        boundary = uuid.uuid4().hex
+        parts = [*self._ref_part(voice.ref_audio, boundary)]
+        fields = "".join(f"\r\n--{boundary}\r\n"
+                         f'Content-Disposition: form-data; name="{key}"\r\n\r\n'
+                         f"{value}"
+                         for key, value in {**voice.fields(), "text": text}.items())
+        parts.append(f"{fields}\r\n--{boundary}--\r\n".encode())
+        return parts, f"multipart/form-data; boundary={boundary}"
+
+    def _post(self, body: list, ctype: str) -> bytes:
+        headers = {"Content-Type": ctype, "Content-Length": str(sum(len(p) for p in body))}
+        while True:
+            conn, reused = self._pool.acquire()
+            try:
+                conn.request("POST", self._pool.prefix + ENDPOINT, body=body,
+                             headers=headers)
+                resp = conn.getresponse()
+                data = resp.read()
+            except _NETWORK_ERRORS as e:
+                self._pool.release(conn, reusable=False)
+                # A kept-alive socket the server had already closed: the
+                # request never arrived, try a fresh connection right away.
+                if reused:
+                    continue
+                raise TTSConnectionError(f"POST {self.base_url}{ENDPOINT}: {e}") from e
+            self._pool.release(conn, reusable=not resp.will_close)
+            if not 200 <= resp.status < 300:
+                raise TTSHTTPError(resp.status, data)
+            return data
+
+    def voice(self, voice: Voice) -> Voice:
+        """``voice`` as it is sent: its bundle, or the raw clip if that fails."""
+        if not self.bundle:
+            return voice
+        from .bundle import VoiceBundleError, bundled
+
+        ident = (os.path.abspath(voice.ref_audio), voice.ref_text)
+        with self._voices_lock:
+            if ident not in self._voices:
+                try:
+                    self._voices[ident] = bundled(voice)
+                except (VoiceBundleError, OSError) as e:
+                    print(f"  [{voice.name}] sending the raw reference clip: {e}",
+                          file=sys.stderr)
+                    self._voices[ident] = voice
+            return self._voices[ident]
+
+    def speech(self, text: str, voice: Voice) -> tuple[bytes, int]:
+        """WAV bytes for ``text`` in ``voice`` and the attempts it took."""
+        body, ctype = self._body(text, voice)
+        attempt = 0
+        try:
+            while True:
+                attempt += 1
+                try:
+                    data = self._post(body, ctype)
+                except (TTSConnectionError, TTSHTTPError) as e:
+                    transient = (isinstance(e, TTSConnectionError)
+                                 or e.status >= 500 or e.status == 429)
+                    if not transient or attempt > self.retries:
+                        raise
+                    time.sleep(self.backoff * 2 ** (attempt - 1))
+                    continue
+                if len(data) < MIN_AUDIO_BYTES:
+                    raise TTSAudioError(f"only {len(data)} bytes of audio")
+                return data, attempt
+        finally:
+            body[1].release()   # the view on the mapped clip, so close() can unmap it
+
+    # -- API ------------------------------------------------------------------
+
+    def synthesize(self, job: TTSJob) -> TTSResult:
+        """Render one job to ``job.dest`` (atomically); never raises."""
+        if self.chunk_chars and "chunk" not in job.meta and len(job.text) > self.chunk_chars:
+            from .chunk import split_text, synthesize_chunked
+
+            chunks = split_text(job.text, self.chunk_chars)
+            if len(chunks) > 1:
+                return synthesize_chunked(self, job, chunks)
+        result = TTSResult(job)
+        start = time.monotonic()
+        try:
+            voice = self.voice(job.voice)
+            key = self.cache.key(voice, job.text) if self.cache else None
+            if key is not None and self.cache.get(key, job.dest):
+                result.cached = True
+                result.size = os.path.getsize(job.dest)
+                result.duration = wav_seconds(job.dest)
+                result.ok = True
+                result.seconds = time.monotonic() - start
+                return result
+            data, result.attempts = self.speech(job.text, voice)
+            folder = os.path.dirname(job.dest) or "."
+            os.makedirs(folder, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=folder, prefix=".tts-", suffix=".wav")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    f.write(data)
+                os.chmod(tmp, 0o644)
+                os.replace(tmp, job.dest)
+            except BaseException:
+                os.unlink(tmp)
+                raise
+            result.size = len(data)
+            result.duration = wav_seconds(job.dest)
+            result.ok = True
+            if key is not None:
+                try:
+                    self.cache.put(key, job.dest, voice=job.voice.name, text=job.text,
+                                   cfg_value=voice.cfg_value, steps=voice.steps,
+                                   duration=result.duration)
+                except OSError as e:
+                    # The line itself is fine; it just renders again next time.
+                    print(f"  [{job.name}] cache write failed: {e}", file=sys.stderr)
+        except (TTSError, OSError) as e:
+            result.error = str(e)
+        result.seconds = time.monotonic() - start
+        return result
+
+    def synthesize_many(self, jobs: list[TTSJob], *, skip_existing: bool = False,
+                        on_result: Callable[[TTSResult], None] | None = None
+                        ) -> list[TTSResult]:
+        """Render ``jobs`` concurrently; results come back in job order.
+
+        With ``skip_existing`` a job whose ``dest`` already holds a
+        readable WAV is not sent again.
+        """
+        on_result = on_result or print_result
+        results: dict[int, TTSResult] = {}
+        todo = []
+        for i, job in enumerate(jobs):
+            if skip_existing and os.path.exists(job.dest):
+                duration = wav_seconds(job.dest)
+                if duration:
+                    results[i] = TTSResult(job, ok=True, size=os.path.getsize(job.dest),
+                                           duration=duration, skipped=True)
+                    on_result(results[i])
+                    continue
+            todo.append(i)
+        if todo:
+            with ThreadPoolExecutor(min(len(todo), self.max_connections),
+                                    thread_name_prefix="tts") as ex:
+                futures = {ex.submit(self.synthesize, jobs[i]): i for i in todo}
+                for fut in as_completed(futures):
+                    results[futures[fut]] = fut.result()
+                    on_result(results[futures[fut]])
+        return [results[i] for i in range(len(jobs))]
+
+
+def print_result(result: TTSResult):
+    """Default ``on_result``: one status line per scene."""
+    name = result.job.name
+    if result.skipped:
+        print(f"  [{name}] SKIP (exists, {result.duration:.2f}s)")
+    elif result.cached:
+        print(f"  [{name}] CACHED: {result.duration or 0:.2f}s of audio")
+    elif result.ok:
+        retried = f", {result.attempts} attempts" if result.attempts > 1 else ""
+        if result.chunks:
+            retried = f", {len(result.chunks)} chunks" + retried
+        print(f"  [{name}] DONE: {result.duration or 0:.2f}s of audio, {result.size} bytes "
+              f"in {result.seconds:.1f}s{retried}")
+    else:
+        print(f"  [{name}] ERROR: {result.error}")
+    sys.stdout.flush()
+
+
+def summarize(results: list[TTSResult], wall: float) -> str:
+    """Totals, and how much running the requests side by side saved."""
+    done = [r for r in results if r.ok and not (r.skipped or r.cached)]
+    failed = sum(1 for r in results if not r.ok)
+    cached = sum(1 for r in results if r.cached)
+    speech = sum(r.duration or 0 for r in results if r.ok)
+    busy = sum(r.seconds for r in done)
+    text = f"{len(results) - failed}/{len(results)} scenes OK, {speech:.2f}s of speech"
+    if cached:
+        text += f" ({cached} from cache)"
+    if done:
+        text += (f"; {len(done)} request(s) took {busy:.1f}s in total, "
+                 f"{wall:.1f}s wall (slowest {max(r.seconds for r in done):.1f}s)")
+    return text
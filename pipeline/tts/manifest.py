@@ -0,0 +1,157 @@
+"""Per-scene frame budget and ``public/audio/manifest.json``.
+
+``src/scripts/generate-audio.ts`` wrote the manifest the render scripts
+read (``totalDurationFrames``), ``generate-digest-tts.py`` printed a frame
+table to copy into a composition by hand, and ``generate-tts-all.py``
+printed bare durations.  ``build_manifest`` does it once for all of them:
+durations come from the WAV headers (``pipeline.media.wav_info``, nothing
+is decoded), every scene gets ``ceil(duration * fps)`` audio frames so its
+last syllable is never cut, plus ``pad`` frames, minus ``crossfade`` frames
+shared with the next scene, and the composition ends ``tail`` frames after
+the last one.  The file keeps the TypeScript schema (``config``,
+``audioMeta``, ``totalDurationFrames``, ``generatedAt``); the per-scene
+frames and start are added to each ``audioMeta`` entry.  generate-audio.ts
+now runs ``python3 -m pipeline.tts manifest`` rather than doing the frame
+math itself.
+
+    python3 -m pipeline.tts manifest --config configs/x.json
+    python3 -m pipeline.tts manifest --pattern digest-{}.wav --pad 20 --tail 0
+"""
+
+from __future__ import annotations
+
+import json
+import math
+import os
+import tempfile
+from dataclasses import dataclass
+from datetime import datetime, timezone
+
+from pipeline.media import probe_duration, wav_info
+
+DEFAULT_FPS = 30
+DEFAULT_TAIL = 30           # frames after the last line (the render scripts' margin)
+DEFAULT_AUDIO_DIR = "public/audio"
+MANIFEST_NAME = "manifest.json"
+
+
+def audio_seconds(path: str) -> float | None:
+    """Length of an audio file: WAV header, else ffprobe; None if unreadable."""
+    info = wav_info(path)
+    if info is not None and info.rate:
+        return info.duration
+    return probe_duration(path) if os.path.exists(path) else None
+
+
+@dataclass
+class SceneAudio:
+    index: int
+    path: str
+    duration: float             # seconds of narration
+    audio_frames: int           # composition frames the narration spans
+    frames: int                 # audio + pad: the scene's <Sequence> length
+    start: int = 0              # first composition frame
+
+    def to_dict(self) -> dict:
+        return {"index": self.index, "path": self.path, "duration": self.duration,
+                "audioFrames": self.audio_frames, "frames": self.frames,
+                "startFrame": self.start}
+
+
+@dataclass
+class AudioManifest:
+    scenes: list[SceneAudio]
+    fps: int = DEFAULT_FPS
+    pad: int = 0
+    crossfade: int = 0
+    tail: int = DEFAULT_TAIL
+    config: dict | None = None
+
+    @property
+    def speech_seconds(self) -> float:
+        return sum(s.duration for s in self.scenes)
+
+    @property
+    def total_frames(self) -> int:
+        if not self.scenes:
+            return self.tail
+        last = self.scenes[-1]
+        return last.start + last.frames + self.tail
+
+    def to_dict(self) -> dict:
+        return {
+            "config": self.config,
+            "audioMeta": [s.to_dict() for s in self.scenes],
+            "totalDurationFrames": self.total_frames,
+            "fps": self.fps,
+            "padFrames": self.pad,
+            "crossfadeFrames": self.crossfade,
+            "generatedAt": datetime.now(timezone.utc).isoformat(timespec="milliseconds")
+                                   .replace("+00:00", "Z"),
+        }
+
+    def save(self, path: str):
+        """Write the manifest as JSON, atomically."""
+        folder = os.path.dirname(path) or "."
+        os.makedirs(folder, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=folder, prefix=".manifest-")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(self.to_dict(), f, indent=2)
+            os.replace(tmp, path)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+            raise
+
+    def table(self) -> str:
+        lines = [f"  scene {s.index}: {s.duration:.2f}s -> {s.audio_frames} audio frames "
+                 f"-> {s.frames} with pad, from frame {s.start}" for s in self.scenes]
+        lines.append(f"  {self.speech_seconds:.2f}s of speech, {self.total_frames} frames "
+                     f"at {self.fps}fps")
+        return "\n".join(lines)
+
+
+def build_manifest(paths: dict[int, str], *, fps: int = DEFAULT_FPS, pad: int = 0,
+                   crossfade: int = 0, tail: int = DEFAULT_TAIL,
+                   config: dict | None = None) -> AudioManifest:
+    """Frame budget of the scene audio files ``paths`` (by scene index).
+
+    Raises ``ValueError`` for a file whose length cannot be read.
+    """
+    scenes, start = [], 0
+    for index in sorted(paths):
+        path = paths[index]
+        duration = audio_seconds(path)
+        if duration is None:
+            raise ValueError(f"cannot read the duration of {path}")
+        audio = math.ceil(round(duration * fps, 6))
+        scene = SceneAudio(index, path, duration, audio, audio + pad, start)
+        start += scene.frames - crossfade
+        scenes.append(scene)
+    return AudioManifest(scenes, fps, pad, crossfade, tail, config)
+
+
+def scene_paths(audio_dir: str = DEFAULT_AUDIO_DIR, pattern: str = "scene-{}.wav",
+                count: int | None = None) -> dict[int, str]:
+    """``pattern`` files in ``audio_dir``: the first ``count``, or up to the first gap."""
+    paths, index = {}, 0
+    while count is None or index < count:
+        path = os.path.join(audio_dir, pattern.format(index))
+        if not os.path.exists(path):
+            if count is None:
+                break
+        else:
+            paths[index] = path
+        index += 1
+    return paths
+
+
+def write_manifest(paths: dict[int, str], dest: str | None = None, **kwargs) -> AudioManifest:
+    """``build_manifest`` and save it (default: ``manifest.json`` beside the audio)."""
+    manifest = build_manifest(paths, **kwargs)
+    if dest is None:
+        folder = os.path.dirname(next(iter(paths.values()))) if paths else DEFAULT_AUDIO_DIR
+        dest = os.path.join(folder, MANIFEST_NAME)
+    manifest.save(dest)
+    return manifest
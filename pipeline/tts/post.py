@@ -0,0 +1,191 @@
+"""Post-process narration: fixed silence, even loudness, one sample rate.
+
+The server's WAVs used to go to ``public/audio`` as they came: a different
+lead-in and loudness for every line, at whatever rate the model runs, left
+for Remotion to resample and mix at render time.  ``postprocess`` trims
+each file to ``TTS_HEAD`` / ``TTS_TAIL`` seconds of silence around the
+speech (0.1 / 0.2 by default, with 5 ms fades at the cuts), sets its
+integrated loudness to ``TTS_LUFS`` (-16 LUFS, ITU-R BS.1770 K-weighted
+and gated, never past -1 dBFS peak) and resamples it to ``TTS_OUT_RATE``
+(48 kHz, the composition's audio rate).  Files are replaced atomically, so
+cache entries hardlinked to them stay untouched.
+
+The signal work is NumPy / SciPy (``sosfilt`` for the K-weighting,
+cumulative sums for the 400 ms block powers, ``resample_poly``).
+``postprocess_many`` runs the scenes in a process pool; the manifest is
+built afterwards, so scene durations and frame budgets reflect the
+trimmed audio.  ``TTS_POST=off`` leaves files as they are.
+
+    python3 -m pipeline.tts post --pattern digest-{}.wav
+"""
+
+from __future__ import annotations
+
+import math
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+
+import numpy as np
+from scipy.signal import sosfilt
+
+from .bundle import read_mono, resample, trim_silence, write_pcm16
+from .client import TTSError
+
+DEFAULT_HEAD = float(os.environ.get("TTS_HEAD", "0.1"))
+DEFAULT_TAIL = float(os.environ.get("TTS_TAIL", "0.2"))
+DEFAULT_LUFS = float(os.environ.get("TTS_LUFS", "-16"))
+DEFAULT_OUT_RATE = int(os.environ.get("TTS_OUT_RATE", "48000"))
+MAX_PEAK_DBFS = -1.0
+FADE = 0.005
+
+
+def enabled() -> bool:
+    return os.environ.get("TTS_POST", "").lower() not in ("0", "off", "no", "false")
+
+
+# ---------------------------------------------------------------------------
+# Loudness (ITU-R BS.1770)
+# ---------------------------------------------------------------------------
+
+def _section(b: tuple, a: tuple) -> list[float]:
+    """One normalized second-order section, as ``sosfilt`` takes it."""
+    return [v / a[0] for v in (*b, *a)]
+
+
+def k_weight(samples: np.ndarray, rate: int) -> np.ndarray:
+    """The BS.1770 pre-filter (high shelf + high pass) designed for ``rate``.
+
+    Bilinear designs of the two stages; at 48 kHz they reproduce the
+    coefficients tabled in BS.1770.
+    """
+    # High shelf, +4 dB above ~1.7 kHz: the acoustic effect of the head.
+    gain, q, fc = 3.999843853973347, 0.7071752369554196, 1681.974450955533
+    k = math.tan(math.pi * fc / rate)
+    vh = 10 ** (gain / 20)
+    vb = vh ** 0.4996667741545416
+    a0 = 1 + k / q + k * k
+    shelf = _section((vh + vb * k / q + k * k, 2 * (k * k - vh), vh - vb * k / q + k * k),
+                     (a0, 2 * (k * k - 1), 1 - k / q + k * k))
+    # High pass at ~38 Hz (the RLB curve).
+    q, fc = 0.5003270373238773, 38.13547087602444
+    k = math.tan(math.pi * fc / rate)
+    a0 = 1 + k / q + k * k
+    # Unity numerator, as tabled: only the poles are normalized.
+    high_pass = [1.0, -2.0, 1.0, 1.0, 2 * (k * k - 1) / a0, (1 - k / q + k * k) / a0]
+    return sosfilt(np.array([shelf, high_pass]), samples)
+
+
+def integrated_loudness(samples: np.ndarray, rate: int) -> float | None:
+    """Gated integrated loudness in LUFS; None for silence or < 400 ms."""
+    weighted = k_weight(samples, rate)
+    block, step = int(0.4 * rate), int(0.1 * rate)
+    if len(weighted) < block:
+        return None
+    prefix = np.concatenate(([0.0], np.cumsum(weighted ** 2)))
+    starts = np.arange(0, len(weighted) - block + 1, step)
+    powers = (prefix[starts + block] - prefix[starts]) / block
+
+    def lufs(power):
+        with np.errstate(divide="ignore"):
+            return -0.691 + 10 * np.log10(power)
+
+    gated = powers[lufs(powers) > -70]
+    if not len(gated):
+        return None
+    relative = lufs(gated.mean()) - 10
+    return float(lufs(gated[lufs(gated) > relative].mean()))
+
+
+# ---------------------------------------------------------------------------
+# Processing
+# ---------------------------------------------------------------------------
+
+@dataclass
+class PostResult:
+    path: str
+    before: float               # seconds
+    after: float
+    loudness: float | None      # LUFS before the gain
+    gain_db: float
+    rate: int
+    limited: bool = False       # gain held back to stay under the peak ceiling
+    error: str | None = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+def _fit_silence(samples: np.ndarray, rate: int, head: float, tail: float) -> np.ndarray:
+    speech = trim_silence(samples, rate, keep=0.0).copy()
+    fade = min(int(FADE * rate), len(speech) // 2)
+    if fade:
+        ramp = np.arange(fade) / fade
+        speech[:fade] *= ramp
+        speech[len(speech) - fade:] *= ramp[::-1]
+    return np.concatenate((np.zeros(int(head * rate)), speech, np.zeros(int(tail * rate))))
+
+
+def postprocess(path: str, dest: str | None = None, *, head: float = DEFAULT_HEAD,
+                tail: float = DEFAULT_TAIL, lufs: float = DEFAULT_LUFS,
+                rate: int = DEFAULT_OUT_RATE) -> PostResult:
+    """Trim, normalize and resample ``path`` into ``dest`` (default: in place)."""
+    dest = dest or path
+    samples, src_rate = read_mono(path)
+    before = len(samples) / src_rate if src_rate else 0.0
+    samples = _fit_silence(samples, src_rate, head, tail)
+    loudness = integrated_loudness(samples, src_rate)
+    gain_db, limited = 0.0, False
+    if loudness is not None:
+        gain_db = lufs - loudness
+        peak = float(np.abs(samples).max(initial=0.0))
+        if peak > 0 and MAX_PEAK_DBFS - 20 * math.log10(peak) < gain_db:
+            gain_db, limited = MAX_PEAK_DBFS - 20 * math.log10(peak), True
+        samples = samples * 10 ** (gain_db / 20)
+    samples = resample(samples, src_rate, rate)
+    folder = os.path.dirname(dest) or "."
+    fd, tmp = tempfile.mkstemp(dir=folder, prefix=".post-", suffix=".wav")
+    os.close(fd)
+    try:
+        write_pcm16(tmp, samples, rate)
+        os.chmod(tmp, 0o644)
+        os.replace(tmp, dest)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
+    return PostResult(dest, before, len(samples) / rate, loudness, gain_db, rate, limited)
+
+
+def _run(args: tuple) -> PostResult:
+    path, kwargs = args
+    try:
+        return postprocess(path, **kwargs)
+    except (OSError, ValueError, TTSError) as e:
+        return PostResult(path, 0.0, 0.0, None, 0.0, 0, error=f"{type(e).__name__}: {e}")
+
+
+def postprocess_many(paths: list[str], *, workers: int | None = None,
+                     **kwargs) -> list[PostResult]:
+    """``postprocess`` every file in place, one process per CPU; in order."""
+    if not paths:
+        return []
+    workers = min(len(paths), workers or os.cpu_count() or 1)
+    if workers == 1:
+        return [_run((p, kwargs)) for p in paths]
+    with ProcessPoolExecutor(workers) as ex:
+        return list(ex.map(_run, [(p, kwargs) for p in paths]))
+
+
+def print_post(results: list[PostResult]):
+    for r in results:
+        name = os.path.basename(r.path)
+        if not r.ok:
+            print(f"  [{name}] POST ERROR: {r.error}")
+            continue
+        level = ("silent" if r.loudness is None
+                 else f"{r.loudness:.1f} LUFS, {r.gain_db:+.1f} dB"
+                 + (" (peak-limited)" if r.limited else ""))
+        print(f"  [{name}] {r.before:.2f}s -> {r.after:.2f}s, {level}, {r.rate} Hz")
@@ -0,0 +1,227 @@
+"""Predict narration length from the text, before the TTS server answers.
+
+Clip planning used to wait for every WAV, and scripts sized scenes on a
+hand-written "~2.2 words/sec".  ``DurationModel`` is a small linear model
+per voice (and per ``cfg_value`` / ``steps``)::
+
+    seconds = a + b * syllables + c * pauses
+
+fitted by ridge regression towards that old rule of thumb, so it is usable
+with no history and gets better with every line in the narration cache
+(``AudioCache`` keeps the text, voice, settings and measured duration of
+each line).  Each ``Prediction`` carries a ~95% bound from the voice's
+relative residuals; ``python3 -m pipeline.plan --predict CONFIG`` plans
+clips for the upper bounds, so clip rendering can start while TTS runs.
+
+    python3 -m pipeline.tts predict --fit             # refit from the cache
+    python3 -m pipeline.tts predict --voice pad "Some line."
+"""
+
+from __future__ import annotations
+
+import json
+import math
+import os
+import re
+import tempfile
+import time
+from dataclasses import dataclass
+
+from pipeline.media import wav_info
+
+from .cache import DEFAULT_CACHE_DIR, AudioCache
+
+MODEL_VERSION = 1
+PRIOR = (0.3, 0.23, 0.25)       # ~2.2 words/s at 1.4 syllables a word
+PRIOR_REL_SD = 0.12             # relative error assumed without history
+RIDGE = 1.0
+MIN_SAMPLES = 3                 # lines a group needs before it is trusted
+Z = 2.0                         # bound width in standard deviations
+
+_WORD = re.compile(r"[A-Za-z']+|\d+")
+_VOWELS = re.compile(r"[aeiouy]+")
+_PAUSES = re.compile(r"[,;:—…]|[.!?]+(?=\s|$)")
+
+
+def default_model_path() -> str:
+    return os.path.join(os.environ.get("TTS_CACHE_DIR") or DEFAULT_CACHE_DIR,
+                        "duration-model.json")
+
+
+def text_features(text: str) -> list[float]:
+    """``[1, syllables, pauses]`` of a line; numbers count as read aloud."""
+    syllables = 0
+    for word in _WORD.findall(text.lower()):
+        if word.isdigit():
+            syllables += 2 * len(word)      # "118520": about a dozen syllables
+        else:
+            groups = len(_VOWELS.findall(word))
+            if word.endswith("e") and groups > 1 and not word.endswith("le"):
+                groups -= 1
+            syllables += max(1, groups)
+    return [1.0, float(syllables), float(len(_PAUSES.findall(text)))]
+
+
+def _solve(a: list[list[float]], b: list[float]) -> list[float]:
+    """Gaussian elimination with partial pivoting for a small dense system."""
+    n = len(b)
+    m = [row[:] + [v] for row, v in zip(a, b)]
+    for col in range(n):
+        pivot = max(range(col, n), key=lambda r: abs(m[r][col]))
+        m[col], m[pivot] = m[pivot], m[col]
+        for r in range(col + 1, n):
+            f = m[r][col] / m[col][col]
+            for c in range(col, n + 1):
+                m[r][c] -= f * m[col][c]
+    x = [0.0] * n
+    for r in reversed(range(n)):
+        x[r] = (m[r][n] - sum(m[r][c] * x[c] for c in range(r + 1, n))) / m[r][r]
+    return x
+
+
+@dataclass
+class Sample:
+    voice: str
+    text: str
+    duration: float
+    cfg_value: str | None = None
+    steps: str | None = None
+
+
+@dataclass
+class Prediction:
+    seconds: float
+    low: float
+    high: float
+    samples: int = 0            # history behind the estimate; 0 = prior only
+
+    def covers(self, seconds: float) -> bool:
+        return self.low <= seconds <= self.high
+
+    def to_dict(self) -> dict:
+        return {"seconds": round(self.seconds, 3), "low": round(self.low, 3),
+                "high": round(self.high, 3), "samples": self.samples}
+
+
+@dataclass
+class _Fit:
+    weights: list[float]
+    rel_sd: float
+    n: int
+
+
+def _fit(samples: list[Sample]) -> _Fit:
+    xs = [text_features(s.text) for s in samples]
+    k = len(PRIOR)
+    ata = [[sum(x[i] * x[j] for x in xs) + (RIDGE if i == j else 0.0) for j in range(k)]
+           for i in range(k)]
+    aty = [sum(x[i] * s.duration for x, s in zip(xs, samples)) + RIDGE * PRIOR[i]
+           for i in range(k)]
+    weights = _solve(ata, aty)
+    rel = [(s.duration - sum(w * f for w, f in zip(weights, x))) / s.duration
+           for x, s in zip(xs, samples) if s.duration > 0]
+    n = len(rel)
+    rel_sd = math.sqrt(sum(r * r for r in rel) / (n - 1)) if n >= MIN_SAMPLES else PRIOR_REL_SD
+    # A handful of lines can fit by luck; never claim better than 4%.
+    return _Fit(weights, max(rel_sd, 0.04), n)
+
+
+def _groups(sample: Sample) -> list[str]:
+    """Most to least specific group keys for a line."""
+    return [f"{sample.voice}|{sample.cfg_value}|{sample.steps}", sample.voice, "*"]
+
+
+class DurationModel:
+    """Per-voice narration length, refittable from the narration cache."""
+
+    def __init__(self, fits: dict[str, _Fit] | None = None, fitted: float | None = None):
+        self.fits = fits or {}
+        self.fitted = fitted
+
+    @classmethod
+    def fit(cls, samples: list[Sample]) -> "DurationModel":
+        grouped: dict[str, list[Sample]] = {}
+        for sample in samples:
+            for key in _groups(sample):
+                grouped.setdefault(key, []).append(sample)
+        return cls({key: _fit(group) for key, group in grouped.items()
+                    if len(group) >= MIN_SAMPLES}, time.time())
+
+    @classmethod
+    def from_cache(cls, cache: AudioCache) -> "DurationModel":
+        return cls.fit(cache_samples(cache))
+
+    def predict(self, text: str, voice: str = "*", cfg_value: str | None = None,
+                steps: str | None = None) -> Prediction:
+        probe = Sample(voice, text, 0.0, cfg_value, steps)
+        fit = next((self.fits[k] for k in _groups(probe) if k in self.fits), None)
+        weights, rel_sd, n = (fit.weights, fit.rel_sd, fit.n) if fit else (PRIOR, PRIOR_REL_SD, 0)
+        x = text_features(text)
+        seconds = max(0.3, sum(w * f for w, f in zip(weights, x)))
+        spread = Z * rel_sd * seconds
+        return Prediction(seconds, max(0.0, seconds - spread), seconds + spread, n)
+
+    # -- persistence ----------------------------------------------------------
+
+    def to_dict(self) -> dict:
+        return {"version": MODEL_VERSION, "fitted": self.fitted,
+                "features": ["1", "syllables", "pauses"],
+                "groups": {k: {"weights": f.weights, "relSd": f.rel_sd, "n": f.n}
+                           for k, f in sorted(self.fits.items())}}
+
+    def save(self, path: str | None = None):
+        """Write the model as JSON, atomically."""
+        path = path or default_model_path()
+        folder = os.path.dirname(path) or "."
+        os.makedirs(folder, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=folder, prefix=".duration-model-")
+        with os.fdopen(fd, "w") as f:
+            json.dump(self.to_dict(), f, indent=2)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str | None = None) -> "DurationModel":
+        """The saved model; the prior alone when none has been fitted."""
+        try:
+            with open(path or default_model_path()) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return cls()
+        if data.get("version") != MODEL_VERSION:
+            return cls()
+        return cls({k: _Fit(g["weights"], g["relSd"], g["n"])
+                    for k, g in data.get("groups", {}).items()}, data.get("fitted"))
+
+
+def cache_samples(cache: AudioCache) -> list[Sample]:
+    """Every cached line with its text, voice and measured duration."""
+    samples = []
+    for _, _, key in cache.entries():
+        meta = cache.meta(key) or {}
+        if not meta.get("text") or not meta.get("voice"):
+            continue
+        duration = meta.get("duration")
+        if duration is None:
+            info = wav_info(cache.path(key))
+            if info is None or not info.rate:
+                continue
+            duration = info.duration
+        samples.append(Sample(meta["voice"], meta["text"], duration,
+                              meta.get("cfg_value"), meta.get("steps")))
+    return samples
+
+
+def predict_config(config_path: str, model: DurationModel | None = None
+                   ) -> dict[int, Prediction]:
+    """Predicted narration of every scene of a video config, by scene index."""
+    with open(config_path) as f:
+        config = json.load(f)
+    model = model or DurationModel.load()
+    characters = config.get("characters", {})
+    predictions = {}
+    for index, scene in enumerate(config.get("scenes", [])):
+        cid = scene.get("characterId", "*")
+        voice = characters.get(cid, {}).get("voice", {})
+        predictions[index] = model.predict(scene.get("dialogue", ""), cid,
+                                           voice.get("cfgValue"), voice.get("steps"))
+    return predictions
@@ -25,6 +25,19 @@ export interface TTSResult {
   sizeKB: number;
 }
 
+// Reference clips are a few hundred KB and shared by every line of a voice:
+// read each one once per process.
+const refBuffers = new Map<string, Buffer>();
+
+function readRefAudio(refAudioPath: string): Buffer {
+  let buf = refBuffers.get(refAudioPath);
+  if (!buf) {
+    buf = fs.readFileSync(refAudioPath);
+    refBuffers.set(refAudioPath, buf);
+  }
+  return buf;
+}
+
 /**
  * Generate speech via VoxCPM voice cloning endpoint.
  *
@@ -49,7 +62,7 @@ export async function generateSpeech(
   const formData = new FormData();
 
   // ref_audio (required) — binary voice sample
-  const refBuffer = fs.readFileSync(request.refAudioPath);
+  const refBuffer = readRefAudio(request.refAudioPath);
   const ext = path.extname(request.refAudioPath).toLowerCase();
   const mime = ext === ".mp3" ? "audio/mpeg" : "audio/wav";
   formData.append("ref_audio", new Blob([refBuffer], { type: mime }), path.basename(request.refAudioPath));
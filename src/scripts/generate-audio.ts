@@ -2,6 +2,7 @@
 // Generate TTS audio for all scenes via VoxCPM (avatar.zkagi.ai)
 // Usage: npx tsx src/scripts/generate-audio.ts --config configs/my-video.json
 
+import { execFileSync } from "child_process";
 import fs from "fs";
 import path from "path";
 import { VideoConfigSchema, type VideoConfig } from "../types";
@@ -26,8 +27,6 @@ async function main() {
   const audioDir = path.join("public", "audio");
   fs.mkdirSync(audioDir, { recursive: true });
 
-  const meta: { index: number; path: string; duration: number }[] = [];
-
   for (let i = 0; i < config.scenes.length; i++) {
     const scene = config.scenes[i];
     const char = config.characters[scene.characterId];
@@ -46,16 +45,25 @@ async function main() {
 
     const dur = await getAudioDuration(out);
     console.log(`  ⏱️  ${dur.toFixed(2)}s`);
-    meta.push({ index: i, path: out, duration: dur });
   }
 
-  const total = meta.reduce((s, m) => s + m.duration, 0);
-  fs.writeFileSync(path.join(audioDir, "manifest.json"), JSON.stringify({
-    config, audioMeta: meta, totalDurationFrames: Math.ceil(total * 30) + 30,
-    generatedAt: new Date().toISOString(),
-  }, null, 2));
+  // Trim, level and resample the scenes like the Python narration scripts
+  // do (pipeline/tts/post.py) before the manifest measures them.
+  if (!["0", "off", "no", "false"].includes((process.env.TTS_POST || "").toLowerCase())) {
+    console.log("\n🎚️  Post-processing:");
+    execFileSync("python3", ["-m", "pipeline.tts", "post", "--audio-dir", audioDir],
+      { stdio: "inherit" });
+  }
+
+  // Durations, per-scene frame budget and manifest.json come from
+  // pipeline/tts/manifest.py, the module the Python narration scripts use.
+  console.log("\n📐 Frame budget:");
+  execFileSync("python3", ["-m", "pipeline.tts", "manifest", "--config", configPath,
+    "--audio-dir", audioDir], { stdio: "inherit" });
+  const manifest = JSON.parse(fs.readFileSync(path.join(audioDir, "manifest.json"), "utf-8"));
+  const total = manifest.audioMeta.reduce((s: number, m: { duration: number }) => s + m.duration, 0);
 
-  console.log(`\n✅ Done! Total: ${total.toFixed(1)}s (${Math.ceil(total * 30)} frames)`);
+  console.log(`\n✅ Done! Total: ${total.toFixed(1)}s (${manifest.totalDurationFrames} frames)`);
   console.log(`\n🎬 Next: npx remotion render ZkAGIVideo out/video.mp4 --props ${configPath}\n`);
 }
 
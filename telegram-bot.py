@@ -529,6 +529,8 @@ async def process_video_job(job: dict):
     await bot.send_message(chat_id, "Pipeline started. Spawning Claude Code...")
     log.info("Starting job: %s -> %s", topic, output_filename)
 
+    # /video requests jump the ComfyUI queue; calendar runs queue as batch.
+    env = {**os.environ, "COMFY_PRIORITY": job.get("priority", "batch")}
     proc = await asyncio.create_subprocess_exec(
         "claude",
         "-p", prompt,
@@ -538,6 +540,7 @@ async def process_video_job(job: dict):
         stdout=asyncio.subprocess.PIPE,
         stderr=asyncio.subprocess.STDOUT,  # merge stderr into stdout
         cwd=str(PROJECT_DIR),
+        env=env,
     )
     current_proc = proc
     proc.stdout._limit = 10 * 1024 * 1024  # 10MB buffer
@@ -823,6 +826,7 @@ async def cmd_video(update: Update, context: ContextTypes.DEFAULT_TYPE):
         "bot": context.bot,
         "timestamp": datetime.now(),
         "digest_context": digest_context,
+        "priority": "interactive",
     }
     await job_queue.put(job)
 
@@ -0,0 +1,110 @@
+"""ComfyClient transport: keep-alive reuse and when a request is sent again."""
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from pipeline.comfy.client import ComfyClient, ComfyConnectionError
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, *, drop_after: int = 0, stall: float = 0.0):
+        super().__init__(("127.0.0.1", 0), _Handler)
+        self.drop_after = drop_after    # close the socket after this many answers
+        self.stall = stall              # seconds /prompt takes to answer
+        self.connections: set[int] = set()
+        self.requests: list[tuple[str, str, int]] = []
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def _answer(self, payload: dict):
+        body = json.dumps(payload).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+        self.wfile.flush()
+        served = sum(1 for r in self.server.requests if r[2] == self.client_address[1])
+        if self.server.drop_after and served >= self.server.drop_after:
+            # Hang up without "Connection: close", like an idle timeout would.
+            self.close_connection = True
+
+    def do_GET(self):
+        self.server.connections.add(self.client_address[1])
+        self.server.requests.append(("GET", self.path, self.client_address[1]))
+        self._answer({"queue_running": [], "queue_pending": []})
+
+    def do_POST(self):
+        self.server.connections.add(self.client_address[1])
+        self.server.requests.append(("POST", self.path, self.client_address[1]))
+        payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        if self.server.stall:
+            time.sleep(self.server.stall)
+        self._answer({"prompt_id": payload.get("prompt_id", "p1"), "number": 1})
+
+
+@pytest.fixture
+def server(request):
+    srv = _Server(**getattr(request, "param", {}))
+    thread = threading.Thread(target=srv.serve_forever, daemon=True)
+    thread.start()
+    yield srv
+    srv.shutdown()
+    srv.server_close()
+
+
+def _posts(server) -> int:
+    return sum(1 for method, path, _ in server.requests if method == "POST")
+
+
+def test_requests_reuse_one_connection(server):
+    with ComfyClient(server.url, use_websocket=False) as client:
+        for _ in range(3):
+            client.queue()
+        client.submit({"1": {"class_type": "SaveVideo", "inputs": {}}})
+    assert len(server.requests) == 4
+    assert len(server.connections) == 1
+
+
+@pytest.mark.parametrize("server", [{"drop_after": 1}], indirect=True)
+def test_post_on_stale_socket_is_sent_again(server):
+    with ComfyClient(server.url, use_websocket=False, backoff=0) as client:
+        client.queue()
+        time.sleep(0.1)     # let the server hang up the idle socket
+        prompt_id = client.submit({"1": {"class_type": "SaveVideo", "inputs": {}}})
+    assert prompt_id
+    assert _posts(server) == 1
+    assert len(server.connections) == 2
+
+
+@pytest.mark.parametrize("server", [{"stall": 1.0}], indirect=True)
+def test_post_that_timed_out_is_not_sent_again(server):
+    with ComfyClient(server.url, use_websocket=False, timeout=0.3, backoff=0) as client:
+        with pytest.raises(ComfyConnectionError) as info:
+            client.submit({"1": {"class_type": "SaveVideo", "inputs": {}}})
+    assert info.value.sent
+    assert info.value.prompt_id
+    assert _posts(server) == 1
+
+
+def test_unreachable_host_was_never_sent():
+    with ComfyClient("http://127.0.0.1:9", use_websocket=False, retries=0) as client:
+        with pytest.raises(ComfyConnectionError) as info:
+            client.submit({"1": {"class_type": "SaveVideo", "inputs": {}}})
+    assert not info.value.sent
+    assert info.value.prompt_id is None
@@ -0,0 +1,64 @@
+"""Clip lengths planned from scene audio."""
+
+import pytest
+
+from pipeline.plan import (
+    COMP_FPS,
+    MAX_FRAMES,
+    ClipPlan,
+    comp_frames,
+    ltx_length,
+    plan_clips,
+    plan_scene,
+)
+
+
+@pytest.mark.parametrize("frames, length", [
+    (1, 1), (2, 9), (8, 9), (9, 9), (10, 17), (96, 97), (97, 97), (98, 105), (160, 161),
+])
+def test_ltx_length_rounds_up_to_8k_plus_1(frames, length):
+    assert ltx_length(frames) == length
+
+
+def test_ltx_length_is_always_valid_and_never_shorter():
+    for frames in range(1, 400):
+        length = ltx_length(frames)
+        assert (length - 1) % 8 == 0
+        assert frames <= length < frames + 8
+
+
+@pytest.mark.parametrize("seconds", [2.0, 3.9, 8.32, 17.5, 29.12])
+def test_scene_clips_are_valid_and_cover_the_narration(seconds):
+    scene = plan_scene(0, seconds)
+    assert scene.clips
+    for clip in scene.clips:
+        assert (clip.length - 1) % 8 == 0
+        assert clip.length <= MAX_FRAMES
+    shown = sum(t["durationInFrames"] for t in scene.timeline)
+    assert shown >= scene.frames >= seconds * COMP_FPS
+    # Only the tail of the last clip goes unused.
+    assert scene.wasted_frames < comp_frames(9)
+
+
+def test_capped_scene_cycles_its_clips():
+    scene = plan_scene(0, 29.12, max_clips=3)
+    assert len(scene.clips) == 3
+    assert scene.cycled
+    assert all(clip.length == MAX_FRAMES for clip in scene.clips)
+
+
+def test_plan_round_trip_and_mismatches():
+    plan = plan_clips({0: 8.0, 1: 5.0, 2: 4.0}, video_scenes={0, 1})
+    assert not plan.scenes[2].clips
+    again = ClipPlan.from_dict(plan.to_dict())
+    assert [c.length for c in again.clips()] == [c.length for c in plan.clips()]
+
+    names = [c.name for c in plan.clips()] + ["scene-2-a.mp4"]
+    assert plan.mismatches(names) == []
+    assert again.length_for("/some/dir/" + names[0]) == plan.clips()[0].length
+    assert again.length_for("scene-2-a.mp4") is None
+
+    problems = plan.mismatches(names[1:] + ["scene-5-a.mp4"])
+    assert len(problems) == 2
+    assert problems[0].startswith(names[0])
+    assert "scene 5" in problems[1]
@@ -0,0 +1,99 @@
+"""Failure classes and the retry each one gets."""
+
+import pytest
+
+from pipeline.comfy.client import (
+    ComfyConnectionError,
+    ComfyError,
+    ComfyExecutionError,
+    ComfyHTTPError,
+    ComfyTimeout,
+    ComfyValidationError,
+)
+from pipeline.comfy.qa import ClipQAError
+from pipeline.comfy.retry import (
+    BACKOFF,
+    EXECUTION,
+    FATAL,
+    NETWORK,
+    OOM,
+    QA,
+    REDUCE,
+    RESEED,
+    TIMEOUT,
+    VALIDATION,
+    WAIT,
+    RetryPolicy,
+    classify,
+)
+
+WORKFLOW = {
+    "1": {"class_type": "EmptyLTXVLatentVideo", "inputs": {"length": 161}},
+    "2": {"class_type": "RandomNoise", "inputs": {"noise_seed": 42}},
+}
+
+
+def _failed(kind: str, message: str = "", exception_type: str = "RuntimeError"):
+    payload = {"exception_type": exception_type, "exception_message": message}
+    return ComfyExecutionError("p1", [["execution_start", {}], [kind, payload]])
+
+
+@pytest.mark.parametrize("error, kind", [
+    (_failed("execution_error", "CUDA error: out of memory"), OOM),
+    (_failed("execution_error", "", "torch.OutOfMemoryError"), OOM),
+    (_failed("execution_error", "shape mismatch"), EXECUTION),
+    (_failed("execution_interrupted"), FATAL),
+    (ComfyTimeout("p1", 300), TIMEOUT),
+    (ClipQAError("/tmp/a.mp4", ["frozen"]), QA),
+    (ComfyConnectionError("connection refused"), NETWORK),
+    (ComfyHTTPError(503, b"busy", "/prompt"), NETWORK),
+    (ComfyHTTPError(429, b"slow down", "/prompt"), NETWORK),
+    (ComfyValidationError(400, b'{"error": {}}', "/prompt"), VALIDATION),
+    (ComfyHTTPError(404, b"", "/view"), VALIDATION),
+    (ComfyError("something else"), FATAL),
+    (ValueError("not ours"), FATAL),
+])
+def test_classify(error, kind):
+    assert classify(error) == kind
+
+
+def test_oom_reduces_to_a_valid_length():
+    retry = RetryPolicy().plan(_failed("execution_error", "out of memory"), 1, WORKFLOW)
+    assert retry.action == REDUCE
+    length = retry.workflow["1"]["inputs"]["length"]
+    assert length < 161 and (length - 1) % 8 == 0
+    assert WORKFLOW["1"]["inputs"]["length"] == 161
+
+
+def test_oom_at_minimum_length_backs_off():
+    short = {"1": {"class_type": "EmptyLTXVLatentVideo", "inputs": {"length": 49}}}
+    retry = RetryPolicy().plan(_failed("execution_error", "out of memory"), 1, short)
+    assert retry.action == BACKOFF
+    assert retry.workflow is short
+
+
+def test_execution_error_rerolls_the_seed():
+    retry = RetryPolicy().plan(_failed("execution_error", "nan"), 1, WORKFLOW)
+    assert retry.action == RESEED
+    assert retry.delay == 0
+    assert retry.workflow["2"]["inputs"]["noise_seed"] != 42
+
+
+def test_network_backs_off_with_doubling_delay():
+    policy = RetryPolicy(backoff=5.0, max_backoff=12.0)
+    delays = [policy.plan(ComfyConnectionError("reset"), n, WORKFLOW).delay for n in (1, 2)]
+    assert delays == [5.0, 10.0]
+    assert RetryPolicy(retries=3, backoff=5.0, max_backoff=12.0).plan(
+        ComfyConnectionError("reset"), 3, WORKFLOW).delay == 12.0
+
+
+def test_timeout_waits_on_the_same_prompt():
+    retry = RetryPolicy().plan(ComfyTimeout("p1", 300), 1, WORKFLOW)
+    assert retry.action == WAIT
+    assert retry.workflow is WORKFLOW
+
+
+def test_validation_and_exhausted_retries_give_up():
+    policy = RetryPolicy(retries=2)
+    assert policy.plan(ComfyValidationError(400, b"{}", "/prompt"), 1, WORKFLOW) is None
+    assert policy.plan(_failed("execution_error", "nan"), 3, WORKFLOW) is None
@@ -0,0 +1,122 @@
+"""Resumable /view downloads."""
+
+import io
+import os
+
+import pytest
+
+from pipeline.comfy.client import ComfyConnectionError, ComfyDownloadError, ComfyHTTPError
+from pipeline.comfy.transfer import _part_path, fetch
+
+DATA = bytes(range(256)) * 40
+ITEM = {"filename": "clip_00001.bin", "subfolder": "", "type": "output"}
+
+
+class _Resp(io.BytesIO):
+    def __init__(self, body: bytes, status: int = 200, headers: dict | None = None):
+        super().__init__(body)
+        self.status = status
+        self.headers = headers or {}
+
+
+class _Client:
+    """Serves ``DATA`` like aiohttp's /view, with scripted failures."""
+
+    base_url = "http://comfy"
+    backoff = 0
+
+    def __init__(self, *, cut_at: int | None = None, fail_first: Exception | None = None,
+                 honour_range: bool = True):
+        self.cut_at = cut_at
+        self.fail_first = fail_first
+        self.honour_range = honour_range
+        self.ranges: list[str | None] = []
+
+    def view(self, item, *, stream=True, headers=None):
+        rng = (headers or {}).get("Range")
+        self.ranges.append(rng)
+        if self.fail_first is not None:
+            error, self.fail_first = self.fail_first, None
+            raise error
+        if rng and self.honour_range:
+            start = int(rng.split("=")[1].rstrip("-"))
+            if start >= len(DATA):
+                raise ComfyHTTPError(416, b"", "/view")
+            return _Resp(DATA[start:], 206, {
+                "Content-Range": f"bytes {start}-{len(DATA) - 1}/{len(DATA)}",
+                "Content-Length": str(len(DATA) - start)})
+        body = DATA
+        if self.cut_at is not None:
+            # The connection drops mid-body: fewer bytes than announced.
+            body, self.cut_at = DATA[:self.cut_at], None
+        return _Resp(body, 200, {"Content-Length": str(len(DATA))})
+
+
+def _read(path: str) -> bytes:
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def test_plain_download(tmp_path):
+    dest = str(tmp_path / "clip.bin")
+    assert fetch(_Client(), ITEM, dest) == len(DATA)
+    assert _read(dest) == DATA
+    assert os.listdir(tmp_path) == ["clip.bin"]
+
+
+def test_dropped_connection_resumes_with_range(tmp_path):
+    dest = str(tmp_path / "clip.bin")
+    client = _Client(cut_at=1000)
+    assert fetch(client, ITEM, dest) == len(DATA)
+    assert client.ranges == [None, "bytes=1000-"]
+    assert _read(dest) == DATA
+
+
+def test_server_ignoring_range_restarts_from_zero(tmp_path):
+    dest = str(tmp_path / "clip.bin")
+    client = _Client(cut_at=1000, honour_range=False)
+    assert fetch(client, ITEM, dest) == len(DATA)
+    assert client.ranges == [None, "bytes=1000-"]
+    assert _read(dest) == DATA
+
+
+def test_stale_part_past_the_end_is_discarded_on_416(tmp_path):
+    dest = str(tmp_path / "clip.bin")
+    part = _part_path(dest, _Client.base_url, ITEM)
+    with open(part, "wb") as f:
+        f.write(b"x" * (len(DATA) + 10))
+    client = _Client()
+    assert fetch(client, ITEM, dest) == len(DATA)
+    assert client.ranges == [f"bytes={len(DATA) + 10}-", None]
+    assert _read(dest) == DATA
+    assert not os.path.exists(part)
+
+
+def test_connection_error_is_retried(tmp_path):
+    dest = str(tmp_path / "clip.bin")
+    client = _Client(fail_first=ComfyConnectionError("reset"))
+    assert fetch(client, ITEM, dest) == len(DATA)
+    assert len(client.ranges) == 2
+
+
+def test_other_http_errors_fail_at_once(tmp_path):
+    dest = str(tmp_path / "clip.bin")
+    client = _Client(fail_first=ComfyHTTPError(404, b"not found", "/view"))
+    with pytest.raises(ComfyDownloadError) as info:
+        fetch(client, ITEM, dest)
+    assert isinstance(info.value.__cause__, ComfyHTTPError)
+    assert client.ranges == [None]
+    assert not os.path.exists(dest)
+
+
+def test_gives_up_without_renaming_a_partial_file(tmp_path):
+    dest = str(tmp_path / "clip.bin")
+
+    class _Truncating(_Client):
+        def view(self, item, *, stream=True, headers=None):
+            self.ranges.append((headers or {}).get("Range"))
+            return _Resp(b"", 200, {"Content-Length": str(len(DATA))})
+
+    with pytest.raises(ComfyDownloadError):
+        fetch(_Truncating(), ITEM, dest, attempts=3)
+    assert not os.path.exists(dest)
@@ -0,0 +1,118 @@
+"""Sentence chunking and gapless stitching of long narration."""
+
+import wave
+
+import numpy as np
+import pytest
+
+from pipeline.tts.chunk import CROSSFADE, _read_pcm16, split_text, stitch
+from pipeline.tts.client import TTSAudioError
+
+RATE = 24000
+
+LONG = (
+    "Sarah runs compliance for a hospital network. Every audit means weeks of paperwork, "
+    "and every shared record is one more chance for a leak. Zero-knowledge proofs change "
+    "that: the auditor checks a proof, not the patient file, and nothing private ever "
+    "leaves the building. Two endpoints. Zero data exposed."
+)
+
+
+def test_short_text_is_one_chunk():
+    assert split_text("  Hello   there.  ") == [("Hello there.", True)]
+    assert split_text("   ") == []
+
+
+def test_chunks_fit_and_keep_every_word():
+    chunks = split_text(LONG, max_chars=120, min_chars=40)
+    assert len(chunks) > 1
+    assert " ".join(text for text, _ in chunks).split() == LONG.split()
+    assert all(len(text) <= 120 for text, _ in chunks)
+    assert chunks[-1][1]
+
+
+def test_long_sentence_is_cut_at_clauses():
+    sentence = ("First clause runs on for a while, second clause keeps going for a while, "
+                "third clause also goes on, and the fourth one ends it.")
+    chunks = split_text(sentence, max_chars=60, min_chars=10)
+    assert len(chunks) > 1
+    assert [end for _, end in chunks] == [False] * (len(chunks) - 1) + [True]
+    assert all(text.endswith(",") for text, _ in chunks[:-1])
+
+
+def test_short_pieces_are_merged():
+    chunks = split_text("Yes. " + "A considerably longer sentence follows here. " * 4,
+                        max_chars=60, min_chars=40)
+    assert all(len(text) >= 40 for text, _ in chunks)
+
+
+def _write(path, pcm: np.ndarray, rate: int = RATE):
+    with wave.open(str(path), "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(rate)
+        w.writeframes(pcm.astype("<i2").tobytes())
+    return str(path)
+
+
+def _speech(seconds: float, lead: float, tail: float, freq: float = 220.0) -> np.ndarray:
+    t = np.arange(int(seconds * RATE)) / RATE
+    tone = 8000 * np.sin(2 * np.pi * freq * t)
+    return np.concatenate([np.zeros(int(lead * RATE)), tone, np.zeros(int(tail * RATE))])
+
+
+def _loud_runs(pcm: np.ndarray) -> list[tuple[int, int]]:
+    loud = np.abs(pcm.astype(np.int32)) > 300
+    edges = np.flatnonzero(np.diff(loud.astype(np.int8)))
+    bounds = np.concatenate([[0] if loud[0] else [], edges + 1,
+                             [len(pcm)] if loud[-1] else []]).astype(int)
+    runs = list(zip(bounds[::2], bounds[1::2]))
+    # Zero crossings of the tone are not pauses.
+    merged = [runs[0]]
+    for start, end in runs[1:]:
+        if start - merged[-1][1] < RATE // 100:
+            merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def test_stitch_trims_silence_to_the_pause(tmp_path):
+    a = _write(tmp_path / "a.wav", _speech(1.0, lead=0.15, tail=0.6))
+    b = _write(tmp_path / "b.wav", _speech(0.5, lead=0.7, tail=0.25, freq=330.0))
+    dest = tmp_path / "line.wav"
+    timings = stitch([a, b], [0.3], str(dest))
+
+    pcm, rate = _read_pcm16(str(dest))
+    assert rate == RATE
+    runs = _loud_runs(pcm[:, 0])
+    assert len(runs) == 2
+    gap = runs[1][0] - runs[0][1]
+    assert abs(gap - 0.3 * RATE) <= CROSSFADE * RATE + 2
+    # The line keeps the first lead-in and the last tail.
+    assert abs(runs[0][0] - 0.15 * RATE) <= 2
+    assert abs(len(pcm) - runs[1][1] - 0.25 * RATE) <= 2
+
+    assert timings[0]["start"] == 0
+    assert timings[0]["end"] > timings[1]["start"]      # the crossfade overlap
+    assert timings[1]["end"] == pytest.approx(len(pcm) / RATE, abs=1e-3)
+
+
+def test_stitch_join_has_no_click(tmp_path):
+    # Chunks that do not start or end in silence still meet smoothly.
+    a = _write(tmp_path / "a.wav", np.full(RATE // 2, 6000))
+    b = _write(tmp_path / "b.wav", np.full(RATE // 2, 6000))
+    dest = tmp_path / "line.wav"
+    stitch([a, b], [0.0], str(dest))
+    pcm, _ = _read_pcm16(str(dest))
+    assert np.abs(np.diff(pcm[:, 0].astype(np.int32))).max() < 1000
+    # Equal-power gains: the level never dips at the join.
+    assert pcm.min() >= 6000
+
+
+def test_stitch_refuses_mixed_rates(tmp_path):
+    a = _write(tmp_path / "a.wav", _speech(0.2, 0.1, 0.1))
+    b = _write(tmp_path / "b.wav", _speech(0.2, 0.1, 0.1), rate=16000)
+    with pytest.raises(TTSAudioError):
+        stitch([a, b], [0.2], str(tmp_path / "line.wav"))
+    assert not (tmp_path / "line.wav").exists()
@@ -0,0 +1,80 @@
+"""BS.1770 loudness and the narration post-processing built on it."""
+
+import wave
+
+import numpy as np
+import pytest
+from scipy.signal import lfilter
+
+from pipeline.tts.bundle import read_mono
+from pipeline.tts.post import integrated_loudness, k_weight, postprocess
+
+
+def _sine(freq: float, seconds: float, rate: int, amplitude: float = 1.0) -> np.ndarray:
+    return amplitude * np.sin(2 * np.pi * freq * np.arange(int(seconds * rate)) / rate)
+
+
+@pytest.mark.parametrize("rate", [24000, 44100, 48000])
+def test_full_scale_1khz_sine_reads_minus_3_lufs(rate):
+    # BS.1770-4: a 0 dBFS 997 Hz sine in one channel measures -3.01 LKFS.
+    assert integrated_loudness(_sine(997, 5, rate), rate) == pytest.approx(-3.01, abs=0.05)
+
+
+def test_k_weighting_matches_the_tabled_48khz_filter():
+    # Coefficients from BS.1770-4, Tables 1 and 2.
+    shelf = ([1.53512485958697, -2.69169618940638, 1.19839281085285],
+             [1.0, -1.69065929318241, 0.73248077421585])
+    high_pass = ([1.0, -2.0, 1.0], [1.0, -1.99004745483398, 0.99007225036621])
+    impulse = np.zeros(64)
+    impulse[0] = 1.0
+    expected = lfilter(*high_pass, lfilter(*shelf, impulse))
+    assert np.allclose(k_weight(impulse, 48000), expected, atol=1e-9)
+
+
+def test_loudness_follows_gain():
+    rate = 48000
+    assert integrated_loudness(_sine(997, 5, rate, 0.1), rate) == pytest.approx(-23.01, abs=0.05)
+
+
+def test_k_weighting_favours_highs_over_lows():
+    rate = 48000
+    low = integrated_loudness(_sine(50, 5, rate), rate)
+    high = integrated_loudness(_sine(4000, 5, rate), rate)
+    assert low < -3.01 - 3
+    assert high > -3.01 + 2
+
+
+def test_silence_is_gated_out():
+    rate = 48000
+    tone = _sine(997, 10, rate, 0.1)
+    padded = np.concatenate([np.zeros(10 * rate), tone, np.zeros(10 * rate)])
+    # Ungated, two thirds of silence would take 4.8 dB off; only the blocks
+    # straddling the edges of the tone still count.
+    assert integrated_loudness(padded, rate) == pytest.approx(
+        integrated_loudness(tone, rate), abs=0.2)
+
+
+def test_silence_and_short_clips_have_no_loudness():
+    assert integrated_loudness(np.zeros(48000), 48000) is None
+    assert integrated_loudness(_sine(997, 0.3, 48000), 48000) is None
+
+
+def test_postprocess_trims_normalizes_and_resamples(tmp_path):
+    src_rate = 24000
+    speech = _sine(440, 1.5, src_rate, 0.05)
+    samples = np.concatenate([np.zeros(src_rate), speech, np.zeros(src_rate // 2)])
+    path = str(tmp_path / "scene-0.wav")
+    with wave.open(path, "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(src_rate)
+        w.writeframes(np.round(samples * 32767).astype("<i2").tobytes())
+
+    result = postprocess(path, head=0.1, tail=0.2, lufs=-16, rate=48000)
+    assert result.ok and not result.limited
+    assert result.rate == 48000
+    assert result.after == pytest.approx(0.1 + 1.5 + 0.2, abs=0.02)
+
+    out, rate = read_mono(path)
+    assert rate == 48000
+    assert integrated_loudness(out, rate) == pytest.approx(-16, abs=0.3)